@@ -1,15 +1,10 @@
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
-import numpy as np
-import time
 import json
 from datetime import datetime, timedelta
+import importlib.util
 import sys
 import os
-import re
-import ast
+import time
 
 # Configuración de la página
 st.set_page_config(
@@ -19,15 +14,40 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Importar agente Claude (REAL)
-try:
-    import anthropic
-    ANTHROPIC_AVAILABLE = True
-except ImportError:
-    ANTHROPIC_AVAILABLE = False
+# Permitir importar los componentes al ejecutar `streamlit run app/main.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import parsing
+from core.agent import stream_message
+from core.cancellation import Cancelled
+from core.metrics import LLM_CALL_SECONDS
+from core.ratelimit import rate_limited
+from core.routing import ROUTER, credential_scope
+from core.reporting import StreamlitReporter
+from core.tracing import span, traced
+from components.app_metrics import install_app_metrics, observe_rerun
+from components.demo_corpus import demo_entry, render_demo
+from components.exports import (FORMATS, deferred_export, export_file_name, export_mime, osint_tables,
+                                profile_tables, render_export_controls)
+from components.history_store import current_session_id, get_history_store
+from components.jobs import render_job_metrics, render_jobs_panel, submit_job
+from components.memory import inspect_session_memory, render_memory_inspector
+from components.model_routing import render_routing_panel
+from components.profiler import (finish_render_profile, profile_section, profiled, render_profiler_panel,
+                                 start_render_profile)
+from components.progress import ProgressTracker, record_stage_timings, render_stage_timings
+from components.render import install_render_counter, paginate, pager, render_page_size_setting, render_render_stats
+from components.session_history import render_memory_report, session_history
+from components.traces import hold_trace, render_trace_panel, resume_trace, start_session_trace
+
+# Agente Claude (REAL): el SDK tarda en importarse, así que solo se comprueba
+# que está instalado y se importa al configurar el cliente
+ANTHROPIC_AVAILABLE = importlib.util.find_spec("anthropic") is not None
+if not ANTHROPIC_AVAILABLE:
     st.error("Anthropic no instalado. Instalar con: pip install anthropic")
 
 # CSS profesional minimalista
+@profiled
 def load_css():
     st.markdown("""
     <style>
@@ -84,58 +104,73 @@ def load_css():
 
 def main():
     """Función principal mejorada con manejo de errores"""
+    started = time.perf_counter()
     try:
+        install_app_metrics()
+        start_render_profile()
+        install_render_counter()
         load_css()
         
         # Inicializar estado de la sesión
-        if 'demo_mode' not in st.session_state:
-            st.session_state.demo_mode = False
-        if 'completed_analyses' not in st.session_state:
-            st.session_state.completed_analyses = []
-        if 'user_profiles' not in st.session_state:
-            st.session_state.user_profiles = []
-        if 'generated_content' not in st.session_state:
-            st.session_state.generated_content = []
+        with profile_section("Estado de sesión"):
+            if 'demo_mode' not in st.session_state:
+                st.session_state.demo_mode = False
+            # Historiales acotados: las entradas antiguas se vuelcan a disco
+            session_history('completed_analyses')
+            session_history('user_profiles')
+            session_history('generated_content')
+        # Tamaño de cada clave de la sesión y umbrales de memoria
+        inspect_session_memory()
         
         # Header principal
-        st.markdown("""
-        <div class="main-header">
-            <h1>Sistema de Análisis de Vulnerabilidades</h1>
-            <p>Plataforma Profesional de Evaluación de Seguridad</p>
-        </div>
-        """, unsafe_allow_html=True)
+        with profile_section("Cabecera"):
+            st.markdown("""
+            <div class="main-header">
+                <h1>Sistema de Análisis de Vulnerabilidades</h1>
+                <p>Plataforma Profesional de Evaluación de Seguridad</p>
+            </div>
+            """, unsafe_allow_html=True)
         
         # Configurar agente de IA
         setup_ai_agent()
         
-        # Menú principal
-        tab1, tab2, tab3, tab4 = st.tabs([
-            "Panel Principal",
-            "Análisis OSINT", 
-            "Perfilado de Usuario",
-            "Generación de Contenido"
-        ])
+        # Análisis en curso en segundo plano
+        render_jobs_panel()
+        
+        # Menú principal: solo se ejecuta la pestaña seleccionada
+        with profile_section("Pestañas"):
+            tab1, tab2, tab3, tab4 = st.tabs([
+                "Panel Principal",
+                "Análisis OSINT", 
+                "Perfilado de Usuario",
+                "Generación de Contenido"
+            ], key="main_tab", on_change="rerun")
         
-        with tab1:
-            show_dashboard()
+        if tab1.open:
+            with tab1:
+                show_dashboard()
         
-        with tab2:
-            osint_analysis()
+        if tab2.open:
+            with tab2:
+                osint_analysis()
         
-        with tab3:
-            user_profiling()
+        if tab3.open:
+            with tab3:
+                user_profiling()
         
-        with tab4:
-            content_generation()
+        if tab4.open:
+            with tab4:
+                content_generation()
         
         # Footer con información adicional
-        st.markdown("---")
-        st.markdown("""
-        <div style="text-align: center; color: #6b7280; font-size: 0.9rem; padding: 1rem;">
-            <p><strong>Sistema de Análisis de Vulnerabilidades</strong> </p>
-            <p>⚠️ <strong>AEGIS SECURITY CONSULTANT</strong> </p>
-        </div>
-        """, unsafe_allow_html=True)
+        with profile_section("Pie"):
+            st.markdown("---")
+            st.markdown("""
+            <div style="text-align: center; color: #6b7280; font-size: 0.9rem; padding: 1rem;">
+                <p><strong>Sistema de Análisis de Vulnerabilidades</strong> </p>
+                <p>⚠️ <strong>AEGIS SECURITY CONSULTANT</strong> </p>
+            </div>
+            """, unsafe_allow_html=True)
         
     except Exception as e:
         st.error(f"❌ Error en la aplicación: {str(e)}")
@@ -153,7 +188,14 @@ def main():
             for key in list(st.session_state.keys()):
                 del st.session_state[key]
             st.rerun()
-
+    finally:
+        # El histórico vuelca sus lotes solo al llenarse o al vencer su intervalo
+        with profile_section("Volcado del histórico"):
+            get_history_store().flush_if_due()
+        finish_render_profile()
+        observe_rerun(st.session_state.get('main_tab', "Panel Principal"), time.perf_counter() - started)
+
+@profiled
 def setup_ai_agent():
     """Configurar agente de IA REAL"""
     
@@ -218,6 +260,29 @@ def setup_ai_agent():
             ❌ Evaluación de vectores de ataque  
             ❌ Análisis contextual profundo
             """)
+        
+        with st.expander("⏱️ Tiempos de Ejecución", expanded=False):
+            render_stage_timings()
+
+        with st.expander("🧠 Memoria de Sesión", expanded=False):
+            render_memory_report()
+            render_memory_inspector()
+
+        with st.expander("🧵 Cola de Trabajos", expanded=False):
+            render_job_metrics()
+
+        with st.expander("📦 Coste de Render", expanded=False):
+            render_page_size_setting()
+            render_render_stats()
+
+        with st.expander("🔥 Perfilado de Render", expanded=False):
+            render_profiler_panel()
+
+        with st.expander("🛰️ Trazas de Análisis", expanded=False):
+            render_trace_panel()
+
+        with st.expander("🧭 Enrutado de Modelos", expanded=False):
+            render_routing_panel(scope=credential_scope(st.session_state.get('anthropic_api_key_input')))
 
 def test_anthropic_connection(api_key):
     """Probar conexión con Anthropic usando modelo que funciona"""
@@ -227,17 +292,22 @@ def test_anthropic_connection(api_key):
     
     try:
         with st.spinner("Probando conexión..."):
+            import anthropic
             client = anthropic.Anthropic(api_key=api_key)
-            # Usar directamente el modelo que funciona
-            response = client.messages.create(
-                model="claude-3-5-haiku-20241022",
-                max_tokens=20,
-                messages=[{"role": "user", "content": "Responde solo: 'Conexión exitosa'"}]
-            )
+            prompt = "Responde solo: 'Conexión exitosa'"
+
+            def send(decision):
+                request = decision.request(messages=[{"role": "user", "content": prompt}])
+                with rate_limited(request) as call:
+                    call['output'] = client.messages.create(**request).content[0].text
+                return call['output']
+
+            text, decision = ROUTER.invoke("connection_test", prompt, send,
+                                         scope=credential_scope(api_key))
             st.session_state.anthropic_client = client
-            st.session_state.claude_model = "claude-3-5-haiku-20241022"
+            st.session_state.claude_model = decision.model
             st.session_state.demo_mode = False
-            st.success(f"✅ {response.content[0].text}")
+            st.success(f"✅ {text}")
     except Exception as e:
         st.error(f"❌ Error de conexión: {str(e)}")
         st.info("💡 Intente con el modo demo mientras tanto")
@@ -246,14 +316,16 @@ def setup_anthropic_client(api_key):
     """Configurar cliente sin probar inmediatamente"""
     if api_key.startswith('sk-ant-'):
         try:
+            import anthropic
             client = anthropic.Anthropic(api_key=api_key)
             st.session_state.anthropic_client = client
-            st.session_state.claude_model = "claude-3-5-haiku-20241022"  # Usar modelo que funciona
+            st.session_state.claude_model = ROUTER.primary_model("connection_test", credential_scope(api_key))
             st.session_state.demo_mode = False
             st.info("🔑 API Key configurada. Use 'Probar API' para verificar.")
         except Exception as e:
             st.error(f"❌ Error configurando cliente: {str(e)}")
 
+@profiled
 def display_system_info():
     """Mostrar información del sistema"""
     st.markdown("---")
@@ -280,6 +352,7 @@ def clear_session_cache():
         if key in st.session_state:
             del st.session_state[key]
 
+@profiled
 def show_dashboard():
     """Panel principal del sistema"""
     
@@ -313,6 +386,7 @@ def show_dashboard():
     
     # Historial de análisis
     display_recent_analyses()
+    display_history_browser()
     
     # Botón para cargar datos demo fuera de cualquier form
     if st.session_state.get('demo_mode'):
@@ -322,6 +396,7 @@ def show_dashboard():
             st.success("✅ Datos de ejemplo cargados")
             st.rerun()
 
+@profiled
 def show_setup_instructions():
     """Mostrar instrucciones de configuración"""
     st.warning("**Configure la API de Anthropic o use el Modo Demo para acceder a todas las funcionalidades**")
@@ -335,70 +410,89 @@ def show_setup_instructions():
     **💡 Tip**: Usa el botón **"🧪 Modo Demo"** en el sidebar para probar la interfaz sin API key.
     """)
 
+def newest_first_page(history, key):
+    """(índice, cabecera) de la página visible de un historial, más recientes primero"""
+    headers = history.headers()
+    start, end = pager(key, len(headers))
+    last = len(headers) - 1
+    return [(last - i, headers[last - i]) for i in range(start, end)]
+
+@profiled
 def display_recent_analyses():
     """Mostrar análisis recientes"""
-    if st.session_state.get('completed_analyses'):
+    history = session_history('completed_analyses')
+    if history:
         st.markdown("### Análisis Recientes")
-        for analysis in st.session_state.completed_analyses[-3:]:
-            with st.expander(f"{analysis['type']} - {analysis['timestamp']}", expanded=False):
-                if isinstance(analysis['summary'], dict):
-                    st.json(analysis['summary'])
-                else:
-                    st.write(analysis['summary'])
-
-def safe_json_parse(content):
-    """Parsear JSON de forma tolerante a errores comunes"""
-    if not content or not isinstance(content, str):
-        return None
-
-    # Paso 1: limpieza básica
-    content = content.strip()
-    content = re.sub(r'```json\s*', '', content)
-    content = re.sub(r'```\s*$', '', content)
-
-    # Paso 2: extraer bloque con llaves
-    json_match = re.search(r'\{.*\}', content, re.DOTALL)
-    if json_match:
-        json_str = json_match.group(0)
-    else:
-        json_str = content
-
-    # Paso 3: normalizar espacios y saltos
-    json_str = json_str.replace('\n', ' ').replace('\r', ' ')
-    json_str = re.sub(r'\s+', ' ', json_str)
-
-    # Paso 4: intentar parseo normal
-    try:
-        return json.loads(json_str)
-    except json.JSONDecodeError:
-        # Intentar reparaciones comunes
-        json_str = fix_common_json_errors(json_str)
+        for index, header in newest_first_page(history, "recent_analyses"):
+            # El cuerpo solo se carga (desde disco si se volcó) al abrir el expander
+            expander = st.expander(f"{header['type']} - {header['timestamp']}", expanded=False,
+                                   key=f"recent_analysis_{index}", on_change="rerun")
+            with expander:
+                if expander.open:
+                    analysis = history[index]
+                    if isinstance(analysis['summary'], dict):
+                        st.json(analysis['summary'])
+                    else:
+                        st.write(analysis['summary'])
+
+@profiled
+def display_history_browser():
+    """Histórico persistente de análisis con filtros y paginación"""
+    store = get_history_store()
+    st.markdown("### 🗄️ Histórico de Análisis")
+
+    kinds = {'Todos': None, 'Análisis OSINT': 'osint', 'Perfiles': 'profile', 'Contenido': 'content'}
+    col1, col2, col3, col4, col5 = st.columns([2, 2, 2, 2, 1])
+    with col1:
+        kind = kinds[st.selectbox("Tipo", list(kinds), key="history_kind")]
+    with col2:
+        company = st.selectbox("Empresa", ["Todas"] + store.distinct('company'), key="history_company")
+    with col3:
+        department = st.selectbox("Departamento", ["Todos"] + store.distinct('department'), key="history_department")
+    with col4:
+        min_risk = st.slider("Riesgo mínimo", 0.0, 1.0, 0.0, 0.05, key="history_min_risk")
+    with col5:
+        page_size = st.selectbox("Filas", [10, 25, 50], key="history_page_size")
+
+    filters = {
+        'kind': kind,
+        'company': None if company == "Todas" else company,
+        'department': None if department == "Todos" else department,
+        'min_risk': min_risk or None
+    }
 
-        try:
-            return json.loads(json_str)
-        except json.JSONDecodeError:
-            # Intentar con ast.literal_eval (más permisivo)
-            try:
-                return ast.literal_eval(json_str)
-            except Exception as e:
-                st.warning(f"Error JSON incluso tras reparación: {e}")
-                st.text(f"Contenido: {json_str}")
-                return None
+    # Paginación por cursor: se guarda el id de corte de cada página visitada
+    filters_key = json.dumps([filters, page_size], sort_keys=True)
+    if st.session_state.get('history_filters') != filters_key:
+        st.session_state.history_filters = filters_key
+        st.session_state.history_cursors = [None]
+    cursors = st.session_state.history_cursors
 
-def fix_common_json_errors(text):
-    """Corrige errores comunes en JSON generado por IA"""
-    # Quitar comas antes de cierre de objeto o array
-    text = re.sub(r',\s*([}\]])', r'\1', text)
+    rows = store.query(limit=page_size, before_id=cursors[-1], **filters)
+    if not rows:
+        st.caption("Sin análisis registrados")
+        return
 
-    # Asegurar que comillas sean dobles
-    text = re.sub(r"'", '"', text)
+    st.dataframe(rows, hide_index=True, use_container_width=True)
 
-    # Quitar caracteres no permitidos al final
-    text = re.sub(r'[\s,]+$', '', text)
+    col_prev, col_info, col_next = st.columns([1, 3, 1])
+    with col_prev:
+        if st.button("◀ Anterior", key="history_prev", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col_info:
+        st.caption(f"Página {len(cursors)} · {store.count(**filters)} análisis")
+    with col_next:
+        if st.button("Siguiente ▶", key="history_next", disabled=len(rows) < page_size):
+            cursors.append(rows[-1]['id'])
+            st.rerun()
 
-    return text
+def safe_json_parse(content):
+    """Parsear JSON de forma tolerante a errores comunes"""
+    return parsing.safe_json_parse(content, reporter=StreamlitReporter())
 
 
+@profiled
 def osint_analysis():
     """Análisis OSINT real mejorado"""
     st.markdown("### Análisis de Inteligencia de Fuentes Abiertas")
@@ -448,8 +542,13 @@ def osint_analysis():
         
         if submitted:
             if company_name and domain:
-                run_osint_analysis(company_name, domain, industry, company_size, 
-                                 employee_info, tech_stack, additional_info)
+                # La traza sigue al análisis hasta que se pintan sus resultados
+                trace = start_session_trace("Análisis OSINT", company=company_name, domain=domain,
+                                            industry=industry, demo=bool(st.session_state.get('demo_mode')))
+                with trace.activate():
+                    run_osint_analysis(company_name, domain, industry, company_size, 
+                                     employee_info, tech_stack, additional_info)
+                hold_trace('osint', trace)
             else:
                 st.error("Complete los campos obligatorios (*)")
     
@@ -457,23 +556,25 @@ def osint_analysis():
     if 'current_osint' in st.session_state:
         st.markdown("---")
         st.markdown("### 📊 Último Análisis Completado")
-        display_osint_results(st.session_state.current_osint)
+        with resume_trace('osint'):
+            display_osint_results(st.session_state.current_osint)
 
 def run_osint_analysis(company_name, domain, industry, company_size, 
                       employee_info, tech_stack, additional_info):
     """Ejecutar análisis OSINT real con Claude mejorado"""
     
     if st.session_state.get('demo_mode'):
+        tracker = ProgressTracker("OSINT (demo)")
         with st.spinner("Generando análisis OSINT de ejemplo..."):
-            time.sleep(2)
-            result = generate_demo_osint(company_name, domain, industry, employee_info)
-            save_osint_result(result, company_name)
-            display_osint_results(result)
+            with tracker.stage("Generación de ejemplo"):
+                result = generate_demo_osint(company_name, domain, industry, employee_info)
+            with tracker.stage("Guardado"):
+                save_osint_result(result, company_name)
+            record_stage_timings(tracker)
         return
     
-    with st.spinner("Ejecutando análisis OSINT profundo..."):
-        
-        # Prompt mejorado para análisis más específico
+    # Prompt mejorado para análisis más específico
+    with span("Construcción del prompt") as prompt_span:
         prompt = f"""
 Eres un experto analista de ciberseguridad especializado en OSINT. Analiza la siguiente empresa y proporciona un análisis detallado.
 
@@ -539,95 +640,62 @@ Proporciona un análisis JSON detallado con la siguiente estructura EXACTA:
 
 Basa tu análisis en la información específica proporcionada. Si no hay información suficiente para un campo, usa "Análisis manual requerido".
 """
-        
+        prompt_span.set_attribute('caracteres', len(prompt))
+    
+    client = st.session_state.anthropic_client
+    session_id = current_session_id()
+
+    def analysis_job(job):
+        # Se ejecuta en un worker: nada de st.* aquí, los mensajes van al reporter del trabajo
         try:
-            response = st.session_state.anthropic_client.messages.create(
-                model="claude-3-5-haiku-20241022",  # Usar modelo que funciona
-                max_tokens=4000,
-                temperature=0.3,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            
-            content = response.content[0].text.strip()
+            with job.tracker.stage("Llamada a Claude"), LLM_CALL_SECONDS.time(method="run_osint_analysis"):
+                content, _ = ROUTER.invoke(
+                    "run_osint_analysis", prompt,
+                    lambda decision: stream_message(client, job.cancel_token, **decision.request(
+                        temperature=0.3,
+                        messages=[{"role": "user", "content": prompt}]
+                    )),
+                    scope=credential_scope(client.api_key),
+                    on_fallback=lambda decision: job.reporter.info(
+                        f"🔄 Intentando con modelo de respaldo ({decision.model})...")
+                )
             
-            with st.expander("🔍 Debug: Respuesta de Claude", expanded=False):
-                st.text(content)
+            content = content.strip()
+            job.reporter.detail(content)
             
             # Usar parsing mejorado
-            analysis_result = safe_json_parse(content)
+            with job.tracker.stage("Parseo JSON"):
+                analysis_result = parsing.safe_json_parse(content, reporter=job.reporter)
             
             if not analysis_result:
-                st.warning("⚠️ Error en parsing JSON. Generando análisis básico...")
+                job.reporter.warning("⚠️ Error en parsing JSON. Generando análisis básico...")
                 analysis_result = generate_fallback_osint(company_name, industry, employee_info)
-            
-            save_osint_result(analysis_result, company_name)
-            st.success("✅ Análisis OSINT completado")
-            display_osint_results(analysis_result)
-            
+            return analysis_result
+        
+        except Cancelled:
+            raise
         except Exception as e:
-            st.error(f"❌ Error en análisis: {str(e)}")
+            job.reporter.error(f"❌ Error en análisis: {str(e)}")
             # Usar fallback inmediatamente
-            fallback_result = generate_fallback_osint(company_name, industry, employee_info)
-            save_osint_result(fallback_result, company_name)
-            display_osint_results(fallback_result)
+            return generate_fallback_osint(company_name, industry, employee_info)
+    
+    submit_job(
+        'osint', analysis_job, f"Análisis OSINT · {company_name}",
+        persist=lambda result: store_osint_result(result, company_name, session_id),
+        apply=lambda result: save_osint_result(result, company_name, store=False),
+        form="osint_form", fingerprint=prompt
+    )
+    st.rerun()
 
 def generate_demo_osint(company_name, domain, industry, employee_info):
     """Generar análisis OSINT demo más realista"""
-    return {
-        "risk_score": 0.78,
-        "risk_level": "ALTO",
-        "vulnerabilities": [
-            {
-                "type": "Exposición de Empleados en RRSS",
-                "severity": "ALTA",
-                "description": f"Personal de {company_name} comparte información sobre proyectos en LinkedIn",
-                "evidence": "Perfiles públicos con detalles técnicos",
-                "impact": "Posible ingeniería social dirigida"
-            },
-            {
-                "type": "Información Técnica Pública",
-                "severity": "MEDIA",
-                "description": f"Stack tecnológico visible en ofertas de trabajo de {industry}",
-                "evidence": "Ofertas laborales detalladas",
-                "impact": "Reconocimiento de infraestructura"
-            }
-        ],
-        "attack_vectors": [
-            {
-                "vector": "Spear Phishing dirigido",
-                "probability": 0.85,
-                "impact": f"Emails personalizados usando información de {industry}",
-                "method": "Aprovechamiento de información pública de empleados"
-            }
-        ],
-        "employee_exposure": [
-            {
-                "employee": employee_info[:30] + "..." if employee_info else "Personal técnico",
-                "risk_level": "ALTO",
-                "exposure_type": "LinkedIn, GitHub",
-                "sensitive_info": "Proyectos, tecnologías, estructura organizacional"
-            }
-        ],
-        "technical_findings": [
-            {
-                "finding": f"Subdominios expuestos de {domain}",
-                "risk": "MEDIO",
-                "recommendation": "Auditoría de subdominios y servicios expuestos"
-            }
-        ],
-        "industry_specific_risks": [
-            f"Regulaciones específicas del sector {industry}",
-            f"Ataques dirigidos comunes en {industry}"
-        ],
-        "recommendations": [
-            {
-                "priority": "ALTA",
-                "category": "Concienciación",
-                "action": "Programa de entrenamiento en ingeniería social",
-                "timeline": "30 días"
-            }
-        ]
-    }
+    return render_demo(
+        'osint',
+        company_name=company_name,
+        domain=domain,
+        industry=industry,
+        employee=employee_info[:30] + "..." if employee_info else "Personal técnico"
+    )
 
 def generate_fallback_osint(company_name, industry, employee_info):
     """Generar análisis OSINT de fallback"""
@@ -664,16 +732,31 @@ def generate_fallback_osint(company_name, industry, employee_info):
         ]
     }
 
-def save_osint_result(result, company_name):
+@traced
+def save_osint_result(result, company_name, store=True):
     """Guardar resultado del análisis OSINT"""
-    st.session_state.completed_analyses.append({
+    session_history('completed_analyses').append({
         'type': 'Análisis OSINT',
         'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         'company': company_name,
         'summary': result
     })
     st.session_state.current_osint = result
-
+    if store:
+        store_osint_result(result, company_name, current_session_id())
+
+@traced
+def store_osint_result(result, company_name, session_id):
+    """Escribir el análisis OSINT en el histórico persistente"""
+    get_history_store().add(
+        'osint', result,
+        company=company_name,
+        risk_score=result.get('risk_score') if isinstance(result, dict) else None,
+        session_id=session_id
+    )
+
+@profiled
+@traced
 def display_osint_results(results):
     """Mostrar resultados del análisis OSINT mejorado"""
     
@@ -695,101 +778,102 @@ def display_osint_results(results):
         vuln_count = len(results.get('vulnerabilities', []))
         st.metric("Vulnerabilidades", vuln_count)
     
+    # Cada sección solo materializa la página visible, en un único bloque HTML
     # Vulnerabilidades detalladas
     if results.get('vulnerabilities'):
         st.markdown("### 🎯 Vulnerabilidades Identificadas")
-        for vuln in results['vulnerabilities']:
-            display_vulnerability_card(vuln)
+        paginate(results['vulnerabilities'], "osint_vulnerabilities", render_html=vulnerability_card_html)
     
     # Exposición de empleados
     if results.get('employee_exposure'):
         st.markdown("### 👥 Exposición de Empleados")
-        for emp in results['employee_exposure']:
-            display_employee_exposure(emp)
+        paginate(results['employee_exposure'], "osint_employees", render_html=employee_exposure_html)
     
     # Vectores de ataque
     if results.get('attack_vectors'):
         st.markdown("### ⚔️ Vectores de Ataque")
-        for vector in results['attack_vectors']:
-            display_attack_vector(vector)
+        paginate(results['attack_vectors'], "osint_vectors", render_html=attack_vector_html)
     
     # Hallazgos técnicos
     if results.get('technical_findings'):
         st.markdown("### 🔧 Hallazgos Técnicos")
-        for finding in results['technical_findings']:
-            display_technical_finding(finding)
+        paginate(results['technical_findings'], "osint_findings", render_html=technical_finding_html)
     
     # Recomendaciones
     if results.get('recommendations'):
         st.markdown("### 💡 Recomendaciones Prioritarias")
-        for rec in results['recommendations']:
-            display_recommendation(rec)
+        paginate(results['recommendations'], "osint_recommendations", render_html=recommendation_html)
+    
+    # Exportación: se genera solo al descargar
+    render_export_controls("osint_results", lambda: osint_tables(results), "analisis_osint",
+                           formats=tuple(FORMATS), label="💾 Exportar Resultados")
 
-def display_vulnerability_card(vuln):
-    """Mostrar tarjeta de vulnerabilidad"""
+def vulnerability_card_html(vuln):
+    """HTML de tarjeta de vulnerabilidad"""
     severity_color = {
         'CRÍTICA': '#dc2626', 'ALTA': '#f97316', 
         'MEDIA': '#d97706', 'BAJA': '#059669'
     }.get(vuln.get('severity', 'MEDIA'), '#6b7280')
     
-    st.markdown(f"""
+    return f"""
     <div style="border-left: 4px solid {severity_color}; padding: 1rem; margin: 0.5rem 0; background: #f8fafc; border-radius: 6px;">
         <h4 style="margin: 0 0 0.5rem 0; color: {severity_color};">{vuln.get('type', 'Vulnerabilidad')} - {vuln.get('severity', 'MEDIA')}</h4>
         <p style="margin: 0.5rem 0;"><strong>Descripción:</strong> {vuln.get('description', 'Sin descripción')}</p>
         {f'<p style="margin: 0.5rem 0;"><strong>Evidencia:</strong> {vuln.get("evidence", "No especificada")}</p>' if vuln.get('evidence') else ''}
         {f'<p style="margin: 0.5rem 0;"><strong>Impacto:</strong> {vuln.get("impact", "No especificado")}</p>' if vuln.get('impact') else ''}
     </div>
-    """, unsafe_allow_html=True)
+    """
 
-def display_employee_exposure(emp):
-    """Mostrar exposición de empleado"""
+def employee_exposure_html(emp):
+    """HTML de exposición de empleado"""
     risk_color = {'ALTO': '#dc2626', 'MEDIO': '#f97316', 'BAJO': '#059669'}.get(emp.get('risk_level', 'MEDIO'), '#6b7280')
     
-    st.markdown(f"""
+    return f"""
     <div style="border-left: 4px solid {risk_color}; padding: 1rem; margin: 0.5rem 0; background: #fef2f2; border-radius: 6px;">
         <h4 style="margin: 0 0 0.5rem 0;">{emp.get('employee', 'Empleado')} - Riesgo {emp.get('risk_level', 'MEDIO')}</h4>
         <p><strong>Tipo de exposición:</strong> {emp.get('exposure_type', 'No especificado')}</p>
         <p><strong>Información sensible:</strong> {emp.get('sensitive_info', 'No especificada')}</p>
     </div>
-    """, unsafe_allow_html=True)
+    """
 
-def display_attack_vector(vector):
-    """Mostrar vector de ataque"""
+def attack_vector_html(vector):
+    """HTML de vector de ataque"""
     probability = vector.get('probability', 0)
     color = '#dc2626' if probability > 0.7 else '#f97316' if probability > 0.4 else '#059669'
     
-    st.markdown(f"""
+    return f"""
     <div style="border-left: 4px solid {color}; padding: 1rem; margin: 0.5rem 0; background: #f8fafc; border-radius: 6px;">
         <h4 style="margin: 0 0 0.5rem 0;">{vector.get('vector', 'Vector')} - Probabilidad: {probability:.0%}</h4>
         <p><strong>Impacto:</strong> {vector.get('impact', 'Sin descripción')}</p>
         <p><strong>Método:</strong> {vector.get('method', 'No especificado')}</p>
     </div>
-    """, unsafe_allow_html=True)
+    """
 
-def display_technical_finding(finding):
-    """Mostrar hallazgo técnico"""
-    st.markdown(f"""
+def technical_finding_html(finding):
+    """HTML de hallazgo técnico"""
+    return f"""
     <div style="border-left: 4px solid #3b82f6; padding: 1rem; margin: 0.5rem 0; background: #eff6ff; border-radius: 6px;">
         <h4 style="margin: 0 0 0.5rem 0;">{finding.get('finding', 'Hallazgo')}</h4>
         <p><strong>Riesgo:</strong> {finding.get('risk', 'No especificado')}</p>
         <p><strong>Recomendación:</strong> {finding.get('recommendation', 'No especificada')}</p>
     </div>
-    """, unsafe_allow_html=True)
+    """
 
-def display_recommendation(rec):
-    """Mostrar recomendación"""
+def recommendation_html(rec):
+    """HTML de recomendación"""
     priority_color = {
         'ALTA': '#dc2626', 'MEDIA': '#f97316', 'BAJA': '#059669'
     }.get(rec.get('priority', 'MEDIA'), '#6b7280')
     
-    st.markdown(f"""
+    return f"""
     <div style="border-left: 4px solid {priority_color}; padding: 1rem; margin: 0.5rem 0; background: #f0fdf4; border-radius: 6px;">
         <h4 style="margin: 0 0 0.5rem 0; color: {priority_color};">Prioridad {rec.get('priority', 'MEDIA')} - {rec.get('category', 'General')}</h4>
         <p><strong>Acción:</strong> {rec.get('action', 'Sin descripción')}</p>
         {f'<p><strong>Plazo:</strong> {rec.get("timeline", "No especificado")}</p>' if rec.get('timeline') else ''}
     </div>
-    """, unsafe_allow_html=True)
+    """
 
+@profiled
 def user_profiling():
     """Perfilado de usuario mejorado"""
     st.markdown("### Perfilado Psicológico de Usuario")
@@ -887,17 +971,17 @@ def generate_psychological_profile(user_name, department, seniority, company_siz
     """Generar perfil psicológico mejorado"""
     
     if st.session_state.get('demo_mode'):
+        tracker = ProgressTracker("Perfil (demo)")
         with st.spinner("Generando perfil psicológico de ejemplo..."):
-            time.sleep(2)
-            result = generate_demo_profile(user_name, department, seniority, social_activity, 
-                                         security_awareness, info_sharing, personality_traits)
-            save_profile_result(result, user_name, department)
-            display_profile_results(result)
+            with tracker.stage("Generación de ejemplo"):
+                result = generate_demo_profile(user_name, department, seniority, social_activity, 
+                                             security_awareness, info_sharing, personality_traits)
+            with tracker.stage("Guardado"):
+                save_profile_result(result, user_name, department)
+            record_stage_timings(tracker)
         return
     
-    with st.spinner("Generando perfil psicológico avanzado..."):
-        
-        prompt = f"""
+    prompt = f"""
 Eres un experto en psicología organizacional y ciberseguridad. Analiza el siguiente perfil y proporciona un análisis detallado.
 
 PERFIL A ANALIZAR:
@@ -988,36 +1072,50 @@ Proporciona un análisis JSON con esta estructura EXACTA:
 
 Basa todo el análisis en las métricas específicas proporcionadas.
 """
-        
+    
+    client = st.session_state.anthropic_client
+    session_id = current_session_id()
+
+    def profile_job(job):
+        # Se ejecuta en un worker: nada de st.* aquí, los mensajes van al reporter del trabajo
         try:
-            response = st.session_state.anthropic_client.messages.create(
-                model="claude-3-5-haiku-20241022",  # Usar modelo que funciona
-                max_tokens=4000,
-                temperature=0.3,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            
-            content = response.content[0].text.strip()
+            with job.tracker.stage("Llamada a Claude"), LLM_CALL_SECONDS.time(method="generate_psychological_profile"):
+                content, _ = ROUTER.invoke(
+                    "generate_psychological_profile", prompt,
+                    lambda decision: stream_message(client, job.cancel_token, **decision.request(
+                        temperature=0.3,
+                        messages=[{"role": "user", "content": prompt}]
+                    )),
+                    scope=credential_scope(client.api_key),
+                    on_fallback=lambda decision: job.reporter.info(
+                        f"🔄 Intentando con modelo de respaldo ({decision.model})...")
+                )
             
-            with st.expander("🔍 Debug: Respuesta de Claude", expanded=False):
-                st.text(content)
+            content = content.strip()
+            job.reporter.detail(content)
             
-            profile_result = safe_json_parse(content)
+            with job.tracker.stage("Parseo JSON"):
+                profile_result = parsing.safe_json_parse(content, reporter=job.reporter)
             
             if not profile_result:
-                st.warning("⚠️ Error en parsing JSON. Generando perfil básico...")
+                job.reporter.warning("⚠️ Error en parsing JSON. Generando perfil básico...")
                 profile_result = generate_fallback_profile(user_name, department, seniority)
-            
-            save_profile_result(profile_result, user_name, department)
-            st.success("✅ Perfil psicológico generado")
-            display_profile_results(st.session_state.current_profile)
-            
+            return profile_result
+        
+        except Cancelled:
+            raise
         except Exception as e:
-            st.error(f"❌ Error generando perfil: {str(e)}")
+            job.reporter.error(f"❌ Error generando perfil: {str(e)}")
             # Usar fallback inmediatamente
-            fallback_result = generate_fallback_profile(user_name, department, seniority)
-            save_profile_result(fallback_result, user_name, department)
-            display_profile_results(st.session_state.current_profile)
+            return generate_fallback_profile(user_name, department, seniority)
+    
+    submit_job(
+        'profile', profile_job, f"Perfil psicológico · {user_name}",
+        persist=lambda result: store_profile_result(profile_entry(result, user_name, department), session_id),
+        apply=lambda result: save_profile_result(result, user_name, department, store=False),
+        form="profile_form", fingerprint=prompt
+    )
+    st.rerun()
 
 def generate_demo_profile(user_name, department, seniority, social_activity, 
                          security_awareness, info_sharing, personality_traits):
@@ -1027,86 +1125,32 @@ def generate_demo_profile(user_name, department, seniority, social_activity,
     risk_score = 0.5 + (info_sharing * 0.04) + (social_activity * 0.03) - (security_awareness * 0.04)
     risk_score = max(0.2, min(0.9, risk_score))
     
-    return {
-        "psychological_profile": {
-            "personality_summary": f"{user_name} es un profesional de {department} con características {', '.join(personality_traits[:3])}. Muestra un nivel {social_activity}/10 de actividad social y {security_awareness}/10 de conciencia de seguridad.",
-            "core_traits": personality_traits[:4] if personality_traits else [f"Profesional de {department}", f"Nivel {seniority}"],
-            "behavioral_patterns": [
-                f"Tendencia {'alta' if info_sharing > 6 else 'media' if info_sharing > 3 else 'baja'} a compartir información",
-                f"Respuesta {'rápida' if social_activity > 6 else 'cautelosa'} en comunicaciones digitales",
-                f"Enfoque {'colaborativo' if 'Colaborativo' in personality_traits else 'independiente'} en el trabajo"
-            ],
-            "decision_making_style": f"Estilo {'analítico' if 'Analítico' in personality_traits else 'intuitivo'} con influencia del rol de {department}",
-            "stress_responses": [
-                f"Bajo presión, tiende a {'acelerar decisiones' if 'Impulsivo' in personality_traits else 'mantener cautela'}",
-                f"Busca {'apoyo del equipo' if 'Colaborativo' in personality_traits else 'soluciones independientes'}"
-            ],
-            "technology_relationship": f"Relación {'cómoda' if info_sharing > 5 else 'cautelosa'} con la tecnología",
-            "social_behavior": f"Comportamiento {'extrovertido' if social_activity > 6 else 'reservado'} en entornos digitales"
-        },
-        "vulnerability_assessment": {
-            "overall_risk_score": round(risk_score, 2),
-            "risk_factors": [
-                {
-                    "factor": "Compartir información",
-                    "score": round(info_sharing / 10, 2),
-                    "description": f"Tendencia {info_sharing}/10 a compartir información puede facilitar ingeniería social",
-                    "mitigation": "Entrenamiento en verificación de solicitudes"
-                },
-                {
-                    "factor": "Conciencia de seguridad",
-                    "score": round(1 - (security_awareness / 10), 2),
-                    "description": f"Nivel {security_awareness}/10 de conciencia indica vulnerabilidad",
-                    "mitigation": "Programas de concientización específicos"
-                }
-            ],
-            "psychological_vulnerabilities": [
-                {
-                    "type": "Autoridad percibida",
-                    "severity": "ALTA" if department in ["Finanzas", "Legal"] else "MEDIA",
-                    "description": f"Como {seniority} en {department}, susceptible a figuras de autoridad",
-                    "triggers": [f"Solicitudes de superiores de {department}", "Auditorías", "Procesos de compliance"],
-                    "exploitation_method": "Emails que imitan comunicaciones oficiales"
-                }
-            ]
-        },
-        "attack_simulation": {
-            "most_effective_vectors": [
-                {
-                    "technique": f"Phishing específico de {department}",
-                    "effectiveness_score": round(0.6 + (info_sharing * 0.03), 2),
-                    "approach": f"Emails que imitan procesos típicos de {department} con urgencia artificial",
-                    "psychological_basis": f"Familiaridad con workflows de {department}",
-                    "execution_example": f"Email sobre proceso urgente de {department} requiriendo verificación"
-                }
-            ],
-            "social_engineering_angles": [
-                {
-                    "angle": "Autoridad organizacional",
-                    "success_probability": round(0.7 if department in ["Finanzas", "Legal"] else 0.5, 2),
-                    "description": f"Aprovechamiento de estructura jerárquica en {department}"
-                }
-            ]
-        },
-        "personalized_training": {
-            "priority_areas": [
-                {
-                    "area": "Verificación de autoridad",
-                    "priority": "ALTA",
-                    "reason": f"Alta susceptibilidad a figuras de autoridad en {department}",
-                    "training_approach": "Simulacros con verificación de identidad"
-                }
-            ],
-            "recommended_simulations": [
-                {
-                    "scenario": f"Phishing dirigido a {department}",
-                    "frequency": "Mensual",
-                    "difficulty": "Media-Alta",
-                    "focus": "Verificación de solicitudes urgentes"
-                }
-            ]
-        }
-    }
+    # Solo se calculan los campos variables; la estructura sale del corpus precompilado
+    return render_demo(
+        'profile',
+        user_name=user_name,
+        department=department,
+        seniority=seniority,
+        social_activity=social_activity,
+        security_awareness=security_awareness,
+        info_sharing=info_sharing,
+        traits_summary=', '.join(personality_traits[:3]),
+        core_traits=personality_traits[:4] if personality_traits else [f"Profesional de {department}", f"Nivel {seniority}"],
+        sharing_level='alta' if info_sharing > 6 else 'media' if info_sharing > 3 else 'baja',
+        response_style='rápida' if social_activity > 6 else 'cautelosa',
+        work_style='colaborativo' if 'Colaborativo' in personality_traits else 'independiente',
+        decision_style='analítico' if 'Analítico' in personality_traits else 'intuitivo',
+        stress_reaction='acelerar decisiones' if 'Impulsivo' in personality_traits else 'mantener cautela',
+        support_source='apoyo del equipo' if 'Colaborativo' in personality_traits else 'soluciones independientes',
+        technology_style='cómoda' if info_sharing > 5 else 'cautelosa',
+        social_style='extrovertido' if social_activity > 6 else 'reservado',
+        risk_score=round(risk_score, 2),
+        sharing_score=round(info_sharing / 10, 2),
+        awareness_gap=round(1 - (security_awareness / 10), 2),
+        authority_severity="ALTA" if department in ["Finanzas", "Legal"] else "MEDIA",
+        vector_effectiveness=round(0.6 + (info_sharing * 0.03), 2),
+        authority_probability=round(0.7 if department in ["Finanzas", "Legal"] else 0.5, 2)
+    )
 
 def generate_fallback_profile(user_name, department, seniority):
     """Generar perfil de fallback"""
@@ -1135,31 +1179,50 @@ def generate_fallback_profile(user_name, department, seniority):
         }
     }
 
-def save_profile_result(result, user_name, department):
-    """Guardar resultado del perfil"""
-    profile_data = {
+def profile_entry(result, user_name, department):
+    """Entrada del perfil para el historial de sesión y el histórico"""
+    return {
         'user_name': user_name,
         'department': department,
         'analysis': result,
         'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     }
+
+def save_profile_result(result, user_name, department, store=True):
+    """Guardar resultado del perfil"""
+    profile_data = profile_entry(result, user_name, department)
     
-    # Inicializar lista si no existe
-    if 'user_profiles' not in st.session_state:
-        st.session_state.user_profiles = []
-    
-    st.session_state.user_profiles.append(profile_data)
+    session_history('user_profiles').append(profile_data)
     st.session_state.current_profile = profile_data
-
+    if store:
+        store_profile_result(profile_data, current_session_id())
+
+def store_profile_result(profile_data, session_id):
+    """Escribir el perfil en el histórico persistente"""
+    get_history_store().add(
+        'profile', profile_data,
+        department=profile_data['department'],
+        subject=profile_data['user_name'],
+        risk_score=profile_data['analysis'].get('vulnerability_assessment', {}).get('overall_risk_score'),
+        session_id=session_id
+    )
+
+@profiled
 def display_existing_profiles():
     """Mostrar perfiles existentes"""
-    if st.session_state.get('user_profiles'):
+    history = session_history('user_profiles')
+    if history:
         st.markdown("---")
         st.markdown("### 👥 Perfiles Existentes")
+        render_export_controls("user_profiles", lambda: profile_tables(history), "perfiles",
+                               label="💾 Exportar Perfiles")
         
-        for i, profile in enumerate(st.session_state.user_profiles[-3:]):
-            with st.expander(f"👤 {profile['user_name']} ({profile['department']}) - {profile['timestamp']}", expanded=False):
-                display_profile_summary(profile)
+        for index, header in newest_first_page(history, "existing_profiles"):
+            expander = st.expander(f"👤 {header['user_name']} ({header['department']}) - {header['timestamp']}",
+                                   expanded=False, key=f"existing_profile_{index}", on_change="rerun")
+            with expander:
+                if expander.open:
+                    display_profile_summary(history[index])
 
 def display_profile_summary(profile):
     """Mostrar resumen del perfil"""
@@ -1173,6 +1236,7 @@ def display_profile_summary(profile):
         profile_data = analysis['psychological_profile']
         st.markdown(f"**Resumen:** {profile_data.get('personality_summary', 'No disponible')}")
 
+@profiled
 def display_profile_results(profile_data):
     """Mostrar resultados del perfilado mejorado"""
     
@@ -1337,6 +1401,7 @@ def display_personalized_training(training):
             </div>
             """, unsafe_allow_html=True)
 
+@profiled
 def content_generation():
     """Generación de contenido adaptativo mejorada"""
     st.markdown("### Generación de Contenido Adaptativo")
@@ -1346,16 +1411,17 @@ def content_generation():
         return
     
     # Verificar si hay perfiles disponibles
-    if not st.session_state.get('user_profiles'):
+    profiles = session_history('user_profiles')
+    if not profiles:
         st.warning("**Primero debe crear un perfil de usuario en la sección 'Perfilado de Usuario'**")
         return
     
     # Seleccionar perfil objetivo
-    profile_options = [f"{p['user_name']} ({p['department']})" for p in st.session_state.user_profiles]
+    profile_options = [f"{p['user_name']} ({p['department']})" for p in profiles.headers()]
     selected_profile_idx = st.selectbox("Seleccionar Usuario Objetivo", range(len(profile_options)), 
                                        format_func=lambda x: profile_options[x])
     
-    target_profile = st.session_state.user_profiles[selected_profile_idx]
+    target_profile = profiles[selected_profile_idx]
     
     with st.form("content_form", clear_on_submit=False):
         st.markdown("**Configuración del Contenido**")
@@ -1421,23 +1487,23 @@ def generate_adaptive_content(target_profile, content_type, scenario,
     """Generar contenido adaptativo ultra-personalizado"""
     
     if st.session_state.get('demo_mode'):
+        tracker = ProgressTracker("Contenido (demo)")
         with st.spinner("Generando contenido adaptativo de ejemplo..."):
-            time.sleep(2)
-            result = generate_demo_content(target_profile, content_type, scenario, 
-                                         urgency, sender_type, company_context,
-                                         personalization_level)
-            save_content_result(result, target_profile, content_type, scenario)
-            display_generated_content(result)
+            with tracker.stage("Generación de ejemplo"):
+                result = generate_demo_content(target_profile, content_type, scenario, 
+                                             urgency, sender_type, company_context,
+                                             personalization_level)
+            with tracker.stage("Guardado"):
+                save_content_result(result, target_profile, content_type, scenario)
+            record_stage_timings(tracker)
         return
     
-    with st.spinner("Generando contenido ultra-personalizado..."):
-        
-        # Extraer información del perfil
-        user_data = target_profile
-        user_analysis = user_data.get('analysis', {})
-        
-        # ✅ Prompt actualizado
-        prompt = f"""
+    # Extraer información del perfil
+    user_data = target_profile
+    user_analysis = user_data.get('analysis', {})
+    
+    # ✅ Prompt actualizado
+    prompt = f"""
 Eres un experto en ciberseguridad y concienciación. Debes crear ejemplos realistas de mensajes que se usan en simulaciones internas de phishing para entrenar empleados.
 
 IMPORTANTE:
@@ -1512,60 +1578,52 @@ Devuelve ÚNICAMENTE un JSON con esta estructura EXACTA:
 
 NO agregues texto fuera del JSON. NO incluyas advertencias ni disclaimers en el cuerpo del mensaje.
 """
-        
+    
+    client = st.session_state.anthropic_client
+    session_id = current_session_id()
+
+    def content_job(job):
+        # Se ejecuta en un worker: nada de st.* aquí, los mensajes van al reporter del trabajo
         try:
-            response = st.session_state.anthropic_client.messages.create(
-                model=st.session_state.get('claude_model', 'claude-3-5-sonnet-20241022'),
-                max_tokens=4000,
-                temperature=0.4,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            
-            content = response.content[0].text.strip()
+            with job.tracker.stage("Llamada a Claude"), LLM_CALL_SECONDS.time(method="generate_adaptive_content"):
+                content, _ = ROUTER.invoke(
+                    "generate_adaptive_content", prompt,
+                    lambda decision: stream_message(client, job.cancel_token, **decision.request(
+                        temperature=0.4,
+                        messages=[{"role": "user", "content": prompt}]
+                    )),
+                    scope=credential_scope(client.api_key),
+                    on_fallback=lambda decision: job.reporter.info(
+                        f"🔄 Intentando con modelo de respaldo ({decision.model})...")
+                )
             
-            # Debug opcional
-            with st.expander("🔍 Debug: Respuesta de Claude", expanded=False):
-                st.text(content)
+            content = content.strip()
+            job.reporter.detail(content)
             
             # ✅ Limpieza y parsing seguro
-            content_result = safe_json_parse(content)
+            with job.tracker.stage("Parseo JSON"):
+                content_result = parsing.safe_json_parse(content, reporter=job.reporter)
             
             if not content_result:
-                st.warning("⚠️ Error en parsing JSON. Generando contenido básico...")
+                job.reporter.warning("⚠️ Error en parsing JSON. Generando contenido básico...")
                 content_result = generate_fallback_content(user_data, content_type, scenario, urgency)
-            
-            save_content_result(content_result, user_data, content_type, scenario)
-            st.success("✅ Contenido ultra-personalizado generado")
-            display_generated_content(st.session_state.current_content)
-
-        except Exception as e:
-            st.error(f"❌ Error inesperado: {e}")
-            
+            return content_result
+        
+        except Cancelled:
+            raise
         except Exception as e:
-            st.error(f"❌ Error generando contenido: {str(e)}")
-            # Intentar con modelo de respaldo
-            if "not_found" in str(e).lower() or "404" in str(e):
-                st.info("🔄 Intentando con modelo de respaldo...")
-                try:
-                    response = st.session_state.anthropic_client.messages.create(
-                        model="claude-3-5-haiku-20241022",
-                        max_tokens=4000,
-                        temperature=0.4,
-                        messages=[{"role": "user", "content": prompt}]
-                    )
-                    content = response.content[0].text.strip()
-                    content_result = safe_json_parse(content) or generate_fallback_content(user_data, content_type, scenario, urgency)
-                    save_content_result(content_result, user_data, content_type, scenario)
-                    st.success("✅ Contenido generado (modelo de respaldo)")
-                    display_generated_content(st.session_state.current_content)
-                    return
-                except Exception:
-                    pass
-            
+            job.reporter.error(f"❌ Error generando contenido: {str(e)}")
             # Usar fallback final
-            fallback_result = generate_fallback_content(user_data, content_type, scenario, urgency)
-            save_content_result(fallback_result, user_data, content_type, scenario)
-            display_generated_content(st.session_state.current_content)
+            return generate_fallback_content(user_data, content_type, scenario, urgency)
+    
+    submit_job(
+        'content', content_job, f"{content_type} · {user_data['user_name']}",
+        persist=lambda result: store_content_result(
+            content_entry(result, user_data, content_type, scenario), user_data, session_id),
+        apply=lambda result: save_content_result(result, user_data, content_type, scenario, store=False),
+        form="content_form", fingerprint=prompt
+    )
+    st.rerun()
 
 def generate_demo_content(target_profile, content_type, scenario, urgency, 
                          sender_type, company_context, personalization_level):
@@ -1588,127 +1646,44 @@ def generate_demo_content(target_profile, content_type, scenario, urgency,
     }
     
     # Personalizar remitente según el tipo
+    company_domain = company_context.lower().replace(' ', '')
     sender_domains = {
-        "Supervisor directo": f"{user_name.split()[0].lower()}supervisor@{company_context.lower().replace(' ', '')}.com",
-        "IT/Seguridad": f"seguridad@{company_context.lower().replace(' ', '')}.com",
-        "RRHH": f"rrhh@{company_context.lower().replace(' ', '')}.com",
-        "Finanzas": f"finanzas@{company_context.lower().replace(' ', '')}.com",
+        "Supervisor directo": f"{user_name.split()[0].lower()}supervisor@{company_domain}.com",
+        "IT/Seguridad": f"seguridad@{company_domain}.com",
+        "RRHH": f"rrhh@{company_domain}.com",
+        "Finanzas": f"finanzas@{company_domain}.com",
         "Auditoría externa": f"auditoria@consultoriaexterna.com",
         "Proveedor": f"soporte@proveedor{department.lower()}.com"
     }
     
-    # Crear contenido ultra-personalizado
-    personalized_body = f"""Estimado/a {user_name},
-
-Como {user_data.get('seniority', 'profesional')} de {department} en {company_context}, necesitamos su atención inmediata para {scenario.lower()}.
-
-Hemos identificado una situación que requiere su intervención específica debido a su rol en {department}."""
-    
     # Añadir elementos basados en vulnerabilidades
-    if vulnerabilities:
-        main_vuln = vulnerabilities[0]
-        if "autoridad" in main_vuln.get('type', '').lower():
-            personalized_body += f"\n\nEsta solicitud viene directamente de la dirección y es crítica para el cumplimiento de {department}."
-    
-    personalized_body += f"""
-
-Detalles específicos:
-- Departamento afectado: {department}
-- Nivel de prioridad: {urgency}
-- Tiempo límite: {"2 horas" if urgency == "Crítica" else "Fin del día" if urgency == "Alta" else "Esta semana"}
-
-Por favor, responda inmediatamente con:
-1. Confirmación de recepción
-2. Información solicitada para {scenario.lower()}
-3. Autorización para proceder
-
-Saludos urgentes,
-{sender_type}
-{company_context}"""
-    
-    return {
-        "content": {
-            "subject": f"{urgency_phrases[urgency]} - {scenario} - {department}",
-            "sender": sender_domains.get(sender_type, f"admin@{company_context.lower().replace(' ', '')}.com"),
-            "sender_name": f"{sender_type} - {company_context}",
-            "body": personalized_body,
-            "call_to_action": f"Responder con información de {scenario.lower()} antes de {"2 horas" if urgency == "Crítica" else "fin del día"}",
-            "urgency_indicators": [
-                f"Nivel {urgency} de prioridad",
-                f"Específico para {department}",
-                f"Solicitud de {sender_type}"
-            ],
-            "personalization_hooks": [
-                f"Nombre específico: {user_name}",
-                f"Departamento específico: {department}",
-                f"Rol específico: {user_data.get('seniority', 'profesional')}",
-                f"Empresa específica: {company_context}"
-            ]
-        },
-        "psychological_analysis": {
-            "target_vulnerabilities": [vuln.get('type', 'Vulnerabilidad general') for vuln in vulnerabilities[:3]],
-            "persuasion_techniques": [
-                {
-                    "technique": "Autoridad",
-                    "application": f"Remitente presenta como {sender_type} oficial",
-                    "effectiveness_reason": f"Personal de {department} responde a autoridad organizacional"
-                },
-                {
-                    "technique": "Urgencia",
-                    "application": f"Crear presión temporal {urgency.lower()}",
-                    "effectiveness_reason": f"Nivel {urgency} reduce tiempo de análisis crítico"
-                },
-                {
-                    "technique": "Personalización específica",
-                    "application": f"Dirigido específicamente a {user_name} de {department}",
-                    "effectiveness_reason": "Aumenta percepción de legitimidad"
-                }
-            ],
-            "emotional_triggers": [
-                f"Responsabilidad profesional en {department}",
-                f"Presión temporal {urgency.lower()}",
-                "Autoridad organizacional"
-            ],
-            "authority_elements": [
-                f"Remitente {sender_type}",
-                f"Proceso oficial de {scenario}",
-                f"Referencia a dirección de {company_context}"
-            ],
-            "social_proof_elements": [
-                f"Proceso estándar en {department}",
-                f"Política de {company_context}",
-                "Cumplimiento regulatorio"
-            ]
-        },
-        "effectiveness_prediction": {
-            "overall_score": min(0.9, 0.6 + (personalization_level * 0.03)),
-            "score_breakdown": {
-                "personalization": min(0.95, 0.7 + (personalization_level * 0.025)),
-                "authority": 0.85 if department in ["Finanzas", "Legal"] else 0.75,
-                "urgency": 0.9 if urgency in ["Crítica", "Alta"] else 0.6,
-                "emotional_impact": 0.8
-            },
-            "success_probability": min(0.85, 0.5 + (personalization_level * 0.035)),
-            "reasoning": f"Contenido altamente personalizado para {user_name} de {department}, explotando vulnerabilidades específicas identificadas en el perfil psicológico",
-            "potential_red_flags": [
-                "Urgencia artificial puede generar sospecha",
-                "Remitente externo puede ser verificado",
-                f"Personal de {department} puede tener protocolos de verificación"
-            ]
-        },
-        "variations": [
-            {
-                "variation_type": "Menos agresivo",
-                "subject": f"Solicitud de {scenario} - {department}",
-                "key_differences": "Elimina urgencia artificial, tono más profesional"
-            },
-            {
-                "variation_type": "Más técnico",
-                "subject": f"Protocolo {scenario} - Validación {department}",
-                "key_differences": "Lenguaje más técnico, referencias a procedimientos específicos"
-            }
-        ]
-    }
+    authority_note = ""
+    if vulnerabilities and "autoridad" in vulnerabilities[0].get('type', '').lower():
+        authority_note = f"\n\nEsta solicitud viene directamente de la dirección y es crítica para el cumplimiento de {department}."
+    
+    return render_demo(
+        'content',
+        user_name=user_name,
+        department=department,
+        seniority=user_data.get('seniority', 'profesional'),
+        scenario=scenario,
+        scenario_lower=scenario.lower(),
+        urgency=urgency,
+        urgency_lower=urgency.lower(),
+        urgency_phrase=urgency_phrases[urgency],
+        sender_type=sender_type,
+        sender=sender_domains.get(sender_type, f"admin@{company_domain}.com"),
+        company_context=company_context,
+        authority_note=authority_note,
+        deadline="2 horas" if urgency == "Crítica" else "Fin del día" if urgency == "Alta" else "Esta semana",
+        action_deadline='2 horas' if urgency == 'Crítica' else 'fin del día',
+        target_vulnerabilities=[vuln.get('type', 'Vulnerabilidad general') for vuln in vulnerabilities[:3]],
+        overall_score=min(0.9, 0.6 + (personalization_level * 0.03)),
+        personalization_score=min(0.95, 0.7 + (personalization_level * 0.025)),
+        authority_score=0.85 if department in ["Finanzas", "Legal"] else 0.75,
+        urgency_score=0.9 if urgency in ["Crítica", "Alta"] else 0.6,
+        success_probability=min(0.85, 0.5 + (personalization_level * 0.035))
+    )
 
 def create_account_verification_email(user_name, department, company_context, urgency):
     """Crear email de verificación de cuenta ultra-realista"""
@@ -2185,37 +2160,55 @@ Tel: ext. 1100 | avazquez.cco@{company_context.lower().replace(' ', '')}.com""",
         ]
     }
 
-def save_content_result(result, user_data, content_type, scenario):
-    """Guardar resultado del contenido generado"""
+def content_entry(result, user_data, content_type, scenario):
+    """Entrada del contenido para el historial de sesión y el histórico"""
     
     # Obtener nombre de usuario de manera segura
     user_name = user_data.get('user_name', 'Usuario Desconocido') if isinstance(user_data, dict) else str(user_data)
     
-    content_data = {
+    return {
         'target_user': user_name,
         'content_type': content_type,
         'scenario': scenario,
         'content': result,
         'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     }
+
+def save_content_result(result, user_data, content_type, scenario, store=True):
+    """Guardar resultado del contenido generado"""
+    content_data = content_entry(result, user_data, content_type, scenario)
     
-    # Inicializar lista si no existe
-    if 'generated_content' not in st.session_state:
-        st.session_state.generated_content = []
-    
-    st.session_state.generated_content.append(content_data)
+    session_history('generated_content').append(content_data)
     st.session_state.current_content = content_data
+    if store:
+        store_content_result(content_data, user_data, current_session_id())
     return content_data
 
+def store_content_result(content_data, user_data, session_id):
+    """Escribir el contenido generado en el histórico persistente"""
+    target = user_data if isinstance(user_data, dict) else {}
+    get_history_store().add(
+        'content', content_data,
+        department=target.get('department'),
+        subject=content_data['target_user'],
+        risk_score=target.get('analysis', {}).get('vulnerability_assessment', {}).get('overall_risk_score'),
+        session_id=session_id
+    )
+
+@profiled
 def display_existing_content():
     """Mostrar contenido existente"""
-    if st.session_state.get('generated_content'):
+    history = session_history('generated_content')
+    if history:
         st.markdown("---")
         st.markdown("### 📧 Contenido Generado Anteriormente")
         
-        for i, content in enumerate(st.session_state.generated_content[-3:]):
-            with st.expander(f"📩 {content['content_type']} para {content['target_user']} - {content['timestamp']}", expanded=False):
-                display_content_summary(content)
+        for index, header in newest_first_page(history, "existing_content"):
+            expander = st.expander(f"📩 {header['content_type']} para {header['target_user']} - {header['timestamp']}",
+                                   expanded=False, key=f"existing_content_{index}", on_change="rerun")
+            with expander:
+                if expander.open:
+                    display_content_summary(history[index])
 
 def display_content_summary(content_data):
     """Mostrar resumen del contenido"""
@@ -2230,6 +2223,7 @@ def display_content_summary(content_data):
         score = content['effectiveness_prediction'].get('overall_score', 0)
         st.metric("Efectividad Predicha", f"{score:.0%}")
 
+@profiled
 def display_generated_content(content_data):
     """Mostrar contenido generado de manera mejorada"""
     
@@ -2330,6 +2324,7 @@ def display_generated_content(content_data):
     # Acciones finales
     display_content_actions(content_data)
 
+@profiled
 def display_detailed_analysis(analysis, prediction, content, content_data):
     """Mostrar análisis detallado del contenido"""
     
@@ -2399,10 +2394,8 @@ def display_detailed_analysis(analysis, prediction, content, content_data):
                 <em>Diferencias:</em> {var.get('key_differences', 'No especificadas')}
             </div>
             """, unsafe_allow_html=True)
-    
-    # Acciones también aquí 👇
-    display_content_actions(content_data)
 
+@profiled
 def display_content_actions(content_data):
     """Mostrar acciones para el contenido"""
     st.markdown("### 🔧 Acciones")
@@ -2447,393 +2440,47 @@ Generado: {timestamp}
     
     # --- Botón exportar ---
     with col3:
-        export_data = {
-            "contenido": content_data,
-            "analisis_completo": content_data.get('content', {}),
-            "timestamp": timestamp,
-            "efectividad": content_data.get('content', {}).get('effectiveness_prediction', {})
-        }
-        
-        safe_filename = f"contenido_analisis_{target_user}_{safe_timestamp}.json".replace(' ', '_')
+        # El JSON solo se genera al pulsar el botón
+        def export_data():
+            return {
+                "contenido": content_data,
+                "analisis_completo": content_data.get('content', {}),
+                "timestamp": timestamp,
+                "efectividad": content_data.get('content', {}).get('effectiveness_prediction', {})
+            }
         
         st.download_button(
             label="💾 Exportar Análisis",
-            data=json.dumps(export_data, indent=2, ensure_ascii=False),
-            file_name=safe_filename,
-            mime="application/json",
-            key=f"export_{content_id}"
+            data=deferred_export(export_data, 'json'),
+            file_name=export_file_name(f"contenido_analisis_{target_user}_{safe_timestamp}", 'json'),
+            mime=export_mime('json'),
+            key=f"export_{content_id}",
+            on_click="ignore"
         )
 def load_demo_data():
     """Cargar datos de ejemplo completos para demostración"""
     
     # Limpiar datos existentes
-    st.session_state.completed_analyses = []
-    st.session_state.user_profiles = []
-    st.session_state.generated_content = []
+    session_history('completed_analyses', reset=True)
+    session_history('user_profiles', reset=True)
+    session_history('generated_content', reset=True)
     
-    # Análisis OSINT de ejemplo
-    demo_osint = {
-        'type': 'Análisis OSINT (DEMO)',
-        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        'company': 'TechCorp Demo',
-        'summary': {
-            "risk_score": 0.78,
-            "risk_level": "ALTO",
-            "vulnerabilities": [
-                {
-                    "type": "Exposición de Empleados en RRSS",
-                    "severity": "ALTA",
-                    "description": "45% del personal técnico comparte información sobre proyectos en LinkedIn",
-                    "evidence": "Perfiles públicos con detalles de stack tecnológico",
-                    "impact": "Posible ingeniería social dirigida y reconocimiento técnico"
-                },
-                {
-                    "type": "Subdominios Vulnerables",
-                    "severity": "MEDIA",
-                    "description": "5 subdominios con servicios desactualizados detectados",
-                    "evidence": "Escaneo automatizado reveló versiones antiguas",
-                    "impact": "Posible explotación de vulnerabilidades conocidas"
-                },
-                {
-                    "type": "Información Técnica Filtrada",
-                    "severity": "MEDIA",
-                    "description": "Stack tecnológico visible en ofertas de trabajo",
-                    "evidence": "Ofertas laborales con detalles específicos",
-                    "impact": "Facilita ataques dirigidos a infraestructura"
-                }
-            ],
-            "attack_vectors": [
-                {
-                    "vector": "Spear Phishing dirigido",
-                    "probability": 0.85,
-                    "impact": "Acceso a sistemas críticos mediante ingeniería social dirigida",
-                    "method": "Emails personalizados usando información pública de empleados"
-                },
-                {
-                    "vector": "Ingeniería social telefónica",
-                    "probability": 0.65,
-                    "impact": "Obtención de credenciales mediante llamadas dirigidas",
-                    "method": "Llamadas haciéndose pasar por proveedores conocidos"
-                }
-            ],
-            "employee_exposure": [
-                {
-                    "employee": "Juan Pérez - CTO",
-                    "risk_level": "ALTO",
-                    "exposure_type": "LinkedIn, GitHub, Twitter",
-                    "sensitive_info": "Proyectos actuales, stack tecnológico, estructura del equipo"
-                },
-                {
-                    "employee": "María González - DevOps Lead",
-                    "risk_level": "MEDIO",
-                    "exposure_type": "GitHub, conferencias técnicas",
-                    "sensitive_info": "Herramientas de infraestructura, procesos de deployment"
-                }
-            ],
-            "technical_findings": [
-                {
-                    "finding": "Subdominios con servicios expuestos",
-                    "risk": "MEDIO",
-                    "recommendation": "Auditoría y hardening de servicios públicos"
-                },
-                {
-                    "finding": "Información de empleados en conferencias",
-                    "risk": "BAJO",
-                    "recommendation": "Políticas de disclosure en eventos públicos"
-                }
-            ],
-            "industry_specific_risks": [
-                "Regulaciones GDPR para datos de clientes",
-                "Ataques dirigidos a empresas de tecnología",
-                "Competencia industrial puede usar información expuesta"
-            ],
-            "recommendations": [
-                {
-                    "priority": "ALTA",
-                    "category": "Concienciación",
-                    "action": "Implementar programa de entrenamiento en ingeniería social",
-                    "timeline": "30 días"
-                },
-                {
-                    "priority": "ALTA",
-                    "category": "Infraestructura",
-                    "action": "Auditar y asegurar todos los subdominios expuestos",
-                    "timeline": "15 días"
-                },
-                {
-                    "priority": "MEDIA",
-                    "category": "Políticas",
-                    "action": "Establecer políticas de publicación en redes sociales",
-                    "timeline": "60 días"
-                }
-            ]
-        }
-    }
+    # El corpus se comparte en solo lectura; cada sesión solo aporta la fecha
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
-    st.session_state.completed_analyses.append(demo_osint)
+    # Análisis OSINT de ejemplo
+    demo_osint = demo_entry('osint', timestamp=timestamp)
+    session_history('completed_analyses').append(demo_osint)
     st.session_state.current_osint = demo_osint['summary']
     
     # Perfil de usuario de ejemplo
-    demo_profile = {
-        'user_name': 'Ana García (Demo)',
-        'department': 'Finanzas',
-        'analysis': {
-            "psychological_profile": {
-                "personality_summary": "Ana García es una profesional de Finanzas orientada a resultados con alta conciencia del cumplimiento. Muestra patrones de comportamiento colaborativo pero con tendencia a confiar en figuras de autoridad.",
-                "core_traits": ["Orientada a resultados", "Detallista", "Confiada", "Responsable"],
-                "behavioral_patterns": [
-                    "Responde rápidamente a solicitudes de autoridades",
-                    "Sigue procedimientos establecidos meticulosamente",
-                    "Comparte información cuando percibe legitimidad oficial"
-                ],
-                "decision_making_style": "Analítica pero susceptible a presión temporal de autoridades",
-                "stress_responses": [
-                    "Busca aprobación de superiores cuando hay presión",
-                    "Acelera decisiones cuando se menciona cumplimiento regulatorio"
-                ],
-                "technology_relationship": "Cómoda con herramientas financieras, cautelosa con nuevas tecnologías",
-                "social_behavior": "Profesional y reservada, pero colaborativa en temas de trabajo"
-            },
-            "vulnerability_assessment": {
-                "overall_risk_score": 0.72,
-                "risk_factors": [
-                    {
-                        "factor": "Autoridad percibida",
-                        "score": 0.85,
-                        "description": "Alta susceptibilidad a figuras de autoridad financiera y regulatoria",
-                        "mitigation": "Entrenamiento en verificación de identidad de autoridades"
-                    },
-                    {
-                        "factor": "Presión de cumplimiento",
-                        "score": 0.78,
-                        "description": "Respuesta acelerada ante menciones de auditorías o compliance",
-                        "mitigation": "Protocolos específicos para solicitudes de auditoría"
-                    }
-                ],
-                "psychological_vulnerabilities": [
-                    {
-                        "type": "Autoridad regulatoria",
-                        "severity": "ALTA",
-                        "description": "Alta susceptibilidad a figuras que se presentan como autoridades fiscales o regulatorias",
-                        "triggers": ["Auditorías", "Compliance", "Procesos fiscales", "Reportes financieros"],
-                        "exploitation_method": "Emails simulando comunicaciones oficiales de entidades regulatorias"
-                    },
-                    {
-                        "type": "Presión temporal en finanzas",
-                        "severity": "MEDIA",
-                        "description": "Vulnerabilidad a tácticas que crean urgencia en procesos financieros",
-                        "triggers": ["Deadlines fiscales", "Cierres contables", "Reportes urgentes"],
-                        "exploitation_method": "Crear escenarios de urgencia falsa relacionados con procesos financieros"
-                    }
-                ]
-            },
-            "attack_simulation": {
-                "most_effective_vectors": [
-                    {
-                        "technique": "Phishing de autoridad fiscal",
-                        "effectiveness_score": 0.82,
-                        "approach": "Emails simulando auditorías urgentes de autoridades fiscales con documentación aparentemente oficial",
-                        "psychological_basis": "Miedo a problemas legales/fiscales combinado con respeto a autoridad",
-                        "execution_example": "Email de 'Hacienda' solicitando verificación urgente de datos fiscales de la empresa"
-                    },
-                    {
-                        "technique": "Ingeniería social de compliance",
-                        "effectiveness_score": 0.75,
-                        "approach": "Llamadas telefónicas haciéndose pasar por auditores externos solicitando información",
-                        "psychological_basis": "Responsabilidad profesional y temor a incumplimiento",
-                        "execution_example": "Llamada de 'auditor externo' solicitando confirmación de datos para proceso de compliance"
-                    }
-                ],
-                "social_engineering_angles": [
-                    {
-                        "angle": "Autoridad fiscal/regulatoria",
-                        "success_probability": 0.8,
-                        "description": "Aprovechamiento de respeto natural a autoridades financieras y fiscales"
-                    },
-                    {
-                        "angle": "Urgencia en procesos contables",
-                        "success_probability": 0.65,
-                        "description": "Creación de escenarios de urgencia en procesos familiares de finanzas"
-                    }
-                ]
-            },
-            "personalized_training": {
-                "priority_areas": [
-                    {
-                        "area": "Verificación de autoridad fiscal",
-                        "priority": "ALTA",
-                        "reason": "Alta susceptibilidad a figuras de autoridad financiera identificada en el perfil",
-                        "training_approach": "Simulacros específicos con verificación de identidad de autoridades fiscales"
-                    },
-                    {
-                        "area": "Manejo de presión temporal en finanzas",
-                        "priority": "MEDIA",
-                        "reason": "Tendencia a acelerar decisiones bajo presión de compliance",
-                        "training_approach": "Protocolos de pausa y verificación en situaciones urgentes"
-                    }
-                ],
-                "recommended_simulations": [
-                    {
-                        "scenario": "Phishing de auditoría fiscal urgente",
-                        "frequency": "Mensual",
-                        "difficulty": "Alta",
-                        "focus": "Verificación de autoridades antes de proporcionar información"
-                    },
-                    {
-                        "scenario": "Llamada de auditor externo falso",
-                        "frequency": "Bimensual",
-                        "difficulty": "Media",
-                        "focus": "Protocolos de verificación telefónica"
-                    }
-                ]
-            }
-        },
-        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    }
-    
-    st.session_state.user_profiles.append(demo_profile)
+    demo_profile = demo_entry('profile', timestamp=timestamp)
+    session_history('user_profiles').append(demo_profile)
     st.session_state.current_profile = demo_profile
     
     # Contenido generado de ejemplo
-    demo_content = {
-        'target_user': 'Ana García (Demo)',
-        'content_type': 'Email de phishing',
-        'scenario': 'Auditoría fiscal',
-        'content': {
-            "content": {
-                "subject": "URGENTE: Verificación Fiscal Requerida - Finanzas",
-                "sender": "verificacion@hacienda-digital.gob.mx",
-                "sender_name": "Servicio de Administración Tributaria",
-                "body": """Estimada Ana García,
-
-Como responsable del área de Finanzas de TechCorp Demo, hemos identificado una discrepancia en su declaración fiscal del último trimestre que requiere verificación inmediata.
-
-De acuerdo con nuestros registros, su empresa presenta irregularidades en:
-- Declaración de IVA del Q3 2024
-- Retenciones de nómina no reportadas
-- Deducciones no comprobadas por $125,000 MXN
-
-Por disposiciones fiscales vigentes, debe proporcionar la siguiente documentación ANTES DE LAS 18:00 HRS DEL DÍA DE HOY:
-
-1. Estados financieros actualizados
-2. Comprobantes de retenciones del último trimestre  
-3. Confirmación de datos bancarios corporativos
-4. Autorización para revisión de cuentas
-
-El incumplimiento de este requerimiento puede resultar en:
-❌ Multas por $500,000 - $2,000,000 MXN
-❌ Congelamiento de cuentas bancarias corporativas
-❌ Proceso administrativo de ejecución
-
-Para evitar sanciones, complete inmediatamente el formulario de verificación en el enlace oficial:
-🔗 [VERIFICAR DATOS FISCALES - SISTEMA SAT]
-
-Número de expediente: SAT-2024-TechCorp-7845
-Fecha límite: HOY 18:00 hrs
-Responsable: Ana García - Área Finanzas
-
-Saludos oficiales,
-Lic. Roberto Martínez Sánchez
-Subdirector de Fiscalización
-Servicio de Administración Tributaria
-Tel: 55-4738-2100 ext. 2847""",
-                "call_to_action": "Completar verificación fiscal antes de las 18:00 hrs del día de hoy",
-                "urgency_indicators": [
-                    "Fecha límite específica (18:00 hrs)",
-                    "Amenaza de multas económicas concretas",
-                    "Número de expediente oficial",
-                    "Consecuencias graves mencionadas"
-                ],
-                "personalization_hooks": [
-                    "Nombre específico: Ana García",
-                    "Área específica: Finanzas", 
-                    "Empresa específica: TechCorp Demo",
-                    "Montos específicos de irregularidades",
-                    "Responsabilidad directa mencionada"
-                ]
-            },
-            "psychological_analysis": {
-                "target_vulnerabilities": [
-                    "Autoridad regulatoria",
-                    "Presión temporal en finanzas",
-                    "Responsabilidad profesional"
-                ],
-                "persuasion_techniques": [
-                    {
-                        "technique": "Autoridad gubernamental",
-                        "application": "Remitente presenta como Servicio de Administración Tributaria oficial",
-                        "effectiveness_reason": "Ana responde automáticamente a autoridades fiscales por su rol en Finanzas"
-                    },
-                    {
-                        "technique": "Miedo específico a sanciones",
-                        "application": "Menciona multas concretas de $500K-$2M y congelamiento de cuentas",
-                        "effectiveness_reason": "Como responsable de Finanzas, estos escenarios son su peor pesadilla profesional"
-                    },
-                    {
-                        "technique": "Urgencia temporal crítica",
-                        "application": "Deadline específico del mismo día a las 18:00 hrs",
-                        "effectiveness_reason": "Presión temporal reduce tiempo de análisis crítico en procesos fiscales"
-                    },
-                    {
-                        "technique": "Personalización detallada",
-                        "application": "Incluye nombre, área, empresa y montos específicos de irregularidades",
-                        "effectiveness_reason": "Alto nivel de personalización aumenta percepción de legitimidad"
-                    }
-                ],
-                "emotional_triggers": [
-                    "Miedo a sanciones económicas devastadoras",
-                    "Pánico por responsabilidad profesional",
-                    "Estrés por deadline inmediato",
-                    "Temor a consecuencias legales para la empresa"
-                ],
-                "authority_elements": [
-                    "Logo y nombre oficial del SAT",
-                    "Número de expediente oficial",
-                    "Nombre y cargo específico del funcionario",
-                    "Teléfono de contacto oficial",
-                    "Lenguaje formal gubernamental"
-                ],
-                "social_proof_elements": [
-                    "Procedimiento aparentemente estándar",
-                    "Referencias a disposiciones fiscales",
-                    "Proceso administrativo formal",
-                    "Sistema oficial de verificación"
-                ]
-            },
-            "effectiveness_prediction": {
-                "overall_score": 0.88,
-                "score_breakdown": {
-                    "personalization": 0.95,
-                    "authority": 0.92,
-                    "urgency": 0.85,
-                    "emotional_impact": 0.88
-                },
-                "success_probability": 0.82,
-                "reasoning": "Contenido extremadamente personalizado que explota las vulnerabilidades principales identificadas en el perfil de Ana García: autoridad fiscal, presión temporal y responsabilidad profesional. La combinación de amenazas económicas específicas, deadline crítico y personalización detallada crea un escenario de alta efectividad.",
-                "potential_red_flags": [
-                    "Email externo solicitando datos sensibles",
-                    "Urgencia artificial puede generar sospecha",
-                    "Solicitud de datos bancarios por email",
-                    "Falta de proceso oficial de verificación presencial"
-                ]
-            },
-            "variations": [
-                {
-                    "variation_type": "Menos agresivo",
-                    "subject": "Notificación de Revisión Fiscal - TechCorp Demo",
-                    "key_differences": "Elimina urgencia artificial, reduce amenazas, tono más informativo"
-                },
-                {
-                    "variation_type": "Más técnico",
-                    "subject": "Requerimiento Art. 42 CFF - Verificación Documental",
-                    "key_differences": "Lenguaje más técnico fiscal, referencias específicas a artículos legales"
-                }
-            ]
-        },
-        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    }
-    
-    st.session_state.generated_content.append(demo_content)
+    demo_content = demo_entry('content', timestamp=timestamp)
+    session_history('generated_content').append(demo_content)
     st.session_state.current_content = demo_content
 
 if __name__ == "__main__":
@@ -0,0 +1,85 @@
+"""
+Benchmark de reducción LTTB: bytes enviados y tiempo de render vs serie completa.
+
+El tiempo de render se aproxima por construcción + serialización de la figura
+(lo que Streamlit envía por websocket); el pintado en el navegador escala con
+el mismo número de puntos.
+
+Uso:
+    python benchmarks/bench_downsampling.py [--points 10000 100000 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from components.downsampling import DEFAULT_CHART_WIDTH_PX, add_downsampled_trace
+
+
+def build_series(n_points, seed=7):
+    """Histórico diario sintético de riesgo con tendencia, estacionalidad y picos"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(end=pd.Timestamp.today().normalize(), periods=n_points, freq='min')
+    t = np.arange(n_points)
+    values = 50 + 0.0005 * t + 10 * np.sin(t / 1440 * 2 * np.pi) + rng.normal(0, 3, n_points)
+    spikes = rng.choice(n_points, size=max(1, n_points // 5000), replace=False)
+    values[spikes] += 40
+    return dates.values, values
+
+
+def measure(build_fig, repeat=3):
+    """Mejor tiempo (ms) y tamaño del payload JSON (bytes)"""
+    best = float('inf')
+    payload = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig = build_fig()
+        payload = len(fig.to_json().encode('utf-8'))
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, payload
+
+
+def run(points_list, width_px):
+    rows = []
+    for n in points_list:
+        x, y = build_series(n)
+
+        def raw():
+            fig = go.Figure()
+            fig.add_trace(go.Scatter(x=x, y=y, mode='lines'))
+            return fig
+
+        def reduced():
+            fig = go.Figure()
+            add_downsampled_trace(fig, x, y, name='serie', color='#ef4444', width_px=width_px)
+            return fig
+
+        raw_ms, raw_bytes = measure(raw)
+        red_ms, red_bytes = measure(reduced)
+        rows.append({
+            'points': n,
+            'raw_ms': round(raw_ms, 1),
+            'lttb_ms': round(red_ms, 1),
+            'raw_kb': round(raw_bytes / 1024, 1),
+            'lttb_kb': round(red_bytes / 1024, 1),
+            'reduction': f"{raw_bytes / max(red_bytes, 1):.0f}x",
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--points', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--width', type=int, default=DEFAULT_CHART_WIDTH_PX)
+    args = parser.parse_args()
+    print(run(args.points, args.width).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark de tiempo de importación (arranque en frío) por módulo.
+
+Lanza un intérprete nuevo con `-X importtime` por cada objetivo, suma el
+tiempo acumulado de las importaciones de primer nivel que hace el objetivo
+(sin las del arranque del intérprete y `site`, que se miden aparte con un
+intérprete vacío) y lo compara con el presupuesto de `import_budgets.json`.
+Cada presupuesto es el peor valor observado en varias ejecuciones más un
+margen de en torno al 20 %: al añadir dependencias se vuelve a medir y se
+ajusta, en vez de ampliarlo para que deje de fallar.
+Cada objetivo puede declarar además módulos pesados que no deben cargarse
+al importarlo (p. ej. plotly.express, pandas o anthropic en `app/main.py`,
+que solo se cargan donde se usan).
+
+Uso:
+    python benchmarks/bench_import_time.py [--repeat 5] [--only app/main.py] [--top 8]
+
+Sale con código 1 si algún objetivo supera su presupuesto o carga un
+módulo prohibido.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_budgets.json")
+
+
+def import_statement(target):
+    """Código que importa el objetivo: un módulo o un script (sin ejecutar su main)"""
+    if target.endswith('.py'):
+        return f"import runpy; runpy.run_path({target!r}, run_name='__bench__')"
+    return f"import {target}"
+
+
+def parse_importtime(stderr):
+    """Filas (nombre, nivel, self_us, cumulative_us) de la salida de -X importtime"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_part, cumulative_part, raw_name = line.split('|', 2)
+        self_us = int(self_part.split(':')[1])
+        cumulative_us = int(cumulative_part)
+        stripped = raw_name.lstrip()
+        # Cada nivel de anidamiento añade dos espacios tras el separador
+        level = (len(raw_name) - len(stripped) - 1) // 2
+        rows.append((stripped, level, self_us, cumulative_us))
+    return rows
+
+
+def run_importtime(code):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{code}: {proc.stderr.strip().splitlines()[-1]}")
+    return parse_importtime(proc.stderr)
+
+
+def startup_modules():
+    """Importaciones de primer nivel de un intérprete vacío (encodings, site...)"""
+    return {name for name, level, _, _ in run_importtime("pass") if level == 0}
+
+
+def measure(target, repeat=5, startup=frozenset()):
+    """Mejor tiempo (ms) de `repeat` arranques en frío y detalle de la mejor ejecución
+
+    Solo cuentan los subárboles que importa el objetivo: los módulos de
+    `startup` ya los carga el intérprete antes de ejecutar nada.
+    """
+    best = None
+    for _ in range(repeat):
+        rows = run_importtime(import_statement(target))
+        total_ms = sum(cum for name, level, _, cum in rows if level == 0 and name not in startup) / 1000
+        if best is None or total_ms < best['total_ms']:
+            best = {'total_ms': total_ms, 'rows': rows}
+    return best
+
+
+def forbidden_loaded(rows, forbidden):
+    """Módulos prohibidos (o submódulos suyos) importados durante la ejecución"""
+    loaded = {name for name, _, _, _ in rows}
+    return sorted(f for f in forbidden if any(n == f or n.startswith(f + '.') for n in loaded))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budgets', default=BUDGETS_PATH)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', nargs='*', help="Objetivos a medir (por defecto todos)")
+    parser.add_argument('--top', type=int, default=5, help="Importaciones más costosas a listar por objetivo")
+    args = parser.parse_args()
+
+    with open(args.budgets, encoding='utf-8') as f:
+        budgets = json.load(f)['targets']
+
+    startup = startup_modules()
+    failures = 0
+    print(f"{'objetivo':<34} {'ms':>8} {'presupuesto':>12}  estado")
+    for target, budget in budgets.items():
+        if args.only and target not in args.only:
+            continue
+
+        result = measure(target, args.repeat, startup)
+        forbidden = forbidden_loaded(result['rows'], budget.get('forbidden', []))
+        over = result['total_ms'] > budget['budget_ms']
+        status = "OK" if not over and not forbidden else "FALLO"
+        failures += status != "OK"
+
+        print(f"{target:<34} {result['total_ms']:>8.1f} {budget['budget_ms']:>12.0f}  {status}")
+        if forbidden:
+            print(f"    módulos prohibidos cargados: {', '.join(forbidden)}")
+
+        heaviest = sorted((r for r in result['rows'] if r[1] == 0 and r[0] not in startup),
+                          key=lambda r: r[3], reverse=True)
+        for name, _, _, cumulative_us in heaviest[:args.top]:
+            print(f"    {cumulative_us / 1000:>8.1f} ms  {name}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark del scoring de rosters: por fila, vectorizado y en pool de procesos.
+
+Genera una organización sintética (core.synthetic) y mide las filas por
+segundo de: `score_employee` fila a fila (sobre una muestra), el backend
+vectorizado en serie y el pool de procesos con memoria compartida para cada
+número de workers. La escalabilidad se informa respecto a un solo worker.
+Con --check compara scores y recuentos de reglas con las funciones de
+`core.scoring` sobre una muestra del roster.
+
+Uso:
+    python benchmarks/bench_parallel_scoring.py [--rows 5000000] [--workers 1 2 4 8] [--repeat 3] [--seed 7] [--check]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.parallel import rule_keys, rule_profile, score_columns, shutdown_pool  # noqa: E402
+from core.scoring import normalize_profile, score_employee  # noqa: E402
+from core.synthetic import generate_organization  # noqa: E402
+
+
+def per_row_rate(org, sample):
+    profiles = [normalize_profile(row) for row in org.rows(0, sample)]
+    started = time.perf_counter()
+    for profile in profiles:
+        score_employee(profile)
+    return sample / (time.perf_counter() - started)
+
+
+def check(org, columns, departments, sample):
+    """Diferencias entre el cálculo vectorizado y score_employee en una muestra"""
+    subset = {name: values[:sample] for name, values in columns.items()}
+    risk, _ = score_columns(subset, departments, backend='serial')
+    keys = rule_keys(subset)
+    mismatches = 0
+    for i, row in enumerate(org.rows(0, sample)):
+        profile = normalize_profile(row)
+        expected = score_employee(profile)
+        rules = score_employee({**rule_profile(keys[i]), 'interests': profile['interests']})
+        if abs(expected['risk_score'] - risk[i]) > 1e-9:
+            mismatches += 1
+        elif any(expected[name] != rules[name] for name in ('vulnerabilities', 'attack_vectors', 'recommendations')):
+            mismatches += 1
+    return mismatches
+
+
+def best_of(repeat, fn):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--shard-rows', type=int, default=250_000)
+    parser.add_argument('--sample', type=int, default=20_000, help="Filas para la medida por fila y --check")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--check', action='store_true')
+    args = parser.parse_args()
+
+    org = generate_organization(args.rows, seed=args.seed)
+    columns, departments = org.scoring_columns()
+    print(f"roster: {args.rows} filas  cpus: {os.cpu_count()}")
+
+    if args.check:
+        mismatches = check(org, columns, departments, min(args.sample, args.rows))
+        print(f"check: {mismatches} diferencias en {min(args.sample, args.rows)} filas")
+
+    print(f"{'backend':>20} {'workers':>8} {'s':>8} {'filas/s':>14} {'escala':>7}")
+    rate = per_row_rate(org, min(args.sample, args.rows))
+    print(f"{'por fila (python)':>20} {1:>8} {args.rows / rate:>8.2f} {rate:>14,.0f} {'':>7}")
+
+    elapsed = best_of(args.repeat, lambda: score_columns(columns, departments, backend='serial',
+                                                         shard_rows=args.shard_rows))
+    print(f"{'vectorizado':>20} {1:>8} {elapsed:>8.2f} {args.rows / elapsed:>14,.0f} {'':>7}")
+
+    baseline = None
+    for workers in args.workers:
+        # El arranque del pool no entra en la medida: en la aplicación se reutiliza
+        score_columns({name: values[:1000] for name, values in columns.items()}, departments, workers=workers)
+        elapsed = best_of(args.repeat, lambda: score_columns(columns, departments, workers=workers,
+                                                             shard_rows=args.shard_rows))
+        baseline = baseline or elapsed
+        print(f"{'procesos':>20} {workers:>8} {elapsed:>8.2f} {args.rows / elapsed:>14,.0f} {baseline / elapsed:>6.2f}x")
+    shutdown_pool()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark de render: elementos y bytes enviados por rerun en la pestaña OSINT.
+
+Carga en modo demo un análisis sintético con N elementos por sección y
+ejecuta la aplicación con streamlit.testing.AppTest para cada tamaño de
+página, leyendo el coste medido por el contador de render de la app.
+
+Uso:
+    python benchmarks/bench_render.py [--items 50 500 5000] [--page-sizes 10 50]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app", "main.py")
+
+
+def synthetic_osint(n_items):
+    """Análisis OSINT con `n_items` vulnerabilidades, empleados y vectores"""
+    return {
+        "risk_score": 0.7,
+        "risk_level": "ALTO",
+        "vulnerabilities": [
+            {"type": f"Vulnerabilidad {i}", "severity": "ALTA", "description": "Descripción " * 15,
+             "evidence": "Evidencia " * 8, "impact": "Impacto " * 8}
+            for i in range(n_items)
+        ],
+        "employee_exposure": [
+            {"employee": f"Empleado {i}", "risk_level": "MEDIO", "exposure_type": "LinkedIn, GitHub",
+             "sensitive_info": "Información " * 8}
+            for i in range(n_items)
+        ],
+        "attack_vectors": [
+            {"vector": f"Vector {i}", "probability": 0.6, "impact": "Impacto " * 6, "method": "Método " * 6}
+            for i in range(n_items)
+        ],
+        "technical_findings": [],
+        "recommendations": []
+    }
+
+
+def measure(n_items, size):
+    """Coste (elementos, KB, ms) de un rerun de la pestaña OSINT"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.run()
+    at.button(key="demo_mode_button").click().run()
+    at.session_state["current_osint"] = synthetic_osint(n_items)
+    at.session_state["page_size"] = size
+    at.session_state["main_tab"] = "Análisis OSINT"
+    at.run()
+
+    started = time.perf_counter()
+    at.run()
+    elapsed = (time.perf_counter() - started) * 1000
+    at.run()  # el coste de una ejecución se archiva al empezar la siguiente
+    stats = at.session_state["render_stats"][-2]
+    return stats['elementos'], stats['kb'], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, nargs='+', default=[50, 500, 5000])
+    parser.add_argument('--page-sizes', type=int, nargs='+', default=[10, 50])
+    args = parser.parse_args()
+
+    # No tocar el histórico ni el directorio de volcado reales
+    workdir = tempfile.mkdtemp(prefix="bench_render_")
+    os.environ.setdefault("SIP_HISTORY_DB", os.path.join(workdir, "history.db"))
+    os.environ.setdefault("SIP_SPILL_DIR", os.path.join(workdir, "spill"))
+
+    print(f"{'elementos/sección':>18} {'página':>7} {'elementos':>10} {'KB':>9} {'ms':>8}")
+    for n_items in args.items:
+        for size in args.page_sizes:
+            elements, kb, elapsed = measure(n_items, size)
+            print(f"{n_items:>18} {size:>7} {elements:>10} {kb:>9.1f} {elapsed:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
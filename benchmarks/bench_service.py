@@ -0,0 +1,130 @@
+"""
+Prueba de carga del servicio HTTP de análisis (core.service).
+
+Arranca el servicio en este proceso con el transporte stand-in (o ataca uno
+ya en marcha con --url) y lanza peticiones concurrentes desde un pool de
+clientes con conexiones keep-alive. Informa del throughput, la latencia
+(p50/p95/p99) de las respuestas 200 y de cuántas fueron rechazadas con 429.
+
+Uso:
+    python benchmarks/bench_service.py [--endpoint analyze] [--requests 400] [--concurrency 32]
+                                       [--workers 4] [--queue-depth 16] [--latency 0.05] [--batch-size 0]
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.agent import SecurityAgent, StandInTransport  # noqa: E402
+from core.service import AnalysisService, make_server  # noqa: E402
+
+
+def employee(i):
+    """Empleado sintético número `i`"""
+    return {
+        'name': f"Empleado {i}", 'department': ('IT', 'Finanzas', 'RRHH', 'Ventas')[i % 4],
+        'social_activity': i % 10 + 1, 'info_sharing': (i * 3) % 10 + 1,
+        'security_awareness': (i * 7) % 10 + 1, 'interests': ['Tecnología', 'Viajes'][:i % 3],
+        'communication': 'Casual', 'schedule': 'Flexible'
+    }
+
+
+def start_local_service(workers, queue_depth, latency):
+    """Servicio en un hilo de este proceso, en un puerto libre"""
+    agent = SecurityAgent(transport=StandInTransport(latency=latency))
+    service = AnalysisService(agent, workers=workers, queue_depth=queue_depth)
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def run_load(url, endpoint, n_requests, concurrency, batch_size):
+    """Lanzar las peticiones; devuelve [(status, segundos)]"""
+    target = urlparse(url)
+    local = threading.local()
+
+    def request(i):
+        if not hasattr(local, 'conn'):
+            local.conn = http.client.HTTPConnection(target.hostname, target.port, timeout=300)
+        if batch_size:
+            path = '/v1/batch'
+            payload = {'operation': endpoint, 'items': [employee(i * batch_size + k) for k in range(batch_size)]}
+        else:
+            path = f'/v1/{endpoint}'
+            payload = employee(i)
+        body = json.dumps(payload).encode('utf-8')
+
+        started = time.perf_counter()
+        local.conn.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+        response = local.conn.getresponse()
+        response.read()
+        return response.status, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(request, range(n_requests)))
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def fetch_metrics(url):
+    target = urlparse(url)
+    conn = http.client.HTTPConnection(target.hostname, target.port, timeout=10)
+    conn.request('GET', '/metrics')
+    return json.loads(conn.getresponse().read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help="Servicio ya en marcha (por defecto se arranca uno local)")
+    parser.add_argument('--endpoint', choices=('score', 'analyze'), default='analyze')
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--batch-size', type=int, default=0, help="Elementos por petición a /v1/batch (0: sin lotes)")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--queue-depth', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0.05, help="Segundos por llamada del transporte stand-in")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server, url = start_local_service(args.workers, args.queue_depth, args.latency)
+
+    started = time.perf_counter()
+    results = run_load(url, args.endpoint, args.requests, args.concurrency, args.batch_size)
+    elapsed = time.perf_counter() - started
+
+    ok = [seconds for status, seconds in results if status == 200]
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    items = len(ok) * (args.batch_size or 1)
+
+    print(f"peticiones: {len(results)}  en {elapsed:.2f}s  estados: {statuses}")
+    print(f"throughput: {len(ok) / elapsed:.1f} peticiones/s  ({items / elapsed:.1f} elementos/s)")
+    if ok:
+        print(f"latencia ms: p50 {percentile(ok, 50) * 1000:.1f}  p95 {percentile(ok, 95) * 1000:.1f}  "
+              f"p99 {percentile(ok, 99) * 1000:.1f}  media {statistics.mean(ok) * 1000:.1f}")
+    print(f"métricas del servicio: {fetch_metrics(url)}")
+
+    if server is not None:
+        server.shutdown()
+        server.service.pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
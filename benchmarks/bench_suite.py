@@ -0,0 +1,313 @@
+"""
+Suite de benchmarks con resultados en JSON y comparación contra una línea base.
+
+Grupos:
+  scoring  `calculate_individual_risk_score` y los generadores de reglas
+           sobre un roster sintético (core.synthetic) de --roster empleados
+  parsing  `safe_json_parse` sobre un corpus de respuestas mal formadas
+           derivado del corpus demo (vallas de código, texto alrededor,
+           comas colgantes, comillas simples, truncados...)
+  charts   construcción y serialización de los gráficos de
+           components/dashboard.py y components/profiling.py
+  reruns   latencia de un rerun completo de cada pestaña con AppTest en modo
+           demo (las respuestas del modelo salen del corpus demo)
+
+Cada medida es la mediana en ms de --repeat ejecuciones (menos es mejor).
+Con --baseline se compara contra un JSON guardado antes con --save-baseline
+y se marca como regresión lo que empeora más de --tolerance (relativo) y de
+--min-delta-ms (absoluto, para no saltar por ruido en medidas pequeñas).
+
+Uso:
+    python benchmarks/bench_suite.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_suite.py --baseline benchmarks/baseline.json [--only scoring parsing] [--output results.json]
+
+Sale con código 1 si hay alguna regresión respecto a la línea base.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+APP_PATH = os.path.join(ROOT, "app", "main.py")
+
+GROUPS = ('scoring', 'parsing', 'charts', 'reruns')
+RESULTS_VERSION = 1
+
+TABS = ("Panel Principal", "Análisis OSINT", "Perfilado de Usuario", "Generación de Contenido")
+
+
+def timed(fn, repeat):
+    """Mediana y mínimo (ms) de `repeat` llamadas a `fn`"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {'ms': round(statistics.median(samples), 3), 'min_ms': round(min(samples), 3), 'n': repeat}
+
+
+# --- scoring ---------------------------------------------------------------
+
+def bench_scoring(args):
+    from core.scoring import (calculate_individual_risk_score, generate_attack_vectors,
+                              generate_individual_recommendations, generate_vulnerabilities,
+                              normalize_profile, score_employee)
+    from core.synthetic import generate_organization
+
+    org = generate_organization(args.roster, seed=args.seed)
+    profiles = [normalize_profile(row) for row in org.rows(0, len(org))]
+
+    results = {}
+    for fn in (calculate_individual_risk_score, generate_vulnerabilities, generate_attack_vectors,
+               generate_individual_recommendations, score_employee):
+        result = timed(lambda: [fn(profile) for profile in profiles], args.repeat)
+        result['us_por_fila'] = round(result['ms'] * 1000 / len(profiles), 3)
+        results[f'scoring.{fn.__name__}'] = result
+    return results
+
+
+# --- parsing ---------------------------------------------------------------
+
+def malformed_corpus():
+    """Respuestas mal formadas típicas de un modelo, generadas a partir del corpus demo"""
+    from components.demo_corpus import load_demo_corpus
+
+    corpus = []
+    for name, entry in sorted(load_demo_corpus()['entries'].items()):
+        clean = json.dumps(entry, ensure_ascii=False, indent=2)
+        compact = json.dumps(entry, ensure_ascii=False)
+        variants = {
+            'limpio': clean,
+            'valla': f"```json\n{clean}\n```",
+            'texto_alrededor': f"Aquí tienes el análisis solicitado:\n\n{clean}\n\nEspero que te sea útil.",
+            'comas_colgantes': clean.replace('\n  }', ',\n  }').replace('\n  ]', ',\n  ]'),
+            'comillas_simples': repr(entry),
+            'sin_llaves_extra': compact + "\n}",
+            'truncado': compact[:len(compact) * 2 // 3],
+        }
+        corpus.extend((f'{name}.{kind}', text) for kind, text in variants.items())
+    return corpus
+
+
+def bench_parsing(args):
+    from core.parsing import safe_json_parse
+    from core.reporting import NullReporter
+
+    reporter = NullReporter()
+    corpus = malformed_corpus()
+    parsed = sum(safe_json_parse(text, reporter=reporter) is not None for _, text in corpus)
+
+    results = {}
+    result = timed(lambda: [safe_json_parse(text, reporter=reporter) for _, text in corpus], args.repeat)
+    result['documentos'] = len(corpus)
+    result['parseados'] = parsed
+    results['parsing.safe_json_parse.corpus'] = result
+    # Peor caso: la cascada completa de reparaciones hasta fallar
+    failing = [text for _, text in corpus if safe_json_parse(text, reporter=reporter) is None]
+    if failing:
+        result = timed(lambda: [safe_json_parse(text, reporter=reporter) for text in failing], args.repeat)
+        result['documentos'] = len(failing)
+        results['parsing.safe_json_parse.fallidos'] = result
+    return results
+
+
+# --- charts ----------------------------------------------------------------
+
+def quiet_streamlit():
+    """Silenciar los avisos de Streamlit (contexto ausente, deprecaciones) durante las medidas"""
+    import streamlit.logger
+    from streamlit import config
+
+    config.get_option('logger.level')  # forzar la lectura de config.toml antes de sobrescribir
+    config.set_option('logger.level', 'error')
+    streamlit.logger.set_log_level('error')
+
+
+def bench_charts(args):
+    # Fuera de `streamlit run` st.plotly_chart serializa la figura igual (modo "bare")
+    quiet_streamlit()
+    from components import dashboard, profiling
+
+    profile = {'social_activity': 8, 'info_sharing': 7, 'security_awareness': 3}
+    charts = [
+        dashboard.create_risk_distribution_chart,
+        dashboard.create_vulnerability_timeline,
+        dashboard.create_department_risk_heatmap,
+        lambda: profiling.create_risk_radar_chart(profile),
+        profiling.create_department_risk_distribution,
+        profiling.create_top_risk_employees_chart,
+        profiling.create_risk_correlation_matrix,
+        profiling.create_personality_distribution,
+        profiling.create_personality_vulnerability_chart,
+        profiling.create_emotional_triggers_analysis,
+        profiling.create_temporal_vulnerability_chart,
+    ]
+    names = ['dashboard.create_risk_distribution_chart', 'dashboard.create_vulnerability_timeline',
+             'dashboard.create_department_risk_heatmap', 'profiling.create_risk_radar_chart'] + \
+            [f'profiling.{fn.__name__}' for fn in charts[4:]]
+
+    results = {}
+    for name, fn in zip(names, charts):
+        fn()  # la primera figura de cada tipo carga plantillas y validadores de plotly
+        results[f'charts.{name}'] = timed(fn, args.repeat)
+    return results
+
+
+# --- reruns ----------------------------------------------------------------
+
+def demo_app():
+    """AppTest en modo demo con resultados cargados en todas las pestañas"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.run()
+    at.button(key="demo_mode_button").click().run()
+    at.button(key="load_demo_dashboard").click().run()
+
+    at.session_state["main_tab"] = "Análisis OSINT"
+    at.run()
+    at.text_input(key="osint_company").input("ACME")
+    at.text_input(key="osint_domain").input("acme.com")
+    click(at, "🔍 Iniciar Análisis OSINT")
+
+    at.session_state["main_tab"] = "Perfilado de Usuario"
+    at.run()
+    at.text_input(key="profile_name").input("Luis Pérez")
+    click(at, "🧠 Generar Perfil Psicológico")
+
+    at.session_state["main_tab"] = "Generación de Contenido"
+    at.run()
+    click(at, "🎯 Generar Contenido Personalizado")
+    if at.exception:
+        raise RuntimeError(f"La aplicación falló al preparar el benchmark: {at.exception[0].value}")
+    return at
+
+
+def click(at, label):
+    """Pulsar el botón `label`; si no existe, el flujo medido ya no es el esperado"""
+    labels = [button.label for button in at.button]
+    if label not in labels:
+        raise RuntimeError(f"Botón no encontrado al preparar el benchmark: {label!r}; disponibles: {labels}")
+    at.button[labels.index(label)].click().run()
+
+
+def bench_reruns(args):
+    # No tocar el histórico ni el directorio de volcado reales
+    workdir = tempfile.mkdtemp(prefix="bench_suite_")
+    os.environ.setdefault("SIP_HISTORY_DB", os.path.join(workdir, "history.db"))
+    os.environ.setdefault("SIP_SPILL_DIR", os.path.join(workdir, "spill"))
+
+    quiet_streamlit()
+    at = demo_app()
+    results = {}
+    for tab in TABS:
+        at.session_state["main_tab"] = tab
+        at.run()  # el primer rerun de la pestaña rellena cachés
+        results[f'reruns.{tab}'] = timed(at.run, args.repeat)
+    return results
+
+
+BENCHMARKS = {
+    'scoring': bench_scoring,
+    'parsing': bench_parsing,
+    'charts': bench_charts,
+    'reruns': bench_reruns,
+}
+
+
+# --- resultados y comparación ----------------------------------------------
+
+def environment():
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Filas (nombre, base, actual, cambio, estado) frente a la línea base"""
+    rows = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            rows.append((name, None, result['ms'], None, 'NUEVO'))
+            continue
+        delta = result['ms'] - base['ms']
+        change = delta / base['ms'] if base['ms'] else 0.0
+        if change > tolerance and delta > min_delta_ms:
+            status = 'REGRESIÓN'
+        elif change < -tolerance and -delta > min_delta_ms:
+            status = 'MEJORA'
+        else:
+            status = 'OK'
+        rows.append((name, base['ms'], result['ms'], change, status))
+    return rows
+
+
+def print_results(results):
+    print(f"{'benchmark':<58} {'ms':>10} {'min ms':>10}")
+    for name, result in results.items():
+        print(f"{name:<58} {result['ms']:>10.2f} {result['min_ms']:>10.2f}")
+
+
+def print_comparison(rows):
+    print(f"{'benchmark':<58} {'base ms':>10} {'ms':>10} {'cambio':>8}  estado")
+    for name, base, current, change, status in rows:
+        base_text = f"{base:>10.2f}" if base is not None else f"{'-':>10}"
+        change_text = f"{change:>+7.0%}" if change is not None else f"{'-':>7}"
+        print(f"{name:<58} {base_text} {current:>10.2f} {change_text:>8}  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', nargs='+', choices=GROUPS, default=list(GROUPS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--roster', type=int, default=20_000, help="Empleados del roster de scoring")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help="Guardar los resultados en este JSON")
+    parser.add_argument('--baseline', help="JSON de una ejecución anterior contra el que comparar")
+    parser.add_argument('--save-baseline', help="Guardar esta ejecución como línea base")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Empeoramiento relativo tolerado")
+    parser.add_argument('--min-delta-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    results = {}
+    for group in args.only:
+        started = time.perf_counter()
+        results.update(BENCHMARKS[group](args))
+        print(f"[{group}] {time.perf_counter() - started:.1f} s", file=sys.stderr)
+
+    document = {
+        'version': RESULTS_VERSION,
+        'entorno': environment(),
+        'parametros': {'repeat': args.repeat, 'roster': args.roster, 'seed': args.seed},
+        'resultados': results,
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+
+    if not args.baseline:
+        print_results(results)
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('parametros', {}).get('roster') != args.roster:
+        print("Aviso: la línea base usa otro tamaño de roster", file=sys.stderr)
+    rows = compare(results, baseline['resultados'], args.tolerance, args.min_delta_ms)
+    print_comparison(rows)
+    return 1 if any(status == 'REGRESIÓN' for *_, status in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Métricas de la aplicación para el exportador Prometheus de core.metrics.
+
+Cada ejecución del script registra su duración por pestaña y el tamaño de
+session_state de su sesión. Las sesiones activas, la profundidad de la cola
+de trabajos y la proporción de aciertos de las cachés se leen en el momento
+del scrape, desde el hilo del exportador, sin pasar por el script.
+"""
+import threading
+import time
+
+from core.metrics import CACHE_LOOKUPS, REGISTRY, RERUN_SECONDS, start_metrics_server
+
+# Segundos sin ejecuciones tras los que una sesión deja de contarse si no
+# se puede consultar el runtime de Streamlit
+SESSION_TTL = 3600
+
+ACTIVE_SESSIONS = REGISTRY.gauge("sip_active_sessions", "Sesiones de Streamlit conectadas")
+SESSION_STATE_BYTES = REGISTRY.gauge(
+    "sip_session_state_bytes", "Tamaño profundo de session_state: suma de las sesiones y la mayor",
+    labels=('stat',))
+JOB_QUEUE_DEPTH = REGISTRY.gauge(
+    "sip_job_queue_depth", "Trabajos de la cola compartida en espera o en ejecución", labels=('state',))
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    "sip_cache_hit_ratio", "Proporción de aciertos de cada caché desde el arranque", labels=('cache',))
+
+_sessions = {}          # session_id -> (bytes de session_state, última ejecución)
+_sessions_lock = threading.Lock()
+
+
+def record_session_bytes(session_id, total):
+    """Tamaño de session_state medido en la ejecución actual de la sesión"""
+    if session_id is None:
+        return
+    with _sessions_lock:
+        _sessions[session_id] = (total, time.time())
+
+
+def observe_rerun(tab, seconds):
+    RERUN_SECONDS.observe(seconds, tab=tab)
+
+
+def session_is_active(session_id, last_seen):
+    """Sesión aún conectada según el runtime de Streamlit (o vista hace menos de SESSION_TTL)"""
+    try:
+        from streamlit.runtime import Runtime
+        if Runtime.exists():
+            return Runtime.instance().is_active_session(session_id)
+    except Exception:
+        pass
+    return time.time() - last_seen < SESSION_TTL
+
+
+def collect_sessions():
+    with _sessions_lock:
+        for session_id, (_, last_seen) in list(_sessions.items()):
+            if not session_is_active(session_id, last_seen):
+                del _sessions[session_id]
+        sizes = [size for size, _ in _sessions.values()]
+    ACTIVE_SESSIONS.set(len(sizes))
+    SESSION_STATE_BYTES.set(sum(sizes), stat='sum')
+    SESSION_STATE_BYTES.set(max(sizes, default=0), stat='max')
+
+
+def collect_jobs():
+    from . import jobs
+
+    # La cola se crea con el primer análisis; el scrape no debe crearla
+    if jobs._queue is None:
+        return
+    metrics = jobs._queue.metrics()
+    JOB_QUEUE_DEPTH.set(metrics['en_cola'], state='queued')
+    JOB_QUEUE_DEPTH.set(metrics['ejecutando'], state='running')
+
+
+def _hit_ratio(hits, misses):
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+def collect_caches():
+    from .demo_corpus import _render_cached
+    from .exports import get_export_cache
+
+    # La caché de etapas es por sesión: sus consultas se cuentan en CACHE_LOOKUPS
+    CACHE_HIT_RATIO.set(_hit_ratio(CACHE_LOOKUPS.value(cache='stage', result='hit'),
+                                   CACHE_LOOKUPS.value(cache='stage', result='miss')), cache='stage')
+    export = get_export_cache()
+    CACHE_HIT_RATIO.set(_hit_ratio(export.hits, export.misses), cache='export')
+    info = _render_cached.cache_info()
+    CACHE_HIT_RATIO.set(_hit_ratio(info.hits, info.misses), cache='demo_templates')
+
+
+def install_app_metrics():
+    """Registrar las fuentes de métricas y arrancar el exportador (SIP_METRICS_PORT)"""
+    for collect in (collect_sessions, collect_jobs, collect_caches):
+        REGISTRY.on_collect(collect)
+    return start_metrics_server()
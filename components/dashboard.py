@@ -1,12 +1,27 @@
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import time
+import hashlib
 
+from .downsampling import (
+    DEFAULT_CHART_WIDTH_PX,
+    MIN_POINTS_TO_DOWNSAMPLE,
+    add_downsampled_trace,
+    slice_range,
+    zoom_range_selector,
+)
+from .profiler import profiled
+from .reports import ReportFile, write_report
+from .trends import TrendEngine, fit_linear_trends
+
+# Ventana de la pendiente móvil y horizonte del pronóstico (en periodos)
+TREND_WINDOW = 12
+FORECAST_HORIZON = 3
+
+@profiled
 def create_executive_dashboard():
     st.markdown("###  Dashboard Ejecutivo de Seguridad")
     
@@ -66,6 +81,7 @@ def create_executive_dashboard():
     st.markdown("###  Mapa de Riesgo por Departamento")
     create_department_risk_heatmap()
 
+@profiled
 def create_risk_distribution_chart():
     risk_data = pd.DataFrame({
         'Nivel': ['Crítico', 'Alto', 'Medio', 'Bajo'],
@@ -101,34 +117,46 @@ def create_risk_distribution_chart():
     
     st.plotly_chart(fig, use_container_width=True)
 
-def create_vulnerability_timeline():
-    # Generar datos de timeline
-    dates = pd.date_range(start='2024-01-01', end='2024-12-31', freq='M')
-    base_vulnerabilities = [45, 52, 48, 61, 58, 67, 74, 69, 73, 81, 87, 92]
+@profiled
+def create_vulnerability_timeline(history=None, width_px=DEFAULT_CHART_WIDTH_PX):
+    # Generar datos de timeline (o usar el histórico almacenado si existe)
+    if history is None:
+        dates = pd.date_range(start='2024-01-01', end='2024-12-31', freq='MS')
+        base_vulnerabilities = [45, 52, 48, 61, 58, 67, 74, 69, 73, 81, 87, 92]
+        
+        # Agregar ruido realista
+        vulnerabilities = np.array(base_vulnerabilities) + np.random.randint(-5, 8, len(base_vulnerabilities))
+    else:
+        dates = pd.DatetimeIndex(history['dates'])
+        vulnerabilities = np.asarray(history['values'])
     
-    # Agregar ruido realista
-    vulnerabilities = [v + np.random.randint(-5, 8) for v in base_vulnerabilities]
+    # Históricos largos: re-consultar solo la ventana visible
+    x_range = None
+    if len(dates) > MIN_POINTS_TO_DOWNSAMPLE:
+        x_range = zoom_range_selector(dates, key="vuln_timeline_range")
     
     fig = go.Figure()
     
-    # Línea principal
-    fig.add_trace(go.Scatter(
-        x=dates,
-        y=vulnerabilities,
-        mode='lines+markers',
+    # Línea principal (LTTB + envolvente mín/máx si la serie es larga)
+    series = add_downsampled_trace(
+        fig, dates.values, vulnerabilities,
         name='Vulnerabilidades Detectadas',
-        line=dict(color='#ef4444', width=3),
-        marker=dict(size=8, color='#ef4444', symbol='circle'),
+        color='#ef4444',
+        width_px=width_px,
+        x_range=x_range,
+        line_width=3,
+        marker_size=8,
         hovertemplate='<b>%{x|%B %Y}</b><br>Vulnerabilidades: %{y}<extra></extra>'
-    ))
+    )
     
-    # Línea de tendencia
-    z = np.polyfit(range(len(vulnerabilities)), vulnerabilities, 1)
-    p = np.poly1d(z)
-    trend_line = [p(i) for i in range(len(vulnerabilities))]
+    # Línea de tendencia (ajustada sobre la ventana completa, evaluada en los puntos enviados)
+    window_x, window_y = slice_range(dates.values, vulnerabilities, x_range)
+    slopes, intercepts = fit_linear_trends(window_y)
+    positions = np.searchsorted(window_x, series['x'])
+    trend_line = intercepts[0] + slopes[0] * positions
     
     fig.add_trace(go.Scatter(
-        x=dates,
+        x=series['x'],
         y=trend_line,
         mode='lines',
         name='Tendencia',
@@ -136,6 +164,31 @@ def create_vulnerability_timeline():
         hovertemplate='<b>Tendencia</b><br>%{x|%B %Y}: %{y:.1f}<extra></extra>'
     ))
     
+    # Pronóstico a corto plazo con banda de confianza
+    engine = get_trend_engine("vulnerabilities", ["Vulnerabilidades"], vulnerabilities,
+                              index=dates, persistent=history is not None)
+    forecast = engine.forecast(horizon=FORECAST_HORIZON)
+    step = dates[-1] - dates[-2] if len(dates) > 1 else pd.Timedelta(days=30)
+    future_dates = [dates[-1] + step * (h + 1) for h in range(FORECAST_HORIZON)]
+    
+    fig.add_trace(go.Scatter(
+        x=future_dates + future_dates[::-1],
+        y=np.concatenate([forecast['upper'][0], forecast['lower'][0][::-1]]),
+        fill='toself',
+        fillcolor='rgba(139, 92, 246, 0.15)',
+        line=dict(width=0),
+        hoverinfo='skip',
+        name='Intervalo 95%'
+    ))
+    fig.add_trace(go.Scatter(
+        x=future_dates,
+        y=forecast['mean'][0],
+        mode='lines+markers',
+        name='Pronóstico',
+        line=dict(color='#8b5cf6', width=2, dash='dot'),
+        hovertemplate='<b>Pronóstico</b><br>%{x|%B %Y}: %{y:.1f}<extra></extra>'
+    ))
+    
     fig.update_layout(
         title="Evolución de Vulnerabilidades en el Tiempo",
         xaxis_title="Período",
@@ -145,7 +198,39 @@ def create_vulnerability_timeline():
     )
     
     st.plotly_chart(fig, use_container_width=True)
+    
+    if series['downsampled']:
+        st.caption(f"Mostrando {len(series['x'])} de {series['raw_points']} puntos (LTTB)")
+
+def history_fingerprint(index, matrix, length):
+    """Huella de las primeras `length` columnas: longitud y hash de sus instantes y valores"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(np.asarray(index)[:length]).tobytes())
+    digest.update(np.ascontiguousarray(matrix[:, :length]).tobytes())
+    return length, digest.hexdigest()
 
+def get_trend_engine(key, series_names, values, index=None, persistent=True):
+    """Obtener el motor de tendencias de una serie, actualizándolo solo con los puntos nuevos
+
+    El motor guardado solo se reutiliza si el tramo que ya consumió sigue
+    siendo el principio del histórico (misma huella); si el histórico se
+    reemplaza, se filtra o se edita algún punto ya consumido, se reconstruye.
+    """
+    matrix = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    if not persistent:
+        return TrendEngine.from_matrix(series_names, matrix, window=TREND_WINDOW)
+    
+    index = index if index is not None else np.arange(matrix.shape[1])
+    engines = st.session_state.setdefault('trend_engines', {})
+    fingerprint, engine = engines.get(key, (None, None))
+    if (engine is None or engine.count > matrix.shape[1]
+            or history_fingerprint(index, matrix, engine.count) != fingerprint):
+        engine = TrendEngine(series_names, window=TREND_WINDOW)
+    engine.sync(matrix)
+    engines[key] = (history_fingerprint(index, matrix, engine.count), engine)
+    return engine
+
+@profiled
 def create_high_risk_employees_table():
     # Datos realistas de empleados de alto riesgo
     high_risk_data = {
@@ -187,25 +272,73 @@ def create_high_risk_employees_table():
         hide_index=True
     )
     
-    # Botón para generar reporte detallado
+    # Reporte detallado: se genera en disco página a página y se ofrece para descarga
+    report_format = st.radio("Formato del reporte", ["PDF", "HTML"], horizontal=True, key="risk_report_format")
+    
     if st.button(" Generar Reporte Detallado", key="risk_report"):
         with st.spinner("Generando reporte..."):
-            time.sleep(2)
-            st.success(" Reporte generado y enviado por email")
+            employees = (
+                {
+                    'name': row['Empleado'],
+                    'role': row['Cargo'],
+                    'department': row['Departamento'],
+                    'risk_score': row['Score Riesgo']
+                }
+                for row in df.to_dict('records')
+            )
+            st.session_state.risk_report_file = generate_risk_report(report_format.lower(), employees)
+            st.success(" Reporte generado")
+    
+    # El reporte va en su propia clave: "risk_report" es la del botón
+    report = st.session_state.get('risk_report_file')
+    if report is not None and report.exists():
+        with report.open() as report_file:
             st.download_button(
-                label="⬇ Descargar Reporte PDF",
-                data=generate_mock_pdf_report(),
-                file_name=f"reporte_riesgo_{datetime.now().strftime('%Y%m%d')}.pdf",
-                mime="application/pdf"
+                label=f"⬇ Descargar Reporte {report.format.upper()}",
+                data=report_file,
+                file_name=report.file_name,
+                mime=report.mime,
+                key="risk_report_download"
             )
-def create_department_risk_heatmap():
+
+def generate_risk_report(fmt, employees):
+    """Escribir el reporte ejecutivo en un archivo temporal de la sesión"""
+    summary = {
+        'title': 'Reporte Ejecutivo de Seguridad',
+        'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'metrics': [
+            ('Vulnerabilidades críticas detectadas', 87),
+            ('Empleados de alto riesgo', 234),
+            ('Cobertura del análisis', '92%'),
+            ('Score general de riesgo', '0.73/1.0')
+        ],
+        'recommendations': [
+            'Implementar capacitación anti-phishing inmediata',
+            'Revisar políticas de verificación telefónica',
+            'Establecer monitoreo de redes sociales corporativas'
+        ]
+    }
+    
+    # Eliminar el reporte anterior de esta sesión
+    previous = st.session_state.get('risk_report_file')
+    if previous is not None:
+        previous.discard()
+    
+    report = ReportFile(fmt, f"reporte_riesgo_{datetime.now().strftime('%Y%m%d')}.{fmt}",
+                        'application/pdf' if fmt == 'pdf' else 'text/html')
+    with open(report.path, 'wb') as out:
+        write_report(out, fmt, summary, build_department_risk_matrix(), employees)
+    return report
+
+def build_department_risk_matrix():
+   """Matriz de riesgo por departamento y tipo de ataque (compartida por gráfico y reporte)"""
    # Datos de departamentos y riesgo
    departments = ['Finanzas', 'IT', 'RRHH', 'Ventas', 'Marketing', 'Operaciones', 'Legal', 'Ejecutivos']
    risk_categories = ['Phishing', 'Vishing', 'Pretexting', 'Baiting', 'Tailgating']
    
    # Generar matriz de riesgo realista
-   np.random.seed(42)  # Para resultados consistentes
-   risk_matrix = np.random.rand(len(departments), len(risk_categories))
+   rng = np.random.RandomState(42)  # Para resultados consistentes
+   risk_matrix = rng.rand(len(departments), len(risk_categories))
    
    # Ajustar algunos valores para que sean más realistas
    risk_adjustments = {
@@ -220,13 +353,21 @@ def create_department_risk_heatmap():
            if dept in risk_adjustments and category in risk_adjustments[dept]:
                risk_matrix[i][j] = risk_adjustments[dept][category]
    
+   return {'departments': departments, 'categories': risk_categories, 'matrix': risk_matrix}
+
+@profiled
+def create_department_risk_heatmap():
+   heatmap = build_department_risk_matrix()
+   departments = heatmap['departments']
+   risk_categories = heatmap['categories']
+   risk_matrix = heatmap['matrix']
+   
    fig = go.Figure(data=go.Heatmap(
        z=risk_matrix,
        x=risk_categories,
        y=departments,
        colorscale='RdYlBu_r',
        colorbar=dict(title="Nivel de Riesgo"),
-       hoverimpl='closest',
        hovertemplate='<b>%{y}</b><br>%{x}: %{z:.2f}<extra></extra>'
    ))
    
@@ -238,25 +379,3 @@ def create_department_risk_heatmap():
    )
    
    st.plotly_chart(fig, use_container_width=True)
-
-def generate_mock_pdf_report():
-   """Generar un PDF mock para demostración"""
-   # En un entorno real, aquí usarías reportlab o similar
-   mock_pdf_content = b"""Mock PDF Report Content - Security Intelligence Analysis
-   
-   REPORTE EJECUTIVO DE SEGURIDAD
-   Fecha: %s
-   
-   RESUMEN EJECUTIVO:
-   - Vulnerabilidades críticas detectadas: 87
-   - Empleados de alto riesgo: 234
-   - Score general de riesgo: 0.73/1.0
-   
-   RECOMENDACIONES PRIORITARIAS:
-   1. Implementar capacitación anti-phishing inmediata
-   2. Revisar políticas de verificación telefónica
-   3. Establecer monitoreo de redes sociales corporativas
-   
-   """ % datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-   
-   return mock_pdf_content.encode('utf-8')
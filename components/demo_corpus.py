@@ -0,0 +1,132 @@
+"""
+Corpus de demostración precompilado.
+
+Los datos de ejemplo (análisis, perfil y contenido de `load_demo_data`) y las
+plantillas de `generate_demo_*` se distribuyen como un JSON compacto y
+versionado con su hash SHA-256. Se cargan una sola vez por proceso, se
+congelan y se comparten en solo lectura entre sesiones; cada sesión solo
+superpone los campos que cambian (fecha, empresa, usuario...). Las
+plantillas usan marcadores `{campo}`; un valor que es exactamente un marcador
+se sustituye por el valor sin convertir a texto (números, listas).
+"""
+import functools
+import hashlib
+import json
+import os
+import re
+
+CORPUS_VERSION = 1
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "demo_corpus.json")
+
+PLACEHOLDER = re.compile(r'\{(\w+)\}')
+FULL_PLACEHOLDER = re.compile(r'^\{(\w+)\}$')
+
+# Renderizados de plantillas conservados por proceso
+RENDER_CACHE_SIZE = 256
+
+
+class FrozenDict(dict):
+    """dict de solo lectura; se serializa con json como un dict normal"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("El corpus de demostración es de solo lectura")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def freeze(value):
+    """Copia inmutable de una estructura JSON (dict -> FrozenDict, list -> tuple)"""
+    if isinstance(value, FrozenDict):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def corpus_digest(corpus):
+    """SHA-256 de la serialización canónica del corpus"""
+    canonical = json.dumps(corpus, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def load_demo_corpus(path=FIXTURE_PATH):
+    """Corpus congelado, cargado y verificado una sola vez por proceso"""
+    with open(path, encoding='utf-8') as f:
+        document = json.load(f)
+
+    if document.get('version') != CORPUS_VERSION:
+        raise ValueError(f"Versión de corpus no soportada: {document.get('version')} (se esperaba {CORPUS_VERSION})")
+    if corpus_digest(document['corpus']) != document.get('sha256'):
+        raise ValueError(f"El hash del corpus de demostración no coincide: {path}")
+    return freeze(document['corpus'])
+
+
+def render(template, values):
+    """Sustituir marcadores compartiendo los subárboles que no los contienen"""
+    if isinstance(template, str):
+        if '{' not in template:
+            return template
+        full = FULL_PLACEHOLDER.match(template)
+        if full and full.group(1) in values:
+            return freeze(values[full.group(1)])
+        return PLACEHOLDER.sub(
+            lambda m: str(values[m.group(1)]) if m.group(1) in values else m.group(0), template
+        )
+    if isinstance(template, dict):
+        rendered = {k: render(v, values) for k, v in template.items()}
+        if all(rendered[k] is template[k] for k in template):
+            return template
+        return FrozenDict(rendered)
+    if isinstance(template, tuple):
+        rendered = tuple(render(v, values) for v in template)
+        if all(a is b for a, b in zip(rendered, template)):
+            return template
+        return rendered
+    return template
+
+
+@functools.lru_cache(maxsize=RENDER_CACHE_SIZE)
+def _render_cached(name, items):
+    return render(load_demo_corpus()['templates'][name], dict(items))
+
+
+def render_demo(name, **values):
+    """Plantilla `name` renderizada (memoizada y de solo lectura)"""
+    items = tuple(sorted((k, freeze(v)) for k, v in values.items()))
+    return _render_cached(name, items)
+
+
+def demo_entry(name, **overlay):
+    """Entrada de ejemplo con los campos propios de la sesión superpuestos"""
+    entry = dict(load_demo_corpus()['entries'][name])
+    entry.update(overlay)
+    return entry
+
+
+def write_demo_corpus(corpus, path=FIXTURE_PATH):
+    """Escribir el fixture compacto con su versión y hash"""
+    document = {'version': CORPUS_VERSION, 'sha256': corpus_digest(corpus), 'corpus': corpus}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, separators=(',', ':'))
+        f.write("\n")
+
+
+if __name__ == '__main__':
+    # Recalcular el hash tras editar el fixture: python -m components.demo_corpus
+    with open(FIXTURE_PATH, encoding='utf-8') as f:
+        write_demo_corpus(json.load(f)['corpus'])
+    print(f"Corpus actualizado: {FIXTURE_PATH}")
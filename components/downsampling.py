@@ -0,0 +1,180 @@
+import numpy as np
+
+# Ancho por defecto (en píxeles) de un gráfico en columna de Streamlit
+DEFAULT_CHART_WIDTH_PX = 800
+
+# Puntos LTTB por píxel horizontal; más de ~2 no aporta detalle visible
+POINTS_PER_PIXEL = 1.0
+
+# Por debajo de este número de puntos no merece la pena reducir
+MIN_POINTS_TO_DOWNSAMPLE = 500
+
+
+def target_points(width_px=DEFAULT_CHART_WIDTH_PX, points_per_px=POINTS_PER_PIXEL):
+    """Calcular cuántos puntos enviar al navegador según el ancho del gráfico"""
+    return max(3, int(width_px * points_per_px))
+
+
+def _as_float(x):
+    """Convertir el eje X (numérico o fechas) a float para calcular áreas"""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def lttb_indices(x, y, n_out):
+    """Índices seleccionados por Largest-Triangle-Three-Buckets"""
+    xf = _as_float(x)
+    yf = np.asarray(y, dtype=np.float64)
+    n = len(yf)
+
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Límites de los buckets interiores (primer y último punto fijos)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    # Promedios de cada bucket, calculados de una vez
+    sums_x = np.add.reduceat(xf[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(yf[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = sums_x / counts
+    avg_y = sums_y / counts
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # Punto "C": promedio del siguiente bucket (o el último punto)
+        if i + 1 < len(avg_x):
+            cx, cy = avg_x[i + 1], avg_y[i + 1]
+        else:
+            cx, cy = xf[-1], yf[-1]
+
+        ax, ay = xf[a], yf[a]
+        areas = np.abs(
+            (ax - cx) * (yf[start:end] - ay) - (ax - xf[start:end]) * (cy - ay)
+        )
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+
+    return selected
+
+
+def minmax_envelope(x, y, n_buckets):
+    """Envolvente mínimo/máximo por bucket para no perder picos al reducir"""
+    xs = np.asarray(x)
+    yf = np.asarray(y, dtype=np.float64)
+    n = len(yf)
+
+    if n_buckets >= n:
+        return xs, yf, yf
+
+    starts = np.linspace(0, n, n_buckets, endpoint=False).astype(np.int64)
+    y_min = np.minimum.reduceat(yf, starts)
+    y_max = np.maximum.reduceat(yf, starts)
+
+    # El eje X de cada bucket es su punto central
+    ends = np.append(starts[1:], n)
+    mids = (starts + ends - 1) // 2
+    return xs[mids], y_min, y_max
+
+
+def slice_range(x, y, x_range=None):
+    """Recortar la serie a la ventana visible (re-consulta al hacer zoom)"""
+    xs = np.asarray(x)
+    ys = np.asarray(y)
+    if not x_range:
+        return xs, ys
+
+    lo, hi = x_range
+    if np.issubdtype(xs.dtype, np.datetime64):
+        lo, hi = np.datetime64(lo, 'ns'), np.datetime64(hi, 'ns')
+    left = np.searchsorted(xs, lo, side='left')
+    right = np.searchsorted(xs, hi, side='right')
+    return xs[left:right], ys[left:right]
+
+
+def downsample_series(x, y, width_px=DEFAULT_CHART_WIDTH_PX, x_range=None,
+                      min_points=MIN_POINTS_TO_DOWNSAMPLE):
+    """Preparar una serie para graficar: recorte por zoom, LTTB y envolvente"""
+    xs, ys = slice_range(x, y, x_range)
+    n_out = target_points(width_px)
+    raw_points = len(ys)
+
+    if raw_points <= max(n_out, min_points):
+        return {
+            'x': xs, 'y': ys,
+            'envelope': None,
+            'raw_points': raw_points,
+            'downsampled': False
+        }
+
+    idx = lttb_indices(xs, ys, n_out)
+    env_x, env_min, env_max = minmax_envelope(xs, ys, n_out // 2)
+
+    return {
+        'x': xs[idx], 'y': ys[idx],
+        'envelope': {'x': env_x, 'min': env_min, 'max': env_max},
+        'raw_points': raw_points,
+        'downsampled': True
+    }
+
+
+def add_downsampled_trace(fig, x, y, name, color, width_px=DEFAULT_CHART_WIDTH_PX,
+                          x_range=None, mode='lines+markers', line_width=2,
+                          hovertemplate=None, marker_size=6):
+    """Añadir una serie larga a una figura Plotly reducida en el servidor"""
+    import plotly.graph_objects as go
+
+    series = downsample_series(x, y, width_px=width_px, x_range=x_range)
+
+    if series['envelope'] is not None:
+        env = series['envelope']
+        # Banda mín/máx: dos trazas, la segunda rellena hasta la primera
+        fig.add_trace(go.Scatter(
+            x=env['x'], y=env['max'],
+            mode='lines', line=dict(width=0, color=color),
+            hoverinfo='skip', showlegend=False
+        ))
+        fig.add_trace(go.Scatter(
+            x=env['x'], y=env['min'],
+            mode='lines', line=dict(width=0, color=color),
+            fill='tonexty', opacity=0.2,
+            hoverinfo='skip', name=f'{name} (mín/máx)', showlegend=False
+        ))
+        # Con miles de puntos los marcadores solo estorban
+        mode = 'lines'
+
+    fig.add_trace(go.Scatter(
+        x=series['x'],
+        y=series['y'],
+        mode=mode,
+        name=name,
+        line=dict(color=color, width=line_width),
+        marker=dict(size=marker_size, color=color),
+        hovertemplate=hovertemplate
+    ))
+
+    return series
+
+
+def zoom_range_selector(x, key, label="Rango visible"):
+    """Selector de rango que provoca la re-consulta de la ventana visible"""
+    import streamlit as st
+    import pandas as pd
+
+    xs = pd.to_datetime(np.asarray(x))
+    if len(xs) < 2:
+        return None
+
+    lo, hi = xs[0].to_pydatetime(), xs[-1].to_pydatetime()
+    selected = st.slider(label, min_value=lo, max_value=hi, value=(lo, hi), key=key)
+    if selected == (lo, hi):
+        return None
+    return selected
@@ -0,0 +1,389 @@
+"""
+Exportación diferida de resultados en JSON, JSONL, CSV y XLSX.
+
+Los botones de descarga reciben una función en lugar del contenido: el
+documento solo se serializa cuando el usuario pulsa el botón, nunca en cada
+rerun. Los escritores producen el archivo por fragmentos (opcionalmente
+comprimidos con gzip) y el resultado se guarda en una caché del proceso,
+acotada en bytes, indexada por el hash del contenido, el formato y la
+compresión; descargar dos veces el mismo análisis no vuelve a generarlo.
+
+Los formatos tabulares reciben un dict `{sección: [filas]}`: en CSV las
+secciones se concatenan con una columna `seccion`, en JSONL cada fila lleva
+su sección y en XLSX cada sección es una hoja. El XLSX se escribe con
+zipfile (SpreadsheetML mínimo) sin dependencias adicionales.
+"""
+import csv
+import hashlib
+import io
+import itertools
+import json
+import math
+import re
+import tempfile
+import threading
+import zipfile
+import zlib
+from collections import OrderedDict
+from xml.sax.saxutils import escape
+
+# Tamaño de los fragmentos que producen los escritores
+CHUNK_SIZE = 64 * 1024
+
+# Bytes de exportaciones conservados por proceso
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Por encima de este tamaño el XLSX en construcción pasa de memoria a disco
+XLSX_SPOOL_BYTES = 8 * 1024 * 1024
+
+FORMATS = {
+    'json': ('JSON', 'application/json'),
+    'jsonl': ('JSONL', 'application/x-ndjson'),
+    'csv': ('CSV', 'text/csv'),
+    'xlsx': ('Excel (XLSX)', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+TABULAR_FORMATS = ('csv', 'jsonl', 'xlsx')
+
+SECTION_COLUMN = 'seccion'
+
+
+def _scalar(value):
+    """Valor de celda: los anidados se serializan como JSON"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return str(value)
+
+
+def _columns(rows):
+    """Columnas en orden de aparición"""
+    columns = {}
+    for row in rows:
+        columns.update(dict.fromkeys(row))
+    return list(columns)
+
+
+def _buffered(parts, chunk_size=CHUNK_SIZE):
+    """Agrupar fragmentos de texto en bloques de bytes de ~`chunk_size`"""
+    buffer, size = [], 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def iter_json(document, chunk_size=CHUNK_SIZE):
+    """Documento JSON indentado, serializado por partes"""
+    encoder = json.JSONEncoder(indent=2, ensure_ascii=False, default=str)
+    return _buffered(encoder.iterencode(document), chunk_size)
+
+
+def iter_jsonl(tables, chunk_size=CHUNK_SIZE):
+    """Una línea JSON por fila, con su sección"""
+    def lines():
+        for section, rows in tables.items():
+            for row in rows:
+                yield json.dumps({SECTION_COLUMN: section, **row}, ensure_ascii=False, default=str) + "\n"
+    return _buffered(lines(), chunk_size)
+
+
+def iter_csv(tables, chunk_size=CHUNK_SIZE):
+    """CSV con la unión de columnas de todas las secciones"""
+    def lines():
+        columns = [SECTION_COLUMN] + _columns(row for rows in tables.values() for row in rows)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for section, rows in tables.items():
+            for row in rows:
+                writer.writerow([section] + [_scalar(row.get(c)) for c in columns[1:]])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    # BOM para que Excel detecte UTF-8 al abrir el CSV
+    return _buffered(itertools.chain(["\ufeff"], lines()), chunk_size)
+
+
+# Caracteres no válidos en XML 1.0
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_cell(ref, value):
+    value = _scalar(value)
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, float) and not math.isfinite(value):
+        # NaN e infinitos no son números válidos en SpreadsheetML: celda vacía
+        return ''
+    if isinstance(value, float):
+        # float() también para np.float64, cuyo repr no es un número
+        return f'<c r="{ref}"><v>{float(value)!r}</v></c>'
+    if isinstance(value, int):
+        return f'<c r="{ref}"><v>{int(value)}</v></c>'
+    text = escape(_XML_INVALID.sub('', value))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _sheet_name(section, used):
+    """Nombre de hoja válido (31 caracteres, sin []:*?/\\) y único"""
+    base = re.sub(r'[\[\]:*?/\\]', '_', str(section))[:31] or 'Hoja'
+    name, n = base, 1
+    while name.lower() in used:
+        n += 1
+        name = f"{base[:28]}_{n}"
+    used.add(name.lower())
+    return name
+
+
+def write_xlsx(tables, target):
+    """Escribir un libro con una hoja por sección en el archivo binario `target`"""
+    used = set()
+    sheets = [(_sheet_name(section, used), rows) for section, rows in tables.items()] or [('Hoja', [])]
+
+    with zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as zf:
+        overrides = ''.join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(1, len(sheets) + 1)
+        )
+        zf.writestr('[Content_Types].xml',
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                    '<Default Extension="xml" ContentType="application/xml"/>'
+                    '<Override PartName="/xl/workbook.xml" '
+                    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                    f'{overrides}</Types>')
+        zf.writestr('_rels/.rels',
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    '<Relationship Id="rId1" '
+                    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+                    'Target="xl/workbook.xml"/></Relationships>')
+        zf.writestr('xl/workbook.xml',
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+                    + ''.join(f'<sheet name="{escape(name, {chr(34): "&quot;"})}" sheetId="{i}" r:id="rId{i}"/>'
+                              for i, (name, _) in enumerate(sheets, 1))
+                    + '</sheets></workbook>')
+        zf.writestr('xl/_rels/workbook.xml.rels',
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    + ''.join(f'<Relationship Id="rId{i}" '
+                              'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                              f'Target="worksheets/sheet{i}.xml"/>' for i in range(1, len(sheets) + 1))
+                    + '</Relationships>')
+
+        for i, (_, rows) in enumerate(sheets, 1):
+            columns = _columns(rows)
+            # Cada hoja se comprime fila a fila dentro del zip
+            with zf.open(f'xl/worksheets/sheet{i}.xml', 'w') as sheet:
+                def write(parts):
+                    sheet.write(''.join(parts).encode('utf-8'))
+
+                write(['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                       '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'])
+                header = [_xlsx_cell(f"{_column_letter(c)}1", name) for c, name in enumerate(columns)]
+                write(['<row r="1">', *header, '</row>'])
+                for r, row in enumerate(rows, 2):
+                    cells = [_xlsx_cell(f"{_column_letter(c)}{r}", row.get(name)) for c, name in enumerate(columns)]
+                    write([f'<row r="{r}">', *cells, '</row>'])
+                write(['</sheetData></worksheet>'])
+
+
+def iter_xlsx(tables, chunk_size=CHUNK_SIZE):
+    """Libro XLSX leído por fragmentos una vez escrito"""
+    # El zip necesita un destino con seek; se construye en un archivo temporal
+    # que solo pasa a disco si el libro es grande
+    with tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_BYTES) as target:
+        write_xlsx(tables, target)
+        target.seek(0)
+        while True:
+            chunk = target.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+WRITERS = {'json': iter_json, 'jsonl': iter_jsonl, 'csv': iter_csv, 'xlsx': iter_xlsx}
+
+
+def gzip_chunks(chunks, level=6):
+    """Comprimir un flujo de fragmentos en formato gzip"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_export(data, fmt, compress=False, chunk_size=CHUNK_SIZE):
+    """Fragmentos de bytes del archivo exportado"""
+    if fmt not in WRITERS:
+        raise ValueError(f"Formato de exportación no soportado: {fmt}")
+    chunks = WRITERS[fmt](data, chunk_size)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def content_hash(data):
+    """SHA-256 de la serialización canónica, calculado por fragmentos"""
+    digest = hashlib.sha256()
+    encoder = json.JSONEncoder(sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    for part in encoder.iterencode(data):
+        digest.update(part.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ExportCache:
+    """Caché LRU de exportaciones generadas, acotada en bytes"""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Las descargas diferidas se generan fuera del hilo del script
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key, payload):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous)
+            self._entries[key] = payload
+            self.bytes += len(payload)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def stats(self):
+        return {'entradas': len(self._entries), 'kb': round(self.bytes / 1024, 1),
+                'aciertos': self.hits, 'fallos': self.misses}
+
+
+_cache = ExportCache()
+
+
+def get_export_cache():
+    return _cache
+
+
+def export_bytes(data, fmt, compress=False, cache=None):
+    """Archivo exportado completo, reutilizando la caché si el contenido no cambió"""
+    cache = _cache if cache is None else cache
+    key = (content_hash(data), fmt, bool(compress))
+    payload = cache.get(key)
+    if payload is None:
+        payload = b''.join(stream_export(data, fmt, compress))
+        cache.put(key, payload)
+    return payload
+
+
+def deferred_export(build, fmt, compress=False):
+    """Función sin argumentos para `st.download_button(data=...)`; `build` devuelve los datos"""
+    def generate():
+        return export_bytes(build(), fmt, compress)
+    return generate
+
+
+def export_file_name(stem, fmt, compress=False):
+    name = f"{stem}.{fmt}".replace(' ', '_')
+    return f"{name}.gz" if compress else name
+
+
+def export_mime(fmt, compress=False):
+    return 'application/gzip' if compress else FORMATS[fmt][1]
+
+
+def render_export_controls(key, build, file_stem, formats=TABULAR_FORMATS, label="💾 Exportar"):
+    """Formato, compresión y botón de descarga; nada se genera hasta la descarga"""
+    import streamlit as st
+
+    col_format, col_gzip, col_button = st.columns([2, 1, 2])
+    with col_format:
+        fmt = st.selectbox("Formato", formats, format_func=lambda f: FORMATS[f][0],
+                           key=f"export_format_{key}", label_visibility="collapsed")
+    with col_gzip:
+        compress = st.checkbox("gzip", key=f"export_gzip_{key}")
+    with col_button:
+        st.download_button(
+            label=label,
+            data=deferred_export(build, fmt, compress),
+            file_name=export_file_name(file_stem, fmt, compress),
+            mime=export_mime(fmt, compress),
+            key=f"export_{key}",
+            on_click="ignore"
+        )
+
+
+def osint_tables(results):
+    """Secciones tabulares de un análisis OSINT"""
+    tables = {
+        'resumen': [{
+            'risk_score': results.get('risk_score'),
+            'risk_level': results.get('risk_level'),
+            'industry_specific_risks': results.get('industry_specific_risks', [])
+        }]
+    }
+    for section in ('vulnerabilities', 'employee_exposure', 'attack_vectors',
+                    'technical_findings', 'recommendations'):
+        rows = results.get(section) or []
+        if rows:
+            tables[section] = [row if isinstance(row, dict) else {'valor': row} for row in rows]
+    return tables
+
+
+def profile_tables(profiles):
+    """Perfiles (una fila por perfil) y sus factores de riesgo y vulnerabilidades"""
+    tables = {'perfiles': [], 'factores_riesgo': [], 'vulnerabilidades': []}
+    for profile in profiles:
+        analysis = profile.get('analysis') or {}
+        psychological = analysis.get('psychological_profile') or {}
+        assessment = analysis.get('vulnerability_assessment') or {}
+        owner = {'user_name': profile.get('user_name'), 'department': profile.get('department'),
+                 'timestamp': profile.get('timestamp')}
+
+        tables['perfiles'].append({
+            **owner,
+            'overall_risk_score': assessment.get('overall_risk_score'),
+            'personality_summary': psychological.get('personality_summary'),
+            'core_traits': psychological.get('core_traits'),
+            'decision_making_style': psychological.get('decision_making_style')
+        })
+        for factor in assessment.get('risk_factors') or []:
+            tables['factores_riesgo'].append({**owner, **factor})
+        for vulnerability in assessment.get('psychological_vulnerabilities') or []:
+            tables['vulnerabilidades'].append({**owner, **vulnerability})
+    return {section: rows for section, rows in tables.items() if rows or section == 'perfiles'}
@@ -0,0 +1,304 @@
+"""
+Histórico persistente de análisis en SQLite.
+
+Los análisis OSINT, perfiles y contenidos generados se guardan en una base
+SQLite en modo WAL (lectores concurrentes con un escritor), indexada por
+empresa, departamento, fecha y score de riesgo. Las escrituras se agrupan
+en lotes para no abrir una transacción por cada análisis: el lote se vuelca
+al llenarse o al vencer su intervalo (con un temporizador, aunque no haya
+más escrituras). Las consultas no fuerzan el volcado, sino que añaden las
+filas pendientes que cumplen los filtros, y paginan por cursor (id
+descendente) para mantenerse rápidas con cientos de miles de filas.
+"""
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# Ruta de la base de datos (relativa a la raíz del proyecto si no es absoluta)
+HISTORY_DB_ENV = "SIP_HISTORY_DB"
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "history.db")
+
+# Escrituras pendientes antes de volcar un lote / antigüedad máxima del lote (s)
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_FLUSH_INTERVAL = 2.0
+
+# Filas escritas tras las que se refrescan las estadísticas del planificador
+ANALYZE_EVERY = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    session_id TEXT,
+    company TEXT,
+    department TEXT,
+    subject TEXT,
+    timestamp TEXT NOT NULL,
+    risk_score REAL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_company ON analyses (company);
+CREATE INDEX IF NOT EXISTS idx_analyses_department ON analyses (department);
+CREATE INDEX IF NOT EXISTS idx_analyses_timestamp ON analyses (timestamp);
+CREATE INDEX IF NOT EXISTS idx_analyses_risk ON analyses (risk_score);
+CREATE INDEX IF NOT EXISTS idx_analyses_kind ON analyses (kind);
+"""
+
+SUMMARY_COLUMNS = "id, kind, session_id, company, department, subject, timestamp, risk_score"
+
+# Orden de los campos de una fila pendiente (los de la tabla sin el id)
+ROW_FIELDS = ('kind', 'session_id', 'company', 'department', 'subject', 'timestamp', 'risk_score', 'payload')
+
+
+class HistoryStore:
+    """Almacén de análisis con escrituras por lotes y consultas paginadas"""
+
+    def __init__(self, path=None, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.path = path or os.getenv(HISTORY_DB_ENV, DEFAULT_DB_PATH)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._pending = []
+        self._pending_since = None
+        self._written_since_analyze = 0
+        self._timer = None
+        self._lock = threading.Lock()
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        atexit.register(self.flush)
+
+    def _connection(self):
+        """Una conexión por hilo (los hilos de Streamlit y los workers no la comparten)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, kind, payload, company=None, department=None, subject=None,
+            risk_score=None, session_id=None, timestamp=None):
+        """Encolar un análisis; se escribe al completar el lote o vencer el intervalo"""
+        row = (
+            kind,
+            session_id,
+            company,
+            department,
+            subject,
+            timestamp or datetime.now().isoformat(timespec='seconds'),
+            risk_score,
+            json.dumps(payload, ensure_ascii=False, default=str)
+        )
+        with self._lock:
+            self._pending.append(row)
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+                self._schedule()
+        self.flush_if_due()
+
+    def _schedule(self):
+        """Volcar el lote al vencer su intervalo aunque no lleguen más escrituras (con el lock)"""
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self._flush_on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_on_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except sqlite3.Error:
+            pass  # las filas siguen pendientes y flush() vuelve a programar el intento
+
+    def flush_if_due(self):
+        """Volcar solo si el lote está lleno o ha vencido su intervalo"""
+        with self._lock:
+            due = bool(self._pending) and (
+                len(self._pending) >= self.batch_size or
+                time.monotonic() - self._pending_since >= self.flush_interval)
+        return self.flush() if due else 0
+
+    def flush(self):
+        """Escribir todas las filas pendientes en una sola transacción
+
+        Si la escritura falla (base bloqueada, disco), las filas vuelven a la
+        cola pendiente para el siguiente intento y se relanza el error.
+        """
+        with self._lock:
+            rows, self._pending = self._pending, []
+            self._pending_since = None
+        if not rows:
+            return 0
+
+        conn = self._connection()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO analyses (kind, session_id, company, department, subject, "
+                    "timestamp, risk_score, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+        except BaseException:
+            with self._lock:
+                self._pending[:0] = rows
+                self._pending_since = time.monotonic()
+                self._schedule()
+            raise
+
+        # Con filtros combinados (empresa + riesgo, etc.) el planificador necesita
+        # estadísticas actualizadas para elegir el índice más selectivo
+        self._written_since_analyze += len(rows)
+        if self._written_since_analyze >= ANALYZE_EVERY:
+            self._written_since_analyze = 0
+            conn.execute("ANALYZE")
+        return len(rows)
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def _pending_items(self, kind=None, company=None, department=None, since=None, until=None,
+                       min_risk=None, max_risk=None, session_id=None):
+        """Filas aún sin volcar que cumplen los filtros, las más recientes primero (sin id)"""
+        with self._lock:
+            rows = list(self._pending)
+        items = []
+        for row in reversed(rows):
+            item = dict(zip(ROW_FIELDS, row))
+            risk = item['risk_score']
+            if any(value and item[column] != value for column, value in
+                   (('kind', kind), ('company', company), ('department', department), ('session_id', session_id))):
+                continue
+            if (since and item['timestamp'] < since) or (until and item['timestamp'] > until):
+                continue
+            if (min_risk is not None and (risk is None or risk < min_risk)) or \
+                    (max_risk is not None and (risk is None or risk > max_risk)):
+                continue
+            items.append({'id': None, **item})
+        return items
+
+    @staticmethod
+    def _filters(kind=None, company=None, department=None, since=None, until=None,
+                 min_risk=None, max_risk=None, session_id=None):
+        clauses, params = [], []
+        for column, value in (('kind', kind), ('company', company),
+                              ('department', department), ('session_id', session_id)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp <= ?")
+            params.append(until)
+        if min_risk is not None:
+            clauses.append("risk_score >= ?")
+            params.append(min_risk)
+        if max_risk is not None:
+            clauses.append("risk_score <= ?")
+            params.append(max_risk)
+        return clauses, params
+
+    def query(self, limit=20, before_id=None, include_payload=False, **filters):
+        """
+        Página de análisis más recientes que cumplen los filtros.
+        Para la página siguiente, pasar `before_id` = id de la última fila.
+
+        La primera página empieza por las filas pendientes de volcar (sin id
+        todavía); si llenan la página se vuelca el lote para que la última
+        fila tenga un id que sirva de cursor.
+        """
+        pending = self._pending_items(**filters) if before_id is None else []
+        if len(pending) >= limit:
+            self.flush()
+            pending = []
+        clauses, params = self._filters(**filters)
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+
+        columns = SUMMARY_COLUMNS + (", payload" if include_payload else "")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connection().execute(
+            f"SELECT {columns} FROM analyses {where} ORDER BY id DESC LIMIT ?",
+            params + [limit - len(pending)]
+        ).fetchall()
+
+        results = []
+        for item in pending:
+            if include_payload:
+                item['payload'] = json.loads(item['payload'])
+            else:
+                del item['payload']
+            results.append(item)
+        for row in rows:
+            item = dict(row)
+            if include_payload:
+                item['payload'] = json.loads(item['payload'])
+            results.append(item)
+        return results
+
+    def count(self, **filters):
+        """Número de análisis que cumplen los filtros (incluidos los pendientes de volcar)"""
+        clauses, params = self._filters(**filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        stored = self._connection().execute(f"SELECT COUNT(*) FROM analyses {where}", params).fetchone()[0]
+        return stored + len(self._pending_items(**filters))
+
+    def get(self, analysis_id):
+        """Análisis completo (con payload) por id; las filas pendientes aún no tienen id"""
+        row = self._connection().execute(
+            f"SELECT {SUMMARY_COLUMNS}, payload FROM analyses WHERE id = ?", (analysis_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        item = dict(row)
+        item['payload'] = json.loads(item['payload'])
+        return item
+
+    def distinct(self, column, kind=None):
+        """Valores distintos de una columna indexada (para filtros de la interfaz)"""
+        if column not in ('company', 'department', 'kind'):
+            raise ValueError(f"Columna no indexada: {column}")
+        sql = f"SELECT DISTINCT {column} FROM analyses WHERE {column} IS NOT NULL"
+        params = []
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        values = {r[0] for r in self._connection().execute(sql, params)}
+        values.update(item[column] for item in self._pending_items(kind=kind) if item[column] is not None)
+        return sorted(values)
+
+
+def current_session_id():
+    """Id de la sesión de Streamlit en curso (None fuera de `streamlit run`)"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx else None
+    except Exception:
+        return None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """Almacén compartido por todas las sesiones del proceso"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore()
+        return _store
@@ -0,0 +1,475 @@
+"""
+Cola de trabajos en segundo plano para los análisis largos.
+
+Los análisis que llaman al modelo (OSINT, perfiles y contenido) ya no
+bloquean el hilo del script de Streamlit: `submit_job` encola el trabajo en
+un pool de hilos compartido por todas las sesiones y devuelve su id. La
+página consulta el estado con un fragmento que se refresca solo mientras
+haya trabajos activos, permite cancelarlos y, al terminar, aplica el
+resultado a la sesión en el hilo del script.
+
+El resultado se escribe en el histórico persistente desde el propio worker
+(`persist`), de modo que un análisis completado queda guardado aunque el
+usuario cierre la pestaña antes de verlo.
+
+Cada envío de un formulario lleva una clave (sesión, formulario): un envío
+nuevo cancela el trabajo anterior de la misma clave si sigue en cola o en
+curso (cerrando su conexión con la API), y un reenvío idéntico se une al
+trabajo activo en lugar de repetir la llamada.
+"""
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from core.cancellation import Cancelled, CancelToken
+from core.reporting import Reporter
+from core.tracing import CANCELLED as SPAN_CANCELLED, ERROR as SPAN_ERROR, NOOP_SPAN, TRACER, current_span
+
+from .profiler import profiled
+from .progress import ProgressTracker
+
+# Variable de entorno con el número de workers del pool de trabajos
+JOB_WORKERS_ENV = "SIP_JOB_WORKERS"
+DEFAULT_WORKERS = 4
+
+# Trabajos terminados que se conservan en memoria para consultar su estado
+DEFAULT_RETENTION = 200
+
+# Muestras de espera/ejecución para la media y el p95
+TIMING_SAMPLES = 500
+
+# Trabajos que cada sesión muestra en el panel
+SESSION_JOBS_LIMIT = 10
+
+# Segundos entre refrescos del panel mientras haya trabajos activos
+POLL_INTERVAL = 1.0
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+ACTIVE = (QUEUED, RUNNING)
+
+# Motivos de cancelación
+BY_USER = 'user'
+SUPERSEDED = 'superseded'
+
+STATUS_LABELS = {
+    QUEUED: "⏳ En cola",
+    RUNNING: "⚙️ Ejecutando",
+    DONE: "✅ Completado",
+    FAILED: "❌ Error",
+    CANCELLED: "🚫 Cancelado",
+}
+
+
+class JobReporter(Reporter):
+    """Reporter que guarda los mensajes del trabajo para mostrarlos al terminar"""
+
+    def __init__(self):
+        self.messages = []
+
+    def info(self, message):
+        self.messages.append(('info', message))
+
+    def warning(self, message):
+        self.messages.append(('warning', message))
+
+    def error(self, message):
+        self.messages.append(('error', message))
+
+    def detail(self, text):
+        self.messages.append(('detail', text))
+
+
+class Job:
+    """Trabajo encolado: estado, tiempos, resultado y mensajes"""
+
+    def __init__(self, job_id, kind, label, fn, session_id=None, persist=None, apply=None,
+                 key=None, fingerprint=None, trace=None):
+        self.id = job_id
+        self.kind = kind
+        self.label = label
+        self.fn = fn
+        self.session_id = session_id
+        self.key = key
+        self.fingerprint = fingerprint
+        self.persist = persist
+        self.apply = apply
+        self.status = QUEUED
+        self.created_at = datetime.now()
+        self.queued_at = time.perf_counter()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.applied = False
+        self.progress = None
+        self.reporter = JobReporter()
+        self.tracker = ProgressTracker(label, callback=self._on_progress)
+        self.future = None
+        self.cancel_token = CancelToken()
+        # Span de la traza que encoló el trabajo (el envío del formulario)
+        self.trace = trace if trace is not None else NOOP_SPAN
+
+    def _on_progress(self, event):
+        self.progress = event
+
+    @property
+    def cancel_requested(self):
+        return self.cancel_token.cancelled
+
+    def raise_if_cancelled(self):
+        """Punto de control entre etapas: abandona el trabajo si se pidió cancelarlo"""
+        self.cancel_token.raise_if_cancelled()
+
+    @property
+    def active(self):
+        return self.status in ACTIVE
+
+    @property
+    def wait_seconds(self):
+        end = self.started or self.finished or time.perf_counter()
+        return end - self.queued_at
+
+    @property
+    def run_seconds(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def messages(self):
+        return self.reporter.messages
+
+
+class JobQueue:
+    """Pool de workers con trabajos consultables por id"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, retention=DEFAULT_RETENTION):
+        self.workers = max(1, workers)
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="jobs")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._latest = {}
+        self._ids = itertools.count(1)
+        self._waits = deque(maxlen=TIMING_SAMPLES)
+        self._runs = deque(maxlen=TIMING_SAMPLES)
+        self.counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0, CANCELLED: 0}
+        # Trabajos cancelados por un envío posterior, llamadas que nunca llegaron
+        # a la API (canceladas en cola o reenvíos idénticos) y llamadas cortadas
+        self.superseded = 0
+        self.saved = 0
+        self.aborted = 0
+
+    def submit(self, kind, fn, label=None, session_id=None, persist=None, apply=None,
+               key=None, fingerprint=None, trace=None):
+        """Encolar `fn(job)`; devuelve el id del trabajo
+
+        `persist(result)` se llama en el worker al completarse (histórico) y
+        `apply(result)` queda para el hilo del script (estado de la sesión).
+        Con `key`, el trabajo reemplaza al anterior activo de la misma clave,
+        salvo que tenga el mismo `fingerprint`: entonces se reutiliza ese.
+        `trace` es el span bajo el que se trazan la espera y la ejecución.
+        """
+        previous = None
+        with self._lock:
+            if key is not None:
+                previous = self._jobs.get(self._latest.get(key))
+                if previous is not None and not previous.active:
+                    previous = None
+                if previous is not None and fingerprint is not None and previous.fingerprint == fingerprint:
+                    self.saved += 1
+                    if trace is not None:
+                        trace.set_attribute('trabajo_reutilizado', previous.id)
+                        trace.end()
+                    return previous.id
+            job_id = f"{kind}-{next(self._ids)}"
+            job = Job(job_id, kind, label or kind, fn, session_id=session_id, persist=persist, apply=apply,
+                      key=key, fingerprint=fingerprint, trace=trace)
+            self._jobs[job_id] = job
+            if key is not None:
+                self._latest[key] = job_id
+            self.counts[QUEUED] += 1
+            self._trim()
+        if previous is not None:
+            self.cancel(previous.id, reason=SUPERSEDED)
+        job.future = self._executor.submit(self._run, job)
+        job.future.add_done_callback(lambda future: self._done(job, future))
+        return job_id
+
+    def _run(self, job):
+        with self._lock:
+            if job.cancel_token.cancelled:
+                return None
+            job.started = time.perf_counter()
+            job.status = RUNNING
+            self.counts[QUEUED] -= 1
+            self.counts[RUNNING] += 1
+            self._waits.append(job.started - job.queued_at)
+
+        TRACER.record("En cola", job.created_at.timestamp(), parent=job.trace)
+        with TRACER.span(f"Trabajo {job.kind}", parent=job.trace, job=job.id):
+            result = job.fn(job)
+            job.raise_if_cancelled()
+            if job.persist is not None:
+                with job.tracker.stage("Guardado"):
+                    job.persist(result)
+        return result
+
+    def _done(self, job, future):
+        # También se llama para los trabajos cancelados antes de empezar
+        with self._lock:
+            job.finished = time.perf_counter()
+            previous = job.status
+            # Una cancelación que llega tras el guardado ya no descarta el resultado
+            if future.cancelled() or job.started is None or isinstance(future.exception(), Cancelled):
+                job.status = CANCELLED
+                if job.started is None:
+                    self.saved += 1
+                else:
+                    self.aborted += 1
+            elif future.exception() is not None:
+                job.status = FAILED
+                error = future.exception()
+                job.error = f"{type(error).__name__}: {error}"
+            else:
+                job.status = DONE
+                job.result = future.result()
+            self.counts[previous] -= 1
+            self.counts[job.status] += 1
+            if job.started is not None:
+                self._runs.append(job.finished - job.started)
+        # Sin resultado que mostrar, la traza del envío termina aquí
+        if job.status == CANCELLED:
+            job.trace.end(SPAN_CANCELLED)
+        elif job.status == FAILED:
+            job.trace.end(SPAN_ERROR, job.error)
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(self._jobs) - self.retention)]:
+            job = self._jobs.pop(job_id)
+            if job.key is not None and self._latest.get(job.key) == job_id:
+                del self._latest[job.key]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self, session_id=None):
+        """Trabajos conservados, del más antiguo al más reciente"""
+        with self._lock:
+            return [job for job in self._jobs.values() if session_id is None or job.session_id == session_id]
+
+    def cancel(self, job_id, reason=BY_USER):
+        """Cancelar un trabajo: si está en cola no llega a ejecutarse; si está
+        en curso se cierra su llamada a la API y se descarta el resultado"""
+        job = self.get(job_id)
+        if job is None or not job.active or not job.cancel_token.cancel(reason):
+            return False
+        if reason == SUPERSEDED:
+            with self._lock:
+                self.superseded += 1
+        if job.future is not None:
+            job.future.cancel()
+        return True
+
+    def metrics(self):
+        """Profundidad de la cola, contadores y tiempos de espera/ejecución"""
+        with self._lock:
+            waits = sorted(self._waits)
+            runs = list(self._runs)
+            counts = dict(self.counts)
+            superseded, saved, aborted = self.superseded, self.saved, self.aborted
+        return {
+            'workers': self.workers,
+            'en_cola': counts[QUEUED],
+            'ejecutando': counts[RUNNING],
+            'completados': counts[DONE],
+            'errores': counts[FAILED],
+            'cancelados': counts[CANCELLED],
+            'reemplazados': superseded,
+            'llamadas_ahorradas': saved,
+            'llamadas_interrumpidas': aborted,
+            'espera_media_ms': round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+            'espera_p95_ms': round(waits[min(len(waits) - 1, int(0.95 * len(waits)))] * 1000, 1) if waits else 0.0,
+            'ejecucion_media_ms': round(sum(runs) / len(runs) * 1000, 1) if runs else 0.0,
+        }
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def job_workers():
+    """Workers configurados en SIP_JOB_WORKERS"""
+    try:
+        return max(1, int(os.getenv(JOB_WORKERS_ENV, DEFAULT_WORKERS)))
+    except ValueError:
+        return DEFAULT_WORKERS
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Cola compartida por todas las sesiones del proceso"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(workers=job_workers())
+        return _queue
+
+
+def submit_job(kind, fn, label, persist=None, apply=None, form=None, fingerprint=None, state=None):
+    """Encolar un trabajo de la sesión en curso y recordarlo para el panel
+
+    Con `form`, un envío nuevo del mismo formulario en esta sesión reemplaza
+    al trabajo anterior (o se une a él si `fingerprint` coincide). El trabajo
+    continúa la traza en curso, si la hay.
+    """
+    from .history_store import current_session_id
+
+    if state is None:
+        import streamlit as st
+        state = st.session_state
+
+    session_id = current_session_id()
+    key = (session_id, form) if form else None
+    job_id = get_job_queue().submit(kind, fn, label=label, session_id=session_id, persist=persist,
+                                    apply=apply, key=key, fingerprint=fingerprint, trace=current_span())
+    jobs = [existing for existing in state.get('jobs', []) if existing != job_id]
+    state['jobs'] = (jobs + [job_id])[-SESSION_JOBS_LIMIT:]
+    return job_id
+
+
+def session_jobs(state=None):
+    """Trabajos de la sesión todavía conservados por la cola"""
+    if state is None:
+        import streamlit as st
+        state = st.session_state
+
+    queue = get_job_queue()
+    return [job for job in (queue.get(job_id) for job_id in state.get('jobs', [])) if job is not None]
+
+
+def apply_finished_jobs(state=None):
+    """Aplicar a la sesión los resultados terminados; devuelve cuántos se aplicaron
+
+    La traza del trabajo queda pendiente hasta que se pinta el resultado.
+    """
+    from .progress import record_stage_timings
+    from .traces import hold_trace
+
+    applied = 0
+    for job in session_jobs(state):
+        if job.status != DONE or job.applied:
+            continue
+        job.applied = True
+        if job.apply is not None:
+            with TRACER.span("Aplicar resultado", parent=job.trace):
+                job.apply(job.result)
+        hold_trace(job.kind, job.trace, state=state)
+        record_stage_timings(job.tracker, state=state)
+        applied += 1
+    return applied
+
+
+def render_job(job):
+    """Fila del panel: estado, tiempos, progreso, mensajes y cancelación"""
+    import streamlit as st
+
+    col1, col2, col3 = st.columns([3, 2, 1])
+    with col1:
+        st.markdown(f"**{job.label}** · {job.created_at.strftime('%H:%M:%S')}")
+        if job.status == RUNNING and job.progress:
+            st.progress(job.progress['overall'], text=job.progress['stage'])
+    with col2:
+        timing = f"espera {job.wait_seconds:.1f}s"
+        if job.started is not None:
+            timing += f" · ejecución {job.run_seconds:.1f}s"
+        status = STATUS_LABELS[job.status]
+        if job.status == CANCELLED and job.cancel_token.reason == SUPERSEDED:
+            status += " (reemplazado)"
+        st.markdown(f"{status}  \n{timing}")
+    with col3:
+        if job.active:
+            st.button("Cancelar", key=f"cancel_job_{job.id}", on_click=get_job_queue().cancel, args=(job.id,))
+
+    if job.error:
+        st.error(job.error)
+    notices = [(level, text) for level, text in job.messages if level != 'detail']
+    for level, text in notices:
+        getattr(st, level)(text)
+    details = [text for level, text in job.messages if level == 'detail']
+    if details:
+        with st.expander("🔍 Debug: Respuesta de Claude", expanded=False):
+            for text in details:
+                st.text(text)
+
+
+@profiled
+def render_jobs_panel():
+    """Estado de los trabajos de la sesión; se refresca solo mientras haya activos"""
+    import streamlit as st
+
+    jobs = session_jobs()
+    if not jobs:
+        return
+
+    interval = POLL_INTERVAL if any(job.active for job in jobs) else None
+
+    @st.fragment(run_every=interval)
+    def panel():
+        current = session_jobs()
+        if apply_finished_jobs():
+            # Los resultados nuevos se pintan en las pestañas: rerun completo
+            st.rerun()
+        if interval and not any(job.active for job in current):
+            st.rerun()
+
+        with st.expander("🧵 Trabajos en segundo plano", expanded=interval is not None):
+            for job in reversed(current):
+                render_job(job)
+
+    panel()
+
+
+def render_job_metrics():
+    """Métricas de la cola compartida para el sidebar"""
+    import streamlit as st
+
+    metrics = get_job_queue().metrics()
+    col1, col2 = st.columns(2)
+    col1.metric("En cola", metrics['en_cola'])
+    col2.metric("Ejecutando", metrics['ejecutando'])
+    col1.metric("Espera media", f"{metrics['espera_media_ms']:.0f} ms")
+    col2.metric("Espera p95", f"{metrics['espera_p95_ms']:.0f} ms")
+    st.caption(
+        f"{metrics['workers']} workers · {metrics['completados']} completados · "
+        f"{metrics['errores']} errores · {metrics['cancelados']} cancelados · "
+        f"ejecución media {metrics['ejecucion_media_ms']:.0f} ms"
+    )
+    st.caption(
+        f"{metrics['reemplazados']} reemplazados por un envío nuevo · "
+        f"{metrics['llamadas_ahorradas']} llamadas ahorradas · "
+        f"{metrics['llamadas_interrumpidas']} llamadas interrumpidas"
+    )
+
+    # El limitador se crea con la primera llamada a la API; el panel no debe crearlo
+    from core import ratelimit
+    if ratelimit._limiter is not None and ratelimit._limiter.enabled:
+        quota = ratelimit._limiter.metrics()
+        st.caption(
+            f"Cuota API ({quota['rpm']:g} RPM · {quota['tpm']:g} TPM, todos los procesos): "
+            f"{quota['en_espera']} esperando turno · {quota['tokens_disponibles']} tokens disponibles · "
+            f"espera media {quota['espera_media_ms']:.0f} ms · p95 {quota['espera_p95_ms']:.0f} ms · "
+            f"{quota['rechazadas']} rechazadas"
+        )
@@ -0,0 +1,337 @@
+"""
+Inspector de memoria de la sesión y de las cachés del proceso.
+
+Como mucho cada INSPECT_INTERVAL segundos por sesión mide el tamaño
+profundo de cada clave de session_state
+(historiales, resultados actuales, cachés de etapas...) y aplica los
+umbrales configurados: una clave que supera SIP_SESSION_KEY_LIMIT_MB, o una
+sesión que supera SIP_SESSION_STATE_LIMIT_MB, libera primero lo que se
+puede recuperar (historiales al disco, cachés vaciadas, listas de métricas
+recortadas, resultados actuales que siguen en el historial). Opcionalmente
+toma instantáneas de tracemalloc y muestra qué líneas crecieron entre dos
+ejecuciones, para localizar fugas en servidores de larga duración.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from collections import deque
+from datetime import datetime
+
+from .app_metrics import record_session_bytes, session_is_active
+from .profiler import profiled
+from .session_history import BoundedHistory
+from .stage_cache import StageCache
+
+KEY_LIMIT_ENV = "SIP_SESSION_KEY_LIMIT_MB"
+DEFAULT_KEY_LIMIT_MB = 32
+SESSION_LIMIT_ENV = "SIP_SESSION_STATE_LIMIT_MB"
+DEFAULT_SESSION_LIMIT_MB = 64
+
+# Resultados actuales que la interfaz vuelve a obtener del historial o regenera
+DISPOSABLE_KEYS = ('current_osint', 'current_profile', 'current_content', 'osint_results',
+                   'individual_profile')
+
+# Registros de métricas que se pueden recortar a sus entradas más recientes
+TRIMMABLE_KEYS = ('render_stats', 'render_profiles', 'stage_timings')
+
+# Claves de la propia instrumentación, que no se miden
+INSPECTOR_KEYS = ('memory_report', 'memory_evictions', 'memory_diff', 'memory_snapshot', 'memory_tracing',
+                  'memory_inspected_at')
+
+# Segundos mínimos entre dos mediciones de la misma sesión (recorrerla cuesta)
+INSPECT_INTERVAL = 10
+
+# Objetos que se recorren como máximo al medir una clave
+MAX_OBJECTS = 200_000
+
+# Líneas que se muestran en la diferencia de tracemalloc
+SNAPSHOT_TOP = 15
+
+# Segundos entre comprobaciones de las sesiones que tienen tracemalloc activado
+TRACING_CHECK_INTERVAL = 60
+EVICTION_HISTORY_LIMIT = 20
+
+_SKIP_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+               types.CodeType, types.FrameType)
+
+
+def _limit_bytes(env, default_mb):
+    try:
+        return int(float(os.getenv(env, default_mb)) * 1024 * 1024)
+    except ValueError:
+        return default_mb * 1024 * 1024
+
+
+def key_limit_bytes():
+    """Umbral por clave de session_state, en bytes"""
+    return _limit_bytes(KEY_LIMIT_ENV, DEFAULT_KEY_LIMIT_MB)
+
+
+def session_limit_bytes():
+    """Umbral para el total de la sesión, en bytes"""
+    return _limit_bytes(SESSION_LIMIT_ENV, DEFAULT_SESSION_LIMIT_MB)
+
+
+def _buffer_bytes(obj):
+    """Bytes de datos de arrays y DataFrames, que getsizeof no cuenta (vistas, bloques de pandas)"""
+    module = type(obj).__module__
+    if module.startswith('pandas') and hasattr(obj, 'memory_usage'):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+    if module.startswith('numpy') and hasattr(obj, 'nbytes'):
+        return int(obj.nbytes)
+    return None
+
+
+def deep_sizeof(obj, limit=MAX_OBJECTS):
+    """Tamaño aproximado (bytes, objetos recorridos) de `obj` y todo lo que alcanza"""
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack and len(seen) < limit:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, _SKIP_TYPES):
+            continue
+        seen.add(id(item))
+
+        buffers = _buffer_bytes(item)
+        if buffers is not None:
+            total += max(buffers, sys.getsizeof(item, 0))
+            continue
+        total += sys.getsizeof(item, 0)
+
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            stack.extend(item)
+        elif isinstance(item, (str, bytes, bytearray, int, float, complex, bool)):
+            continue
+        else:
+            attributes = getattr(item, '__dict__', None)
+            if isinstance(attributes, dict):
+                stack.append(attributes)
+            for slot in getattr(type(item), '__slots__', ()):
+                if isinstance(slot, str) and hasattr(item, slot):
+                    stack.append(getattr(item, slot))
+    return total, len(seen)
+
+
+def eviction_policy(key, value):
+    """Qué se hace con la clave al superar un umbral (None: solo se informa)"""
+    if isinstance(value, BoundedHistory):
+        return 'volcar a disco' if value.stats()['en_memoria'] > 1 else None
+    if isinstance(value, StageCache):
+        return 'vaciar caché' if len(value) else None
+    if key in DISPOSABLE_KEYS:
+        return 'descartar'
+    if key in TRIMMABLE_KEYS and isinstance(value, list) and len(value) > 1:
+        return 'recortar a la mitad'
+    return None
+
+
+def evict(state, key):
+    """Liberar la clave según su política; devuelve la acción aplicada"""
+    value = state.get(key)
+    policy = eviction_policy(key, value)
+    if policy == 'volcar a disco':
+        value.shrink(keep=1)
+    elif policy == 'vaciar caché':
+        value.clear()
+    elif policy == 'descartar':
+        del state[key]
+    elif policy == 'recortar a la mitad':
+        del value[:len(value) // 2]
+    return policy
+
+
+def measure_session(state):
+    """Filas (clave, tipo, bytes, objetos, política) de session_state, de mayor a menor"""
+    rows = []
+    for key in list(state.keys()):
+        if key in INSPECTOR_KEYS:
+            continue
+        value = state.get(key)
+        size, objects = deep_sizeof(value)
+        rows.append({'clave': key, 'tipo': type(value).__name__, 'bytes': size, 'objetos': objects,
+                     'política': eviction_policy(key, value) or '-'})
+    return sorted(rows, key=lambda row: row['bytes'], reverse=True)
+
+
+def enforce_session_limits(state, rows, key_limit=None, session_limit=None):
+    """Aplicar los umbrales por clave y por sesión; devuelve los desalojos realizados"""
+    key_limit = key_limit_bytes() if key_limit is None else key_limit
+    session_limit = session_limit_bytes() if session_limit is None else session_limit
+
+    evictions = []
+    total = sum(row['bytes'] for row in rows)
+    for row in rows:
+        over_key = row['bytes'] > key_limit
+        if not over_key and total <= session_limit:
+            break
+        action = evict(state, row['clave'])
+        if action is None:
+            continue
+        after = deep_sizeof(state[row['clave']])[0] if row['clave'] in state else 0
+        total -= row['bytes'] - after
+        evictions.append({'fecha': datetime.now().strftime('%H:%M:%S'), 'clave': row['clave'],
+                          'kb_antes': round(row['bytes'] / 1024, 1), 'kb_después': round(after / 1024, 1),
+                          'acción': action, 'motivo': 'clave' if over_key else 'sesión'})
+        row['bytes'] = after
+    rows[:] = [row for row in rows if row['clave'] in state]
+    return evictions
+
+
+def cache_sizes():
+    """Cachés compartidas por todas las sesiones del proceso"""
+    from .demo_corpus import _render_cached, load_demo_corpus
+    from .exports import get_export_cache
+    from .session_history import total_memory_bytes
+    from . import jobs
+
+    export = get_export_cache().stats()
+    corpus_loaded = load_demo_corpus.cache_info().currsize
+    rows = [
+        {'caché': 'exportaciones', 'entradas': export['entradas'], 'kb': export['kb']},
+        {'caché': 'corpus demo', 'entradas': corpus_loaded,
+         'kb': round(deep_sizeof(load_demo_corpus())[0] / 1024, 1) if corpus_loaded else 0.0},
+        {'caché': 'plantillas demo', 'entradas': _render_cached.cache_info().currsize, 'kb': None},
+        {'caché': 'historiales (todas las sesiones)', 'entradas': None,
+         'kb': round(total_memory_bytes() / 1024, 1)},
+    ]
+    # La cola de trabajos solo se mide si ya existe
+    if jobs._queue is not None:
+        retained = jobs._queue.jobs()
+        rows.append({'caché': 'trabajos conservados', 'entradas': len(retained),
+                     'kb': round(deep_sizeof([job.result for job in retained])[0] / 1024, 1)})
+    return rows
+
+
+# Sesiones con tracemalloc activado (id -> última ejecución): se detiene
+# cuando no queda ninguna, también si se cierran sin desactivarlo
+_tracing_sessions = {}
+_tracing_lock = threading.Lock()
+_tracing_watcher = None
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ))
+
+
+def _prune_tracing_sessions():
+    """Olvidar las sesiones cerradas y detener tracemalloc si no queda ninguna (con el lock)"""
+    for session_id, last_seen in list(_tracing_sessions.items()):
+        if not session_is_active(session_id, last_seen):
+            del _tracing_sessions[session_id]
+    if not _tracing_sessions and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def _watch_tracing():
+    """Revisar periódicamente las sesiones mientras tracemalloc esté activado"""
+    global _tracing_watcher
+    while True:
+        time.sleep(TRACING_CHECK_INTERVAL)
+        with _tracing_lock:
+            _prune_tracing_sessions()
+            if not _tracing_sessions:
+                _tracing_watcher = None
+                return
+
+
+def update_tracemalloc(state, session_id, top=SNAPSHOT_TOP):
+    """Instantánea de esta ejecución y diferencia con la anterior de la sesión"""
+    global _tracing_watcher
+    enabled = bool(state.get('memory_tracing'))
+    with _tracing_lock:
+        if enabled:
+            _tracing_sessions[session_id] = time.time()
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            if _tracing_watcher is None:
+                _tracing_watcher = threading.Thread(target=_watch_tracing, name="tracemalloc-watch", daemon=True)
+                _tracing_watcher.start()
+        else:
+            _tracing_sessions.pop(session_id, None)
+        _prune_tracing_sessions()
+    if not enabled:
+        state.pop('memory_snapshot', None)
+        return None
+
+    snapshot = _snapshot()
+    previous = state.get('memory_snapshot')
+    state['memory_snapshot'] = snapshot
+    if previous is None:
+        return None
+    diff = [{
+        'ubicación': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+        'kb_diferencia': round(stat.size_diff / 1024, 1),
+        'kb_total': round(stat.size / 1024, 1),
+        'bloques': stat.count_diff,
+    } for stat in snapshot.compare_to(previous, 'lineno')[:top]]
+    state['memory_diff'] = diff
+    return diff
+
+
+@profiled
+def inspect_session_memory(state=None, force=False):
+    """Medir la sesión y aplicar los umbrales (como mucho cada INSPECT_INTERVAL s) y actualizar tracemalloc"""
+    if state is None:
+        import streamlit as st
+        state = st.session_state
+    from .history_store import current_session_id
+
+    now = time.monotonic()
+    rows = state.get('memory_report')
+    if force or rows is None or now - state.get('memory_inspected_at', 0) >= INSPECT_INTERVAL:
+        rows = measure_session(state)
+        evictions = enforce_session_limits(state, rows)
+        if evictions:
+            history = state.get('memory_evictions', [])
+            history.extend(evictions)
+            state['memory_evictions'] = history[-EVICTION_HISTORY_LIMIT:]
+        state['memory_report'] = rows
+        state['memory_inspected_at'] = now
+    record_session_bytes(current_session_id(), sum(row['bytes'] for row in rows))
+    update_tracemalloc(state, current_session_id())
+    return rows
+
+
+@profiled
+def render_memory_inspector(state=None):
+    """Panel con el tamaño de cada clave, las cachés, los desalojos y la diferencia de tracemalloc"""
+    import streamlit as st
+
+    if state is None:
+        state = st.session_state
+
+    rows = state.get('memory_report', [])
+    total = sum(row['bytes'] for row in rows)
+    age = time.monotonic() - state.get('memory_inspected_at', time.monotonic())
+    st.caption(f"Sesión: {total / 1024:.1f} KB (medida hace {age:.0f} s) · "
+               f"umbral por clave {key_limit_bytes() / 1024 / 1024:.0f} MB · "
+               f"por sesión {session_limit_bytes() / 1024 / 1024:.0f} MB")
+    st.dataframe([{**{k: v for k, v in row.items() if k != 'bytes'}, 'kb': round(row['bytes'] / 1024, 1)}
+                  for row in rows], hide_index=True, use_container_width=True)
+
+    st.caption("Cachés del proceso")
+    st.dataframe(cache_sizes(), hide_index=True, use_container_width=True)
+
+    evictions = state.get('memory_evictions', [])
+    if evictions:
+        st.caption("Desalojos recientes")
+        st.dataframe(list(reversed(evictions)), hide_index=True, use_container_width=True)
+
+    st.toggle("Instantáneas tracemalloc", key="memory_tracing",
+              help="Compara la memoria asignada entre ejecuciones; ralentiza el proceso mientras está activo")
+    diff = state.get('memory_diff')
+    if state.get('memory_tracing') and diff:
+        st.caption("Crecimiento desde la ejecución anterior (todo el proceso)")
+        st.dataframe(diff, hide_index=True, use_container_width=True)
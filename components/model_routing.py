@@ -0,0 +1,46 @@
+"""
+Panel del enrutador de modelos (core.routing): rutas configuradas, latencia
+observada por tipo de análisis y modelo, y últimas decisiones.
+"""
+from core.routing import ROUTER
+
+from .profiler import profiled
+
+
+def route_rows(router=ROUTER):
+    """Configuración efectiva de cada ruta"""
+    return [{
+        'llamada': call,
+        'modelos': " → ".join(config['models']),
+        'presupuesto_s': config['latency_budget_s'],
+        'max_tokens': config['max_tokens'],
+        'min_tokens': config['min_tokens'],
+    } for call, config in sorted(router.routes.items())]
+
+
+@profiled
+def render_routing_panel(router=ROUTER, scope=None):
+    """Latencia p95 frente al presupuesto y decisiones recientes del enrutador
+
+    `scope` es la credencial de la sesión: solo se listan los modelos que la
+    API rechazó para ella.
+    """
+    import streamlit as st
+
+    stats = router.stats()
+    if stats:
+        st.caption("Latencia observada frente al presupuesto")
+        st.dataframe(stats, hide_index=True, use_container_width=True)
+    decisions = router.decisions()
+    if decisions:
+        st.caption("Últimas decisiones")
+        st.dataframe(decisions[:10], hide_index=True, use_container_width=True)
+    else:
+        st.caption("Sin llamadas enrutadas todavía")
+    unavailable = router.unavailable(scope)
+    if unavailable:
+        st.warning(f"No disponibles con esta API key: {', '.join(sorted(unavailable))}")
+
+    with st.popover("Rutas configuradas", use_container_width=True):
+        st.dataframe(route_rows(router), hide_index=True, use_container_width=True)
+        st.caption("Se sobrescriben con un JSON en SIP_ROUTING_CONFIG")
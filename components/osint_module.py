@@ -1,12 +1,17 @@
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
 import numpy as np
-import time
+import itertools
 import json
 from datetime import datetime, timedelta
 
+from .downsampling import MIN_POINTS_TO_DOWNSAMPLE, add_downsampled_trace, zoom_range_selector
+from .exports import deferred_export, export_file_name, export_mime
+from .osint_sources import get_adapter, run_source_adapters
+from .profiler import profiled
+from .progress import ProgressTracker, record_stage_timings, streamlit_progress_callback
+from .stage_cache import get_stage_cache, stage_fingerprint
+
+@profiled
 def create_osint_interface():
     st.markdown("###  Módulo de Inteligencia OSINT")
     st.info("**Open Source Intelligence** - Recopilación y análisis de información públicamente disponible")
@@ -19,6 +24,7 @@ def create_osint_interface():
     with col2:
         create_osint_results_panel()
 
+@profiled
 def create_osint_input_form():
     st.markdown("####  Configuración del Análisis OSINT")
     
@@ -86,14 +92,13 @@ def create_osint_input_form():
         submit_button = st.form_submit_button(" Iniciar Análisis OSINT", type="primary")
         
         if submit_button:
-            run_osint_analysis(company_name, domain, search_sources, depth_level, target_roles)
+            run_osint_analysis(company_name, domain, search_sources, depth_level, target_roles, time_range)
 
-def run_osint_analysis(company_name, domain, sources, depth, roles):
-    """Ejecutar análisis OSINT simulado"""
+def run_osint_analysis(company_name, domain, sources, depth, roles, time_range=None):
+    """Ejecutar análisis OSINT con todas las fuentes habilitadas en paralelo"""
     
     # Crear contenedor para el progreso
     progress_container = st.container()
-    results_container = st.container()
     
     with progress_container:
         st.markdown("####  Análisis en Progreso...")
@@ -105,89 +110,94 @@ def run_osint_analysis(company_name, domain, sources, depth, roles):
         # Contenedor para sub-procesos
         sub_progress_container = st.container()
         
-        # Simular análisis paso a paso
-        total_steps = len([k for k, v in sources.items() if v]) * 2
-        current_step = 0
+        enabled_sources = [k for k, v in sources.items() if v]
+        adapters = [get_adapter(source) for source in enabled_sources]
+        context = {
+            'company_name': company_name,
+            'domain': domain,
+            'depth': depth,
+            'time_range': time_range,
+            'roles': sorted(roles)
+        }
+        
+        # Solo se ejecutan las fuentes cuya huella de entradas cambió
+        stage_cache = get_stage_cache()
+        fingerprints = {
+            adapter.key: stage_fingerprint(f"{type(adapter).__name__}:{adapter.key}", context)
+            for adapter in adapters
+        }
+        cached_results = {}
+        for adapter in adapters:
+            cached = stage_cache.get(fingerprints[adapter.key])
+            if cached is not None:
+                cached_results[adapter.key] = cached
+        stale_adapters = [a for a in adapters if a.key not in cached_results]
+        
+        tracker = ProgressTracker(
+            "OSINT",
+            callback=streamlit_progress_callback(main_progress, status_text),
+            total_stages=2
+        )
         
         # Resultados acumulativos
-        total_employees = 0
-        total_emails = 0
-        total_profiles = 0
-        total_tech = 0
+        totals = {'employees': 0, 'emails': 0, 'profiles': 0, 'tech': 0, 'subdomains': 0}
+        failed_sources = []
         
-        for source, enabled in sources.items():
-            if enabled:
-                source_names = {
-                    'linkedin': 'LinkedIn',
-                    'website': 'Sitio Web',
-                    'twitter': 'Twitter/X',
-                    'facebook': 'Facebook',
-                    'github': 'GitHub',
-                    'dns': 'DNS/Subdominios',
-                    'news': 'Noticias',
-                    'jobs': 'Ofertas de Trabajo'
-                }
+        # Los resultados llegan en orden de finalización, no de declaración
+        with tracker.stage("Fuentes OSINT", total_units=len(adapters)) as stage:
+            fresh_results = run_source_adapters(stale_adapters, context) if stale_adapters else []
+            for result in itertools.chain(cached_results.values(), fresh_results):
+                if result.get('cached'):
+                    stage.advance(detail=f"{result['label']} (caché)")
+                else:
+                    tracker.record(result['label'], result['elapsed'])
+                    stage.advance(detail=f"{result['label']} procesado")
+                    if result['status'] == 'ok':
+                        stage_cache.put(fingerprints[result['key']], dict(result, cached=True))
                 
                 with sub_progress_container:
-                    st.write(f" Analizando {source_names[source]}...")
-                    sub_progress = st.progress(0)
-                    
-                    # Simular sub-pasos
-                    for i in range(101):
-                        time.sleep(0.01)  # Simular procesamiento
-                        sub_progress.progress(i)
-                        if i % 25 == 0:
-                            status_text.text(f"Procesando {source_names[source]}: {i}%")
+                    if result['status'] != 'ok':
+                        failed_sources.append(result['key'])
+                        st.warning(f" {result['label']}: {result['error']}")
+                        continue
                     
-                    # Simular resultados específicos por fuente
-                    if source == 'linkedin':
-                        employees_found = np.random.randint(45, 85)
-                        total_employees += employees_found
-                        st.success(f" {employees_found} perfiles de empleados encontrados")
-                        
-                    elif source == 'website':
-                        emails_found = np.random.randint(8, 20)
-                        total_emails += emails_found
-                        st.success(f" {emails_found} direcciones de email extraídas")
-                        
-                    elif source == 'github':
-                        repos_found = np.random.randint(12, 30)
-                        total_tech += repos_found
-                        st.success(f" {repos_found} repositorios públicos identificados")
-                        
-                    elif source == 'dns':
-                        subdomains_found = np.random.randint(15, 45)
-                        st.success(f" {subdomains_found} subdominios descubiertos")
-                
-                current_step += 1
-                main_progress.progress(current_step / total_steps)
+                    for metric, value in result['data']['metrics'].items():
+                        totals[metric] = totals.get(metric, 0) + value
+                    if result['data']['message']:
+                        suffix = " (sin cambios, reutilizado)" if result.get('cached') else ""
+                        st.success(result['data']['message'] + suffix)
         
         # Análisis final
-        status_text.text(" Procesando resultados con IA...")
-        time.sleep(2)
+        with tracker.stage("Consolidación de resultados"):
+            # Almacenar resultados en session state
+            st.session_state.osint_results = {
+                'company_name': company_name,
+                'total_employees': totals['employees'],
+                'total_emails': totals['emails'],
+                'total_profiles': totals['profiles'] + totals['employees'],
+                'total_tech': totals['tech'],
+                'analysis_time': datetime.now(),
+                'depth': depth,
+                'sources_used': [s for s in enabled_sources if s not in failed_sources],
+                'sources_failed': failed_sources
+            }
         
         main_progress.progress(1.0)
-        status_text.text(" Análisis completado exitosamente!")
-        
-        # Almacenar resultados en session state
-        st.session_state.osint_results = {
-            'company_name': company_name,
-            'total_employees': total_employees,
-            'total_emails': total_emails,
-            'total_profiles': total_profiles + total_employees,
-            'total_tech': total_tech,
-            'analysis_time': datetime.now(),
-            'depth': depth,
-            'sources_used': [k for k, v in sources.items() if v]
-        }
+        status_text.text(
+            f" Análisis completado en {tracker.elapsed:.2f}s "
+            f"({len(stale_adapters)} fuentes ejecutadas, {len(cached_results)} reutilizadas)"
+        )
+        record_stage_timings(tracker)
         
         st.success(" Análisis OSINT completado. Revisa los resultados en el panel derecho.")
-        
-        # Auto-refresh para mostrar resultados
-        time.sleep(1)
         st.rerun()
 
+@profiled
 def create_osint_results_panel():
+    # Plotly solo se carga cuando se pinta el panel de resultados
+    import plotly.express as px
+    import plotly.graph_objects as go
+
     st.markdown("####  Resultados del Análisis")
     
     if 'osint_results' not in st.session_state:
@@ -247,15 +257,17 @@ def create_osint_results_panel():
     st.markdown("####  Actividad en Redes Sociales")
     activity_data = generate_activity_timeline()
     
+    x_range = None
+    if len(activity_data['dates']) > MIN_POINTS_TO_DOWNSAMPLE:
+        x_range = zoom_range_selector(activity_data['dates'], key="osint_activity_range")
+    
     fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=activity_data['dates'],
-        y=activity_data['posts'],
-        mode='lines+markers',
+    series = add_downsampled_trace(
+        fig, activity_data['dates'].values, activity_data['posts'],
         name='Posts/Día',
-        line=dict(color='#3b82f6', width=2),
-        marker=dict(size=6)
-    ))
+        color='#3b82f6',
+        x_range=x_range
+    )
     
     fig.update_layout(
         height=250,
@@ -265,18 +277,46 @@ def create_osint_results_panel():
     )
     st.plotly_chart(fig, use_container_width=True)
     
+    if series['downsampled']:
+        st.caption(f"Mostrando {len(series['x'])} de {series['raw_points']} puntos (LTTB)")
+    
     # Botones de acción
     col1, col2 = st.columns(2)
     
     with col1:
-        if st.button(" Exportar Resultados", key="export_osint"):
-            st.success(" Resultados exportados a Excel")
+        # El libro se genera solo al descargar
+        st.download_button(
+            " Exportar Resultados",
+            data=deferred_export(lambda: osint_summary_tables(results), 'xlsx'),
+            file_name=export_file_name(f"osint_{results['company_name']}", 'xlsx'),
+            mime=export_mime('xlsx'),
+            key="export_osint",
+            on_click="ignore"
+        )
     
     with col2:
         if st.button(" Nuevo Análisis", key="new_osint"):
             del st.session_state.osint_results
             st.rerun()
 
+def osint_summary_tables(results):
+    """Resumen, fuentes y distribución por departamento para exportar"""
+    return {
+        'resumen': [{
+            'empresa': results['company_name'],
+            'profundidad': results['depth'],
+            'empleados': results['total_employees'],
+            'emails': results['total_emails'],
+            'perfiles': results['total_profiles'],
+            'tecnologias': results['total_tech'],
+            'completado': results['analysis_time'].strftime('%Y-%m-%d %H:%M:%S')
+        }],
+        'fuentes': [{'fuente': source, 'estado': 'OK'} for source in results['sources_used']]
+                   + [{'fuente': source, 'estado': 'FALLO'} for source in results.get('sources_failed', [])],
+        'departamentos': [{'departamento': department, 'empleados': count}
+                          for department, count in generate_department_distribution(results['total_employees']).items()]
+    }
+
 def generate_department_distribution(total_employees):
     """Generar distribución realista por departamentos"""
     departments = {
@@ -296,9 +336,11 @@ def generate_department_distribution(total_employees):
     
     return departments
 
-def generate_activity_timeline():
+def generate_activity_timeline(days=30):
     """Generar timeline de actividad en redes sociales"""
-    dates = pd.date_range(start=datetime.now() - timedelta(days=30), end=datetime.now(), freq='D')
+    import pandas as pd
+
+    dates = pd.date_range(start=datetime.now() - timedelta(days=days), end=datetime.now(), freq='D')
     posts = np.random.poisson(3, len(dates))  # Distribución de Poisson para posts
     
     return {
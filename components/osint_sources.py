@@ -0,0 +1,226 @@
+"""
+Adaptadores de fuentes OSINT y ejecutor concurrente por fuente.
+
+Cada fuente habilitada en el formulario se resuelve con un adaptador
+registrado. El ejecutor lanza todos los adaptadores en un pool de hilos
+acotado, aplica un timeout propio a cada uno y entrega los resultados en
+orden de finalización, de modo que la interfaz puede actualizarse según
+llegan y el tiempo total se aproxima al de la fuente más lenta.
+
+El timeout de cada fuente cuenta desde que un hilo empieza a ejecutarla, no
+desde que se encola: el pool se comparte entre consultas simultáneas y una
+fuente que espera hilo libre no debe agotar su plazo sin haber arrancado.
+
+Un hilo del pool no se puede interrumpir desde fuera: cada `fetch` recibe
+un `CancelToken` que se activa al vencer su timeout (o si se abandona la
+consulta), y el adaptador debe esperar con `cancel.wait(...)` y comprobarlo
+entre pasos para devolver el hilo al pool en cuanto se le abandona.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from core.cancellation import Cancelled, CancelToken
+
+# Hilos máximos compartidos por todas las sesiones del proceso
+DEFAULT_MAX_WORKERS = 8
+
+# Timeout por defecto de cada adaptador (segundos)
+DEFAULT_TIMEOUT = 10.0
+
+# Cada cuánto se mira si ha arrancado alguna fuente que esperaba hilo (segundos)
+START_POLL_INTERVAL = 0.05
+
+# Modo de adaptadores: 'simulated' (por defecto) o 'fixtures' para pruebas offline
+ADAPTER_MODE_ENV = "SIP_OSINT_ADAPTERS"
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "osint")
+
+
+class SourceAdapter:
+    """Adaptador base: `fetch` devuelve {'metrics': {...}, 'message': str}
+
+    `cancel` se activa cuando se abandona la fuente (timeout); el adaptador
+    debe dejar de trabajar en cuanto lo vea.
+    """
+
+    key = None
+    label = None
+    timeout = DEFAULT_TIMEOUT
+
+    def fetch(self, context, cancel):
+        raise NotImplementedError
+
+
+class SimulatedSourceAdapter(SourceAdapter):
+    """Resultados aleatorios verosímiles, equivalentes a la demo original"""
+
+    def __init__(self, key, label, metric=None, low=0, high=1, message=None, timeout=DEFAULT_TIMEOUT):
+        self.key = key
+        self.label = label
+        self.metric = metric
+        self.low = low
+        self.high = high
+        self.message = message
+        self.timeout = timeout
+
+    def fetch(self, context, cancel):
+        if not self.metric:
+            return {'metrics': {}, 'message': None}
+        value = int(np.random.randint(self.low, self.high))
+        return {
+            'metrics': {self.metric: value},
+            'message': self.message.format(value=value) if self.message else None
+        }
+
+
+class FixtureSourceAdapter(SourceAdapter):
+    """Lee el resultado de un JSON local; `delay_seconds` emula la latencia de la fuente"""
+
+    def __init__(self, key, label, fixtures_dir=FIXTURES_DIR, timeout=DEFAULT_TIMEOUT):
+        self.key = key
+        self.label = label
+        self.path = os.path.join(fixtures_dir, f"{key}.json")
+        self.timeout = timeout
+
+    def fetch(self, context, cancel):
+        with open(self.path, encoding='utf-8') as f:
+            fixture = json.load(f)
+
+        delay = fixture.get('delay_seconds', 0)
+        if delay and cancel.wait(delay):
+            raise Cancelled(cancel.reason)
+
+        message = fixture.get('message')
+        if message:
+            message = message.format(**context, **fixture.get('metrics', {}))
+        return {'metrics': fixture.get('metrics', {}), 'message': message}
+
+
+SIMULATED_ADAPTERS = [
+    SimulatedSourceAdapter('linkedin', 'LinkedIn', 'employees', 45, 85, " {value} perfiles de empleados encontrados"),
+    SimulatedSourceAdapter('website', 'Sitio Web', 'emails', 8, 20, " {value} direcciones de email extraídas"),
+    SimulatedSourceAdapter('twitter', 'Twitter/X'),
+    SimulatedSourceAdapter('facebook', 'Facebook'),
+    SimulatedSourceAdapter('github', 'GitHub', 'tech', 12, 30, " {value} repositorios públicos identificados"),
+    SimulatedSourceAdapter('dns', 'DNS/Subdominios', 'subdomains', 15, 45, " {value} subdominios descubiertos"),
+    SimulatedSourceAdapter('news', 'Noticias'),
+    SimulatedSourceAdapter('jobs', 'Ofertas de Trabajo'),
+]
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def register_adapter(adapter):
+    """Registrar (o reemplazar) el adaptador de una fuente"""
+    with _registry_lock:
+        _registry[adapter.key] = adapter
+    return adapter
+
+
+def get_adapter(key):
+    """Adaptador registrado para una fuente, según el modo configurado"""
+    with _registry_lock:
+        if key in _registry:
+            return _registry[key]
+
+    if os.getenv(ADAPTER_MODE_ENV, "simulated") == "fixtures":
+        label = next((a.label for a in SIMULATED_ADAPTERS if a.key == key), key)
+        return FixtureSourceAdapter(key, label)
+
+    for adapter in SIMULATED_ADAPTERS:
+        if adapter.key == key:
+            return adapter
+    raise KeyError(f"No hay adaptador registrado para la fuente '{key}'")
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(max_workers=DEFAULT_MAX_WORKERS):
+    """Pool de hilos acotado y compartido por el proceso"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="osint-source")
+        return _executor
+
+
+def _timed_fetch(adapter, context, cancel, clock):
+    cancel.raise_if_cancelled()
+    # El plazo de la fuente empieza aquí, cuando por fin tiene hilo
+    clock['started'] = time.perf_counter()
+    data = adapter.fetch(context, cancel)
+    return data, time.perf_counter() - clock['started']
+
+
+def run_source_adapters(adapters, context, executor=None):
+    """
+    Ejecutar los adaptadores en paralelo y producir un resultado por fuente
+    en cuanto termina: {'key', 'label', 'status', 'data', 'elapsed', 'error'}.
+    """
+    executor = executor or get_executor()
+    started = time.perf_counter()
+
+    pending = {}
+    for adapter in adapters:
+        cancel = CancelToken()
+        clock = {}
+        future = executor.submit(_timed_fetch, adapter, context, cancel, clock)
+        pending[future] = (adapter, cancel, clock)
+
+    try:
+        yield from _collect(pending, started)
+    finally:
+        # Si se deja de consumir el generador, las fuentes pendientes se abandonan
+        for future, (_, cancel, _) in pending.items():
+            cancel.cancel('abandoned')
+            future.cancel()
+
+
+def _deadline(adapter, clock):
+    """Instante en que vence la fuente, o None si aún espera hilo"""
+    started = clock.get('started')
+    return None if started is None else started + adapter.timeout
+
+
+def _collect(pending, started):
+    while pending:
+        deadlines = [_deadline(adapter, clock) for adapter, _, clock in pending.values()]
+        running = [deadline for deadline in deadlines if deadline is not None]
+        timeout = max(0.0, min(running) - time.perf_counter()) if running else None
+        if len(running) < len(deadlines):
+            # Alguna fuente sigue en cola: volver a mirar pronto para empezar a contar su plazo
+            timeout = START_POLL_INTERVAL if timeout is None else min(timeout, START_POLL_INTERVAL)
+        done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            adapter, _, _ = pending.pop(future)
+            result = {'key': adapter.key, 'label': adapter.label, 'data': None, 'error': None}
+            try:
+                result['data'], result['elapsed'] = future.result()
+                result['status'] = 'ok'
+            except Exception as e:
+                result.update(status='error', error=str(e), elapsed=time.perf_counter() - started)
+            yield result
+
+        # Fuentes que superaron su timeout: se abandonan sin bloquear al resto
+        # y su token les pide que liberen el hilo
+        now = time.perf_counter()
+        for future, (adapter, cancel, clock) in list(pending.items()):
+            deadline = _deadline(adapter, clock)
+            if deadline is not None and now >= deadline:
+                cancel.cancel('timeout')
+                future.cancel()
+                del pending[future]
+                yield {
+                    'key': adapter.key, 'label': adapter.label, 'status': 'timeout',
+                    'data': None, 'error': f"Timeout tras {adapter.timeout:.1f}s",
+                    'elapsed': now - started
+                }
@@ -0,0 +1,177 @@
+"""
+Perfilado del render: tiempo de cada sección de `main()` y de cada función
+de componente en una ejecución del script.
+
+Se activa desde la barra lateral. Las funciones marcadas con `@profiled` y
+las secciones abiertas con `profile_section(...)` consultan una ContextVar;
+sin perfilado activo esa consulta es todo el coste añadido. Con el
+perfilado activo cada llamada abre un marco con su padre y su profundidad,
+y al terminar la ejecución el árbol se archiva en la sesión para mostrarlo
+como tabla tipo flame graph.
+"""
+import contextvars
+import functools
+import time
+
+# Ejecuciones perfiladas que se conservan por sesión
+PROFILE_HISTORY_LIMIT = 10
+
+# Clave del toggle de la barra lateral
+PROFILING_KEY = "render_profiling"
+
+_current = contextvars.ContextVar("render_profile", default=None)
+
+
+class RenderProfile:
+    """Marcos (nombre, profundidad, inicio, duración) de una ejecución del script"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.frames = []
+        self._stack = []
+
+    def enter(self, name):
+        frame = {'nombre': name, 'profundidad': len(self._stack), 'inicio': time.perf_counter(),
+                 'ms': 0.0, 'hijos_ms': 0.0}
+        self.frames.append(frame)
+        self._stack.append(frame)
+        return frame
+
+    def exit(self, frame):
+        frame['ms'] = (time.perf_counter() - frame['inicio']) * 1000
+        # Una excepción (p. ej. st.rerun) puede saltarse marcos intermedios
+        while self._stack and self._stack.pop() is not frame:
+            pass
+        if self._stack:
+            self._stack[-1]['hijos_ms'] += frame['ms']
+
+    def rows(self, total):
+        """Filas de la tabla flame: marcos en orden de llamada con su tiempo propio"""
+        return [{
+            'sección': f"{'  ' * frame['profundidad']}{frame['nombre']}",
+            'ms': round(frame['ms'], 2),
+            'propio_ms': round(frame['ms'] - frame['hijos_ms'], 2),
+            '%': round(100 * frame['ms'] / total, 1) if total else 0.0,
+        } for frame in self.frames]
+
+    def finish(self):
+        total = (time.perf_counter() - self.started) * 1000
+        return {'ms': round(total, 1), 'marcos': self.rows(total)}
+
+
+class profile_section:
+    """Sección con nombre dentro de una ejecución perfilada (`with profile_section("CSS"):`)"""
+
+    __slots__ = ('name', 'profile', 'frame')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.profile = _current.get()
+        if self.profile is not None:
+            self.frame = self.profile.enter(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        if self.profile is not None:
+            self.profile.exit(self.frame)
+        return False
+
+
+def profiled(fn=None, name=None):
+    """Decorador: mide cada llamada a `fn` cuando el perfilado está activo"""
+    if fn is None:
+        return functools.partial(profiled, name=name)
+    label = name or fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return fn(*args, **kwargs)
+        frame = profile.enter(label)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.exit(frame)
+
+    return wrapper
+
+
+def profiling_enabled(state=None):
+    if state is None:
+        import streamlit as st
+        state = st.session_state
+    return bool(state.get(PROFILING_KEY, False))
+
+
+def start_render_profile(state=None):
+    """Abrir el perfil de esta ejecución si el perfilado está activado"""
+    if not profiling_enabled(state):
+        _current.set(None)
+        return None
+    profile = RenderProfile()
+    _current.set(profile)
+    return profile
+
+
+def finish_render_profile(state=None, limit=PROFILE_HISTORY_LIMIT):
+    """Cerrar el perfil en curso y archivarlo en session_state['render_profiles']"""
+    profile = _current.get()
+    if profile is None:
+        return None
+    _current.set(None)
+    if state is None:
+        import streamlit as st
+        state = st.session_state
+
+    run = profile.finish()
+    history = state.get('render_profiles', [])
+    history.append(run)
+    state['render_profiles'] = history[-limit:]
+    return run
+
+
+def aggregate_profiles(history):
+    """Media y máximo por sección en las ejecuciones archivadas"""
+    totals = {}
+    for run in history:
+        for frame in run['marcos']:
+            name = frame['sección'].strip()
+            entry = totals.setdefault(name, {'sección': name, 'llamadas': 0, 'ms': 0.0, 'propio_ms': 0.0,
+                                             'max_ms': 0.0})
+            entry['llamadas'] += 1
+            entry['ms'] += frame['ms']
+            entry['propio_ms'] += frame['propio_ms']
+            entry['max_ms'] = max(entry['max_ms'], frame['ms'])
+    runs = max(1, len(history))
+    rows = [{**entry, 'ms': round(entry['ms'] / runs, 2), 'propio_ms': round(entry['propio_ms'] / runs, 2)}
+            for entry in totals.values()]
+    return sorted(rows, key=lambda row: row['propio_ms'], reverse=True)
+
+
+def render_profiler_panel(state=None):
+    """Toggle del perfilado y tabla flame de las últimas ejecuciones"""
+    import streamlit as st
+
+    if state is None:
+        state = st.session_state
+
+    st.toggle("Perfilar ejecuciones", key=PROFILING_KEY,
+              help="Mide cada sección y componente en las próximas ejecuciones")
+    history = state.get('render_profiles', [])
+    if not history:
+        st.caption("Sin ejecuciones perfiladas")
+        return
+
+    labels = [f"#{len(history) - i} · {run['ms']:.0f} ms" for i, run in enumerate(reversed(history))]
+    choice = st.selectbox("Ejecución", range(len(history)), format_func=labels.__getitem__,
+                          key="render_profile_choice")
+    run = history[-1 - choice]
+    st.dataframe(run['marcos'], hide_index=True, use_container_width=True, column_config={
+        '%': st.column_config.ProgressColumn("%", min_value=0, max_value=100, format="%.1f%%"),
+    })
+
+    st.caption(f"Media de las últimas {len(history)} ejecuciones (ordenado por tiempo propio)")
+    st.dataframe(aggregate_profiles(history), hide_index=True, use_container_width=True)
@@ -3,9 +3,15 @@ import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
-import time
 from datetime import datetime
 
+from core.scoring import (calculate_individual_risk_score, generate_attack_vectors, generate_individual_recommendations,
+                          generate_vulnerabilities, get_risk_color, get_risk_level)
+
+from .profiler import profiled
+from .progress import ProgressTracker, record_stage_timings, streamlit_progress_callback
+
+@profiled
 def create_profiling_interface():
     st.markdown("### 👥 Perfilado Avanzado de Objetivos")
     st.info("**Análisis psicológico y comportamental** de empleados para identificar vulnerabilidades específicas")
@@ -26,6 +32,7 @@ def create_profiling_interface():
     with profile_tab3:
         create_psychological_patterns()
 
+@profiled
 def create_individual_profiling():
     st.markdown("####  Análisis Individual de Empleado")
     
@@ -91,37 +98,42 @@ def run_individual_analysis(employee, profile_data):
     
     with st.spinner(" Analizando perfil psicológico..."):
         progress_bar = st.progress(0)
+        status_text = st.empty()
         
+        # Cada etapa corresponde a una función real del análisis
         analysis_steps = [
-            "Analizando patrones de comportamiento digital...",
-            "Evaluando vulnerabilidades psicológicas...",
-            "Identificando vectores de ataque óptimos...",
-            "Calculando probabilidades de éxito...",
-            "Generando recomendaciones de defensa..."
+            ("Calculando score de riesgo...", 'risk_score', calculate_individual_risk_score),
+            ("Evaluando vulnerabilidades psicológicas...", 'vulnerabilities', generate_vulnerabilities),
+            ("Identificando vectores de ataque óptimos...", 'attack_vectors', generate_attack_vectors),
+            ("Generando recomendaciones de defensa...", 'recommendations', generate_individual_recommendations)
         ]
         
-        for i, step in enumerate(analysis_steps):
-            time.sleep(0.8)
-            progress_bar.progress((i + 1) / len(analysis_steps))
-            st.text(step)
+        tracker = ProgressTracker(
+            "Perfil individual",
+            callback=streamlit_progress_callback(progress_bar, status_text),
+            total_stages=len(analysis_steps)
+        )
+        
+        results = {}
+        for label, key, step in analysis_steps:
+            with tracker.stage(label) as stage:
+                results[key] = step(profile_data)
+                stage.advance(detail=label)
         
-        # Calcular métricas de riesgo
-        risk_score = calculate_individual_risk_score(profile_data)
+        record_stage_timings(tracker)
         
         # Almacenar resultados
         st.session_state.individual_profile = {
             'employee': employee,
             'data': profile_data,
-            'risk_score': risk_score,
             'analysis_time': datetime.now(),
-            'vulnerabilities': generate_vulnerabilities(profile_data),
-            'attack_vectors': generate_attack_vectors(profile_data),
-            'recommendations': generate_individual_recommendations(profile_data)
+            **results
         }
         
         st.success(" Análisis de perfil completado")
         st.rerun()
 
+@profiled
 def display_individual_results():
     """Mostrar resultados del análisis individual"""
     
@@ -173,6 +185,7 @@ def display_individual_results():
     for i, rec in enumerate(profile['recommendations'], 1):
         st.markdown(f"**{i}.** {rec}")
 
+@profiled
 def create_risk_radar_chart(profile_data):
     """Crear gráfico de radar con dimensiones de riesgo"""
     
@@ -219,6 +232,7 @@ def create_risk_radar_chart(profile_data):
     
     st.plotly_chart(fig, use_container_width=True)
 
+@profiled
 def create_group_analysis():
     st.markdown("####  Análisis de Grupo y Departamental")
     
@@ -244,6 +258,7 @@ def create_group_analysis():
     st.markdown("####  Correlaciones de Factores de Riesgo")
     create_risk_correlation_matrix()
 
+@profiled
 def create_department_risk_distribution():
     """Gráfico de distribución de riesgo por departamento"""
     
@@ -276,6 +291,7 @@ def create_department_risk_distribution():
     fig.update_layout(height=350)
     st.plotly_chart(fig, use_container_width=True)
 
+@profiled
 def create_top_risk_employees_chart():
     """Gráfico de top empleados de riesgo"""
     
@@ -303,6 +319,7 @@ def create_top_risk_employees_chart():
     
     st.plotly_chart(fig, use_container_width=True)
 
+@profiled
 def create_risk_correlation_matrix():
     """Matriz de correlación entre factores de riesgo"""
     
@@ -339,6 +356,7 @@ def create_risk_correlation_matrix():
     
     st.plotly_chart(fig, use_container_width=True)
 
+@profiled
 def create_psychological_patterns():
     st.markdown("####  Análisis de Patrones Psicológicos")
     
@@ -349,19 +367,20 @@ def create_psychological_patterns():
         st.markdown("####  Tipos de Personalidad (DISC)")
         create_personality_distribution()
 
-  with col2:
-       # Vulnerabilidades por tipo de personalidad
-       st.markdown("#### ⚠ Vulnerabilidades por Personalidad")
-       create_personality_vulnerability_chart()
-   
-   # Análisis de triggers emocionales
-   st.markdown("####  Triggers Emocionales Más Efectivos")
-   create_emotional_triggers_analysis()
-   
-   # Patrones temporales
-   st.markdown("####  Patrones Temporales de Vulnerabilidad")
-   create_temporal_vulnerability_chart()
+    with col2:
+        # Vulnerabilidades por tipo de personalidad
+        st.markdown("#### ⚠ Vulnerabilidades por Personalidad")
+        create_personality_vulnerability_chart()
+    
+    # Análisis de triggers emocionales
+    st.markdown("####  Triggers Emocionales Más Efectivos")
+    create_emotional_triggers_analysis()
+    
+    # Patrones temporales
+    st.markdown("####  Patrones Temporales de Vulnerabilidad")
+    create_temporal_vulnerability_chart()
 
+@profiled
 def create_personality_distribution():
    """Distribución de tipos de personalidad DISC"""
    
@@ -389,6 +408,7 @@ def create_personality_distribution():
    
    st.plotly_chart(fig, use_container_width=True)
 
+@profiled
 def create_personality_vulnerability_chart():
    """Vulnerabilidades específicas por tipo de personalidad"""
    
@@ -424,6 +444,7 @@ def create_personality_vulnerability_chart():
    
    st.plotly_chart(fig, use_container_width=True)
 
+@profiled
 def create_emotional_triggers_analysis():
    """Análisis de triggers emocionales más efectivos"""
    
@@ -475,6 +496,7 @@ def create_emotional_triggers_analysis():
    
    st.dataframe(df_display, use_container_width=True, hide_index=True)
 
+@profiled
 def create_temporal_vulnerability_chart():
    """Patrones temporales de vulnerabilidad"""
    
@@ -553,152 +575,3 @@ def generate_employee_list(total_employees):
        employees.append(f"{name} - {role}")
    
    return employees
-
-def calculate_individual_risk_score(profile_data):
-   """Calcular score de riesgo individual"""
-   
-   # Pesos para diferentes factores
-   weights = {
-       'social_activity': 0.25,
-       'info_sharing': 0.30,
-       'security_awareness': -0.20,  # Negativo porque mayor conciencia = menor riesgo
-       'interests_count': 0.10,
-       'communication_risk': 0.15
-   }
-   
-   # Calcular componentes
-   social_risk = profile_data['social_activity'] / 10
-   sharing_risk = profile_data['info_sharing'] / 10
-   awareness_protection = profile_data['security_awareness'] / 10
-   interests_risk = len(profile_data['interests']) / 7  # Máximo 7 intereses
-   
-   # Riesgo por estilo de comunicación
-   comm_risks = {
-       'Formal': 0.3,
-       'Casual': 0.7,
-       'Técnico': 0.4,
-       'Emocional': 0.8,
-       'Directo': 0.5
-   }
-   communication_risk = comm_risks.get(profile_data['communication'], 0.5)
-   
-   # Calcular score final
-   risk_score = (
-       social_risk * weights['social_activity'] +
-       sharing_risk * weights['info_sharing'] +
-       awareness_protection * weights['security_awareness'] +
-       interests_risk * weights['interests_count'] +
-       communication_risk * weights['communication_risk']
-   )
-   
-   # Normalizar entre 0 y 1
-   risk_score = max(0, min(1, risk_score + 0.3))  # Base mínima de 0.3
-   
-   return risk_score
-
-def generate_vulnerabilities(profile_data):
-   """Generar lista de vulnerabilidades específicas"""
-   
-   vulnerabilities = []
-   
-   if profile_data['social_activity'] >= 7:
-       vulnerabilities.append("Alta exposición en redes sociales - información personal fácilmente accesible")
-   
-   if profile_data['info_sharing'] >= 7:
-       vulnerabilities.append("Tendencia a compartir información corporativa en canales públicos")
-   
-   if profile_data['security_awareness'] <= 4:
-       vulnerabilities.append("Baja conciencia de seguridad - susceptible a técnicas básicas de ingeniería social")
-   
-   if 'Familia' in profile_data['interests']:
-       vulnerabilities.append("Información familiar pública - posible vector de manipulación emocional")
-   
-   if 'Tecnología' in profile_data['interests']:
-       vulnerabilities.append("Interés en tecnología - susceptible a ataques técnicos sofisticados")
-   
-   if profile_data['communication'] == 'Emocional':
-       vulnerabilities.append("Estilo comunicativo emocional - vulnerable a técnicas de manipulación psicológica")
-   
-   if profile_data['schedule'] == '24/7 Disponible':
-       vulnerabilities.append("Disponibilidad constante - mayor superficie de ataque temporal")
-   
-   return vulnerabilities
-
-def generate_attack_vectors(profile_data):
-   """Generar vectores de ataque específicos"""
-   
-   vectors = []
-   
-   # Vectores basados en actividad social
-   if profile_data['social_activity'] >= 6:
-       vectors.append("Phishing dirigido basado en posts recientes en redes sociales")
-       vectors.append("Ingeniería social vía LinkedIn con conexiones falsas")
-   
-   # Vectores basados en intereses
-   if 'Tecnología' in profile_data['interests']:
-       vectors.append("Emails de alerta de seguridad falsos con enlaces maliciosos")
-   
-   if 'Viajes' in profile_data['interests']:
-       vectors.append("Ofertas de viajes corporativos falsas para captura de datos")
-   
-   if 'Familia' in profile_data['interests']:
-       vectors.append("Emergencias familiares falsas para generar urgencia")
-   
-   # Vectores basados en comunicación
-   if profile_data['communication'] in ['Casual', 'Emocional']:
-       vectors.append("Vishing (phone phishing) con pretexto emocional")
-   
-   # Vector de timing
-   if profile_data['schedule'] != '9-17 Estándar':
-       vectors.append("Ataques fuera de horario laboral cuando las defensas están bajas")
-   
-   return vectors
-
-def generate_individual_recommendations(profile_data):
-   """Generar recomendaciones personalizadas"""
-   
-   recommendations = []
-   
-   if profile_data['social_activity'] >= 7:
-       recommendations.append("Capacitación específica sobre configuración de privacidad en redes sociales")
-       recommendations.append("Política de redes sociales corporativas personalizada")
-   
-   if profile_data['security_awareness'] <= 4:
-       recommendations.append("Programa intensivo de concienciación en seguridad")
-       recommendations.append("Simulacros de phishing semanales hasta mejora demostrable")
-   
-   if profile_data['info_sharing'] >= 6:
-       recommendations.append("Protocolo de verificación antes de compartir información corporativa")
-       recommendations.append("Capacitación sobre clasificación de información sensible")
-   
-   if profile_data['communication'] == 'Emocional':
-       recommendations.append("Entrenamiento específico sobre técnicas de manipulación emocional")
-       recommendations.append("Protocolo de 'pausa y verificación' para solicitudes urgentes")
-   
-   # Recomendación técnica
-   recommendations.append("Implementación de autenticación multifactor obligatoria")
-   recommendations.append("Monitoreo personalizado de actividades inusuales")
-   
-   return recommendations
-
-def get_risk_color(risk_score):
-   """Obtener color basado en el score de riesgo"""
-   if risk_score >= 0.8:
-       return '#ef4444'  # Rojo
-   elif risk_score >= 0.6:
-       return '#f59e0b'  # Naranja
-   elif risk_score >= 0.4:
-       return '#3b82f6'  # Azul
-   else:
-       return '#10b981'  # Verde
-
-def get_risk_level(risk_score):
-   """Obtener nivel de riesgo textual"""
-   if risk_score >= 0.8:
-       return 'CRÍTICO - Acción inmediata requerida'
-   elif risk_score >= 0.6:
-       return 'ALTO - Requiere atención prioritaria'
-   elif risk_score >= 0.4:
-       return 'MEDIO - Monitoreo continuo recomendado'
-   else:
-       return 'BAJO - Mantener vigilancia estándar'
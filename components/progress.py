@@ -0,0 +1,168 @@
+"""
+Progreso por etapas basado en trabajo real.
+
+Cada etapa del pipeline declara cuántas unidades de trabajo tiene y las va
+avanzando; un callback recibe el avance y el tiempo transcurrido. Por
+defecto no hay ningún retardo artificial. Para presentaciones en vivo se
+puede activar una pausa por etapa con la variable de entorno SIP_DEMO_DELAY
+(segundos), que se registra aparte del tiempo de trabajo.
+"""
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from core.tracing import span
+
+# Variable de entorno con la pausa (en segundos) por etapa en modo presentación
+DEMO_DELAY_ENV = "SIP_DEMO_DELAY"
+
+# Número de ejecuciones cuyos tiempos se conservan para el panel de instrumentación
+TIMINGS_HISTORY_LIMIT = 20
+
+
+def artificial_delay():
+    """Pausa configurada por etapa (0 = sin retardo artificial, modo producción)"""
+    try:
+        return max(0.0, float(os.getenv(DEMO_DELAY_ENV, "0")))
+    except ValueError:
+        return 0.0
+
+
+class Stage:
+    """Etapa en curso: acumula unidades completadas y notifica al tracker"""
+
+    def __init__(self, tracker, name, total_units):
+        self.tracker = tracker
+        self.name = name
+        self.total_units = max(1, int(total_units))
+        self.done_units = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def advance(self, units=1, detail=None):
+        self.done_units = min(self.total_units, self.done_units + units)
+        self.elapsed = time.perf_counter() - self.started
+        self.tracker._notify(self, detail)
+
+
+class ProgressTracker:
+    """Coordina las etapas de un pipeline y guarda sus tiempos reales"""
+
+    def __init__(self, pipeline, callback=None, total_stages=None, delay=None):
+        self.pipeline = pipeline
+        self.callback = callback
+        self.total_stages = total_stages
+        self.delay = artificial_delay() if delay is None else delay
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.timings = []
+
+    @contextmanager
+    def stage(self, name, total_units=1):
+        current = Stage(self, name, total_units)
+        self._notify(current, None)
+        try:
+            # Cada etapa es un span de la traza en curso, si la hay
+            with span(name, pipeline=self.pipeline, units=current.total_units):
+                yield current
+        finally:
+            current.elapsed = time.perf_counter() - current.started
+            if current.done_units < current.total_units:
+                current.done_units = current.total_units
+            self.timings.append({
+                'stage': name,
+                'units': current.total_units,
+                'elapsed_ms': round(current.elapsed * 1000, 2)
+            })
+            self._notify(current, None)
+            if self.delay:
+                time.sleep(self.delay)
+
+    def record(self, name, elapsed, units=1):
+        """Registrar el tiempo de una tarea medida fuera de `stage` (p. ej. en paralelo)"""
+        self.timings.append({
+            'stage': name,
+            'units': units,
+            'elapsed_ms': round(elapsed * 1000, 2),
+            'concurrent': True
+        })
+
+    def _notify(self, stage, detail):
+        if not self.callback:
+            return
+        completed = len(self._sequential_timings())
+        total = self.total_stages or completed + 1
+        fraction = (completed + stage.done_units / stage.total_units) / max(total, 1)
+        self.callback({
+            'pipeline': self.pipeline,
+            'stage': stage.name,
+            'done': stage.done_units,
+            'total': stage.total_units,
+            'elapsed': stage.elapsed,
+            'overall': min(1.0, fraction),
+            'detail': detail
+        })
+
+    def _sequential_timings(self):
+        # Las tareas concurrentes se solapan con su etapa contenedora
+        return [t for t in self.timings if not t.get('concurrent')]
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def summary(self):
+        """Resumen de la ejecución para el panel de instrumentación"""
+        sequential = self._sequential_timings()
+        work = sum(t['elapsed_ms'] for t in sequential)
+        return {
+            'pipeline': self.pipeline,
+            'started_at': self.started_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'total_ms': round(self.elapsed * 1000, 2),
+            'work_ms': round(work, 2),
+            'delay_ms': round(self.delay * len(sequential) * 1000, 2),
+            'stages': list(self.timings)
+        }
+
+
+def streamlit_progress_callback(progress_bar, status_text=None):
+    """Callback que refleja el avance en una barra y un texto de Streamlit"""
+    def callback(event):
+        progress_bar.progress(event['overall'])
+        if status_text is not None:
+            label = event['detail'] or f"{event['stage']}: {event['done']}/{event['total']}"
+            status_text.text(f"{label} ({event['elapsed'] * 1000:.0f} ms)")
+    return callback
+
+
+def record_stage_timings(tracker, state=None, limit=TIMINGS_HISTORY_LIMIT):
+    """Guardar los tiempos de la ejecución en session_state para el panel"""
+    if state is None:
+        import streamlit as st
+        state = st.session_state
+
+    history = state.get('stage_timings', [])
+    history.append(tracker.summary())
+    state['stage_timings'] = history[-limit:]
+
+
+def render_stage_timings(state=None):
+    """Panel de instrumentación con los tiempos de las últimas ejecuciones"""
+    import streamlit as st
+
+    if state is None:
+        state = st.session_state
+
+    history = state.get('stage_timings', [])
+    if not history:
+        st.caption("Sin ejecuciones registradas")
+        return
+
+    for run in reversed(history[-5:]):
+        st.markdown(
+            f"**{run['pipeline']}** · {run['started_at']} · "
+            f"{run['work_ms']:.0f} ms de trabajo"
+            + (f" + {run['delay_ms']:.0f} ms de pausa" if run['delay_ms'] else "")
+        )
+        st.dataframe(run['stages'], hide_index=True, use_container_width=True)
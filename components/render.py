@@ -0,0 +1,164 @@
+"""
+Renderizado paginado de listas largas y medición del coste de cada rerun.
+
+Las secciones de resultados solo materializan la página visible, y las
+tarjetas HTML de una página se envían en un único elemento markdown en lugar
+de uno por elemento. El contador de render envuelve la cola de mensajes de
+la sesión y registra cuántos elementos y bytes se envían al navegador en
+cada ejecución del script. Ese gancho usa `ScriptRunContext._enqueue`, que
+es privado: si una versión de Streamlit lo cambia, el contador se desactiva
+en lugar de romper el render.
+"""
+import math
+
+from .profiler import profiled
+
+DEFAULT_PAGE_SIZE = 10
+PAGE_SIZE_OPTIONS = (5, 10, 25, 50)
+
+# Ejecuciones cuyo coste de render se conserva por sesión
+RENDER_HISTORY_LIMIT = 20
+
+
+def page_size(state=None):
+    """Tamaño de página configurado en la sesión"""
+    if state is None:
+        import streamlit as st
+        state = st.session_state
+    return state.get('page_size', DEFAULT_PAGE_SIZE)
+
+
+def render_page_size_setting():
+    """Selector del tamaño de página (elementos por página en las listas)"""
+    import streamlit as st
+
+    st.selectbox("Elementos por página", PAGE_SIZE_OPTIONS,
+                 index=PAGE_SIZE_OPTIONS.index(DEFAULT_PAGE_SIZE), key="page_size")
+
+
+def pager(key, total, size=None):
+    """Controles de página; devuelve el rango (inicio, fin) visible"""
+    import streamlit as st
+
+    size = size or page_size()
+    pages = max(1, math.ceil(total / size))
+    state_key = f"page_{key}"
+    page = min(st.session_state.get(state_key, 0), pages - 1)
+
+    if pages > 1:
+        col_prev, col_info, col_next = st.columns([1, 3, 1])
+        with col_prev:
+            if st.button("◀", key=f"{state_key}_prev", disabled=page == 0):
+                page -= 1
+        with col_next:
+            if st.button("▶", key=f"{state_key}_next", disabled=page >= pages - 1):
+                page += 1
+        with col_info:
+            start = page * size
+            st.caption(f"{start + 1}–{min(start + size, total)} de {total}")
+
+    st.session_state[state_key] = page
+    return page * size, min(page * size + size, total)
+
+
+@profiled
+def paginate(items, key, render_html=None, render_item=None, size=None):
+    """
+    Renderizar solo la página visible de `items`. Con `render_html` la página
+    se envía como un único bloque markdown; con `render_item` se llama por elemento.
+    """
+    import streamlit as st
+
+    items = items or []
+    start, end = pager(key, len(items), size)
+    visible = items[start:end]
+
+    if render_html is not None:
+        st.markdown("\n".join(render_html(item) for item in visible), unsafe_allow_html=True)
+    else:
+        for item in visible:
+            render_item(item)
+    return visible
+
+
+class RenderCounter:
+    """Elementos y bytes enviados al navegador en la ejecución en curso"""
+
+    def __init__(self):
+        self.elements = 0
+        self.bytes = 0
+        self.messages = 0
+
+    def count(self, msg):
+        self.messages += 1
+        self.bytes += msg.ByteSize()
+        if msg.WhichOneof('type') == 'delta' and msg.delta.WhichOneof('type') in ('new_element', 'add_block'):
+            self.elements += 1
+
+    def snapshot(self):
+        return {'elementos': self.elements, 'mensajes': self.messages, 'kb': round(self.bytes / 1024, 1)}
+
+
+def install_render_counter(state=None, limit=RENDER_HISTORY_LIMIT):
+    """
+    Contar los mensajes de esta ejecución; se llama al inicio del script y
+    archiva en session_state['render_stats'] el coste de la ejecución anterior.
+    """
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return None
+    if state is None:
+        import streamlit as st
+        state = st.session_state
+
+    # Cada ejecución tiene su propio contexto; el contador de la anterior
+    # queda en la sesión hasta que empieza la siguiente
+    previous = state.get('render_counter')
+    if previous is not None and previous.messages:
+        history = state.get('render_stats', [])
+        history.append(previous.snapshot())
+        state['render_stats'] = history[-limit:]
+
+    if not getattr(ctx, 'render_counted', False):
+        enqueue = getattr(ctx, '_enqueue', None)
+        if not callable(enqueue):
+            state.pop('render_counter', None)
+            return None
+
+        def counting_enqueue(msg):
+            try:
+                state['render_counter'].count(msg)
+            except Exception:
+                # Un mensaje con otra forma no debe impedir que se envíe
+                pass
+            enqueue(msg)
+
+        try:
+            ctx._enqueue = counting_enqueue
+            ctx.render_counted = True
+        except (AttributeError, TypeError):
+            state.pop('render_counter', None)
+            return None
+
+    counter = RenderCounter()
+    state['render_counter'] = counter
+    return counter
+
+
+def render_render_stats(state=None):
+    """Panel con el coste de las últimas ejecuciones"""
+    import streamlit as st
+
+    if state is None:
+        state = st.session_state
+
+    history = state.get('render_stats', [])
+    if not history:
+        st.caption("Sin ejecuciones medidas")
+        return
+
+    last = history[-1]
+    st.caption(f"Última ejecución: {last['elementos']} elementos · {last['kb']:.1f} KB")
+    st.dataframe(list(reversed(history)), hide_index=True, use_container_width=True)
@@ -0,0 +1,319 @@
+"""
+Generador de reportes ejecutivos en PDF y HTML que escribe página a página.
+
+Ningún formato mantiene el documento completo en memoria: el PDF se vuelca
+al archivo de salida al cerrar cada página (solo se conservan los offsets de
+la tabla xref) y el HTML se produce como un iterador de fragmentos. Los
+empleados se consumen de cualquier iterable, de modo que un roster de 50k
+filas puede venir de un generador o de un cursor de base de datos.
+"""
+import html
+import os
+import tempfile
+import weakref
+from datetime import datetime
+
+# Página A4 en puntos PDF
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 50
+
+# Filas de empleados por lote en el reporte HTML
+HTML_BATCH_SIZE = 500
+
+TRAINING_BY_LEVEL = [
+    (0.8, [
+        "Programa intensivo de concienciación en seguridad",
+        "Simulacros de phishing semanales hasta mejora demostrable",
+        "Protocolo de 'pausa y verificación' para solicitudes urgentes"
+    ]),
+    (0.6, [
+        "Capacitación específica en reconocimiento de phishing",
+        "Revisión de configuraciones de privacidad en redes sociales"
+    ]),
+    (0.4, [
+        "Simulacros de phishing mensuales",
+    ]),
+    (0.0, [
+        "Mantener capacitación anual estándar",
+    ]),
+]
+
+
+def default_training_plan(risk_score):
+    """Plan de capacitación por defecto según el score de riesgo"""
+    for threshold, plan in TRAINING_BY_LEVEL:
+        if risk_score >= threshold:
+            return plan
+    return TRAINING_BY_LEVEL[-1][1]
+
+
+def risk_rgb(value):
+    """Color RdYlBu invertido aproximado para un valor 0-1"""
+    stops = [(0.0, (0.27, 0.46, 0.71)), (0.5, (1.0, 1.0, 0.75)), (1.0, (0.84, 0.19, 0.15))]
+    value = max(0.0, min(1.0, float(value)))
+    for (x0, c0), (x1, c1) in zip(stops, stops[1:]):
+        if value <= x1:
+            f = (value - x0) / (x1 - x0)
+            return tuple(a + (b - a) * f for a, b in zip(c0, c1))
+    return stops[-1][1]
+
+
+def _pdf_text(text):
+    """Codificar texto para un string literal PDF (WinAnsi)"""
+    raw = str(text).encode('cp1252', errors='replace')
+    return raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+class StreamingPDFWriter:
+    """Escritor PDF mínimo que emite cada página en cuanto se completa"""
+
+    def __init__(self, out):
+        self.out = out
+        self.offset = 0
+        self.offsets = {}
+        self.page_ids = []
+        # 1: catálogo, 2: árbol de páginas, 3-4: fuentes (se escriben al final o ahora)
+        self.next_id = 5
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self._object(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+        self._object(4, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>')
+
+    def _write(self, data):
+        self.out.write(data)
+        self.offset += len(data)
+
+    def _object(self, obj_id, body):
+        self.offsets[obj_id] = self.offset
+        self._write(b'%d 0 obj\n' % obj_id + body + b'\nendobj\n')
+
+    def _allocate(self):
+        obj_id = self.next_id
+        self.next_id += 1
+        return obj_id
+
+    def add_page(self, content):
+        """Escribir una página con su stream de contenido ya construido"""
+        content_id = self._allocate()
+        page_id = self._allocate()
+        self._object(content_id, b'<< /Length %d >>\nstream\n' % len(content) + content + b'\nendstream')
+        self._object(page_id, (
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>'
+        ) % (PAGE_WIDTH, PAGE_HEIGHT, content_id))
+        self.page_ids.append(page_id)
+
+    def close(self):
+        """Escribir árbol de páginas, catálogo, xref y trailer"""
+        kids = b' '.join(b'%d 0 R' % pid for pid in self.page_ids)
+        self._object(2, b'<< /Type /Pages /Kids [' + kids + b'] /Count %d >>' % len(self.page_ids))
+        self._object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+
+        xref_offset = self.offset
+        size = self.next_id
+        self._write(b'xref\n0 %d\n' % size)
+        self._write(b'0000000000 65535 f \n')
+        for obj_id in range(1, size):
+            self._write(b'%010d 00000 n \n' % self.offsets[obj_id])
+        self._write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, xref_offset))
+
+
+class _PageCanvas:
+    """Página en construcción con un cursor vertical; se vuelca al llenarse"""
+
+    def __init__(self, writer, footer):
+        self.writer = writer
+        self.footer = footer
+        self.page_number = 0
+        self._start_page()
+
+    def _start_page(self):
+        self.ops = []
+        self.y = PAGE_HEIGHT - MARGIN
+        self.page_number += 1
+
+    def flush(self):
+        """Cerrar la página actual y empezar otra"""
+        self.text(f"{self.footer} - Página {self.page_number}", MARGIN, MARGIN / 2, size=8)
+        self.writer.add_page(b'\n'.join(self.ops))
+        self._start_page()
+
+    def ensure_space(self, height):
+        if self.y - height < MARGIN:
+            self.flush()
+
+    def text(self, value, x, y, size=10, bold=False):
+        font = b'F2' if bold else b'F1'
+        self.ops.append(b'BT /%s %d Tf %.1f %.1f Td (%s) Tj ET' % (font, size, x, y, _pdf_text(value)))
+
+    def line(self, value, size=10, bold=False, indent=0, leading=None):
+        leading = leading or size + 4
+        self.ensure_space(leading)
+        self.y -= leading
+        self.text(value, MARGIN + indent, self.y, size=size, bold=bold)
+
+    def rect(self, x, y, w, h, rgb):
+        self.ops.append(b'%.3f %.3f %.3f rg %.1f %.1f %.1f %.1f re f 0 0 0 rg' % (rgb + (x, y, w, h)))
+
+    def gap(self, height=8):
+        self.y -= height
+
+
+def _truncate(value, length):
+    value = str(value)
+    return value if len(value) <= length else value[:length - 3] + '...'
+
+
+def write_pdf_report(out, summary, heatmap, employees):
+    """Escribir el reporte PDF completo en `out` (archivo binario) página a página"""
+    writer = StreamingPDFWriter(out)
+    canvas = _PageCanvas(writer, summary.get('title', 'Reporte de Seguridad'))
+
+    # Resumen ejecutivo
+    canvas.line(summary.get('title', 'Reporte de Seguridad'), size=18, bold=True, leading=24)
+    canvas.line(f"Fecha: {summary.get('date', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))}", size=9)
+    canvas.gap()
+    canvas.line("RESUMEN EJECUTIVO", size=13, bold=True)
+    for label, value in summary.get('metrics', []):
+        canvas.line(f"- {label}: {value}", indent=10)
+    canvas.gap()
+    canvas.line("RECOMENDACIONES PRIORITARIAS", size=13, bold=True)
+    for i, rec in enumerate(summary.get('recommendations', []), 1):
+        canvas.line(f"{i}. {rec}", indent=10)
+
+    # Mapa de calor por departamento
+    if heatmap:
+        departments = heatmap['departments']
+        categories = heatmap['categories']
+        matrix = heatmap['matrix']
+        cell_w = (PAGE_WIDTH - 2 * MARGIN - 90) / len(categories)
+        cell_h = 18
+
+        canvas.gap(12)
+        canvas.ensure_space(40 + cell_h * (len(departments) + 1))
+        canvas.line("MAPA DE RIESGO POR DEPARTAMENTO", size=13, bold=True)
+        canvas.y -= cell_h
+        for j, category in enumerate(categories):
+            canvas.text(category, MARGIN + 90 + j * cell_w + 3, canvas.y + 5, size=8, bold=True)
+        for i, dept in enumerate(departments):
+            canvas.y -= cell_h
+            canvas.text(dept, MARGIN, canvas.y + 5, size=8)
+            for j in range(len(categories)):
+                value = float(matrix[i][j])
+                canvas.rect(MARGIN + 90 + j * cell_w, canvas.y, cell_w - 1, cell_h - 1, risk_rgb(value))
+                canvas.text(f"{value:.2f}", MARGIN + 90 + j * cell_w + cell_w / 2 - 8, canvas.y + 5, size=8)
+
+    # Recomendaciones de capacitación por empleado (una página tras otra)
+    canvas.gap(12)
+    canvas.line("PLAN DE CAPACITACIÓN POR EMPLEADO", size=13, bold=True)
+    count = 0
+    for emp in employees:
+        training = emp.get('recommendations') or default_training_plan(emp.get('risk_score', 0))
+        canvas.ensure_space(14 * (len(training) + 1) + 4)
+        canvas.line(
+            f"{_truncate(emp.get('name', 'Empleado'), 40)} - {_truncate(emp.get('role', ''), 25)} "
+            f"({emp.get('department', '')}) - Riesgo {emp.get('risk_score', 0):.2f}",
+            size=9, bold=True
+        )
+        for rec in training:
+            canvas.line(f"- {_truncate(rec, 100)}", size=8, indent=12, leading=11)
+        canvas.gap(3)
+        count += 1
+
+    canvas.gap(8)
+    canvas.line(f"Total de empleados incluidos: {count}", size=9)
+    canvas.flush()
+    writer.close()
+    return count
+
+
+def iter_html_report(summary, heatmap, employees, batch_size=HTML_BATCH_SIZE):
+    """Generar el reporte HTML como fragmentos de texto (para escribir o enviar en streaming)"""
+    esc = html.escape
+    title = esc(summary.get('title', 'Reporte de Seguridad'))
+    yield (
+        f"<!DOCTYPE html><html lang=\"es\"><head><meta charset=\"utf-8\"><title>{title}</title>"
+        "<style>body{font-family:Inter,Arial,sans-serif;margin:2rem;color:#1f2937}"
+        "table{border-collapse:collapse}td,th{border:1px solid #e5e7eb;padding:4px 8px;font-size:12px}"
+        "h2{border-bottom:2px solid #1e40af}</style></head><body>"
+    )
+    yield f"<h1>{title}</h1><p>Fecha: {esc(str(summary.get('date', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))))}</p>"
+
+    yield "<h2>Resumen Ejecutivo</h2><ul>"
+    yield ''.join(f"<li><strong>{esc(str(label))}:</strong> {esc(str(value))}</li>"
+                  for label, value in summary.get('metrics', []))
+    yield "</ul><h3>Recomendaciones Prioritarias</h3><ol>"
+    yield ''.join(f"<li>{esc(str(rec))}</li>" for rec in summary.get('recommendations', []))
+    yield "</ol>"
+
+    if heatmap:
+        yield "<h2>Mapa de Riesgo por Departamento</h2><table><tr><th></th>"
+        yield ''.join(f"<th>{esc(c)}</th>" for c in heatmap['categories']) + "</tr>"
+        for dept, row in zip(heatmap['departments'], heatmap['matrix']):
+            cells = ''.join(
+                '<td style="background:rgb({},{},{})">{:.2f}</td>'.format(
+                    *(int(c * 255) for c in risk_rgb(v)), float(v))
+                for v in row
+            )
+            yield f"<tr><th>{esc(dept)}</th>{cells}</tr>"
+        yield "</table>"
+
+    yield ("<h2>Plan de Capacitación por Empleado</h2><table>"
+           "<tr><th>Empleado</th><th>Cargo</th><th>Departamento</th><th>Riesgo</th><th>Capacitación</th></tr>")
+    batch = []
+    for emp in employees:
+        training = emp.get('recommendations') or default_training_plan(emp.get('risk_score', 0))
+        batch.append(
+            f"<tr><td>{esc(str(emp.get('name', 'Empleado')))}</td><td>{esc(str(emp.get('role', '')))}</td>"
+            f"<td>{esc(str(emp.get('department', '')))}</td><td>{emp.get('risk_score', 0):.2f}</td>"
+            f"<td>{'<br>'.join(esc(str(r)) for r in training)}</td></tr>"
+        )
+        if len(batch) >= batch_size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+    yield "</table></body></html>"
+
+
+def write_report(out, fmt, summary, heatmap, employees):
+    """Escribir el reporte en el formato pedido ('pdf' o 'html') sobre un archivo binario"""
+    if fmt == 'pdf':
+        return write_pdf_report(out, summary, heatmap, employees)
+    if fmt == 'html':
+        for chunk in iter_html_report(summary, heatmap, employees):
+            out.write(chunk.encode('utf-8'))
+        return None
+    raise ValueError(f"Formato de reporte no soportado: {fmt}")
+
+
+def _remove_report(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class ReportFile:
+    """Reporte escrito en un archivo temporal que se borra al soltar el objeto
+
+    El archivo desaparece al llamar a `discard`, cuando nadie conserva ya la
+    referencia (se cierra la sesión o se elimina su clave) o al salir del
+    proceso.
+    """
+
+    def __init__(self, fmt, file_name, mime):
+        with tempfile.NamedTemporaryFile(prefix="reporte_riesgo_", suffix=f".{fmt}", delete=False) as out:
+            self.path = out.name
+        self.format = fmt
+        self.file_name = file_name
+        self.mime = mime
+        self._finalizer = weakref.finalize(self, _remove_report, self.path)
+
+    def open(self):
+        return open(self.path, 'rb')
+
+    def exists(self):
+        return self._finalizer.alive and os.path.exists(self.path)
+
+    def discard(self):
+        """Borrar el archivo ya, sin esperar a que se libere el objeto"""
+        self._finalizer()
@@ -0,0 +1,231 @@
+"""
+Historial de sesión acotado con volcado a disco.
+
+Cada historial (análisis, perfiles, contenidos) mantiene en memoria solo las
+últimas entradas; las más antiguas se escriben comprimidas en un segmento
+JSONL con gzip por sesión y se vuelven a leer bajo demanda. En memoria se
+conserva siempre una cabecera ligera de cada entrada (nombre, fecha...) para
+listados y selectores. Un techo global de memoria, compartido por todas las
+sesiones del proceso, fuerza el volcado de las entradas más antiguas cuando
+se supera.
+"""
+import gzip
+import json
+import os
+import shutil
+import threading
+import uuid
+import weakref
+from collections import deque
+
+# Entradas completas que cada historial mantiene en memoria
+DEFAULT_CAPACITY = 5
+
+# Techo global (MB) de entradas en memoria para todas las sesiones
+MEMORY_LIMIT_ENV = "SIP_SESSION_MEMORY_LIMIT_MB"
+DEFAULT_MEMORY_LIMIT_MB = 256
+
+SPILL_DIR_ENV = "SIP_SPILL_DIR"
+DEFAULT_SPILL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "spill")
+
+# Campos de cada historial que se conservan en memoria para listados
+HISTORY_HEADERS = {
+    'completed_analyses': ('type', 'timestamp', 'company'),
+    'user_profiles': ('user_name', 'department', 'timestamp'),
+    'generated_content': ('target_user', 'content_type', 'scenario', 'timestamp'),
+}
+
+
+def memory_limit_bytes():
+    """Techo global configurado, en bytes"""
+    try:
+        return int(float(os.getenv(MEMORY_LIMIT_ENV, DEFAULT_MEMORY_LIMIT_MB)) * 1024 * 1024)
+    except ValueError:
+        return DEFAULT_MEMORY_LIMIT_MB * 1024 * 1024
+
+
+def _remove_spill(path):
+    if os.path.exists(path):
+        os.remove(path)
+    # Eliminar el directorio de la sesión si ya no queda ningún segmento
+    directory = os.path.dirname(path)
+    if os.path.isdir(directory) and not os.listdir(directory):
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class BoundedHistory:
+    """Lista de solo-añadir con las últimas `capacity` entradas en memoria"""
+
+    def __init__(self, name, session_id=None, capacity=DEFAULT_CAPACITY, header_keys=None, spill_dir=None):
+        self.name = name
+        self.session_id = session_id or uuid.uuid4().hex
+        self.capacity = max(1, capacity)
+        self.header_keys = header_keys or HISTORY_HEADERS.get(name, ())
+        self.spill_path = os.path.join(spill_dir or os.getenv(SPILL_DIR_ENV, DEFAULT_SPILL_DIR),
+                                       self.session_id, f"{name}-{uuid.uuid4().hex[:8]}.jsonl.gz")
+
+        self._headers = []
+        self._recent = deque()      # (entrada, tamaño serializado)
+        self._spilled = []          # (offset, longitud) de cada miembro gzip
+        self._spilled_bytes = 0
+        self._memory_bytes = 0
+        self._lock = threading.RLock()
+
+        self._finalizer = weakref.finalize(self, _remove_spill, self.spill_path)
+        _register(self)
+
+    def append(self, entry):
+        size = len(json.dumps(entry, ensure_ascii=False, default=str).encode('utf-8'))
+        with self._lock:
+            self._headers.append({k: entry.get(k) for k in self.header_keys} if isinstance(entry, dict) else {})
+            self._recent.append((entry, size))
+            self._memory_bytes += size
+            while len(self._recent) > self.capacity:
+                self._spill_oldest()
+        enforce_memory_ceiling()
+
+    def _spill_oldest(self):
+        entry, size = self._recent.popleft()
+        # Un miembro gzip por entrada: el segmento sigue siendo un .jsonl.gz
+        # legible con zcat y cada entrada se descomprime por separado
+        member = gzip.compress((json.dumps(entry, ensure_ascii=False, default=str) + "\n").encode('utf-8'))
+        os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+        with open(self.spill_path, 'ab') as f:
+            offset = f.tell()
+            f.write(member)
+        self._spilled.append((offset, len(member)))
+        self._spilled_bytes += len(member)
+        self._memory_bytes -= size
+
+    def shrink(self, keep=1):
+        """Volcar a disco hasta dejar `keep` entradas en memoria; devuelve bytes liberados"""
+        with self._lock:
+            before = self._memory_bytes
+            while len(self._recent) > max(1, keep):
+                self._spill_oldest()
+            return before - self._memory_bytes
+
+    def _load(self, index):
+        offset, length = self._spilled[index]
+        with open(self.spill_path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(gzip.decompress(f.read(length)))
+
+    def __len__(self):
+        return len(self._spilled) + len(self._recent)
+
+    def __getitem__(self, index):
+        with self._lock:
+            if isinstance(index, slice):
+                return [self[i] for i in range(*index.indices(len(self)))]
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError("índice fuera del historial")
+            if index < len(self._spilled):
+                return self._load(index)
+            return self._recent[index - len(self._spilled)][0]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def is_spilled(self, index):
+        if index < 0:
+            index += len(self)
+        return index < len(self._spilled)
+
+    def headers(self):
+        """Cabeceras ligeras de todas las entradas (sin leer el disco)"""
+        return list(self._headers)
+
+    def clear(self):
+        with self._lock:
+            self._headers.clear()
+            self._recent.clear()
+            self._spilled.clear()
+            self._spilled_bytes = 0
+            self._memory_bytes = 0
+            _remove_spill(self.spill_path)
+
+    @property
+    def memory_bytes(self):
+        return self._memory_bytes
+
+    def stats(self):
+        return {
+            'historial': self.name,
+            'entradas': len(self),
+            'en_memoria': len(self._recent),
+            'en_disco': len(self._spilled),
+            'memoria_kb': round(self._memory_bytes / 1024, 1),
+            'disco_kb': round(self._spilled_bytes / 1024, 1)
+        }
+
+
+_histories = weakref.WeakSet()
+_histories_lock = threading.Lock()
+
+
+def _register(history):
+    with _histories_lock:
+        _histories.add(history)
+
+
+def total_memory_bytes():
+    """Memoria ocupada por las entradas en memoria de todas las sesiones"""
+    with _histories_lock:
+        return sum(h.memory_bytes for h in list(_histories))
+
+
+def enforce_memory_ceiling(limit=None):
+    """Volcar las entradas más antiguas de los historiales más grandes hasta respetar el techo"""
+    limit = memory_limit_bytes() if limit is None else limit
+    with _histories_lock:
+        histories = sorted(_histories, key=lambda h: h.memory_bytes, reverse=True)
+
+    total = sum(h.memory_bytes for h in histories)
+    for history in histories:
+        if total <= limit:
+            break
+        total -= history.shrink(keep=1)
+    return total
+
+
+def session_history(name, state=None, reset=False):
+    """Historial acotado `name` de la sesión actual (se crea si no existe)"""
+    if state is None:
+        import streamlit as st
+        state = st.session_state
+
+    history = state.get(name)
+    if not isinstance(history, BoundedHistory):
+        from .history_store import current_session_id
+        history = BoundedHistory(name, session_id=current_session_id())
+        state[name] = history
+    elif reset:
+        history.clear()
+    return history
+
+
+def session_memory_report(state=None):
+    """Uso de memoria de los historiales de la sesión actual"""
+    if state is None:
+        import streamlit as st
+        state = st.session_state
+    return [state[name].stats() for name in HISTORY_HEADERS if isinstance(state.get(name), BoundedHistory)]
+
+
+def render_memory_report(state=None):
+    """Panel con el uso de memoria de la sesión y del proceso"""
+    import streamlit as st
+
+    report = session_memory_report(state)
+    if not report:
+        st.caption("Sin historial en esta sesión")
+        return
+
+    st.dataframe(report, hide_index=True, use_container_width=True)
+    limit = memory_limit_bytes()
+    total = total_memory_bytes()
+    st.caption(f"Todas las sesiones: {total / 1024 / 1024:.1f} MB de {limit / 1024 / 1024:.0f} MB")
@@ -0,0 +1,70 @@
+"""
+Caché de salidas de etapas indexada por la huella de sus entradas.
+
+Una etapa solo se vuelve a ejecutar cuando cambia alguna de sus entradas
+(empresa, dominio, profundidad, rango temporal, roles o el propio
+adaptador); el resto de salidas se reutilizan y se combinan con las nuevas.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+
+from core.metrics import CACHE_LOOKUPS
+
+# Entradas de etapa conservadas por sesión
+DEFAULT_MAX_ENTRIES = 256
+
+
+def stage_fingerprint(stage, inputs):
+    """Huella SHA-256 estable de una etapa y sus entradas"""
+    canonical = json.dumps({'stage': stage, 'inputs': inputs}, sort_keys=True,
+                           ensure_ascii=False, default=str, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class StageCache:
+    """LRU acotado de salidas de etapas con contadores de aciertos"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, fingerprint):
+        if fingerprint in self._entries:
+            self._entries.move_to_end(fingerprint)
+            self.hits += 1
+            CACHE_LOOKUPS.inc(cache='stage', result='hit')
+            return self._entries[fingerprint]
+        self.misses += 1
+        CACHE_LOOKUPS.inc(cache='stage', result='miss')
+        return None
+
+    def put(self, fingerprint, value):
+        self._entries[fingerprint] = value
+        self._entries.move_to_end(fingerprint)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def get_stage_cache(key='osint_stage_cache', state=None):
+    """Caché de etapas de la sesión actual"""
+    if state is None:
+        import streamlit as st
+        state = st.session_state
+
+    if key not in state:
+        state[key] = StageCache()
+    return state[key]
@@ -0,0 +1,140 @@
+"""
+Trazas de los pipelines en la interfaz: muestreo por sesión, trazas que
+cruzan ejecuciones del script y vista waterfall.
+
+El análisis OSINT empieza su traza al enviar el formulario, la pasa al
+trabajo en segundo plano y la deja pendiente en la sesión al aplicar el
+resultado; la ejecución que pinta los resultados la retoma con
+`resume_trace` y la cierra. La barra lateral permite forzar o desactivar el
+muestreo de la sesión y muestra las trazas recientes de la sesión como
+waterfall.
+"""
+import os
+from contextlib import contextmanager
+
+from core.tracing import NOOP_SPAN, load_traces, sample_rate, start_trace, trace_file, waterfall
+
+from .profiler import profiled
+
+# Clave del selector de muestreo de la barra lateral
+SAMPLING_KEY = "trace_sampling"
+SAMPLING_OPTIONS = {'auto': None, 'always': True, 'never': False}
+
+# Trazas recientes que se ofrecen en el panel
+PANEL_TRACES = 20
+
+# (ruta, tamaño, mtime) -> trazas leídas, para no releer el fichero en cada rerun
+_loaded = {}
+
+
+def session_sampling(state=None):
+    """Decisión de muestreo de la sesión: None (según SIP_TRACE_SAMPLE_RATE), True o False"""
+    if state is None:
+        import streamlit as st
+        state = st.session_state
+    return SAMPLING_OPTIONS.get(state.get(SAMPLING_KEY, 'auto'))
+
+
+def start_session_trace(name, state=None, **attributes):
+    """Traza raíz con el muestreo de la sesión y su id como atributo"""
+    from .history_store import current_session_id
+
+    return start_trace(name, sampled=session_sampling(state), session_id=current_session_id(), **attributes)
+
+
+def hold_trace(kind, trace, state=None):
+    """Dejar la traza abierta hasta que se pinte su resultado (una pendiente por tipo)"""
+    if not trace.sampled:
+        return
+    if state is None:
+        import streamlit as st
+        state = st.session_state
+    pending = state.setdefault('pending_traces', {})
+    previous = pending.get(kind)
+    if previous is not None and previous is not trace:
+        # Un resultado más nuevo sustituye al que nunca llegó a pintarse
+        previous.set_attribute('sin_mostrar', True)
+        previous.end()
+    pending[kind] = trace
+
+
+@contextmanager
+def resume_trace(kind, state=None):
+    """Reactivar la traza pendiente de `kind` durante el bloque y cerrarla al terminar"""
+    if state is None:
+        import streamlit as st
+        state = st.session_state
+    trace = state.get('pending_traces', {}).pop(kind, None)
+    if trace is None:
+        yield NOOP_SPAN
+        return
+    try:
+        with trace.activate():
+            yield trace
+    finally:
+        trace.end()
+
+
+def recent_traces():
+    """Trazas del final del fichero; solo se vuelve a leer si ha cambiado"""
+    path = trace_file()
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return []
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    if key not in _loaded:
+        _loaded.clear()
+        _loaded[key] = load_traces(path, limit=None)
+    return _loaded[key]
+
+
+def waterfall_chart(rows):
+    """Barras horizontales desde el inicio de cada span, en orden de árbol"""
+    import plotly.graph_objects as go
+
+    colors = {'ok': '#3b82f6', 'error': '#dc2626', 'cancelled': '#9ca3af'}
+    labels = [f"{'  ' * row['profundidad']}{row['span']} · {i}" for i, row in enumerate(rows)]
+    fig = go.Figure(go.Bar(
+        y=labels,
+        x=[row['ms'] or 0 for row in rows],
+        base=[row['inicio_ms'] for row in rows],
+        orientation='h',
+        marker_color=[colors.get(row['estado'], '#6b7280') for row in rows],
+        hovertemplate="%{y}<br>inicio %{base:.1f} ms<br>%{x:.1f} ms<extra></extra>",
+    ))
+    fig.update_layout(
+        height=max(160, 28 * len(rows) + 60), margin=dict(l=0, r=0, t=10, b=30),
+        xaxis_title="ms desde el inicio", showlegend=False,
+    )
+    fig.update_yaxes(autorange='reversed', tickvals=labels,
+                     ticktext=[f"{'  ' * row['profundidad']}{row['span']}" for row in rows])
+    return fig
+
+
+@profiled
+def render_trace_panel():
+    """Selector de muestreo y waterfall de las trazas recientes de la sesión"""
+    import streamlit as st
+    from .history_store import current_session_id
+
+    labels = {'auto': f"Según configuración ({sample_rate():.0%})", 'always': "Siempre", 'never': "Nunca"}
+    st.radio("Muestreo de trazas", list(SAMPLING_OPTIONS), format_func=labels.__getitem__,
+             key=SAMPLING_KEY, horizontal=True,
+             help="Qué análisis de esta sesión se trazan; SIP_TRACE_SAMPLE_RATE fija la proporción por defecto")
+
+    session_id = current_session_id()
+    traces = [trace for trace in recent_traces()
+              if trace['attributes'].get('session_id') == session_id][:PANEL_TRACES]
+    if not traces:
+        st.caption("Sin trazas en esta sesión")
+        return
+
+    options = [f"{trace['name']} · {trace['duration_ms'] or 0:.0f} ms" for trace in traces]
+    choice = st.selectbox("Traza", range(len(traces)), format_func=options.__getitem__, key="trace_choice")
+    trace = traces[choice]
+    rows = waterfall(trace)
+    st.plotly_chart(waterfall_chart(rows), use_container_width=True, config={'displayModeBar': False})
+    st.dataframe([{**row, 'atributos': str(row['atributos']) if row['atributos'] else ''} for row in rows],
+                 hide_index=True, use_container_width=True)
+    st.caption(f"Traza {trace['trace_id']} · {trace_file()}")
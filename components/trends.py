@@ -0,0 +1,191 @@
+import numpy as np
+
+# Cuantil normal para bandas de confianza del 95%
+Z_95 = 1.96
+
+
+def fit_linear_trends(values):
+    """Ajuste lineal por mínimos cuadrados de varias series a la vez (forma S × T)"""
+    y = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    t = np.arange(y.shape[1], dtype=np.float64)
+    t_centered = t - t.mean()
+    denom = (t_centered ** 2).sum()
+
+    if denom == 0:
+        return np.zeros(y.shape[0]), y[:, 0].copy()
+
+    slopes = (y @ t_centered) / denom
+    intercepts = y.mean(axis=1) - slopes * t.mean()
+    return slopes, intercepts
+
+
+def linear_trend(values):
+    """Línea de tendencia evaluada en todos los puntos (sustituye polyfit + poly1d)"""
+    y = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    slopes, intercepts = fit_linear_trends(y)
+    t = np.arange(y.shape[1], dtype=np.float64)
+    trend = intercepts[:, None] + slopes[:, None] * t[None, :]
+    return trend[0] if np.ndim(values) == 1 else trend
+
+
+class TrendEngine:
+    """
+    Estadísticas móviles incrementales (EWMA, pendiente móvil, línea base
+    estacional) para un conjunto de series, todas como operaciones sobre
+    matrices de forma (series × tiempo).
+    """
+
+    def __init__(self, series_names, window=12, alpha=0.3, season_length=None):
+        self.series_names = list(series_names)
+        self.window = int(window)
+        self.alpha = float(alpha)
+        self.season_length = season_length
+
+        n = len(self.series_names)
+        self.count = 0
+        self.ewma = np.full(n, np.nan)
+
+        # Buffer circular con las últimas `window` observaciones
+        self._buffer = np.zeros((n, self.window))
+        self._head = 0
+
+        # Suma y conteo por fase estacional
+        if season_length:
+            self._season_sum = np.zeros((n, season_length))
+            self._season_count = np.zeros(season_length)
+
+    @classmethod
+    def from_matrix(cls, series_names, matrix, **kwargs):
+        """Crear el motor y consumir un histórico completo"""
+        engine = cls(series_names, **kwargs)
+        engine.extend(matrix)
+        return engine
+
+    def update(self, values):
+        """Añadir una observación nueva por serie (vector de longitud S)"""
+        v = np.asarray(values, dtype=np.float64)
+
+        if self.count == 0:
+            self.ewma = v.copy()
+        else:
+            self.ewma = self.alpha * v + (1 - self.alpha) * self.ewma
+
+        self._buffer[:, self._head] = v
+        self._head = (self._head + 1) % self.window
+
+        if self.season_length:
+            phase = self.count % self.season_length
+            self._season_sum[:, phase] += v
+            self._season_count[phase] += 1
+
+        self.count += 1
+
+    def extend(self, matrix):
+        """Consumir varias observaciones (matriz S × T) de una vez"""
+        m = np.atleast_2d(np.asarray(matrix, dtype=np.float64))
+        if m.shape[1] == 0:
+            return
+
+        # EWMA de la matriz completa: pesos (1-α)^k aplicados de forma vectorizada
+        start = 0
+        if self.count == 0:
+            self.ewma = m[:, 0].copy()
+            start = 1
+        steps = m.shape[1] - start
+        if steps > 0:
+            decay = (1 - self.alpha) ** np.arange(steps - 1, -1, -1)
+            self.ewma = ((1 - self.alpha) ** steps) * self.ewma + self.alpha * (m[:, start:] @ decay)
+
+        # Buffer circular: solo importan las últimas `window` columnas
+        tail = m[:, -self.window:]
+        positions = (self._head + np.arange(m.shape[1]))[-self.window:] % self.window
+        self._buffer[:, positions] = tail
+        self._head = (self._head + m.shape[1]) % self.window
+
+        if self.season_length:
+            phases = (self.count + np.arange(m.shape[1])) % self.season_length
+            np.add.at(self._season_sum.T, phases, m.T)
+            self._season_count += np.bincount(phases, minlength=self.season_length)
+
+        self.count += m.shape[1]
+
+    def sync(self, matrix):
+        """Consumir solo las columnas nuevas de un histórico que va creciendo"""
+        m = np.atleast_2d(np.asarray(matrix, dtype=np.float64))
+        if m.shape[1] > self.count:
+            self.extend(m[:, self.count:])
+
+    def _window_values(self):
+        """Ventana móvil en orden cronológico (S × W)"""
+        size = min(self.count, self.window)
+        ordered = np.roll(self._buffer, -self._head, axis=1)
+        return ordered[:, self.window - size:]
+
+    def rolling_fit(self):
+        """Pendiente, nivel final y dispersión residual de la ventana móvil"""
+        y = self._window_values()
+        size = y.shape[1]
+        t = np.arange(size, dtype=np.float64)
+        t_centered = t - t.mean()
+        denom = (t_centered ** 2).sum()
+
+        if size < 2 or denom == 0:
+            level = y[:, -1] if size else np.zeros(len(self.series_names))
+            return np.zeros(len(self.series_names)), level, np.zeros(len(self.series_names))
+
+        slope = (y @ t_centered) / denom
+        intercept = y.mean(axis=1) - slope * t.mean()
+        residuals = y - (intercept[:, None] + slope[:, None] * t[None, :])
+        dof = max(size - 2, 1)
+        sigma = np.sqrt((residuals ** 2).sum(axis=1) / dof)
+        level = intercept + slope * t[-1]
+        return slope, level, sigma
+
+    @property
+    def rolling_slope(self):
+        return self.rolling_fit()[0]
+
+    def seasonal_baseline(self):
+        """Desviación media por fase estacional (S × season_length)"""
+        if not self.season_length:
+            return None
+        counts = np.maximum(self._season_count, 1)
+        means = self._season_sum / counts
+        return means - means.mean(axis=1, keepdims=True)
+
+    def forecast(self, horizon=3, z=Z_95):
+        """Pronóstico a corto plazo con bandas de confianza para todas las series"""
+        slope, level, sigma = self.rolling_fit()
+        size = min(self.count, self.window)
+        h = np.arange(1, horizon + 1, dtype=np.float64)
+
+        mean = level[:, None] + slope[:, None] * h[None, :]
+
+        baseline = self.seasonal_baseline()
+        if baseline is not None:
+            phases = (self.count + np.arange(horizon)) % self.season_length
+            mean = mean + baseline[:, phases]
+
+        # Intervalo de predicción de la regresión lineal sobre la ventana
+        if size >= 2:
+            t = np.arange(size, dtype=np.float64)
+            t_mean = t.mean()
+            denom = ((t - t_mean) ** 2).sum()
+            spread = np.sqrt(1 + 1 / size + ((t[-1] + h - t_mean) ** 2) / denom)
+        else:
+            spread = np.ones(horizon)
+        half_width = z * sigma[:, None] * spread[None, :]
+
+        return {
+            'mean': mean,
+            'lower': mean - half_width,
+            'upper': mean + half_width
+        }
+
+    def summary(self):
+        """Resumen por serie para tablas o paneles"""
+        slope = self.rolling_slope
+        return {
+            name: {'ewma': float(self.ewma[i]), 'slope': float(slope[i])}
+            for i, name in enumerate(self.series_names)
+        }
@@ -0,0 +1,20 @@
+"""
+Núcleo de la plataforma sin dependencias de UI.
+
+Reglas de scoring, parseo de respuestas, agente de seguridad y ejecutor por
+lotes. Nada de este paquete importa Streamlit: los avisos al usuario pasan
+por un `Reporter` inyectado (ver `core.reporting`).
+"""
+from .agent import AnthropicTransport, SecurityAgent, StandInTransport, create_agent, stream_message
+from .cancellation import CancelToken, Cancelled
+from .parsing import fix_common_json_errors, safe_json_parse
+from .reporting import LoggingReporter, NullReporter, Reporter, StreamlitReporter
+from .scoring import normalize_profile, score_employee
+
+__all__ = [
+    'AnthropicTransport', 'SecurityAgent', 'StandInTransport', 'create_agent', 'stream_message',
+    'CancelToken', 'Cancelled',
+    'fix_common_json_errors', 'safe_json_parse',
+    'LoggingReporter', 'NullReporter', 'Reporter', 'StreamlitReporter',
+    'normalize_profile', 'score_employee',
+]
@@ -0,0 +1,545 @@
+"""
+Agente de seguridad sin dependencias de UI.
+
+El agente construye los prompts, delega la llamada al modelo en un
+transporte inyectado y avisa de su progreso a través de un `Reporter`. Sin
+transporte trabaja en modo offline: los perfiles de empleado se evalúan con
+las reglas de `core.scoring` y el resto de análisis devuelven sus resultados
+de respaldo.
+"""
+import contextlib
+import json
+import os
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, Optional
+
+from .cancellation import Cancelled
+from .metrics import LLM_CALL_SECONDS
+from .parsing import safe_json_parse
+from .ratelimit import rate_limited
+from .reporting import resolve_reporter
+from .routing import ROUTER, credential_scope
+from .scoring import normalize_profile, score_employee
+from .tracing import current_span, span
+
+DEFAULT_MAX_TOKENS = 1500
+
+
+def stream_message(client, cancel=None, **request) -> str:
+    """
+    Texto de una llamada a `messages` en streaming. Si el token `cancel` se
+    activa durante la respuesta, se cierra la conexión HTTP (el modelo deja
+    de generar) y se lanza `Cancelled`.
+    """
+    if cancel is not None:
+        cancel.raise_if_cancelled()
+
+    current = current_span()
+    current.set_attributes(model=request.get('model'), max_tokens=request.get('max_tokens'))
+    started = time.perf_counter()
+    chunks = []
+    with rate_limited(request, cancel) as call, client.messages.stream(**request) as stream:
+        with cancel.closing(stream) if cancel is not None else contextlib.nullcontext():
+            try:
+                for text in stream.text_stream:
+                    if not chunks:
+                        current.set_attribute('primer_token_ms', round((time.perf_counter() - started) * 1000, 1))
+                    chunks.append(text)
+                    if cancel is not None:
+                        cancel.raise_if_cancelled()
+            except Cancelled:
+                raise
+            except Exception:
+                # Al cerrar la conexión desde otro hilo la lectura falla: es la cancelación
+                if cancel is not None:
+                    cancel.raise_if_cancelled()
+                raise
+            finally:
+                call['output'] = "".join(chunks)
+    content = call['output']
+    current.set_attribute('caracteres', len(content))
+    return content
+
+
+class AnthropicTransport:
+    """Transporte que envía cada prompt a la API de Anthropic
+
+    Sin `model` el modelo de cada llamada lo elige el enrutador (core.routing).
+    """
+
+    def __init__(self, api_key: str, model: Optional[str] = None):
+        # El SDK tarda en importarse; solo se carga si hay API key
+        import anthropic
+
+        self.client = anthropic.Anthropic(api_key=api_key)
+        self.routed = model is None
+        self.model = model
+        self.scope = credential_scope(api_key)
+
+    def complete(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS, cancel=None,
+                 model: Optional[str] = None) -> str:
+        if model is None:
+            model = ROUTER.primary_model('complete', self.scope) if self.routed else self.model
+        request = {
+            'model': model,
+            'max_tokens': max_tokens,
+            'messages': [{"role": "user", "content": prompt}]
+        }
+        if cancel is not None:
+            return stream_message(self.client, cancel, **request)
+        with rate_limited(request) as call:
+            response = self.client.messages.create(**request)
+            call['output'] = response.content[0].text
+        return call['output']
+
+
+class StandInTransport:
+    """
+    Transporte local que imita al modelo: responde JSON válido y determinista
+    tras una latencia configurable, para pruebas de carga sin API
+    """
+
+    routed = False
+
+    def __init__(self, latency: float = 0.2, model: str = "stand-in"):
+        self.latency = latency
+        self.model = model
+
+    def complete(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS, cancel=None,
+                 model: Optional[str] = None) -> str:
+        if cancel is not None:
+            if cancel.wait(self.latency):
+                raise Cancelled(cancel.reason)
+        elif self.latency:
+            time.sleep(self.latency)
+        seed = zlib.crc32(prompt.encode('utf-8'))
+        return json.dumps({
+            'risk_score': round(0.3 + (seed % 65) / 100, 2),
+            'vulnerability_profile': ['Respuesta simulada del transporte local'],
+            'recommendations': ['Capacitación anti-phishing', 'Autenticación multifactor'],
+            'stand_in': True
+        })
+
+
+class SecurityAgent:
+    """
+    Agente de seguridad profesional; offline si no recibe transporte
+    """
+
+    def __init__(self, transport=None, reporter=None, max_tokens: Optional[int] = None):
+        self.transport = transport
+        self.reporter = resolve_reporter(reporter)
+        # Techo opcional sobre el presupuesto de salida de cada ruta
+        self.max_tokens = max_tokens
+        self.last_model = None
+
+    @property
+    def routed(self) -> bool:
+        return getattr(self.transport, 'routed', False)
+
+    @property
+    def model(self) -> str:
+        """Modelo fijo del transporte o, si se enruta, el último usado (o el primero de la ruta por defecto)"""
+        if self.offline:
+            return 'offline'
+        if self.routed:
+            return self.last_model or ROUTER.primary_model('complete', getattr(self.transport, 'scope', None))
+        return self.transport.model
+
+    def _call(self, method: str, prompt: str):
+        """(texto, decisión) de la llamada enrutada; un transporte con modelo fijo solo elige max_tokens"""
+        content, decision = ROUTER.invoke(
+            method, prompt,
+            lambda decision: self.transport.complete(prompt, decision.max_tokens, model=decision.model),
+            models=None if self.routed else [self.transport.model],
+            max_tokens=self.max_tokens,
+            scope=getattr(self.transport, 'scope', None),
+            on_fallback=lambda decision: self.reporter.info(f"Intentando con modelo de respaldo ({decision.model})..."),
+        )
+        self.last_model = decision.model
+        return content, decision
+
+    @property
+    def offline(self) -> bool:
+        return self.transport is None
+
+    def _complete_json(self, prompt: str, spinner: str, method: str = 'complete') -> Optional[Dict]:
+        """Respuesta JSON del modelo (con el modelo usado en `ai_model`), o None si la llamada o el parseo fallan"""
+        try:
+            with self.reporter.spinner(spinner), LLM_CALL_SECONDS.time(method=method), \
+                    span("Llamada al modelo", method=method):
+                content, decision = self._call(method, prompt)
+        except Exception as e:
+            self.reporter.error(f"Error con Claude API: {e}")
+            return None
+
+        result = safe_json_parse(content, reporter=self.reporter)
+        if not isinstance(result, dict):
+            self.reporter.error("Error parseando respuesta de Claude")
+            return None
+        result['ai_model'] = decision.model
+        return result
+
+    def analyze_company_osint(self, company_data: Dict) -> Dict:
+        """Análisis OSINT de empresa con Claude"""
+
+        if self.offline:
+            return self._generate_fallback_analysis(company_data)
+
+        prompt = f"""
+        Como experto en inteligencia de amenazas y OSINT, analiza la siguiente empresa:
+        
+        DATOS DE LA EMPRESA:
+        - Nombre: {company_data.get('name', 'N/A')}
+        - Dominio: {company_data.get('domain', 'N/A')}
+        - Industria: {company_data.get('industry', 'N/A')}
+        - Tamaño: {company_data.get('size', 'N/A')}
+        - Ubicación: {company_data.get('location', 'N/A')}
+        
+        FUENTES ANALIZADAS:
+        {', '.join(company_data.get('sources', ['LinkedIn', 'Website', 'Public Records']))}
+        
+        Proporciona un análisis estructurado en formato JSON con:
+        
+        1. risk_score: Puntuación de riesgo (0.0-1.0)
+        2. vulnerabilities_found: Lista de vulnerabilidades específicas
+        3. employees_at_risk: Número estimado de empleados de alto riesgo
+        4. attack_surface: Descripción de la superficie de ataque
+        5. critical_findings: Lista de hallazgos críticos
+        6. department_risks: Riesgos por departamento
+        7. recommendations: Recomendaciones prioritarias
+        8. timeline_analysis: Análisis de patrones temporales
+        
+        IMPORTANTE: 
+        - Sé específico y realista
+        - Enfócate en vulnerabilidades de ingeniería social
+        - Incluye métricas cuantificables
+        - Proporciona recomendaciones accionables
+        
+        Responde SOLO con JSON válido.
+        """
+
+        analysis_result = self._complete_json(prompt, " Claude analizando inteligencia empresarial...",
+                                             method='analyze_company_osint')
+        if analysis_result is None:
+            return self._generate_fallback_analysis(company_data)
+
+        # Añadir metadatos
+        analysis_result.update({
+            'analysis_timestamp': datetime.now().isoformat(),
+            'company_analyzed': company_data.get('name', 'Unknown'),
+            'confidence_level': 0.87
+        })
+        return analysis_result
+
+    def analyze_employee_profile(self, employee_data: Dict) -> Dict:
+        """Análisis psicológico de empleado con Claude"""
+
+        if self.offline:
+            return self._generate_offline_employee_analysis(employee_data)
+
+        prompt = f"""
+        Como especialista en psicología de la ingeniería social, analiza este perfil de empleado:
+        
+        DATOS DEL EMPLEADO:
+        - Nombre/Rol: {employee_data.get('name', 'N/A')}
+        - Departamento: {employee_data.get('department', 'N/A')}
+        - Actividad en RRSS: {employee_data.get('social_activity', 5)}/10
+        - Compartir información: {employee_data.get('info_sharing', 5)}/10
+        - Conciencia de seguridad: {employee_data.get('security_awareness', 5)}/10
+        - Intereses: {', '.join(employee_data.get('interests', []))}
+        - Estilo comunicación: {employee_data.get('communication', 'N/A')}
+        - Horario de trabajo: {employee_data.get('schedule', 'N/A')}
+        
+        Proporciona análisis en JSON con:
+        
+        1. risk_score: Puntuación de riesgo individual (0.0-1.0)
+        2. vulnerability_profile: Lista detallada de vulnerabilidades
+        3. psychological_factors: Factores psicológicos explotables
+        4. optimal_attack_vectors: Vectores de ataque más efectivos
+        5. susceptibility_analysis: Análisis de susceptibilidad por técnica
+        6. behavioral_patterns: Patrones de comportamiento identificados
+        7. timing_vulnerabilities: Momentos de mayor vulnerabilidad
+        8. personalized_recommendations: Recomendaciones específicas
+        9. training_priorities: Prioridades de capacitación
+        10. monitoring_suggestions: Sugerencias de monitoreo
+        
+        ENFOQUE EN:
+        - Factores psicológicos específicos
+        - Vulnerabilidades comportamentales
+        - Técnicas de manipulación más efectivas
+        - Contramedidas personalizadas
+        
+        Responde SOLO con JSON válido.
+        """
+
+        profile_analysis = self._complete_json(prompt, " Claude analizando perfil psicológico...",
+                                              method='analyze_employee_profile')
+        if profile_analysis is None:
+            return self._generate_fallback_employee_analysis(employee_data)
+
+        # Añadir metadatos
+        profile_analysis.update({
+            'analysis_timestamp': datetime.now().isoformat(),
+            'employee_analyzed': employee_data.get('name', 'Unknown'),
+            'confidence_level': 0.91
+        })
+        return profile_analysis
+
+    def generate_attack_simulation(self, target_profile: Dict, company_context: Dict) -> Dict:
+        """Generar simulación educativa de ataque con Claude"""
+
+        if self.offline:
+            return self._generate_fallback_simulation()
+
+        prompt = f"""
+        TAREA: Crear simulación EDUCATIVA de ataque de ingeniería social.
+        
+        IMPORTANTE: Esto es para CAPACITACIÓN Y CONCIENCIACIÓN, no para uso malicioso.
+        
+        PERFIL DEL OBJETIVO:
+        {json.dumps(target_profile, indent=2)}
+        
+        CONTEXTO EMPRESARIAL:
+        {json.dumps(company_context, indent=2)}
+        
+        Como experto en seguridad cibernética, diseña una simulación educativa que muestre:
+        
+        1. attack_scenario: Escenario de ataque detallado pero educativo
+        2. psychological_techniques: Técnicas psicológicas que se utilizarían
+        3. social_engineering_methods: Métodos específicos de ingeniería social
+        4. success_probability: Probabilidad de éxito estimada
+        5. timeline_execution: Cronología del ataque simulado
+        6. red_flags_ignored: Señales de alerta que se pasarían por alto
+        7. defensive_measures: Medidas defensivas específicas
+        8. educational_insights: Insights educativos clave
+        9. training_recommendations: Recomendaciones de entrenamiento
+        10. detection_strategies: Estrategias de detección
+        
+        CARACTERÍSTICAS DEL ANÁLISIS:
+        - Enfoque educativo y preventivo
+        - Explicación de técnicas sin contenido malicioso
+        - Énfasis en contramedidas y detección
+        - Casos de estudio para capacitación
+        
+        DISCLAIMER: Incluir claramente que es solo para educación y prevención.
+        
+        Responde SOLO con JSON válido.
+        """
+
+        # Más tokens para análisis completo
+        simulation = self._complete_json(prompt, " Claude generando simulación educativa...",
+                                        method='generate_attack_simulation')
+        if simulation is None:
+            return self._generate_fallback_simulation()
+
+        # Añadir disclaimer de seguridad
+        simulation.update({
+            'disclaimer': 'SIMULACIÓN EDUCATIVA - Solo para capacitación y concienciación',
+            'purpose': 'Educación en seguridad cibernética',
+            'generated_by': 'Claude AI Security Agent',
+            'timestamp': datetime.now().isoformat(),
+            'ethical_use_only': True
+        })
+        return simulation
+
+    def generate_countermeasures(self, analysis_results: Dict) -> Dict:
+        """Generar contramedidas inteligentes con Claude"""
+
+        if self.offline:
+            return self._generate_fallback_countermeasures()
+
+        prompt = f"""
+        Como consultor senior en seguridad cibernética, basándote en este análisis:
+        
+        {json.dumps(analysis_results, indent=2)}
+        
+        Genera un plan integral de contramedidas en JSON con:
+        
+        1. immediate_actions: Acciones inmediatas (0-7 días)
+        2. short_term_measures: Medidas a corto plazo (1-4 semanas)
+        3. long_term_strategy: Estrategia a largo plazo (1-6 meses)
+        4. budget_breakdown: Desglose presupuestario detallado
+        5. roi_analysis: Análisis de retorno de inversión
+        6. implementation_timeline: Cronograma de implementación
+        7. success_metrics: Métricas de éxito medibles
+        8. risk_reduction_estimates: Estimaciones de reducción de riesgo
+        9. training_programs: Programas de capacitación específicos
+        10. monitoring_framework: Marco de monitoreo continuo
+        
+        PARA CADA CONTRAMEDIDA INCLUIR:
+        - Descripción detallada
+        - Costo estimado
+        - Tiempo de implementación
+        - Impacto esperado
+        - Métricas de seguimiento
+        - Responsables sugeridos
+        
+        PRIORIZAR POR:
+        - Impacto en reducción de riesgo
+        - Facilidad de implementación
+        - Costo-beneficio
+        - Urgencia basada en vulnerabilidades críticas
+        
+        Responde SOLO con JSON válido.
+        """
+
+        countermeasures = self._complete_json(prompt, " Claude generando contramedidas inteligentes...",
+                                             method='generate_countermeasures')
+        if countermeasures is None:
+            return self._generate_fallback_countermeasures()
+
+        # Añadir metadatos
+        countermeasures.update({
+            'generated_timestamp': datetime.now().isoformat(),
+            'analysis_basis': 'Claude AI Security Analysis',
+            'confidence_level': 0.89
+        })
+        return countermeasures
+
+    def _generate_offline_employee_analysis(self, employee_data: Dict) -> Dict:
+        """Análisis de empleado con las reglas de scoring (sin modelo)"""
+        scores = score_employee(normalize_profile(employee_data))
+        return {
+            'risk_score': scores['risk_score'],
+            'risk_level': scores['risk_level'],
+            'vulnerability_profile': scores['vulnerabilities'],
+            'optimal_attack_vectors': scores['attack_vectors'],
+            'personalized_recommendations': scores['recommendations'],
+            'employee_analyzed': employee_data.get('name', 'Unknown'),
+            'ai_model': 'offline',
+            'offline_mode': True,
+            'analysis_timestamp': datetime.now().isoformat()
+        }
+
+    def _generate_fallback_analysis(self, company_data: Dict) -> Dict:
+        """Análisis de fallback si Claude falla"""
+        return {
+            'risk_score': 0.75,
+            'vulnerabilities_found': [
+                'Alta exposición en redes sociales corporativas',
+                'Información organizacional públicamente disponible',
+                'Empleados con perfiles de alto riesgo identificados'
+            ],
+            'employees_at_risk': 45,
+            'attack_surface': 'Superficie de ataque extensa con múltiples vectores',
+            'critical_findings': [
+                'Ejecutivos con información personal expuesta',
+                'Patrones de comunicación corporativa predecibles',
+                'Falta de políticas de redes sociales'
+            ],
+            'recommendations': [
+                'Capacitación anti-phishing inmediata',
+                'Implementar autenticación multifactor',
+                'Revisar políticas de redes sociales'
+            ],
+            'fallback_mode': True,
+            'analysis_timestamp': datetime.now().isoformat()
+        }
+
+    def _generate_fallback_employee_analysis(self, employee_data: Dict) -> Dict:
+        """Análisis de empleado de fallback"""
+        return {
+            'risk_score': 0.68,
+            'vulnerability_profile': [
+                'Actividad alta en redes sociales',
+                'Tendencia a compartir información profesional',
+                'Posible susceptibilidad a técnicas de autoridad'
+            ],
+            'optimal_attack_vectors': [
+                'Phishing dirigido por email',
+                'Ingeniería social vía LinkedIn',
+                'Vishing con pretexto corporativo'
+            ],
+            'personalized_recommendations': [
+                'Capacitación específica en reconocimiento de phishing',
+                'Protocolo de verificación para solicitudes urgentes',
+                'Revisión de configuraciones de privacidad'
+            ],
+            'fallback_mode': True,
+            'analysis_timestamp': datetime.now().isoformat()
+        }
+
+    def _generate_fallback_simulation(self) -> Dict:
+        """Simulación de fallback"""
+        return {
+            'attack_scenario': 'Simulación educativa básica de phishing dirigido',
+            'success_probability': 0.67,
+            'educational_insights': [
+                'Los ataques personalizados tienen mayor éxito',
+                'La urgencia reduce la capacidad de verificación',
+                'La autoridad percibida aumenta la compliance'
+            ],
+            'defensive_measures': [
+                'Verificación multi-canal obligatoria',
+                'Capacitación en reconocimiento de señales',
+                'Protocolos de escalación claros'
+            ],
+            'disclaimer': 'Simulación educativa generada en modo fallback',
+            'fallback_mode': True
+        }
+
+    def _generate_fallback_countermeasures(self) -> Dict:
+        """Contramedidas de fallback"""
+        return {
+            'immediate_actions': [
+                {
+                    'action': 'Capacitación anti-phishing de emergencia',
+                    'timeline': '7 días',
+                    'cost': '$10,000',
+                    'impact': 'Alto'
+                }
+            ],
+            'short_term_measures': [
+                {
+                    'action': 'Implementar MFA obligatorio',
+                    'timeline': '2 semanas',
+                    'cost': '$5,000',
+                    'impact': 'Crítico'
+                }
+            ],
+            'budget_breakdown': {
+                'total_investment': '$50,000',
+                'immediate': '$15,000',
+                'short_term': '$20,000',
+                'long_term': '$15,000'
+            },
+            'fallback_mode': True
+        }
+
+    def check_api_status(self) -> Dict:
+        """Verificar estado de la API"""
+        if self.offline:
+            return {
+                'status': 'simulation_mode',
+                'message': 'Usando modo simulación - No se requiere API',
+                'api_available': False
+            }
+
+        try:
+            # Test simple con Claude
+            _, decision = self._call('connection_test', "Test")
+            return {
+                'status': 'active',
+                'message': 'Claude API funcionando correctamente',
+                'api_available': True,
+                'model': decision.model
+            }
+        except Exception as e:
+            return {
+                'status': 'error',
+                'message': f'Error con Claude API: {str(e)}',
+                'api_available': False
+            }
+
+
+def create_agent(api_key: Optional[str] = None, reporter=None, model: Optional[str] = None) -> SecurityAgent:
+    """Agente con transporte de Anthropic si hay API key (argumento o ANTHROPIC_API_KEY); offline si no
+
+    Sin `model`, el enrutador elige el modelo de cada llamada.
+    """
+    api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
+    transport = AnthropicTransport(api_key, model=model) if api_key else None
+    return SecurityAgent(transport=transport, reporter=reporter)
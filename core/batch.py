@@ -0,0 +1,172 @@
+"""
+Ejecutor por lotes: analiza un roster de empleados y escribe JSONL.
+
+Lee el roster fila a fila (CSV o JSONL), aplica las reglas de scoring y el
+análisis del agente a cada empleado y escribe un objeto JSON por línea, sin
+pasar por Streamlit. En modo `offline` el análisis se hace con las reglas
+locales en el propio hilo; en modo `llm` las llamadas al modelo se reparten
+entre `--workers` hilos con un número acotado de peticiones en vuelo y el
+orden de salida se conserva.
+
+Columnas del roster: name, role, department, social_activity, info_sharing,
+security_awareness, interests (separados por `;`, `|` o `,`), communication
+y schedule. Las que falten toman los valores de `core.scoring.PROFILE_DEFAULTS`.
+
+Uso:
+    python -m core.batch roster.csv -o resultados.jsonl [--mode offline|llm] [--workers 8]
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .agent import SecurityAgent, create_agent
+from .reporting import LoggingReporter, resolve_reporter
+from .scoring import normalize_profile
+
+# Peticiones en vuelo por hilo en modo llm
+INFLIGHT_PER_WORKER = 2
+
+# Filas entre avisos de progreso
+PROGRESS_EVERY = 10000
+
+# Tamaño del buffer de escritura del JSONL
+WRITE_BUFFER_BYTES = 1024 * 1024
+
+
+def roster_format(path):
+    """Formato del roster según su extensión ('csv' o 'jsonl')"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    raise ValueError(f"Formato de roster no reconocido: {path} (use .csv o .jsonl, o indique --format)")
+
+
+def read_roster(stream, fmt):
+    """Filas del roster como dicts, leídas de una en una"""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    elif fmt == 'jsonl':
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError(f"Formato de roster no soportado: {fmt}")
+
+
+def analyze_row(agent, index, row):
+    """Resultado de una fila: datos del empleado y análisis, o el error"""
+    result = {'row': index, 'name': row.get('name'), 'role': row.get('role'), 'department': row.get('department')}
+    try:
+        profile = normalize_profile(row)
+        result.update(agent.analyze_employee_profile(profile))
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def iter_results(rows, agent, workers=1):
+    """Resultados en el orden del roster; con varios hilos, acotando las filas en vuelo"""
+    if workers <= 1:
+        for index, row in enumerate(rows, 1):
+            yield analyze_row(agent, index, row)
+        return
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+        for index, row in enumerate(rows, 1):
+            pending.append(pool.submit(analyze_row, agent, index, row))
+            if len(pending) >= workers * INFLIGHT_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def run_batch(rows, out, agent, workers=1, reporter=None, progress_every=PROGRESS_EVERY):
+    """Escribir en `out` (texto) una línea JSON por fila; devuelve el resumen"""
+    reporter = resolve_reporter(reporter)
+    dumps = json.JSONEncoder(ensure_ascii=False, default=str).encode
+    started = time.perf_counter()
+    total = errors = 0
+
+    for result in iter_results(rows, agent, workers):
+        out.write(dumps(result))
+        out.write("\n")
+        total += 1
+        errors += 'error' in result
+        if progress_every and total % progress_every == 0:
+            elapsed = time.perf_counter() - started
+            reporter.info(f"{total} filas ({total / elapsed:.0f} filas/s)")
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        'filas': total,
+        'errores': errors,
+        'segundos': round(elapsed, 3),
+        'filas_por_segundo': round(total / elapsed, 1) if elapsed else None
+    }
+    reporter.info(f"Completado: {total} filas, {errors} errores en {elapsed:.2f}s")
+    return summary
+
+
+def _open_output(path):
+    if path == '-':
+        return io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', write_through=False), False
+    return open(path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_BYTES), True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('roster', help="Roster CSV o JSONL ('-' para JSONL por stdin)")
+    parser.add_argument('-o', '--output', default='-', help="JSONL de salida (por defecto stdout)")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), help="Formato del roster (por defecto, según la extensión)")
+    parser.add_argument('--mode', choices=('offline', 'llm'), default='offline',
+                        help="offline: reglas locales; llm: análisis con Claude (requiere ANTHROPIC_API_KEY)")
+    parser.add_argument('--workers', type=int, default=8, help="Hilos de llamadas al modelo en modo llm")
+    parser.add_argument('--model', help="Fijar el modelo (por defecto lo elige core.routing por llamada)")
+    parser.add_argument('--progress-every', type=int, default=PROGRESS_EVERY)
+    parser.add_argument('-q', '--quiet', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s", stream=sys.stderr)
+    reporter = LoggingReporter()
+
+    if args.mode == 'llm':
+        if not os.getenv("ANTHROPIC_API_KEY"):
+            parser.error("el modo llm requiere la variable ANTHROPIC_API_KEY")
+        agent = create_agent(reporter=reporter, model=args.model)
+        workers = args.workers
+    else:
+        agent = SecurityAgent(reporter=reporter)
+        workers = 1
+
+    fmt = args.format or ('jsonl' if args.roster == '-' else roster_format(args.roster))
+    source = sys.stdin if args.roster == '-' else open(args.roster, newline='', encoding='utf-8-sig')
+    out, close_out = _open_output(args.output)
+    try:
+        summary = run_batch(read_roster(source, fmt), out, agent, workers=workers,
+                            reporter=reporter, progress_every=args.progress_every)
+    finally:
+        out.flush()
+        if close_out:
+            out.close()
+        else:
+            out.detach()
+        if source is not sys.stdin:
+            source.close()
+
+    print(json.dumps(summary, ensure_ascii=False), file=sys.stderr)
+    return 1 if summary['errores'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
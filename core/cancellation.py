@@ -0,0 +1,68 @@
+"""
+Tokens de cancelación para las llamadas largas al modelo.
+
+Un `CancelToken` acompaña a una petición desde que se encola hasta que
+termina. Quien la lanzó puede cancelarla en cualquier momento; el código que
+la ejecuta comprueba el token entre etapas y registra los recursos abiertos
+(p. ej. la respuesta HTTP en streaming) para que se cierren en el acto.
+"""
+import contextlib
+import threading
+
+
+class Cancelled(Exception):
+    """La petición se canceló antes de terminar"""
+
+
+class CancelToken:
+    """Señal de cancelación compartida entre quien pide y quien ejecuta"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.reason = None
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason=None):
+        """Activar el token y ejecutar los callbacks registrados; False si ya lo estaba"""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+        return True
+
+    def wait(self, timeout=None):
+        """Esperar hasta `timeout` segundos; True si el token se canceló"""
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self):
+        """Punto de control: abandona el trabajo si se pidió cancelarlo"""
+        if self._event.is_set():
+            raise Cancelled(self.reason)
+
+    @contextlib.contextmanager
+    def closing(self, resource):
+        """Cerrar `resource` si el token se cancela mientras está abierto"""
+        with self._lock:
+            registered = not self._event.is_set()
+            if registered:
+                self._callbacks.append(resource.close)
+        if not registered:
+            resource.close()
+        try:
+            yield resource
+        finally:
+            with self._lock:
+                if resource.close in self._callbacks:
+                    self._callbacks.remove(resource.close)
@@ -0,0 +1,284 @@
+"""
+Métricas de la plataforma en formato de texto de Prometheus.
+
+Contadores, gauges e histogramas con etiquetas, seguros entre hilos y sin
+dependencias externas. Los módulos que instrumentan (agente, parseo, UI)
+actualizan las métricas de este registro; los valores que ya viven en otros
+objetos (colas, cachés, sesiones) se leen al exportar mediante funciones de
+recogida registradas con `REGISTRY.on_collect`.
+
+`start_metrics_server` sirve GET /metrics desde un hilo propio, de modo que
+un scrape nunca bloquea las ejecuciones del script de Streamlit.
+
+Uso:
+    SIP_METRICS_PORT=9464 streamlit run app/main.py
+    curl localhost:9464/metrics
+"""
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .cancellation import Cancelled
+
+METRICS_PORT_ENV = "SIP_METRICS_PORT"
+METRICS_HOST_ENV = "SIP_METRICS_HOST"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Cubetas (segundos) para llamadas al modelo y para reruns del script
+LLM_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+RERUN_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+logger = logging.getLogger("sip.metrics")
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Métrica con etiquetas: un valor (o estado) por combinación de etiquetas"""
+
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name}: se esperaban las etiquetas {self.labels}, no {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in sorted(self._values.items())]
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{_format_labels(self.labels, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LLM_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observar la duración del bloque; la etiqueta `outcome`, si existe, indica cómo terminó"""
+        started = time.perf_counter()
+        outcome = {'outcome': 'ok'} if 'outcome' in self.labels else {}
+        try:
+            yield outcome
+        except Exception as e:
+            if outcome:
+                outcome['outcome'] = 'cancelled' if isinstance(e, Cancelled) else 'error'
+            raise
+        finally:
+            self.observe(time.perf_counter() - started, **labels, **outcome)
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state['count'] if state else 0
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state['counts']):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", key, (('le', _format_value(bound)),), cumulative))
+                samples.append((f"{self.name}_sum", key, (), state['sum']))
+                samples.append((f"{self.name}_count", key, (), state['count']))
+        return samples
+
+
+class Registry:
+    """Conjunto de métricas exportadas juntas"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labels != metric.labels:
+                    raise ValueError(f"Métrica {metric.name} ya registrada con otro tipo o etiquetas")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._add(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=()):
+        return self._add(Gauge(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LLM_BUCKETS):
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def on_collect(self, fn):
+        """Registrar una función que actualiza gauges justo antes de cada exportación"""
+        with self._lock:
+            if fn not in self._collectors:
+                self._collectors.append(fn)
+        return fn
+
+    def expose(self):
+        """Texto de exposición de Prometheus (formato 0.0.4)"""
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collect in collectors:
+            try:
+                collect()
+            except Exception:
+                # Una fuente caída no debe dejar sin métricas al resto
+                logger.exception("Error recogiendo métricas en %s", getattr(collect, '__name__', collect))
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+LLM_CALL_SECONDS = REGISTRY.histogram(
+    "sip_llm_call_seconds", "Duración de las llamadas al modelo por método del agente",
+    labels=('method', 'outcome'), buckets=LLM_BUCKETS)
+JSON_PARSE_TOTAL = REGISTRY.counter(
+    "sip_json_parse_total", "Respuestas procesadas por safe_json_parse según el paso que las resolvió",
+    labels=('result',))
+CACHE_LOOKUPS = REGISTRY.counter(
+    "sip_cache_lookups_total", "Consultas a las cachés de la plataforma", labels=('cache', 'result'))
+RERUN_SECONDS = REGISTRY.histogram(
+    "sip_rerun_seconds", "Duración de cada ejecución completa del script por pestaña",
+    labels=('tab',), buckets=RERUN_BUCKETS)
+
+
+def make_metrics_server(host="127.0.0.1", port=0, registry=REGISTRY):
+    """Servidor HTTP (un hilo por conexión) que sirve GET /metrics; port=0 elige uno libre"""
+    # http.server solo se importa si el exportador está activado
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug("%s - %s", self.address_string(), format % args)
+
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.expose().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    return server
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def metrics_port():
+    """Puerto configurado en SIP_METRICS_PORT (None: exportador desactivado)"""
+    try:
+        return int(os.environ[METRICS_PORT_ENV])
+    except (KeyError, ValueError):
+        return None
+
+
+def start_metrics_server(port=None, host=None, registry=REGISTRY):
+    """Servir /metrics en un hilo daemon (una vez por proceso); None si no hay puerto"""
+    global _server
+    port = metrics_port() if port is None else port
+    if port is None:
+        return None
+    with _server_lock:
+        if _server is not None:
+            return _server or None
+        try:
+            server = make_metrics_server(host or os.getenv(METRICS_HOST_ENV, "127.0.0.1"), port, registry)
+        except OSError as e:
+            # Otro proceso del servidor ya exporta en ese puerto
+            logger.warning("No se pudo abrir el exportador de métricas en el puerto %s: %s", port, e)
+            _server = False
+            return None
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        _server = server
+        logger.info("Métricas en http://%s:%s/metrics", *server.server_address[:2])
+        return server
@@ -0,0 +1,386 @@
+"""
+Scoring de rosters grandes en paralelo, con columnas en memoria compartida.
+
+El roster se codifica en columnas numéricas (niveles 1-10, número de
+intereses, estilo de comunicación, horario, departamento...). Con el backend
+`process`, las columnas se copian una sola vez a un bloque de
+`multiprocessing.shared_memory`; cada proceso del pool recibe solo el nombre
+del bloque y el rango de filas de su tramo, calcula los scores de forma
+vectorizada, los escribe en la columna de salida compartida y devuelve
+agregados parciales de tamaño fijo que el proceso principal suma. Ninguna
+fila viaja serializada entre procesos y el hilo del servidor de Streamlit
+no compite por el GIL con el cálculo.
+
+Las reglas de vulnerabilidades, vectores y recomendaciones solo comparan
+los niveles con umbrales fijos, así que cada fila se reduce a una clave de
+regla y los tramos devuelven cuántas filas caen en cada clave; los textos
+salen de evaluar las funciones de `core.scoring` una vez por clave.
+
+Uso:
+    python -m core.parallel roster.csv|org.npz [--workers 4] [--backend process|serial] [--shard-rows 250000]
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .scoring import (BASE_RISK, COMMUNICATION_RISK, DEFAULT_COMMUNICATION_RISK, MAX_INTERESTS, RISK_WEIGHTS,
+                      generate_attack_vectors, generate_individual_recommendations, generate_vulnerabilities,
+                      get_risk_level, normalize_profile)
+
+# Columnas de entrada (nombre, dtype) y columna de salida
+COLUMNS = (
+    ('social_activity', 'u1'),
+    ('info_sharing', 'u1'),
+    ('security_awareness', 'u1'),
+    ('interest_count', 'u1'),
+    ('interest_flags', 'u1'),
+    ('communication', 'u1'),
+    ('schedule', 'u1'),
+    ('department', 'i4'),
+)
+OUTPUT_COLUMN = ('risk_score', 'f8')
+
+# Intereses que activan reglas (un bit cada uno)
+FLAGGED_INTERESTS = ('Familia', 'Tecnología', 'Viajes')
+
+# Códigos de estilo de comunicación y horario; el último recoge el resto de valores
+COMMUNICATION_STYLES = tuple(COMMUNICATION_RISK) + ('Otro',)
+SCHEDULES = ('9-17 Estándar', '24/7 Disponible', 'Otro')
+
+# Umbrales de los niveles de riesgo (get_risk_level) e histograma
+LEVEL_EDGES = (0.4, 0.6, 0.8)
+HIGH_RISK = 0.6
+HISTOGRAM_BINS = 10
+
+# Claves de regla: actividad social y compartir información en tres tramos
+# (<=5, 6, >=7), conciencia de seguridad en dos (<=4, >=5), bits de intereses,
+# comunicación y horario. Un valor representativo por tramo basta para
+# reproducir las reglas de core.scoring.
+LEVEL_BUCKETS = (5, 6, 7)
+AWARENESS_BUCKETS = (4, 5)
+RULE_KEYS = (len(LEVEL_BUCKETS) ** 2 * len(AWARENESS_BUCKETS) * 2 ** len(FLAGGED_INTERESTS)
+             * len(COMMUNICATION_STYLES) * len(SCHEDULES))
+
+# Filas por tramo enviado a un proceso
+DEFAULT_SHARD_ROWS = 250_000
+
+BACKENDS = ('process', 'serial')
+
+
+def encode_rows(rows):
+    """Columnas del roster a partir de filas (dicts); devuelve (columnas, departamentos)"""
+    communication_codes = {style: code for code, style in enumerate(COMMUNICATION_STYLES[:-1])}
+    schedule_codes = {schedule: code for code, schedule in enumerate(SCHEDULES[:-1])}
+    departments = {}
+    values = {name: [] for name, _ in COLUMNS}
+
+    for row in rows:
+        profile = normalize_profile(row)
+        interests = profile['interests']
+        values['social_activity'].append(profile['social_activity'])
+        values['info_sharing'].append(profile['info_sharing'])
+        values['security_awareness'].append(profile['security_awareness'])
+        values['interest_count'].append(min(len(interests), 255))
+        values['interest_flags'].append(sum(1 << bit for bit, interest in enumerate(FLAGGED_INTERESTS)
+                                            if interest in interests))
+        values['communication'].append(communication_codes.get(profile['communication'],
+                                                                len(COMMUNICATION_STYLES) - 1))
+        values['schedule'].append(schedule_codes.get(profile['schedule'], len(SCHEDULES) - 1))
+        values['department'].append(departments.setdefault(row.get('department') or 'Sin departamento',
+                                                           len(departments)))
+
+    columns = {name: np.asarray(values[name], dtype=dtype) for name, dtype in COLUMNS}
+    return columns, list(departments)
+
+
+def risk_scores(columns):
+    """Score de riesgo vectorizado (mismo cálculo que calculate_individual_risk_score)"""
+    communication_risk = np.array(
+        [COMMUNICATION_RISK[style] for style in COMMUNICATION_STYLES[:-1]] + [DEFAULT_COMMUNICATION_RISK]
+    )
+    score = (
+        columns['social_activity'] / 10 * RISK_WEIGHTS['social_activity'] +
+        columns['info_sharing'] / 10 * RISK_WEIGHTS['info_sharing'] +
+        columns['security_awareness'] / 10 * RISK_WEIGHTS['security_awareness'] +
+        columns['interest_count'] / MAX_INTERESTS * RISK_WEIGHTS['interests_count'] +
+        communication_risk[columns['communication']] * RISK_WEIGHTS['communication_risk']
+    )
+    return np.clip(score + BASE_RISK, 0, 1)
+
+
+def rule_keys(columns):
+    """Clave de regla de cada fila (ver LEVEL_BUCKETS)"""
+    social = np.digitize(columns['social_activity'], (6, 7))
+    sharing = np.digitize(columns['info_sharing'], (6, 7))
+    awareness = (columns['security_awareness'] >= 5).astype(np.int64)
+    key = social * len(LEVEL_BUCKETS) + sharing
+    key = key * len(AWARENESS_BUCKETS) + awareness
+    key = key * 2 ** len(FLAGGED_INTERESTS) + columns['interest_flags']
+    key = key * len(COMMUNICATION_STYLES) + columns['communication']
+    return key * len(SCHEDULES) + columns['schedule']
+
+
+def rule_profile(key):
+    """Perfil representativo de una clave de regla"""
+    key, schedule = divmod(int(key), len(SCHEDULES))
+    key, communication = divmod(key, len(COMMUNICATION_STYLES))
+    key, flags = divmod(key, 2 ** len(FLAGGED_INTERESTS))
+    key, awareness = divmod(key, len(AWARENESS_BUCKETS))
+    social, sharing = divmod(key, len(LEVEL_BUCKETS))
+    return {
+        'social_activity': LEVEL_BUCKETS[social],
+        'info_sharing': LEVEL_BUCKETS[sharing],
+        'security_awareness': AWARENESS_BUCKETS[awareness],
+        'interests': [interest for bit, interest in enumerate(FLAGGED_INTERESTS) if flags & (1 << bit)],
+        'communication': COMMUNICATION_STYLES[communication],
+        'schedule': SCHEDULES[schedule]
+    }
+
+
+def partial_aggregates(columns, risk, n_departments):
+    """Agregados de tamaño fijo de un tramo"""
+    department = columns['department']
+    return {
+        'rows': len(risk),
+        'risk_sum': float(risk.sum()),
+        'risk_sumsq': float(np.square(risk).sum()),
+        'risk_min': float(risk.min()) if len(risk) else math.inf,
+        'risk_max': float(risk.max()) if len(risk) else -math.inf,
+        'histogram': np.histogram(risk, bins=HISTOGRAM_BINS, range=(0, 1))[0],
+        'levels': np.bincount(np.digitize(risk, LEVEL_EDGES), minlength=len(LEVEL_EDGES) + 1),
+        'rule_keys': np.bincount(rule_keys(columns), minlength=RULE_KEYS),
+        'department_rows': np.bincount(department, minlength=n_departments),
+        'department_risk': np.bincount(department, weights=risk, minlength=n_departments),
+        'department_high': np.bincount(department[risk >= HIGH_RISK], minlength=n_departments),
+    }
+
+
+def merge_aggregates(parts):
+    """Sumar los agregados parciales de todos los tramos"""
+    parts = list(parts)
+    merged = dict(parts[0])
+    for part in parts[1:]:
+        for name, value in part.items():
+            if name == 'risk_min':
+                merged[name] = min(merged[name], value)
+            elif name == 'risk_max':
+                merged[name] = max(merged[name], value)
+            else:
+                merged[name] = merged[name] + value
+    return merged
+
+
+def summarize(aggregates, departments):
+    """Resumen legible del roster a partir de los agregados"""
+    rows = aggregates['rows']
+    mean = aggregates['risk_sum'] / rows if rows else 0.0
+    variance = max(0.0, aggregates['risk_sumsq'] / rows - mean ** 2) if rows else 0.0
+
+    vulnerabilities, vectors, recommendations = {}, {}, {}
+    for key in np.flatnonzero(aggregates['rule_keys']):
+        count = int(aggregates['rule_keys'][key])
+        profile = rule_profile(key)
+        for target, rule in ((vulnerabilities, generate_vulnerabilities),
+                             (vectors, generate_attack_vectors),
+                             (recommendations, generate_individual_recommendations)):
+            for text in rule(profile):
+                target[text] = target.get(text, 0) + count
+
+    def ranked(counts):
+        return dict(sorted(counts.items(), key=lambda item: -item[1]))
+
+    level_labels = [get_risk_level(edge) for edge in (0.0,) + LEVEL_EDGES]
+    return {
+        'empleados': rows,
+        'riesgo_medio': round(mean, 4),
+        'riesgo_desviacion': round(math.sqrt(variance), 4),
+        'riesgo_min': round(aggregates['risk_min'], 4) if rows else None,
+        'riesgo_max': round(aggregates['risk_max'], 4) if rows else None,
+        'niveles': {label: int(count) for label, count in zip(level_labels, aggregates['levels'])},
+        'histograma': [int(count) for count in aggregates['histogram']],
+        'vulnerabilidades': ranked(vulnerabilities),
+        'vectores_ataque': ranked(vectors),
+        'recomendaciones': ranked(recommendations),
+        'departamentos': [
+            {
+                'departamento': name,
+                'empleados': int(aggregates['department_rows'][code]),
+                'riesgo_medio': round(float(aggregates['department_risk'][code] / aggregates['department_rows'][code]), 4),
+                'alto_riesgo': int(aggregates['department_high'][code]),
+            }
+            for code, name in enumerate(departments) if aggregates['department_rows'][code]
+        ],
+    }
+
+
+class SharedRoster:
+    """Columnas del roster (y la columna de salida) en un bloque de memoria compartida"""
+
+    def __init__(self, columns, n_departments):
+        rows = len(columns['social_activity'])
+        layout, offset = [], 0
+        for name, dtype in COLUMNS + (OUTPUT_COLUMN,):
+            layout.append((name, dtype, offset))
+            # Alinear cada columna a 8 bytes
+            offset += -(-rows * np.dtype(dtype).itemsize // 8) * 8
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 8))
+        self.spec = {'name': self.shm.name, 'rows': rows, 'layout': layout, 'departments': n_departments}
+        self.views = _views(self.shm, self.spec)
+        for name, _ in COLUMNS:
+            self.views[name][:] = columns[name]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # Soltar las vistas antes de cerrar: el bloque no se libera con buffers exportados
+        self.views = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _views(shm, spec):
+    return {
+        name: np.ndarray((spec['rows'],), dtype=dtype, buffer=shm.buf, offset=offset)
+        for name, dtype, offset in spec['layout']
+    }
+
+
+def _attach(name):
+    """Abrir un bloque existente. Los procesos del pool comparten el resource
+    tracker del principal, que es quien libera el bloque al terminar"""
+    return shared_memory.SharedMemory(name=name)
+
+
+def score_shard(spec, start, stop):
+    """Trabajo de un proceso: scores del tramo en la columna compartida y sus agregados"""
+    shm = _attach(spec['name'])
+    try:
+        views = _views(shm, spec)
+        shard = {name: views[name][start:stop] for name, _ in COLUMNS}
+        risk = risk_scores(shard)
+        views[OUTPUT_COLUMN[0]][start:stop] = risk
+        return partial_aggregates(shard, risk, spec['departments'])
+    finally:
+        views = shard = risk = None
+        shm.close()
+
+
+def shard_ranges(rows, workers, shard_rows=DEFAULT_SHARD_ROWS):
+    """Rangos [inicio, fin) de los tramos: al menos uno por worker si hay filas"""
+    if rows == 0:
+        return []
+    size = max(1, min(shard_rows, math.ceil(rows / max(1, workers))))
+    return [(start, min(rows, start + size)) for start in range(0, rows, size)]
+
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool(workers):
+    """Pool de procesos reutilizado entre llamadas (arrancarlo cuesta más que un tramo)"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown()
+            # forkserver: no se hace fork del servidor de Streamlit con sus hilos
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool():
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = _pool_workers = None
+
+
+def score_columns(columns, departments, workers=None, backend='process', shard_rows=DEFAULT_SHARD_ROWS):
+    """Scores por fila y resumen agregado de un roster ya codificado en columnas"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend no soportado: {backend} (use {', '.join(BACKENDS)})")
+    workers = workers or os.cpu_count() or 1
+    rows = len(columns['social_activity'])
+    ranges = shard_ranges(rows, workers, shard_rows)
+    if not ranges:
+        return np.empty(0), summarize(partial_aggregates(columns, np.empty(0), len(departments)), departments)
+
+    if backend == 'serial':
+        risk = np.empty(rows)
+        parts = []
+        for start, stop in ranges:
+            shard = {name: columns[name][start:stop] for name, _ in COLUMNS}
+            risk[start:stop] = risk_scores(shard)
+            parts.append(partial_aggregates(shard, risk[start:stop], len(departments)))
+        return risk, summarize(merge_aggregates(parts), departments)
+
+    pool = get_process_pool(workers)
+    with SharedRoster(columns, len(departments)) as roster:
+        futures = [pool.submit(score_shard, roster.spec, start, stop) for start, stop in ranges]
+        aggregates = merge_aggregates(future.result() for future in futures)
+        risk = roster.views[OUTPUT_COLUMN[0]].copy()
+    return risk, summarize(aggregates, departments)
+
+
+def score_rows(rows, workers=None, backend='process', shard_rows=DEFAULT_SHARD_ROWS):
+    """Como `score_columns`, partiendo de filas (dicts) del roster"""
+    columns, departments = encode_rows(rows)
+    return score_columns(columns, departments, workers=workers, backend=backend, shard_rows=shard_rows)
+
+
+def main(argv=None):
+    from .batch import read_roster, roster_format
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('roster', help="Roster CSV o JSONL, u organización sintética .npz/.parquet")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), help="Formato del roster (por defecto, según la extensión)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--backend', choices=BACKENDS, default='process')
+    parser.add_argument('--shard-rows', type=int, default=DEFAULT_SHARD_ROWS)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.roster.endswith(('.npz', '.parquet')):
+        # Organización sintética de core.synthetic: ya viene en columnas
+        from .synthetic import load_organization
+        columns, departments = load_organization(args.roster).scoring_columns()
+    else:
+        with open(args.roster, newline='', encoding='utf-8-sig') as source:
+            columns, departments = encode_rows(read_roster(source, args.format or roster_format(args.roster)))
+    encoded = time.perf_counter()
+    _, summary = score_columns(columns, departments, workers=args.workers, backend=args.backend,
+                               shard_rows=args.shard_rows)
+    scored = time.perf_counter()
+
+    summary['tiempos'] = {
+        'lectura_s': round(encoded - started, 3),
+        'scoring_s': round(scored - encoded, 3),
+        'filas_por_segundo': round(summary['empleados'] / (scored - encoded), 1) if scored > encoded else None,
+    }
+    json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write("\n")
+    shutdown_pool()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
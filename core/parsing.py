@@ -0,0 +1,79 @@
+"""
+Parseo tolerante de las respuestas JSON de los modelos.
+"""
+import ast
+import json
+import re
+
+from .metrics import JSON_PARSE_TOTAL
+from .reporting import resolve_reporter
+from .tracing import current_span
+
+
+def _outcome(result):
+    """Contar el paso que resolvió la respuesta y anotarlo en el span en curso"""
+    JSON_PARSE_TOTAL.inc(result=result)
+    current_span().set_attribute('json_parse', result)
+
+
+def safe_json_parse(content, reporter=None):
+    """Parsear JSON de forma tolerante a errores comunes"""
+    if not content or not isinstance(content, str):
+        _outcome('empty')
+        return None
+
+    # Paso 1: limpieza básica
+    content = content.strip()
+    content = re.sub(r'```json\s*', '', content)
+    content = re.sub(r'```\s*$', '', content)
+
+    # Paso 2: extraer bloque con llaves
+    json_match = re.search(r'\{.*\}', content, re.DOTALL)
+    if json_match:
+        json_str = json_match.group(0)
+    else:
+        json_str = content
+
+    # Paso 3: normalizar espacios y saltos
+    json_str = json_str.replace('\n', ' ').replace('\r', ' ')
+    json_str = re.sub(r'\s+', ' ', json_str)
+
+    # Paso 4: intentar parseo normal
+    try:
+        result = json.loads(json_str)
+        _outcome('ok')
+        return result
+    except json.JSONDecodeError:
+        # Intentar reparaciones comunes
+        json_str = fix_common_json_errors(json_str)
+
+        try:
+            result = json.loads(json_str)
+            _outcome('repaired')
+            return result
+        except json.JSONDecodeError:
+            # Intentar con ast.literal_eval (más permisivo)
+            try:
+                result = ast.literal_eval(json_str)
+                _outcome('literal_eval')
+                return result
+            except Exception as e:
+                _outcome('failed')
+                reporter = resolve_reporter(reporter)
+                reporter.warning(f"Error JSON incluso tras reparación: {e}")
+                reporter.detail(f"Contenido: {json_str}")
+                return None
+
+
+def fix_common_json_errors(text):
+    """Corrige errores comunes en JSON generado por IA"""
+    # Quitar comas antes de cierre de objeto o array
+    text = re.sub(r',\s*([}\]])', r'\1', text)
+
+    # Asegurar que comillas sean dobles
+    text = re.sub(r"'", '"', text)
+
+    # Quitar caracteres no permitidos al final
+    text = re.sub(r'[\s,]+$', '', text)
+
+    return text
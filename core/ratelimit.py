@@ -0,0 +1,315 @@
+"""
+Límite de peticiones a la API compartido entre sesiones, hilos y procesos.
+
+Dos token buckets, de peticiones y de tokens por minuto (SIP_RATE_LIMIT_RPM
+y SIP_RATE_LIMIT_TPM), viven en una base SQLite (SIP_RATE_LIMIT_DB, por
+defecto data/ratelimit.db) que comparten todos los procesos del servidor.
+Cada consulta o consumo es una transacción BEGIN IMMEDIATE, que hace de
+cerrojo entre procesos.
+
+Las peticiones que esperan sacan un turno en la tabla `tickets` y solo
+consume el turno más antiguo: el reparto es FIFO entre hilos y procesos, y
+una petición grande no se queda sin cuota ante un goteo de pequeñas. Si la
+espera estimada supera SIP_RATE_LIMIT_MAX_WAIT segundos la petición se
+rechaza en el acto con `RateLimited`, en lugar de acabar en un 429.
+
+Cada llamada reserva su entrada estimada más su `max_tokens` y, al
+terminar, devuelve al bucket los tokens que no llegó a usar.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from .cancellation import Cancelled
+from .metrics import REGISTRY
+from .routing import estimate_tokens
+from .tracing import TRACER, current_span
+
+RATE_LIMIT_DB_ENV = "SIP_RATE_LIMIT_DB"
+RPM_ENV = "SIP_RATE_LIMIT_RPM"
+TPM_ENV = "SIP_RATE_LIMIT_TPM"
+MAX_WAIT_ENV = "SIP_RATE_LIMIT_MAX_WAIT"
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "ratelimit.db")
+DEFAULT_RPM = 50
+DEFAULT_TPM = 100_000
+DEFAULT_MAX_WAIT = 60.0
+
+# Segundos entre comprobaciones de un turno en espera
+POLL_INTERVAL = 0.1
+
+# Turnos sin renovar durante este tiempo son de procesos caídos y se descartan
+STALE_TICKET = 30.0
+
+# Esperas que se conservan para la media y el p95
+WAIT_SAMPLES = 500
+
+REQUESTS = 'requests'
+TOKENS = 'tokens'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    level REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tickets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cost REAL NOT NULL,
+    created REAL NOT NULL,
+    seen REAL NOT NULL
+);
+"""
+
+RATE_LIMIT_WAIT = REGISTRY.histogram(
+    "sip_rate_limit_wait_seconds", "Espera de las llamadas al modelo por cuota de la API",
+    buckets=(0.01, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0))
+RATE_LIMIT_REJECTIONS = REGISTRY.counter(
+    "sip_rate_limit_rejections_total", "Llamadas rechazadas por el límite de cuota compartido")
+RATE_LIMIT_QUEUE = REGISTRY.gauge(
+    "sip_rate_limit_queue", "Llamadas esperando turno de cuota en todos los procesos")
+
+
+class RateLimited(Exception):
+    """La espera por cuota de la API superaría el máximo configurado"""
+
+
+def _env_number(env, default):
+    try:
+        return max(0.0, float(os.getenv(env, default)))
+    except ValueError:
+        return default
+
+
+def request_tokens(request):
+    """Tokens que reserva una petición a `messages`: entrada estimada más max_tokens"""
+    text = "".join(str(message.get('content', '')) for message in request.get('messages', ()))
+    return estimate_tokens(text) + int(request.get('max_tokens', 0))
+
+
+class Permit:
+    """Cuota concedida a una llamada; `settle` devuelve lo que no se usó"""
+
+    def __init__(self, limiter, tokens, wait_s):
+        self.limiter = limiter
+        self.tokens = tokens
+        self.wait_s = wait_s
+
+    def settle(self, used_tokens):
+        unused = self.tokens - used_tokens
+        if unused > 0 and self.limiter is not None:
+            self.limiter.refund(unused)
+        self.tokens = 0
+
+
+class RateLimiter:
+    """Token buckets de peticiones y tokens por minuto con turnos FIFO en SQLite"""
+
+    def __init__(self, path=None, rpm=None, tpm=None, max_wait=None):
+        self.path = path or os.getenv(RATE_LIMIT_DB_ENV, DEFAULT_DB_PATH)
+        self.rpm = _env_number(RPM_ENV, DEFAULT_RPM) if rpm is None else rpm
+        self.tpm = _env_number(TPM_ENV, DEFAULT_TPM) if tpm is None else tpm
+        self.max_wait = _env_number(MAX_WAIT_ENV, DEFAULT_MAX_WAIT) if max_wait is None else max_wait
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self.granted = 0
+        self.rejected = 0
+        if self.enabled:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._connection().executescript(SCHEMA)
+
+    @property
+    def enabled(self):
+        return bool(self.rpm or self.tpm)
+
+    def _connection(self):
+        """Una conexión por hilo; las transacciones se abren a mano"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _limits(self):
+        return {name: limit for name, limit in ((REQUESTS, self.rpm), (TOKENS, self.tpm)) if limit}
+
+    def _levels(self, conn, now):
+        """Nivel actual de cada bucket tras rellenarlo por el tiempo transcurrido"""
+        rows = dict(((name, (level, updated)) for name, level, updated in
+                     conn.execute("SELECT name, level, updated FROM buckets")))
+        levels = {}
+        for name, limit in self._limits().items():
+            level, updated = rows.get(name, (limit, now))
+            levels[name] = min(limit, level + max(0.0, now - updated) * limit / 60)
+        return levels
+
+    def _store(self, conn, levels, now):
+        conn.executemany("INSERT OR REPLACE INTO buckets (name, level, updated) VALUES (?, ?, ?)",
+                         [(name, level, now) for name, level in levels.items()])
+
+    def _deficit_wait(self, levels, requests, tokens):
+        """Segundos hasta que los buckets cubren `requests` peticiones y `tokens` tokens"""
+        wait = 0.0
+        for name, need in ((REQUESTS, requests), (TOKENS, tokens)):
+            limit = self._limits().get(name)
+            if limit:
+                wait = max(wait, (need - levels[name]) * 60 / limit)
+        return wait
+
+    def _try_acquire(self, ticket, cost):
+        """Consumir si el turno es el primero y hay cuota (devuelve None); si no, espera estimada (s)"""
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM tickets WHERE seen < ?", (now - STALE_TICKET,))
+            conn.execute("UPDATE tickets SET seen = ? WHERE id = ?", (now, ticket))
+            ahead, ahead_cost = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(cost), 0) FROM tickets WHERE id < ?", (ticket,)).fetchone()
+            levels = self._levels(conn, now)
+            wait = self._deficit_wait(levels, ahead + 1, ahead_cost + cost)
+            if ahead == 0 and wait <= 0:
+                levels[REQUESTS] = levels.get(REQUESTS, 0) - 1
+                levels[TOKENS] = levels.get(TOKENS, 0) - cost
+                self._store(conn, {name: levels[name] for name in self._limits()}, now)
+                conn.execute("DELETE FROM tickets WHERE id = ?", (ticket,))
+                wait = None
+            else:
+                # Aunque haya cuota, los turnos anteriores consumen primero
+                wait = max(wait, POLL_INTERVAL)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire(self, tokens, cancel=None):
+        """Esperar turno y cuota para una llamada de `tokens` tokens; devuelve un `Permit`
+
+        Lanza `RateLimited` si la espera estimada supera `max_wait` y
+        `Cancelled` si el token `cancel` se activa mientras espera.
+        """
+        if not self.enabled:
+            return Permit(None, 0, 0.0)
+        # Una petición mayor que el bucket nunca cabría entera
+        cost = min(tokens, self.tpm) if self.tpm else 0
+        started = time.monotonic()
+        started_at = time.time()
+        conn = self._connection()
+        ticket = conn.execute("INSERT INTO tickets (cost, created, seen) VALUES (?, ?, ?)",
+                              (cost, started_at, started_at)).lastrowid
+        try:
+            while True:
+                wait = self._try_acquire(ticket, cost)
+                if wait is None:
+                    break
+                if time.monotonic() - started + wait > self.max_wait:
+                    self._reject()
+                    raise RateLimited(
+                        f"Límite de la API: la llamada tendría que esperar ~{wait:.0f}s más "
+                        f"(máximo {self.max_wait:.0f}s, {RPM_ENV}={self.rpm:g}, {TPM_ENV}={self.tpm:g})")
+                if cancel is not None:
+                    if cancel.wait(min(wait, POLL_INTERVAL)):
+                        raise Cancelled(cancel.reason)
+                else:
+                    time.sleep(min(wait, POLL_INTERVAL))
+        except BaseException:
+            conn.execute("DELETE FROM tickets WHERE id = ?", (ticket,))
+            raise
+
+        waited = time.monotonic() - started
+        with self._lock:
+            self._waits.append(waited)
+            self.granted += 1
+        RATE_LIMIT_WAIT.observe(waited)
+        if waited >= POLL_INTERVAL:
+            TRACER.record("Espera de cuota", started_at, tokens=cost)
+        current_span().set_attribute('espera_cuota_ms', round(waited * 1000, 1))
+        return Permit(self, cost, waited)
+
+    def _reject(self):
+        with self._lock:
+            self.rejected += 1
+        RATE_LIMIT_REJECTIONS.inc()
+
+    def refund(self, tokens):
+        """Devolver al bucket de tokens la parte reservada que no se usó"""
+        if not self.tpm:
+            return
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            levels = self._levels(conn, now)
+            levels[TOKENS] = min(self.tpm, levels[TOKENS] + tokens)
+            self._store(conn, levels, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def queued(self):
+        """Turnos en espera en todos los procesos"""
+        if not self.enabled:
+            return 0
+        cutoff = time.time() - STALE_TICKET
+        return self._connection().execute("SELECT COUNT(*) FROM tickets WHERE seen >= ?", (cutoff,)).fetchone()[0]
+
+    def metrics(self):
+        """Configuración, turnos en espera, niveles y esperas de este proceso"""
+        with self._lock:
+            waits = sorted(self._waits)
+            granted, rejected = self.granted, self.rejected
+        levels = self._levels(self._connection(), time.time()) if self.enabled else {}
+        return {
+            'rpm': self.rpm,
+            'tpm': self.tpm,
+            'en_espera': self.queued(),
+            'peticiones_disponibles': round(levels.get(REQUESTS, 0), 1),
+            'tokens_disponibles': round(levels.get(TOKENS, 0)),
+            'concedidas': granted,
+            'rechazadas': rejected,
+            'espera_media_ms': round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+            'espera_p95_ms': round(waits[min(len(waits) - 1, int(0.95 * len(waits)))] * 1000, 1) if waits else 0.0,
+        }
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Limitador del proceso (se crea con la primera llamada a la API)"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
+
+
+@contextmanager
+def rate_limited(request, cancel=None):
+    """Reservar cuota para la petición `request` mientras dura el bloque
+
+    Si el bloque deja el texto de la respuesta en `call['output']`, al salir
+    se devuelve la parte de `max_tokens` que no se generó; si falla, toda.
+    """
+    reserved = request_tokens(request)
+    permit = get_rate_limiter().acquire(reserved, cancel)
+    call = {}
+    try:
+        yield call
+    finally:
+        used = reserved - int(request.get('max_tokens', 0)) + estimate_tokens(call.get('output', ''))
+        permit.settle(used)
+
+
+@REGISTRY.on_collect
+def collect_rate_limiter():
+    # El scrape no crea la base si el proceso aún no ha llamado a la API
+    if _limiter is not None:
+        RATE_LIMIT_QUEUE.set(_limiter.queued())
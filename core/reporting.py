@@ -0,0 +1,91 @@
+"""
+Interfaz de reporte para el núcleo sin UI.
+
+El núcleo nunca llama a Streamlit: avisa de su progreso y de sus errores a
+través de un `Reporter` inyectado. La aplicación usa `StreamlitReporter`
+(spinners y mensajes en la página), el ejecutor por lotes usa
+`LoggingReporter` (stderr) y las pruebas o los procesos silenciosos usan
+`NullReporter`.
+"""
+import contextlib
+import logging
+
+
+class Reporter:
+    """Destino de los mensajes del núcleo; por defecto los descarta"""
+
+    def info(self, message):
+        pass
+
+    def warning(self, message):
+        pass
+
+    def error(self, message):
+        pass
+
+    def detail(self, text):
+        """Texto largo de diagnóstico (respuestas del modelo, etc.)"""
+        pass
+
+    @contextlib.contextmanager
+    def spinner(self, message):
+        yield
+
+
+class NullReporter(Reporter):
+    """Reporter silencioso"""
+
+
+class LoggingReporter(Reporter):
+    """Reporter que escribe en un logger (stderr en la línea de comandos)"""
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger("sip")
+
+    def info(self, message):
+        self.logger.info(message)
+
+    def warning(self, message):
+        self.logger.warning(message)
+
+    def error(self, message):
+        self.logger.error(message)
+
+    def detail(self, text):
+        self.logger.debug(text)
+
+    @contextlib.contextmanager
+    def spinner(self, message):
+        self.logger.debug(message)
+        yield
+
+
+class StreamlitReporter(Reporter):
+    """Reporter que pinta en la página de Streamlit en curso"""
+
+    def info(self, message):
+        import streamlit as st
+        st.info(message)
+
+    def warning(self, message):
+        import streamlit as st
+        st.warning(message)
+
+    def error(self, message):
+        import streamlit as st
+        st.error(message)
+
+    def detail(self, text):
+        import streamlit as st
+        st.text(text)
+
+    @contextlib.contextmanager
+    def spinner(self, message):
+        import streamlit as st
+        with st.spinner(message):
+            yield
+
+
+def resolve_reporter(reporter=None):
+    """Reporter indicado o uno silencioso"""
+    return reporter if reporter is not None else NullReporter()
@@ -0,0 +1,355 @@
+"""
+Enrutado de modelos por tipo de llamada.
+
+Cada tipo de llamada (los métodos del agente y los análisis de la interfaz)
+declara en ROUTES sus modelos candidatos, de mayor a menor calidad, su
+presupuesto de latencia (p95, en segundos) y su presupuesto de salida
+(`max_tokens` y el mínimo aceptable sin truncar el JSON). `route()` estima la
+latencia de cada candidato con el tamaño de la entrada y la latencia
+observada en las últimas llamadas de ese modelo y tipo (con el perfil de
+MODELS mientras no haya muestras suficientes) y elige el primer candidato
+que cabe en el presupuesto, recortando `max_tokens` si hace falta.
+`invoke()` hace la llamada con la decisión y, si la API no encuentra el
+modelo (404), lo marca como no disponible para esa credencial durante
+UNAVAILABLE_TTL_S segundos y repite con el siguiente candidato: cada sesión
+usa su propia API key, y un modelo al que no llega una cuenta puede estar
+disponible para otra.
+
+Cada decisión se registra en el logger "sip.routing", en el span de la
+traza en curso, en la métrica `sip_model_route_total` y en un histórico
+para el panel de la interfaz. SIP_ROUTING_CONFIG puede apuntar a un JSON con
+las mismas claves ("models", "routes") para sobrescribir la configuración.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from .metrics import REGISTRY
+from .tracing import current_span
+
+ROUTING_CONFIG_ENV = "SIP_ROUTING_CONFIG"
+
+# Aproximación de tokens a partir de caracteres (texto en español y JSON)
+CHARS_PER_TOKEN = 4
+
+# Llamadas observadas por (tipo, modelo) y mínimo para fiarse de ellas
+SAMPLES_PER_ROUTE = 50
+MIN_SAMPLES = 5
+DECISION_HISTORY = 50
+
+# Segundos que un modelo rechazado por la API queda fuera de las rutas de esa credencial
+UNAVAILABLE_TTL_S = 600
+
+# Perfil de latencia de cada modelo: coste fijo y velocidad de entrada y salida
+MODELS = {
+    'claude-3-5-sonnet-20241022': {'overhead_s': 1.5, 'input_tokens_s': 8000, 'output_tokens_s': 50},
+    'claude-3-5-haiku-20241022': {'overhead_s': 0.8, 'input_tokens_s': 15000, 'output_tokens_s': 90},
+    'claude-3-haiku-20240307': {'overhead_s': 0.5, 'input_tokens_s': 20000, 'output_tokens_s': 140},
+}
+UNKNOWN_MODEL = {'overhead_s': 1.0, 'input_tokens_s': 10000, 'output_tokens_s': 60}
+
+# Modelos candidatos (de mayor a menor calidad) y presupuestos por tipo de llamada
+ROUTES = {
+    'run_osint_analysis': {
+        'models': ['claude-3-5-haiku-20241022', 'claude-3-haiku-20240307'],
+        'latency_budget_s': 45, 'max_tokens': 4000, 'min_tokens': 2000, 'expected_output_tokens': 2500},
+    'generate_psychological_profile': {
+        'models': ['claude-3-5-haiku-20241022', 'claude-3-haiku-20240307'],
+        'latency_budget_s': 45, 'max_tokens': 4000, 'min_tokens': 2000, 'expected_output_tokens': 2500},
+    'generate_adaptive_content': {
+        'models': ['claude-3-5-sonnet-20241022', 'claude-3-5-haiku-20241022', 'claude-3-haiku-20240307'],
+        'latency_budget_s': 45, 'max_tokens': 4000, 'min_tokens': 1500, 'expected_output_tokens': 2000},
+    'analyze_company_osint': {
+        'models': ['claude-3-haiku-20240307'],
+        'latency_budget_s': 30, 'max_tokens': 1500, 'min_tokens': 1000, 'expected_output_tokens': 1200},
+    'analyze_employee_profile': {
+        'models': ['claude-3-haiku-20240307'],
+        'latency_budget_s': 30, 'max_tokens': 1500, 'min_tokens': 1000, 'expected_output_tokens': 1200},
+    'generate_attack_simulation': {
+        'models': ['claude-3-haiku-20240307'],
+        'latency_budget_s': 30, 'max_tokens': 2000, 'min_tokens': 1200, 'expected_output_tokens': 1600},
+    'generate_countermeasures': {
+        'models': ['claude-3-haiku-20240307'],
+        'latency_budget_s': 30, 'max_tokens': 2000, 'min_tokens': 1200, 'expected_output_tokens': 1600},
+    'connection_test': {
+        'models': ['claude-3-5-haiku-20241022', 'claude-3-haiku-20240307'],
+        'latency_budget_s': 10, 'max_tokens': 20, 'min_tokens': 10, 'expected_output_tokens': 10},
+}
+DEFAULT_ROUTE = {'models': ['claude-3-haiku-20240307'], 'latency_budget_s': 30, 'max_tokens': 1500,
+                 'min_tokens': 500, 'expected_output_tokens': 1000}
+
+ROUTE_DECISIONS = REGISTRY.counter(
+    "sip_model_route_total", "Decisiones del enrutador de modelos por tipo de llamada, modelo y motivo",
+    labels=('call', 'model', 'reason'))
+
+logger = logging.getLogger("sip.routing")
+
+
+def estimate_tokens(text):
+    return len(text or "") // CHARS_PER_TOKEN + 1
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def load_routing_config(path=None):
+    """MODELS y ROUTES con lo que sobrescriba el JSON de SIP_ROUTING_CONFIG"""
+    models = {name: dict(profile) for name, profile in MODELS.items()}
+    routes = {name: dict(route) for name, route in ROUTES.items()}
+    path = path or os.getenv(ROUTING_CONFIG_ENV)
+    if not path:
+        return models, routes
+    try:
+        with open(path, encoding='utf-8') as f:
+            overrides = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("No se pudo leer la configuración de enrutado %s: %s", path, e)
+        return models, routes
+    for name, profile in overrides.get('models', {}).items():
+        models[name] = {**models.get(name, UNKNOWN_MODEL), **profile}
+    for name, route in overrides.get('routes', {}).items():
+        routes[name] = {**routes.get(name, DEFAULT_ROUTE), **route}
+    return models, routes
+
+
+class Decision:
+    """Modelo y presupuesto de salida elegidos para una llamada"""
+
+    def __init__(self, router, call, model, max_tokens, input_tokens, estimated_s, budget_s, basis, reason,
+                 scope=None):
+        self.router = router
+        self.scope = scope
+        self.call = call
+        self.model = model
+        self.max_tokens = max_tokens
+        self.input_tokens = input_tokens
+        self.estimated_s = estimated_s
+        self.budget_s = budget_s
+        self.basis = basis
+        self.reason = reason
+
+    def request(self, **request):
+        """Argumentos de `messages.create`/`stream` con el modelo y max_tokens elegidos"""
+        return {'model': self.model, 'max_tokens': self.max_tokens, **request}
+
+    @contextmanager
+    def measure(self):
+        """Medir la llamada; si el bloque deja la respuesta en `call['output']`, cuenta como observación"""
+        started = time.perf_counter()
+        call = {}
+        yield call
+        if 'output' in call:
+            self.router.observe(self.call, self.model, time.perf_counter() - started, call['output'])
+
+    def to_dict(self):
+        return {
+            'llamada': self.call,
+            'modelo': self.model,
+            'max_tokens': self.max_tokens,
+            'entrada_tokens': self.input_tokens,
+            'estimada_s': round(self.estimated_s, 2),
+            'presupuesto_s': self.budget_s,
+            'base': self.basis,
+            'motivo': self.reason,
+        }
+
+
+class Router:
+    """Elige modelo y max_tokens por tipo de llamada y aprende de las latencias observadas"""
+
+    def __init__(self, models=None, routes=None):
+        if models is None or routes is None:
+            loaded_models, loaded_routes = load_routing_config()
+            models = loaded_models if models is None else models
+            routes = loaded_routes if routes is None else routes
+        self.models = models
+        self.routes = routes
+        self._unavailable = {}      # (credencial, modelo) -> instante en que vuelve a probarse
+        self._samples = {}
+        self._decisions = deque(maxlen=DECISION_HISTORY)
+        self._lock = threading.Lock()
+
+    def route_config(self, call):
+        return self.routes.get(call, DEFAULT_ROUTE)
+
+    def unavailable(self, scope=None):
+        """Modelos que la API rechazó para la credencial `scope` y que aún no han caducado"""
+        now = time.monotonic()
+        with self._lock:
+            for key in [key for key, until in self._unavailable.items() if until <= now]:
+                del self._unavailable[key]
+            return {model for (owner, model) in self._unavailable if owner == scope}
+
+    def mark_unavailable(self, model, scope=None, ttl=UNAVAILABLE_TTL_S):
+        with self._lock:
+            self._unavailable[(scope, model)] = time.monotonic() + ttl
+
+    def candidates(self, call, models=None, scope=None):
+        """Modelos de la ruta (o los fijados por el transporte) sin los no disponibles para `scope`"""
+        names = models or self.route_config(call)['models']
+        unavailable = self.unavailable(scope)
+        available = [name for name in names if name not in unavailable]
+        # Si todos fallaron se vuelve a intentar con la lista completa
+        return available or list(names)
+
+    def primary_model(self, call, scope=None):
+        """Primer candidato de la ruta, sin estimar ni registrar una decisión"""
+        return self.candidates(call, scope=scope)[0]
+
+    def observe(self, call, model, seconds, output):
+        """Añadir una llamada completada (duración y tamaño de la respuesta) a las observaciones"""
+        with self._lock:
+            samples = self._samples.setdefault((call, model), deque(maxlen=SAMPLES_PER_ROUTE))
+            samples.append((seconds, estimate_tokens(output)))
+
+    def estimate(self, call, model, input_tokens, max_tokens):
+        """Latencia p95 estimada (segundos) y su base: 'observada' o 'perfil'"""
+        profile = self.models.get(model, UNKNOWN_MODEL)
+        with self._lock:
+            samples = list(self._samples.get((call, model), ()))
+        if len(samples) >= MIN_SAMPLES:
+            p95 = _percentile([seconds for seconds, _ in samples], 0.95)
+            typical = _percentile([tokens for _, tokens in samples], 0.95)
+            # Un max_tokens por debajo de la salida habitual acorta la generación en proporción
+            scale = min(1.0, max_tokens / typical) if typical else 1.0
+            return profile['overhead_s'] + max(0.0, p95 - profile['overhead_s']) * scale, 'observada'
+        expected = min(max_tokens, self.route_config(call)['expected_output_tokens'])
+        return (profile['overhead_s'] + input_tokens / profile['input_tokens_s']
+                + expected / profile['output_tokens_s']), 'perfil'
+
+    def _fit_tokens(self, call, model, input_tokens, budget, low, high):
+        """Mayor max_tokens en [low, high] cuya estimación cabe en el presupuesto (None si ninguno)"""
+        if self.estimate(call, model, input_tokens, low)[0] > budget:
+            return None
+        while high - low > 1:
+            middle = (low + high) // 2
+            if self.estimate(call, model, input_tokens, middle)[0] <= budget:
+                low = middle
+            else:
+                high = middle
+        return low
+
+    def route(self, call, prompt="", models=None, max_tokens=None, scope=None):
+        """Decidir modelo y max_tokens para `call` con la entrada `prompt`
+
+        `models` fija los candidatos (p. ej. un transporte con modelo fijo),
+        `max_tokens` pone un techo al presupuesto de salida de la ruta y
+        `scope` identifica la credencial (ver `credential_scope`).
+        """
+        decision = self._decide(call, estimate_tokens(prompt), self.candidates(call, models, scope), max_tokens,
+                                scope)
+        self._record(decision)
+        return decision
+
+    def fallback(self, decision):
+        """Marcar el modelo de `decision` como no disponible para su credencial y decidir de nuevo (None si no hay otro)"""
+        self.mark_unavailable(decision.model, decision.scope)
+        unavailable = self.unavailable(decision.scope)
+        remaining = [name for name in self.route_config(decision.call)['models'] if name not in unavailable]
+        if not remaining:
+            return None
+        retry = self._decide(decision.call, decision.input_tokens, remaining, None, decision.scope)
+        retry.reason = f"respaldo de {decision.model}"
+        self._record(retry)
+        return retry
+
+    def invoke(self, call, prompt, send, models=None, max_tokens=None, on_fallback=None, scope=None):
+        """Enrutar `call`, ejecutar `send(decision)` midiendo la llamada y devolver (texto, decisión)
+
+        Si la API no encuentra el modelo, se marca como no disponible para la
+        credencial `scope` y se repite con el siguiente candidato de la ruta
+        (avisando a `on_fallback(decision)`). Con `models` fijados no hay respaldo.
+        """
+        decision = self.route(call, prompt, models, max_tokens, scope)
+        while True:
+            try:
+                with decision.measure() as measured:
+                    measured['output'] = send(decision)
+                return measured['output'], decision
+            except Exception as e:
+                retry = self.fallback(decision) if models is None and model_not_found(e) else None
+                if retry is None:
+                    raise
+                if on_fallback is not None:
+                    on_fallback(retry)
+                decision = retry
+
+    def _decide(self, call, input_tokens, options, max_tokens, scope=None):
+        config = self.route_config(call)
+        budget = config['latency_budget_s']
+        ceiling = min(config['max_tokens'], max_tokens or config['max_tokens'])
+        floor = min(config['min_tokens'], ceiling)
+
+        for model in options:
+            estimated, basis = self.estimate(call, model, input_tokens, ceiling)
+            if estimated <= budget:
+                reason = 'preferido' if model == options[0] else 'más rápido'
+                return Decision(self, call, model, ceiling, input_tokens, estimated, budget, basis, reason, scope)
+            tokens = self._fit_tokens(call, model, input_tokens, budget, floor, ceiling)
+            if tokens is not None:
+                estimated, basis = self.estimate(call, model, input_tokens, tokens)
+                return Decision(self, call, model, tokens, input_tokens, estimated, budget, basis,
+                                'salida recortada', scope)
+
+        # Ningún candidato cabe: el más rápido con la salida mínima
+        estimates = [(self.estimate(call, model, input_tokens, floor), model) for model in options]
+        (estimated, basis), model = min(estimates, key=lambda item: item[0][0])
+        return Decision(self, call, model, floor, input_tokens, estimated, budget, basis, 'sin margen', scope)
+
+    def _record(self, decision):
+        entry = {'fecha': datetime.now().strftime('%H:%M:%S'), **decision.to_dict()}
+        with self._lock:
+            self._decisions.append(entry)
+        ROUTE_DECISIONS.inc(call=decision.call, model=decision.model, reason=decision.reason)
+        current_span().set_attributes(modelo=decision.model, max_tokens=decision.max_tokens,
+                                      latencia_estimada_s=round(decision.estimated_s, 2),
+                                      enrutado=decision.reason)
+        logger.info("%s → %s (max_tokens=%d, entrada≈%d tokens, estimada %.1fs de %ss según %s: %s)",
+                    decision.call, decision.model, decision.max_tokens, decision.input_tokens,
+                    decision.estimated_s, decision.budget_s, decision.basis, decision.reason)
+
+    def decisions(self):
+        """Últimas decisiones, de la más reciente a la más antigua"""
+        with self._lock:
+            return list(reversed(self._decisions))
+
+    def stats(self):
+        """Latencia observada por tipo de llamada y modelo frente a su presupuesto"""
+        with self._lock:
+            samples = {key: list(values) for key, values in self._samples.items()}
+        rows = []
+        for (call, model), values in sorted(samples.items()):
+            seconds = [value for value, _ in values]
+            rows.append({
+                'llamada': call,
+                'modelo': model,
+                'muestras': len(values),
+                'p50_s': round(_percentile(seconds, 0.5), 2),
+                'p95_s': round(_percentile(seconds, 0.95), 2),
+                'presupuesto_s': self.route_config(call)['latency_budget_s'],
+                'salida_p95_tokens': _percentile([tokens for _, tokens in values], 0.95),
+            })
+        return rows
+
+
+def model_not_found(error):
+    """La API rechazó el modelo (no existe o la cuenta no tiene acceso): `anthropic.NotFoundError`, HTTP 404"""
+    return getattr(error, 'status_code', None) == 404
+
+
+def credential_scope(api_key):
+    """Identificador de la credencial para las marcas de no disponible, sin guardar la clave"""
+    if not api_key:
+        return None
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+
+
+ROUTER = Router()
@@ -0,0 +1,202 @@
+"""
+Reglas de scoring y perfilado de empleados, sin dependencias de UI.
+
+Las mismas funciones alimentan el perfilado individual de la aplicación y
+el ejecutor por lotes; `score_employee` aplica todas las reglas a un perfil.
+"""
+import re
+
+# Valores por defecto de un perfil incompleto (p. ej. una fila de roster)
+PROFILE_DEFAULTS = {
+    'social_activity': 5,
+    'info_sharing': 5,
+    'security_awareness': 5,
+    'interests': [],
+    'communication': 'Formal',
+    'schedule': '9-17 Estándar'
+}
+
+
+# Pesos para diferentes factores
+RISK_WEIGHTS = {
+    'social_activity': 0.25,
+    'info_sharing': 0.30,
+    'security_awareness': -0.20,  # Negativo porque mayor conciencia = menor riesgo
+    'interests_count': 0.10,
+    'communication_risk': 0.15
+}
+
+# Riesgo por estilo de comunicación (los estilos no listados cuentan 0.5)
+COMMUNICATION_RISK = {
+    'Formal': 0.3,
+    'Casual': 0.7,
+    'Técnico': 0.4,
+    'Emocional': 0.8,
+    'Directo': 0.5
+}
+DEFAULT_COMMUNICATION_RISK = 0.5
+
+MAX_INTERESTS = 7
+BASE_RISK = 0.3
+
+
+def calculate_individual_risk_score(profile_data):
+    """Calcular score de riesgo individual"""
+
+    weights = RISK_WEIGHTS
+
+    # Calcular componentes
+    social_risk = profile_data['social_activity'] / 10
+    sharing_risk = profile_data['info_sharing'] / 10
+    awareness_protection = profile_data['security_awareness'] / 10
+    interests_risk = len(profile_data['interests']) / MAX_INTERESTS  # Máximo 7 intereses
+
+    communication_risk = COMMUNICATION_RISK.get(profile_data['communication'], DEFAULT_COMMUNICATION_RISK)
+
+    # Calcular score final
+    risk_score = (
+        social_risk * weights['social_activity'] +
+        sharing_risk * weights['info_sharing'] +
+        awareness_protection * weights['security_awareness'] +
+        interests_risk * weights['interests_count'] +
+        communication_risk * weights['communication_risk']
+    )
+
+    # Normalizar entre 0 y 1
+    risk_score = max(0, min(1, risk_score + BASE_RISK))  # Base mínima de 0.3
+
+    return risk_score
+
+
+def generate_vulnerabilities(profile_data):
+    """Generar lista de vulnerabilidades específicas"""
+
+    vulnerabilities = []
+
+    if profile_data['social_activity'] >= 7:
+        vulnerabilities.append("Alta exposición en redes sociales - información personal fácilmente accesible")
+
+    if profile_data['info_sharing'] >= 7:
+        vulnerabilities.append("Tendencia a compartir información corporativa en canales públicos")
+
+    if profile_data['security_awareness'] <= 4:
+        vulnerabilities.append("Baja conciencia de seguridad - susceptible a técnicas básicas de ingeniería social")
+
+    if 'Familia' in profile_data['interests']:
+        vulnerabilities.append("Información familiar pública - posible vector de manipulación emocional")
+
+    if 'Tecnología' in profile_data['interests']:
+        vulnerabilities.append("Interés en tecnología - susceptible a ataques técnicos sofisticados")
+
+    if profile_data['communication'] == 'Emocional':
+        vulnerabilities.append("Estilo comunicativo emocional - vulnerable a técnicas de manipulación psicológica")
+
+    if profile_data['schedule'] == '24/7 Disponible':
+        vulnerabilities.append("Disponibilidad constante - mayor superficie de ataque temporal")
+
+    return vulnerabilities
+
+
+def generate_attack_vectors(profile_data):
+    """Generar vectores de ataque específicos"""
+
+    vectors = []
+
+    # Vectores basados en actividad social
+    if profile_data['social_activity'] >= 6:
+        vectors.append("Phishing dirigido basado en posts recientes en redes sociales")
+        vectors.append("Ingeniería social vía LinkedIn con conexiones falsas")
+
+    # Vectores basados en intereses
+    if 'Tecnología' in profile_data['interests']:
+        vectors.append("Emails de alerta de seguridad falsos con enlaces maliciosos")
+
+    if 'Viajes' in profile_data['interests']:
+        vectors.append("Ofertas de viajes corporativos falsas para captura de datos")
+
+    if 'Familia' in profile_data['interests']:
+        vectors.append("Emergencias familiares falsas para generar urgencia")
+
+    # Vectores basados en comunicación
+    if profile_data['communication'] in ['Casual', 'Emocional']:
+        vectors.append("Vishing (phone phishing) con pretexto emocional")
+
+    # Vector de timing
+    if profile_data['schedule'] != '9-17 Estándar':
+        vectors.append("Ataques fuera de horario laboral cuando las defensas están bajas")
+
+    return vectors
+
+
+def generate_individual_recommendations(profile_data):
+    """Generar recomendaciones personalizadas"""
+
+    recommendations = []
+
+    if profile_data['social_activity'] >= 7:
+        recommendations.append("Capacitación específica sobre configuración de privacidad en redes sociales")
+        recommendations.append("Política de redes sociales corporativas personalizada")
+
+    if profile_data['security_awareness'] <= 4:
+        recommendations.append("Programa intensivo de concienciación en seguridad")
+        recommendations.append("Simulacros de phishing semanales hasta mejora demostrable")
+
+    if profile_data['info_sharing'] >= 6:
+        recommendations.append("Protocolo de verificación antes de compartir información corporativa")
+        recommendations.append("Capacitación sobre clasificación de información sensible")
+
+    if profile_data['communication'] == 'Emocional':
+        recommendations.append("Entrenamiento específico sobre técnicas de manipulación emocional")
+        recommendations.append("Protocolo de 'pausa y verificación' para solicitudes urgentes")
+
+    # Recomendación técnica
+    recommendations.append("Implementación de autenticación multifactor obligatoria")
+    recommendations.append("Monitoreo personalizado de actividades inusuales")
+
+    return recommendations
+
+
+def get_risk_color(risk_score):
+    """Obtener color basado en el score de riesgo"""
+    if risk_score >= 0.8:
+        return '#ef4444'  # Rojo
+    elif risk_score >= 0.6:
+        return '#f59e0b'  # Naranja
+    elif risk_score >= 0.4:
+        return '#3b82f6'  # Azul
+    else:
+        return '#10b981'  # Verde
+
+
+def get_risk_level(risk_score):
+    """Obtener nivel de riesgo textual"""
+    if risk_score >= 0.8:
+        return 'CRÍTICO - Acción inmediata requerida'
+    elif risk_score >= 0.6:
+        return 'ALTO - Requiere atención prioritaria'
+    elif risk_score >= 0.4:
+        return 'MEDIO - Monitoreo continuo recomendado'
+    else:
+        return 'BAJO - Mantener vigilancia estándar'
+
+
+def normalize_profile(data):
+    """Perfil con todos los campos que usan las reglas, con sus tipos"""
+    profile = {**PROFILE_DEFAULTS, **{k: v for k, v in data.items() if v not in (None, '')}}
+    for key in ('social_activity', 'info_sharing', 'security_awareness'):
+        profile[key] = max(1, min(10, int(float(profile[key]))))
+    if isinstance(profile['interests'], str):
+        profile['interests'] = [i.strip() for i in re.split(r'[;|,]', profile['interests']) if i.strip()]
+    return profile
+
+
+def score_employee(profile_data):
+    """Score, vulnerabilidades, vectores y recomendaciones de un perfil"""
+    risk_score = calculate_individual_risk_score(profile_data)
+    return {
+        'risk_score': risk_score,
+        'risk_level': get_risk_level(risk_score),
+        'vulnerabilities': generate_vulnerabilities(profile_data),
+        'attack_vectors': generate_attack_vectors(profile_data),
+        'recommendations': generate_individual_recommendations(profile_data)
+    }
@@ -0,0 +1,376 @@
+"""
+Servicio HTTP/JSON local de scoring y análisis.
+
+Expone el motor de scoring y el agente de seguridad a otras herramientas
+internas sin pasar por la interfaz de Streamlit. Las peticiones se ejecutan
+en un pool de hilos acotado; cuando las operaciones pendientes (en curso y
+en cola) alcanzan `workers + queue_depth`, el servicio responde 429 con
+`Retry-After` en lugar de encolar sin límite.
+
+Endpoints:
+    GET  /health                 estado y modelo del agente
+    GET  /metrics                contadores del pool (cola, espera, latencia)
+    GET  /metrics/prometheus     lo mismo y las métricas del agente en formato Prometheus
+    POST /v1/score               scoring por reglas de un empleado
+    POST /v1/analyze             análisis de un empleado con el agente
+    POST /v1/countermeasures     plan de contramedidas para un análisis
+    POST /v1/batch               {"operation": "score", "items": [...]}
+
+Uso:
+    python -m core.service [--port 8765] [--workers 4] [--queue-depth 64] [--transport stand-in]
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .agent import AnthropicTransport, SecurityAgent, StandInTransport
+from .metrics import CONTENT_TYPE, REGISTRY
+from .reporting import LoggingReporter
+from .scoring import normalize_profile, score_employee
+
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_DEPTH = 64
+
+# Elementos máximos por petición al endpoint de lotes (nunca más que la
+# capacidad del pool: un lote mayor no podría admitirse nunca)
+MAX_BATCH_ITEMS = 64
+
+# Tamaño máximo del cuerpo de una petición
+MAX_BODY_BYTES = 1024 * 1024
+
+# Segundos que una petición espera su resultado antes de responder 504
+REQUEST_TIMEOUT = 120.0
+
+logger = logging.getLogger("sip.service")
+
+SERVICE_POOL = REGISTRY.gauge("sip_service_pool", "Estado del pool del servicio HTTP", labels=('stat',))
+
+
+class Overloaded(Exception):
+    """No quedan huecos en el pool para la petición"""
+
+    def __init__(self, retry_after):
+        super().__init__("Servicio saturado")
+        self.retry_after = retry_after
+
+
+class WorkerPool:
+    """Pool de hilos con admisión acotada: en curso + en cola <= workers + queue_depth"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, queue_depth=DEFAULT_QUEUE_DEPTH):
+        self.workers = max(1, workers)
+        self.queue_depth = max(0, queue_depth)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="service")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self._wait_total = 0.0
+        self._run_total = 0.0
+
+    @property
+    def capacity(self):
+        return self.workers + self.queue_depth
+
+    def retry_after(self):
+        """Segundos estimados hasta que se libere hueco"""
+        with self._lock:
+            finished = self.completed + self.failed
+            average = self._run_total / finished if finished else 1.0
+            return max(1, math.ceil(average * self._pending / self.workers))
+
+    def submit_many(self, calls):
+        """Encolar todas las llamadas (fn, args) o ninguna; lanza Overloaded si no caben"""
+        calls = list(calls)
+        with self._lock:
+            if self._pending + len(calls) > self.capacity:
+                self.rejected += len(calls)
+                overloaded = True
+            else:
+                self._pending += len(calls)
+                self.submitted += len(calls)
+                overloaded = False
+        if overloaded:
+            raise Overloaded(self.retry_after())
+
+        queued_at = time.perf_counter()
+        futures = [self._executor.submit(self._run, fn, args, queued_at) for fn, args in calls]
+        for future in futures:
+            future.add_done_callback(self._done)
+        return futures
+
+    def submit(self, fn, *args):
+        return self.submit_many([(fn, args)])[0]
+
+    def _run(self, fn, args, queued_at):
+        started = time.perf_counter()
+        with self._lock:
+            self._running += 1
+            self._wait_total += started - queued_at
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._run_total += time.perf_counter() - started
+
+    def _done(self, future):
+        # También se llama para las peticiones canceladas antes de empezar
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled():
+                self.cancelled += 1
+            elif future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def stats(self):
+        with self._lock:
+            started = self.completed + self.failed + self._running
+            finished = self.completed + self.failed
+            return {
+                'workers': self.workers,
+                'queue_depth': self.queue_depth,
+                'running': self._running,
+                'queued': self._pending - self._running,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'cancelled': self.cancelled,
+                'avg_wait_ms': round(self._wait_total / started * 1000, 2) if started else 0.0,
+                'avg_run_ms': round(self._run_total / finished * 1000, 2) if finished else 0.0
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def score_operation(employee):
+    """Scoring por reglas de un empleado (sin modelo)"""
+    profile = normalize_profile(employee)
+    return {'name': employee.get('name'), 'department': employee.get('department'), **score_employee(profile)}
+
+
+class AnalysisService:
+    """Operaciones del servicio sobre un agente y un pool acotado"""
+
+    def __init__(self, agent, workers=DEFAULT_WORKERS, queue_depth=DEFAULT_QUEUE_DEPTH,
+                 max_batch=MAX_BATCH_ITEMS, timeout=REQUEST_TIMEOUT):
+        self.agent = agent
+        self.pool = WorkerPool(workers, queue_depth)
+        self.max_batch = min(max_batch, self.pool.capacity)
+        self.timeout = timeout
+        self.started_at = time.time()
+        self.operations = {
+            'score': score_operation,
+            'analyze': lambda employee: agent.analyze_employee_profile(normalize_profile(employee)),
+            'countermeasures': agent.generate_countermeasures,
+        }
+
+    def _result(self, future, deadline):
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            future.cancel()
+            raise
+
+    def run(self, operation, item):
+        future = self.pool.submit(self.operations[operation], item)
+        return self._result(future, time.monotonic() + self.timeout)
+
+    def run_batch(self, operation, items):
+        """Resultados en el orden de `items`; un fallo de un elemento no anula el lote"""
+        futures = self.pool.submit_many((self.operations[operation], (item,)) for item in items)
+        # El lote completo comparte el mismo plazo
+        deadline = time.monotonic() + self.timeout
+        results = []
+        for future in futures:
+            try:
+                results.append({'ok': True, 'result': self._result(future, deadline)})
+            except FutureTimeout:
+                results.append({'ok': False, 'error': 'timeout'})
+            except Exception as e:
+                results.append({'ok': False, 'error': f"{type(e).__name__}: {e}"})
+        return results
+
+    def health(self):
+        return {'status': 'ok', 'model': self.agent.model, 'routed': self.agent.routed, 'offline': self.agent.offline,
+                'max_batch': self.max_batch,
+                'uptime_s': round(time.time() - self.started_at, 1)}
+
+    def metrics(self):
+        return self.pool.stats()
+
+    def collect_pool(self):
+        for stat, value in self.pool.stats().items():
+            SERVICE_POOL.set(value, stat=stat)
+
+    def prometheus(self):
+        REGISTRY.on_collect(self.collect_pool)
+        return REGISTRY.expose()
+
+
+class BadRequest(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """Rutas JSON del servicio; `self.server.service` es el AnalysisService"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "SIPService/1.0"
+
+    ROUTES = {
+        '/v1/score': 'score',
+        '/v1/analyze': 'analyze',
+        '/v1/countermeasures': 'countermeasures',
+    }
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            # El cuerpo no se lee: la conexión no puede reutilizarse
+            self.close_connection = True
+            raise BadRequest(413, f"Cuerpo mayor de {MAX_BODY_BYTES} bytes")
+        try:
+            payload = json.loads(self.rfile.read(length) or b'null')
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise BadRequest(400, f"JSON inválido: {e}")
+        if not isinstance(payload, dict):
+            raise BadRequest(400, "Se esperaba un objeto JSON")
+        return payload
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == '/health':
+            self._send(200, service.health())
+        elif self.path == '/metrics':
+            self._send(200, service.metrics())
+        elif self.path == '/metrics/prometheus':
+            body = service.prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send(404, {'error': f"Ruta no encontrada: {self.path}"})
+
+    def do_POST(self):
+        service = self.server.service
+        try:
+            payload = self._read_json()
+            if self.path == '/v1/batch':
+                operation = payload.get('operation', 'score')
+                items = payload.get('items')
+                if operation not in service.operations:
+                    raise BadRequest(400, f"Operación desconocida: {operation}")
+                if not isinstance(items, list) or not all(isinstance(i, dict) for i in items):
+                    raise BadRequest(400, "'items' debe ser una lista de objetos")
+                if len(items) > service.max_batch:
+                    raise BadRequest(413, f"Máximo {service.max_batch} elementos por lote")
+                results = service.run_batch(operation, items)
+                self._send(200, {'operation': operation, 'results': results})
+            elif self.path in self.ROUTES:
+                self._send(200, service.run(self.ROUTES[self.path], payload))
+            else:
+                self._send(404, {'error': f"Ruta no encontrada: {self.path}"})
+        except BadRequest as e:
+            self._send(e.status, {'error': str(e)})
+        except Overloaded as e:
+            self._send(429, {'error': str(e), 'retry_after': e.retry_after},
+                       headers={'Retry-After': str(e.retry_after)})
+        except FutureTimeout:
+            self._send(504, {'error': "Tiempo de espera agotado"})
+        except Exception as e:
+            logger.exception("Error procesando %s", self.path)
+            self._send(500, {'error': f"{type(e).__name__}: {e}"})
+
+
+def make_server(service, host="127.0.0.1", port=DEFAULT_PORT):
+    """Servidor HTTP (un hilo por conexión) sobre `service`; port=0 elige uno libre"""
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def build_transport(kind, latency=0.2, model=None):
+    """Transporte del agente: offline (None), stand-in o anthropic"""
+    if kind == 'offline':
+        return None
+    if kind == 'stand-in':
+        return StandInTransport(latency=latency)
+    if kind == 'anthropic':
+        api_key = os.getenv("ANTHROPIC_API_KEY")
+        if not api_key:
+            raise ValueError("El transporte anthropic requiere la variable ANTHROPIC_API_KEY")
+        return AnthropicTransport(api_key, model=model)
+    raise ValueError(f"Transporte desconocido: {kind}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--queue-depth', type=int, default=DEFAULT_QUEUE_DEPTH)
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH_ITEMS)
+    parser.add_argument('--transport', choices=('offline', 'stand-in', 'anthropic'), default='offline')
+    parser.add_argument('--stand-in-latency', type=float, default=0.2, help="Segundos por llamada del transporte stand-in")
+    parser.add_argument('--model', help="Fijar el modelo de Anthropic (por defecto lo elige core.routing por llamada)")
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s", stream=sys.stderr)
+    try:
+        transport = build_transport(args.transport, args.stand_in_latency, args.model)
+    except ValueError as e:
+        parser.error(str(e))
+
+    agent = SecurityAgent(transport=transport, reporter=LoggingReporter())
+    service = AnalysisService(agent, args.workers, args.queue_depth, args.max_batch)
+    server = make_server(service, args.host, args.port)
+    logger.info("Servicio en http://%s:%d (%s, %d workers, cola %d)",
+                args.host, server.server_port, agent.model, args.workers, args.queue_depth)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
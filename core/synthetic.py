@@ -0,0 +1,361 @@
+"""
+Generador de organizaciones sintéticas para pruebas de carga y escala.
+
+Produce plantillas de 1k a 10M empleados de forma vectorizada y
+reproducible (misma semilla, mismo resultado): departamento, nivel y
+cargo, nombre, los tres factores 1-10 que usa el scoring (correlacionados
+y con medias por departamento), intereses, estilo de comunicación y
+horario. Las columnas categóricas se guardan como
+códigos más su vocabulario, y se escriben en ficheros columnares (`.npz`, o
+Parquet si está instalado `pyarrow`).
+
+Uso:
+    python -m core.synthetic --employees 1000000 --seed 42 -o org.npz [--format npz|parquet]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# Filas generadas por bloque; cada bloque tiene su propia semilla derivada
+BLOCK_ROWS = 1_000_000
+
+FORMATS = ('npz', 'parquet')
+
+# Departamento: (peso en la plantilla, medias de actividad social, compartir
+# información y conciencia de seguridad)
+DEPARTMENTS = {
+    'Ventas': (0.22, 7.0, 6.5, 4.5),
+    'Operaciones': (0.20, 4.5, 4.5, 5.0),
+    'Tecnología': (0.15, 5.0, 5.5, 7.5),
+    'Finanzas': (0.10, 4.0, 3.5, 6.0),
+    'Marketing': (0.11, 7.5, 7.0, 4.5),
+    'Recursos Humanos': (0.08, 6.0, 6.0, 5.0),
+    'Legal': (0.05, 3.5, 3.0, 6.5),
+    'Ejecutivo': (0.09, 6.5, 5.5, 5.0),
+}
+
+SENIORITY = ('Junior', 'Senior', 'Manager', 'Director', 'C-Level')
+# Pirámide de niveles; el departamento Ejecutivo se concentra arriba
+SENIORITY_WEIGHTS = (0.45, 0.32, 0.15, 0.07, 0.01)
+EXECUTIVE_SENIORITY_WEIGHTS = (0.0, 0.20, 0.35, 0.30, 0.15)
+
+ROLE_TITLES = {
+    'Ventas': ('Ejecutivo de Cuentas', 'Ejecutivo de Cuentas Senior', 'Jefe de Ventas', 'Director Comercial', 'CSO'),
+    'Operaciones': ('Técnico de Operaciones', 'Coord. Operaciones', 'Jefe de Operaciones', 'Director de Operaciones', 'COO'),
+    'Tecnología': ('Desarrollador', 'Ingeniero Senior', 'Jefe de Sistemas', 'Director IT', 'CTO'),
+    'Finanzas': ('Analista Financiero', 'Analista Senior', 'Controller', 'Director Financiero', 'CFO'),
+    'Marketing': ('Especialista de Marketing', 'Marketing Senior', 'Jefe de Marketing', 'Director de Marketing', 'CMO'),
+    'Recursos Humanos': ('Técnico de RRHH', 'Generalista de RRHH', 'Gerente RRHH', 'Director de Personas', 'CHRO'),
+    'Legal': ('Paralegal', 'Abogado', 'Jefe de Asesoría Jurídica', 'Director Legal', 'General Counsel'),
+    'Ejecutivo': ('Asistente de Dirección', 'Jefe de Gabinete', 'Director General Adjunto', 'Director General', 'CEO'),
+}
+
+# Los mismos intereses, estilos y horarios que ofrece el perfilado individual
+INTERESTS = ('Tecnología', 'Deportes', 'Viajes', 'Familia', 'Finanzas', 'Entretenimiento', 'Educación')
+INTEREST_PROBABILITIES = (0.35, 0.40, 0.45, 0.55, 0.20, 0.50, 0.25)
+
+COMMUNICATION_STYLES = ('Formal', 'Casual', 'Técnico', 'Emocional', 'Directo')
+COMMUNICATION_WEIGHTS = {
+    'Ventas': (0.15, 0.40, 0.05, 0.25, 0.15),
+    'Operaciones': (0.25, 0.30, 0.15, 0.10, 0.20),
+    'Tecnología': (0.10, 0.30, 0.45, 0.05, 0.10),
+    'Finanzas': (0.50, 0.10, 0.15, 0.05, 0.20),
+    'Marketing': (0.10, 0.40, 0.05, 0.30, 0.15),
+    'Recursos Humanos': (0.25, 0.25, 0.05, 0.35, 0.10),
+    'Legal': (0.60, 0.05, 0.15, 0.05, 0.15),
+    'Ejecutivo': (0.35, 0.10, 0.05, 0.10, 0.40),
+}
+
+SCHEDULES = ('9-17 Estándar', 'Flexible', 'Nocturno', 'Fines de Semana', '24/7 Disponible')
+# Por nivel: los puestos altos están más disponibles fuera de horario
+SCHEDULE_WEIGHTS = (
+    (0.60, 0.20, 0.10, 0.08, 0.02),
+    (0.50, 0.30, 0.08, 0.07, 0.05),
+    (0.40, 0.35, 0.05, 0.05, 0.15),
+    (0.25, 0.35, 0.02, 0.03, 0.35),
+    (0.10, 0.30, 0.00, 0.00, 0.60),
+)
+
+# Correlación entre factores (social, compartir, conciencia) y desviación típica
+FACTOR_CORRELATION = np.array([
+    [1.0, 0.55, -0.20],
+    [0.55, 1.0, -0.40],
+    [-0.20, -0.40, 1.0],
+])
+FACTOR_STD = 1.8
+
+FIRST_NAMES = ('María', 'Carlos', 'Ana', 'Luis', 'Carmen', 'David', 'Laura', 'Javier', 'Lucía', 'Miguel',
+               'Elena', 'Pablo', 'Sara', 'Daniel', 'Paula', 'Jorge', 'Marta', 'Alejandro', 'Cristina', 'Diego',
+               'Isabel', 'Sergio', 'Raquel', 'Adrián', 'Beatriz', 'Álvaro', 'Silvia', 'Fernando', 'Patricia', 'Rubén')
+LAST_NAMES = ('González', 'Rodríguez', 'Martínez', 'Hernández', 'López', 'Pérez', 'Sánchez', 'García', 'Romero',
+              'Torres', 'Díaz', 'Moreno', 'Muñoz', 'Álvarez', 'Ruiz', 'Jiménez', 'Navarro', 'Domínguez', 'Gil',
+              'Vázquez', 'Serrano', 'Ramos', 'Blanco', 'Molina', 'Castro', 'Ortiz', 'Rubio', 'Marín', 'Sanz', 'Iglesias')
+
+COLUMNS = (
+    ('employee_id', 'u4'),
+    ('first_name', 'u1'),
+    ('last_name', 'u1'),
+    ('department', 'u1'),
+    ('seniority', 'u1'),
+    ('social_activity', 'u1'),
+    ('info_sharing', 'u1'),
+    ('security_awareness', 'u1'),
+    ('interests', 'u1'),  # bit i = INTERESTS[i]
+    ('communication', 'u1'),
+    ('schedule', 'u1'),
+)
+
+# Vocabulario de cada columna categórica
+VOCABULARIES = {
+    'first_name': FIRST_NAMES,
+    'last_name': LAST_NAMES,
+    'department': tuple(DEPARTMENTS),
+    'seniority': SENIORITY,
+    'communication': COMMUNICATION_STYLES,
+    'schedule': SCHEDULES,
+}
+
+
+class SyntheticOrganization:
+    """Plantilla sintética en columnas (códigos) con sus vocabularios"""
+
+    def __init__(self, columns, seed):
+        self.columns = columns
+        self.seed = seed
+
+    def __len__(self):
+        return len(self.columns['employee_id'])
+
+    def role(self, i):
+        department = VOCABULARIES['department'][self.columns['department'][i]]
+        return ROLE_TITLES[department][self.columns['seniority'][i]]
+
+    def rows(self, start=0, stop=None):
+        """Empleados como dicts con los campos del roster (ver core.batch)"""
+        c = self.columns
+        for i in range(start, len(self) if stop is None else min(stop, len(self))):
+            flags = int(c['interests'][i])
+            yield {
+                'name': f"{FIRST_NAMES[c['first_name'][i]]} {LAST_NAMES[c['last_name'][i]]}",
+                'role': self.role(i),
+                'department': VOCABULARIES['department'][c['department'][i]],
+                'seniority': SENIORITY[c['seniority'][i]],
+                'social_activity': int(c['social_activity'][i]),
+                'info_sharing': int(c['info_sharing'][i]),
+                'security_awareness': int(c['security_awareness'][i]),
+                'interests': [interest for bit, interest in enumerate(INTERESTS) if flags & (1 << bit)],
+                'communication': COMMUNICATION_STYLES[c['communication'][i]],
+                'schedule': SCHEDULES[c['schedule'][i]],
+            }
+
+    def scoring_columns(self):
+        """Columnas codificadas para core.parallel.score_columns; devuelve (columnas, departamentos)"""
+        from . import parallel
+
+        c = self.columns
+        bits = np.arange(len(INTERESTS), dtype=np.uint8)
+        interest_count = ((c['interests'][:, None] >> bits) & 1).sum(axis=1)
+        flags = np.zeros(len(self), dtype=np.uint8)
+        for bit, interest in enumerate(parallel.FLAGGED_INTERESTS):
+            flags |= ((c['interests'] >> INTERESTS.index(interest)) & 1) << bit
+
+        def recode(values, vocabulary, target):
+            other = len(target) - 1
+            mapping = np.array([target.index(v) if v in target[:-1] else other for v in vocabulary], dtype=np.uint8)
+            return mapping[values]
+
+        columns = {
+            'social_activity': c['social_activity'],
+            'info_sharing': c['info_sharing'],
+            'security_awareness': c['security_awareness'],
+            'interest_count': interest_count.astype(np.uint8),
+            'interest_flags': flags,
+            'communication': recode(c['communication'], COMMUNICATION_STYLES, parallel.COMMUNICATION_STYLES),
+            'schedule': recode(c['schedule'], SCHEDULES, parallel.SCHEDULES),
+            'department': c['department'].astype(np.int32),
+        }
+        return columns, list(VOCABULARIES['department'])
+
+
+def _categorical(rng, weights, size):
+    """Muestras de un categórico con pesos por fila (matriz) o comunes (vector)"""
+    weights = np.asarray(weights, dtype=float)
+    cumulative = np.cumsum(weights / weights.sum(axis=-1, keepdims=True), axis=-1)
+    draws = rng.random(size)
+    if cumulative.ndim == 1:
+        return np.searchsorted(cumulative, draws, side='right').clip(0, len(cumulative) - 1)
+    return (draws[:, None] >= cumulative).sum(axis=1).clip(0, cumulative.shape[1] - 1)
+
+
+def _generate_block(rng, start, size):
+    departments = tuple(DEPARTMENTS)
+    shares = [DEPARTMENTS[d][0] for d in departments]
+    department = _categorical(rng, shares, size)
+
+    executive = department == departments.index('Ejecutivo')
+    seniority = _categorical(rng, SENIORITY_WEIGHTS, size)
+    seniority[executive] = _categorical(rng, EXECUTIVE_SENIORITY_WEIGHTS, int(executive.sum()))
+
+    # Factores correlacionados alrededor de la media del departamento; la
+    # conciencia de seguridad sube medio punto por nivel
+    means = np.array([DEPARTMENTS[d][1:] for d in departments])[department]
+    means[:, 2] += 0.5 * seniority
+    noise = rng.multivariate_normal(np.zeros(3), FACTOR_CORRELATION * FACTOR_STD ** 2, size)
+    factors = np.clip(np.rint(means + noise), 1, 10).astype(np.uint8)
+
+    interests = np.zeros(size, dtype=np.uint8)
+    for bit, (interest, probability) in enumerate(zip(INTERESTS, INTEREST_PROBABILITIES)):
+        probabilities = np.full(size, probability)
+        if interest == 'Tecnología':
+            probabilities[department == departments.index('Tecnología')] += 0.25
+        interests |= (rng.random(size) < probabilities).astype(np.uint8) << bit
+
+    communication_weights = np.array([COMMUNICATION_WEIGHTS[d] for d in departments])
+    communication = _categorical(rng, communication_weights[department], size)
+    schedule = _categorical(rng, np.array(SCHEDULE_WEIGHTS)[seniority], size)
+
+    return {
+        'employee_id': np.arange(start + 1, start + size + 1, dtype=np.uint32),
+        'first_name': rng.integers(0, len(FIRST_NAMES), size, dtype=np.uint8),
+        'last_name': rng.integers(0, len(LAST_NAMES), size, dtype=np.uint8),
+        'department': department.astype(np.uint8),
+        'seniority': seniority.astype(np.uint8),
+        'social_activity': factors[:, 0],
+        'info_sharing': factors[:, 1],
+        'security_awareness': factors[:, 2],
+        'interests': interests,
+        'communication': communication.astype(np.uint8),
+        'schedule': schedule.astype(np.uint8),
+    }
+
+
+def generate_organization(employees, seed=0, block_rows=BLOCK_ROWS):
+    """Organización sintética de `employees` empleados, reproducible por semilla"""
+    if employees < 0:
+        raise ValueError("El número de empleados no puede ser negativo")
+    columns = {name: np.empty(employees, dtype=dtype) for name, dtype in COLUMNS}
+    blocks = np.random.SeedSequence(seed).spawn(max(1, -(-employees // block_rows)))
+    for index, start in enumerate(range(0, employees, block_rows)):
+        size = min(block_rows, employees - start)
+        block = _generate_block(np.random.default_rng(blocks[index]), start, size)
+        for name, _ in COLUMNS:
+            columns[name][start:start + size] = block[name]
+    return SyntheticOrganization(columns, seed)
+
+
+def _metadata(org):
+    return {'seed': org.seed, 'employees': len(org), 'interests': INTERESTS,
+            'vocabularies': VOCABULARIES, 'roles': ROLE_TITLES}
+
+
+def write_npz(org, path, compress=False):
+    """Columnas en un .npz, con los vocabularios en `__meta__` (JSON)"""
+    save = np.savez_compressed if compress else np.savez
+    # Con un fichero abierto numpy no añade la extensión por su cuenta
+    with open(path, 'wb') as f:
+        save(f, __meta__=np.array(json.dumps(_metadata(org), ensure_ascii=False)), **org.columns)
+
+
+def write_parquet(org, path):
+    """Columnas en Parquet; las categóricas como columnas diccionario"""
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Parquet requiere pyarrow: pip install pyarrow (o use --format npz)")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrays, names = [], []
+    for name, _ in COLUMNS:
+        values = org.columns[name]
+        if name in VOCABULARIES:
+            arrays.append(pa.DictionaryArray.from_arrays(pa.array(values), pa.array(VOCABULARIES[name])))
+        else:
+            arrays.append(pa.array(values))
+        names.append(name)
+    table = pa.Table.from_arrays(arrays, names=names)
+    table = table.replace_schema_metadata({'sip': json.dumps(_metadata(org), ensure_ascii=False)})
+    pq.write_table(table, path)
+
+
+def load_npz(path):
+    """Organización guardada con write_npz"""
+    with np.load(path) as data:
+        meta = json.loads(str(data['__meta__']))
+        columns = {name: data[name] for name, _ in COLUMNS}
+    return SyntheticOrganization(columns, meta.get('seed'))
+
+
+def load_parquet(path):
+    """Organización guardada con write_parquet"""
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Parquet requiere pyarrow: pip install pyarrow")
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    meta = json.loads((table.schema.metadata or {}).get(b'sip', b'{}'))
+    columns = {}
+    for name, dtype in COLUMNS:
+        column = table.column(name).combine_chunks()
+        if name in VOCABULARIES:
+            # Recodificar por si el diccionario del fichero no sigue nuestro orden
+            mapping = np.array([VOCABULARIES[name].index(v) for v in column.dictionary.to_pylist()], dtype=dtype)
+            columns[name] = mapping[column.indices.to_numpy()]
+        else:
+            columns[name] = column.to_numpy().astype(dtype, copy=False)
+    return SyntheticOrganization(columns, meta.get('seed'))
+
+
+def load_organization(path):
+    """Organización de un .npz o .parquet"""
+    return load_parquet(path) if path.endswith('.parquet') else load_npz(path)
+
+
+def write_organization(org, path, fmt=None):
+    """Escribir en el formato indicado o deducido de la extensión"""
+    fmt = fmt or ('parquet' if path.endswith('.parquet') else 'npz')
+    if fmt == 'parquet':
+        write_parquet(org, path)
+    elif fmt == 'npz':
+        write_npz(org, path)
+    else:
+        raise ValueError(f"Formato no soportado: {fmt} (use {', '.join(FORMATS)})")
+    return fmt
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--employees', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', required=True, help="Fichero de salida (.npz o .parquet)")
+    parser.add_argument('--format', choices=FORMATS, help="Por defecto, según la extensión")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    org = generate_organization(args.employees, seed=args.seed)
+    generated = time.perf_counter()
+    try:
+        fmt = write_organization(org, args.output, args.format)
+    except RuntimeError as e:
+        parser.error(str(e))
+    written = time.perf_counter()
+
+    print(json.dumps({
+        'empleados': len(org),
+        'semilla': args.seed,
+        'formato': fmt,
+        'bytes': os.path.getsize(args.output),
+        'generacion_s': round(generated - started, 3),
+        'escritura_s': round(written - generated, 3),
+        'filas_por_segundo': round(len(org) / (generated - started), 1) if generated > started else None,
+    }, ensure_ascii=False), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,378 @@
+"""
+Trazas estructuradas (spans) de los pipelines de análisis.
+
+Una traza empieza explícitamente con `start_trace` (p. ej. al enviar el
+formulario OSINT) y decide en ese momento si se muestrea, según
+SIP_TRACE_SAMPLE_RATE o la elección de la sesión. Los spans hijos se abren
+con `span(...)` o `@traced` bajo el span actual (una ContextVar); sin traza
+muestreada en curso esa consulta es todo el coste añadido, de modo que la
+instrumentación puede quedarse en producción.
+
+Un span se puede pasar a otro hilo o a otra ejecución del script (el
+trabajo en segundo plano, el rerun que pinta el resultado) y reactivarse allí
+con `span.activate()`. Cada span terminado se añade como una línea JSON a
+SIP_TRACE_FILE (por defecto data/traces.jsonl), que se rota al superar
+SIP_TRACE_MAX_MB.
+"""
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from .cancellation import Cancelled
+
+TRACE_FILE_ENV = "SIP_TRACE_FILE"
+TRACE_SAMPLE_ENV = "SIP_TRACE_SAMPLE_RATE"
+TRACE_MAX_MB_ENV = "SIP_TRACE_MAX_MB"
+DEFAULT_TRACE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "traces.jsonl")
+DEFAULT_SAMPLE_RATE = 0.1
+DEFAULT_MAX_MB = 20
+
+# Bytes del final del fichero que se leen para mostrar las trazas recientes
+TAIL_BYTES = 2 * 1024 * 1024
+
+OK = 'ok'
+ERROR = 'error'
+CANCELLED = 'cancelled'
+
+_current = contextvars.ContextVar("trace_span", default=None)
+
+
+def sample_rate():
+    """Proporción de trazas muestreadas (0 = ninguna, 1 = todas)"""
+    try:
+        return min(1.0, max(0.0, float(os.getenv(TRACE_SAMPLE_ENV, DEFAULT_SAMPLE_RATE))))
+    except ValueError:
+        return DEFAULT_SAMPLE_RATE
+
+
+def trace_file():
+    return os.getenv(TRACE_FILE_ENV, DEFAULT_TRACE_FILE)
+
+
+class JsonlExporter:
+    """Añade cada span terminado como una línea JSON; rota el fichero al superar `max_bytes`"""
+
+    def __init__(self, path=None, max_bytes=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _max_bytes(self):
+        if self.max_bytes is not None:
+            return self.max_bytes
+        try:
+            return int(float(os.getenv(TRACE_MAX_MB_ENV, DEFAULT_MAX_MB)) * 1024 * 1024)
+        except ValueError:
+            return DEFAULT_MAX_MB * 1024 * 1024
+
+    def export(self, record):
+        path = self.path or trace_file()
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            try:
+                if os.path.getsize(path) > self._max_bytes():
+                    os.replace(path, path + ".1")
+            except OSError:
+                pass
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+class Span:
+    """Operación con nombre, padre, atributos y duración dentro de una traza"""
+
+    __slots__ = ('tracer', 'name', 'trace_id', 'span_id', 'parent_id', 'attributes', 'start',
+                 '_started', 'duration_ms', 'status', 'error', 'thread', '_lock')
+
+    sampled = True
+
+    def __init__(self, tracer, name, trace_id, parent_id=None, attributes=None, start=None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        # `start` permite registrar tramos ya transcurridos (p. ej. la espera en cola)
+        self.start = time.time() if start is None else start
+        self._started = time.perf_counter() - (time.time() - self.start)
+        self.duration_ms = None
+        self.status = OK
+        self.error = None
+        self.thread = threading.current_thread().name
+        self._lock = threading.Lock()
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, status=None, error=None):
+        """Cerrar el span y exportarlo; las llamadas posteriores no hacen nada"""
+        with self._lock:
+            if self.duration_ms is not None:
+                return
+            self.duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+        if status is not None:
+            self.status = status
+        if error is not None:
+            self.error = error
+        self.tracer.exporter.export(self.to_dict())
+
+    @property
+    def ended(self):
+        return self.duration_ms is not None
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': round(self.start, 6),
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'error': self.error,
+            'thread': self.thread,
+            'attributes': self.attributes,
+        }
+
+    @contextmanager
+    def activate(self):
+        """Hacer de este span el actual sin cerrarlo (p. ej. en el hilo de un trabajo)"""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is None:
+            self.end()
+        elif isinstance(exc, Cancelled):
+            self.end(CANCELLED)
+        elif isinstance(exc, Exception):
+            self.end(ERROR, f"{type(exc).__name__}: {exc}")
+        else:
+            # Excepciones de control (st.rerun, st.stop) no son errores del span
+            self.end()
+        return False
+
+
+class _NoopSpan:
+    """Span de una traza no muestreada: no mide ni exporta nada"""
+
+    __slots__ = ()
+
+    sampled = False
+    ended = True
+    name = None
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def end(self, status=None, error=None):
+        pass
+
+    @contextmanager
+    def activate(self):
+        yield self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+# Valor por defecto de `parent`: el span actual de la ContextVar
+_CURRENT = object()
+
+
+class _ActiveSpan:
+    """Span hijo como gestor de contexto: es el actual mientras dura el bloque"""
+
+    __slots__ = ('span', 'token')
+
+    def __init__(self, span):
+        self.span = span
+
+    def __enter__(self):
+        self.token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, *exc):
+        _current.reset(self.token)
+        return self.span.__exit__(*exc)
+
+
+class Tracer:
+    """Crea trazas muestreadas y spans hijos y los envía al exportador"""
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter or JsonlExporter()
+
+    def start_trace(self, name, sampled=None, **attributes):
+        """Span raíz de una traza nueva; `sampled` fuerza la decisión de muestreo
+
+        Queda abierto hasta que se llama a `end()`, aunque sea en otro hilo o
+        en otra ejecución del script.
+        """
+        if sampled is None:
+            rate = sample_rate()
+            sampled = rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+        if not sampled:
+            return NOOP_SPAN
+        return Span(self, name, uuid.uuid4().hex, attributes=attributes)
+
+    def start_span(self, name, parent=_CURRENT, start=None, **attributes):
+        """Span hijo de `parent` (por defecto el actual); no muestreado si no hay traza"""
+        if parent is _CURRENT:
+            parent = _current.get()
+        if parent is None or not parent.sampled:
+            return NOOP_SPAN
+        return Span(self, name, parent.trace_id, parent.span_id, attributes, start=start)
+
+    def span(self, name, parent=_CURRENT, **attributes):
+        """`with tracer.span("Parseo JSON"):` abre un hijo que es el actual dentro del bloque"""
+        child = self.start_span(name, parent, **attributes)
+        if not child.sampled:
+            return NOOP_SPAN
+        return _ActiveSpan(child)
+
+    def record(self, name, start, parent=_CURRENT, **attributes):
+        """Registrar un tramo que empezó en `start` (epoch) y termina ahora"""
+        self.start_span(name, parent, start=start, **attributes).end()
+
+
+TRACER = Tracer()
+
+
+def current_span():
+    """Span actual del contexto, o el span vacío si no hay traza muestreada"""
+    return _current.get() or NOOP_SPAN
+
+
+def start_trace(name, sampled=None, **attributes):
+    return TRACER.start_trace(name, sampled, **attributes)
+
+
+def span(name, parent=_CURRENT, **attributes):
+    return TRACER.span(name, parent, **attributes)
+
+
+def traced(fn=None, name=None):
+    """Decorador: cada llamada a `fn` es un span hijo si hay una traza muestreada en curso"""
+    if fn is None:
+        return functools.partial(traced, name=name)
+    label = name or fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        parent = _current.get()
+        if parent is None:
+            return fn(*args, **kwargs)
+        with TRACER.span(label, parent):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+# --- lectura ---------------------------------------------------------------
+
+def read_spans(path=None, tail_bytes=TAIL_BYTES):
+    """Spans del final del fichero (las líneas incompletas o corruptas se ignoran)"""
+    path = path or trace_file()
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - tail_bytes))
+            data = f.read()
+    except OSError:
+        return []
+    lines = data.decode('utf-8', errors='replace').splitlines()
+    if size > tail_bytes:
+        lines = lines[1:]  # la primera línea puede estar cortada
+    spans = []
+    for line in lines:
+        try:
+            spans.append(json.loads(line))
+        except ValueError:
+            continue
+    return spans
+
+
+def group_traces(spans):
+    """Trazas {trace_id, name, start, duration_ms, status, attributes, spans}, las más recientes primero"""
+    by_trace = {}
+    for record in spans:
+        by_trace.setdefault(record['trace_id'], []).append(record)
+
+    traces = []
+    for trace_id, records in by_trace.items():
+        roots = [record for record in records if record['parent_id'] is None]
+        start = min(record['start'] for record in records)
+        end = max(record['start'] + (record['duration_ms'] or 0) / 1000 for record in records)
+        root = roots[0] if roots else None
+        traces.append({
+            'trace_id': trace_id,
+            'name': root['name'] if root else f"{records[0]['name']} (incompleta)",
+            'start': start,
+            'duration_ms': root['duration_ms'] if root else round((end - start) * 1000, 3),
+            'status': root['status'] if root else None,
+            'attributes': root['attributes'] if root else {},
+            'spans': records,
+        })
+    return sorted(traces, key=lambda trace: trace['start'], reverse=True)
+
+
+def load_traces(path=None, limit=20, tail_bytes=TAIL_BYTES):
+    return group_traces(read_spans(path, tail_bytes))[:limit]
+
+
+def waterfall(trace):
+    """Spans de la traza en orden de árbol con profundidad y desplazamiento desde el inicio (ms)"""
+    spans = trace['spans']
+    ids = {record['span_id'] for record in spans}
+    children = {}
+    for record in spans:
+        # Los hijos cuyo padre no está en el fichero se cuelgan de la raíz
+        parent = record['parent_id'] if record['parent_id'] in ids else None
+        children.setdefault(parent, []).append(record)
+
+    rows = []
+    stack = [(record, 0) for record in sorted(children.get(None, []), key=lambda r: r['start'], reverse=True)]
+    while stack:
+        record, depth = stack.pop()
+        rows.append({
+            'span': record['name'],
+            'profundidad': depth,
+            'inicio_ms': round((record['start'] - trace['start']) * 1000, 2),
+            'ms': record['duration_ms'],
+            'estado': record['status'],
+            'hilo': record['thread'],
+            'atributos': record['attributes'],
+            'error': record['error'],
+        })
+        for child in sorted(children.get(record['span_id'], []), key=lambda r: r['start'], reverse=True):
+            stack.append((child, depth + 1))
+    return rows
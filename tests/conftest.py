@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos se importan desde la raíz del repositorio (core, components)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,115 @@
+import threading
+
+import pytest
+
+from core import ratelimit
+from core.agent import StandInTransport, stream_message
+from core.cancellation import Cancelled, CancelToken
+
+
+class Resource:
+    def __init__(self):
+        self.closed = 0
+
+    def close(self):
+        self.closed += 1
+
+
+def test_cancel_runs_callbacks_once_and_keeps_reason():
+    token = CancelToken()
+    resource = Resource()
+    with token.closing(resource):
+        assert token.cancel("user")
+        assert not token.cancel("again")
+    assert resource.closed == 1
+    assert token.reason == "user"
+    with pytest.raises(Cancelled):
+        token.raise_if_cancelled()
+
+
+def test_closing_after_cancel_closes_immediately_and_unregisters():
+    token = CancelToken()
+    done = Resource()
+    with token.closing(done):
+        pass
+    token.cancel()
+    assert done.closed == 0
+
+    late = Resource()
+    with token.closing(late):
+        assert late.closed == 1
+
+
+class BlockingStream:
+    """Respuesta en streaming que se queda esperando hasta que se cierra"""
+
+    def __init__(self):
+        self.closed = threading.Event()
+        self.started = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        self.closed.set()
+
+    @property
+    def text_stream(self):
+        yield '{"a": '
+        self.started.set()
+        self.closed.wait(5)
+        raise ConnectionError("connection closed")
+
+
+class FakeClient:
+    def __init__(self, stream):
+        self.messages = self
+        self._stream = stream
+
+    def stream(self, **request):
+        return self._stream
+
+
+@pytest.fixture
+def no_rate_limit(monkeypatch):
+    monkeypatch.setattr(ratelimit, '_limiter', ratelimit.RateLimiter(rpm=0, tpm=0))
+
+
+def test_cancel_token_closes_stream_and_raises_cancelled(no_rate_limit):
+    token = CancelToken()
+    stream = BlockingStream()
+    errors = []
+
+    def call():
+        try:
+            stream_message(FakeClient(stream), token, model="m", max_tokens=10,
+                           messages=[{"role": "user", "content": "x"}])
+        except Exception as exc:
+            errors.append(exc)
+
+    worker = threading.Thread(target=call)
+    worker.start()
+    assert stream.started.wait(5)
+    token.cancel("superseded")
+    worker.join(5)
+
+    assert stream.closed.is_set()
+    assert len(errors) == 1 and isinstance(errors[0], Cancelled)
+
+
+def test_stream_errors_without_cancel_propagate(no_rate_limit):
+    stream = BlockingStream()
+    stream.close()
+    with pytest.raises(ConnectionError):
+        stream_message(FakeClient(stream), CancelToken(), model="m", max_tokens=10,
+                       messages=[{"role": "user", "content": "x"}])
+
+
+def test_stand_in_transport_stops_waiting_when_cancelled():
+    token = CancelToken()
+    threading.Timer(0.05, token.cancel).start()
+    with pytest.raises(Cancelled):
+        StandInTransport(latency=5).complete("prompt", cancel=token)
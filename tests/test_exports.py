@@ -0,0 +1,41 @@
+import io
+import math
+import zipfile
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from components.exports import write_xlsx
+
+NS = {'m': "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+def read_sheet(data, index=1):
+    """Celdas {referencia: valor} de una hoja del XLSX"""
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        root = ET.fromstring(zf.read(f'xl/worksheets/sheet{index}.xml'))
+    cells = {}
+    for cell in root.iterfind('.//m:c', NS):
+        value = cell.find('m:v', NS)
+        text = cell.find('m:is/m:t', NS)
+        cells[cell.get('r')] = value.text if value is not None else text.text
+    return cells
+
+
+def test_xlsx_round_trip_writes_non_finite_floats_as_empty_cells():
+    rows = [
+        {'nombre': 'Ana', 'score': 0.75, 'vistas': 3},
+        {'nombre': 'Luis', 'score': float('nan'), 'vistas': float('inf')},
+        {'nombre': 'Eva', 'score': np.float64('-inf'), 'vistas': np.float64(2.5)},
+    ]
+    target = io.BytesIO()
+    write_xlsx({'Empleados': rows}, target)
+    cells = read_sheet(target.getvalue())
+
+    assert cells['A1'] == 'nombre' and cells['B1'] == 'score'
+    assert float(cells['B2']) == 0.75 and int(cells['C2']) == 3
+    assert cells['A3'] == 'Luis' and 'B3' not in cells and 'C3' not in cells
+    assert 'B4' not in cells and float(cells['C4']) == 2.5
+    # Todo valor numérico escrito es un número finito
+    assert all(math.isfinite(float(v)) for ref, v in cells.items() if ref[0] in 'BC' and ref[1:] != '1')
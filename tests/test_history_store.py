@@ -0,0 +1,91 @@
+import sqlite3
+import time
+
+import pytest
+
+from components.history_store import HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path / "history.db"), batch_size=5, flush_interval=60)
+
+
+def _stored(store):
+    return store._connection().execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+
+def test_reads_merge_pending_rows_without_writing(store):
+    store.add('osint', {'n': 1}, company="ACME", risk_score=0.7)
+    store.add('profile', {'n': 2}, company="Beta", department="IT", risk_score=0.2)
+
+    assert store.pending == 2
+    assert store.count() == 2
+    assert store.count(company="ACME") == 1
+    assert store.count(min_risk=0.5) == 1
+    assert store.distinct('company') == ["ACME", "Beta"]
+    rows = store.query(include_payload=True)
+    assert [row['payload'] for row in rows] == [{'n': 2}, {'n': 1}]
+    assert all(row['id'] is None for row in rows)
+    # Ninguna lectura ha forzado el volcado
+    assert store.pending == 2
+    assert _stored(store) == 0
+
+
+def test_batch_flushes_when_full_and_query_pages_by_id(store):
+    for i in range(7):
+        store.add('osint', {'n': i}, company="ACME", risk_score=i / 10)
+
+    assert _stored(store) == 5
+    assert store.pending == 2
+
+    first = store.query(limit=3)
+    assert [row['id'] for row in first] == [None, None, 5]
+    second = store.query(limit=3, before_id=first[-1]['id'])
+    assert [row['id'] for row in second] == [4, 3, 2]
+    assert store.count(company="ACME") == 7
+
+
+def test_full_page_of_pending_rows_flushes_for_a_cursor(store):
+    for i in range(3):
+        store.add('osint', {'n': i})
+
+    rows = store.query(limit=2)
+    assert store.pending == 0
+    assert [row['id'] for row in rows] == [3, 2]
+
+
+def test_flush_if_due_respects_thresholds(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"), batch_size=100, flush_interval=0.05)
+    store.add('osint', {'n': 1})
+    assert store.flush_if_due() == 0
+    time.sleep(0.1)
+    # El temporizador ya puede haberlo volcado; en cualquier caso no queda nada pendiente
+    store.flush_if_due()
+    assert store.pending == 0
+    assert _stored(store) == 1
+
+
+def test_failed_flush_keeps_rows_pending(store, monkeypatch):
+    store.add('osint', {'n': 1})
+    store.add('osint', {'n': 2})
+
+    class LockedConnection:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def executemany(self, *args):
+            raise sqlite3.OperationalError("database is locked")
+
+    real = store._connection
+    monkeypatch.setattr(store, '_connection', LockedConnection)
+    with pytest.raises(sqlite3.OperationalError):
+        store.flush()
+    assert store.pending == 2
+
+    monkeypatch.setattr(store, '_connection', real)
+    assert store.flush() == 2
+    assert [row['payload'] for row in store.query(include_payload=True)] == [{'n': 2}, {'n': 1}]
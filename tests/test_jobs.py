@@ -0,0 +1,103 @@
+import threading
+from concurrent.futures import wait
+
+import pytest
+
+from components.jobs import CANCELLED, DONE, SUPERSEDED, JobQueue
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(workers=2)
+    yield queue
+    queue.shutdown()
+
+
+def _blocking(started):
+    def fn(job):
+        started.set()
+        # Punto de control cooperativo: despierta en cuanto se cancela
+        job.cancel_token.wait(5)
+        job.raise_if_cancelled()
+        return "hecho"
+    return fn
+
+
+def _wait(queue, job_id):
+    job = queue.get(job_id)
+    wait([job.future], timeout=5)
+    # El callback de fin se ejecuta justo después de resolverse el future
+    for _ in range(100):
+        if not job.active:
+            break
+        threading.Event().wait(0.01)
+    return job
+
+
+def test_job_runs_persists_and_reports(queue):
+    persisted = []
+    job_id = queue.submit('osint', lambda job: {'ok': 1}, persist=persisted.append)
+    job = _wait(queue, job_id)
+    assert job.status == DONE
+    assert job.result == {'ok': 1}
+    assert persisted == [{'ok': 1}]
+    assert queue.metrics()['completados'] == 1
+
+
+def test_new_submission_supersedes_active_job_with_same_key(queue):
+    started = threading.Event()
+    first = queue.submit('osint', _blocking(started), key=('s', 'form'), fingerprint="a")
+    assert started.wait(5)
+
+    second = queue.submit('osint', lambda job: "nuevo", key=('s', 'form'), fingerprint="b")
+
+    assert _wait(queue, first).status == CANCELLED
+    assert queue.get(first).cancel_token.reason == SUPERSEDED
+    assert _wait(queue, second).result == "nuevo"
+    metrics = queue.metrics()
+    assert metrics['reemplazados'] == 1
+    assert metrics['llamadas_interrumpidas'] == 1
+
+
+def test_identical_submission_reuses_active_job(queue):
+    started = threading.Event()
+    first = queue.submit('osint', _blocking(started), key=('s', 'form'), fingerprint="a")
+    assert started.wait(5)
+
+    again = queue.submit('osint', lambda job: "duplicado", key=('s', 'form'), fingerprint="a")
+
+    assert again == first
+    assert queue.metrics()['llamadas_ahorradas'] == 1
+    queue.cancel(first)
+
+
+def test_cancel_discards_result_and_skips_persist(queue):
+    started = threading.Event()
+    persisted = []
+    job_id = queue.submit('profile', _blocking(started), persist=persisted.append)
+    assert started.wait(5)
+
+    assert queue.cancel(job_id)
+    job = _wait(queue, job_id)
+
+    assert job.status == CANCELLED
+    assert job.result is None
+    assert persisted == []
+    assert not queue.cancel(job_id)
+
+
+def test_queued_job_cancelled_never_runs():
+    queue = JobQueue(workers=1)
+    started = threading.Event()
+    ran = []
+    try:
+        blocker = queue.submit('osint', _blocking(started))
+        assert started.wait(5)
+        queued = queue.submit('osint', lambda job: ran.append(job.id))
+        assert queue.cancel(queued)
+        queue.cancel(blocker)
+        assert _wait(queue, queued).status == CANCELLED
+        assert ran == []
+        assert queue.metrics()['llamadas_ahorradas'] == 1
+    finally:
+        queue.shutdown()
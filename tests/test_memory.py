@@ -0,0 +1,69 @@
+import tracemalloc
+
+import pytest
+
+from components import memory
+
+
+@pytest.fixture(autouse=True)
+def clean_tracing(monkeypatch):
+    # Sin servidor de Streamlit todas las sesiones cuentan como activas
+    monkeypatch.setattr(memory, 'session_is_active', lambda session_id, last_seen: True)
+    memory._tracing_sessions.clear()
+    yield
+    memory._tracing_sessions.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def test_tracing_stops_when_last_session_disables_it():
+    state = {'memory_tracing': True}
+    memory.update_tracemalloc(state, 's1')
+    assert tracemalloc.is_tracing()
+
+    state['memory_tracing'] = False
+    memory.update_tracemalloc(state, 's1')
+    assert not tracemalloc.is_tracing()
+    assert 'memory_snapshot' not in state
+
+
+def test_closed_sessions_are_pruned_and_tracing_stops(monkeypatch):
+    memory.update_tracemalloc({'memory_tracing': True}, 'closed')
+    assert tracemalloc.is_tracing()
+
+    monkeypatch.setattr(memory, 'session_is_active', lambda session_id, last_seen: session_id != 'closed')
+    with memory._tracing_lock:
+        memory._prune_tracing_sessions()
+
+    assert memory._tracing_sessions == {}
+    assert not tracemalloc.is_tracing()
+
+
+def test_other_active_session_keeps_tracing():
+    memory.update_tracemalloc({'memory_tracing': True}, 'a')
+    memory.update_tracemalloc({'memory_tracing': False}, 'b')
+    assert tracemalloc.is_tracing()
+    assert set(memory._tracing_sessions) == {'a'}
+
+
+def test_inspection_is_throttled_per_session(monkeypatch):
+    calls = []
+    measure = memory.measure_session
+    monkeypatch.setattr(memory, 'measure_session', lambda state: calls.append(1) or measure(state))
+    clock = [100.0]
+    monkeypatch.setattr(memory.time, 'monotonic', lambda: clock[0])
+
+    state = {'current_osint': {'company': 'ACME'}}
+    memory.inspect_session_memory(state)
+    memory.inspect_session_memory(state)
+    assert len(calls) == 1
+
+    clock[0] += memory.INSPECT_INTERVAL
+    memory.inspect_session_memory(state)
+    memory.inspect_session_memory(state, force=True)
+    assert len(calls) == 3
+
+
+def test_report_file_is_not_discarded_by_eviction():
+    assert memory.eviction_policy('risk_report', True) is None
+    assert memory.eviction_policy('risk_report_file', object()) is None
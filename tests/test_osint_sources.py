@@ -0,0 +1,60 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from components.osint_sources import SourceAdapter, run_source_adapters
+
+
+class SlowAdapter(SourceAdapter):
+    def __init__(self, key, delay, timeout):
+        self.key = key
+        self.label = key
+        self.delay = delay
+        self.timeout = timeout
+        self.released = threading.Event()
+
+    def fetch(self, context, cancel):
+        abandoned = cancel.wait(self.delay)
+        self.released.set()
+        return {'metrics': {'abandoned': abandoned}, 'message': None}
+
+
+def test_timed_out_adapter_releases_its_thread():
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        slow = SlowAdapter('slow', delay=30, timeout=0.05)
+        results = list(run_source_adapters([slow], {}, executor=executor))
+        assert [r['status'] for r in results] == ['timeout']
+        assert slow.released.wait(1)
+
+        # Con un solo hilo, la siguiente consulta no espera a que termine la abandonada
+        fast = SlowAdapter('fast', delay=0, timeout=1)
+        started = time.perf_counter()
+        results = list(run_source_adapters([fast], {}, executor=executor))
+        assert [r['status'] for r in results] == ['ok']
+        assert time.perf_counter() - started < 0.5
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def test_results_arrive_in_completion_order():
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        adapters = [SlowAdapter('lenta', delay=0.2, timeout=1), SlowAdapter('rápida', delay=0, timeout=1)]
+        keys = [r['key'] for r in run_source_adapters(adapters, {}, executor=executor)]
+        assert keys == ['rápida', 'lenta']
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def test_timeout_counts_from_start_not_from_submit():
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        # Con un solo hilo la segunda fuente espera 0.3 s en cola, más que su timeout
+        adapters = [SlowAdapter('primera', delay=0.3, timeout=1), SlowAdapter('segunda', delay=0.05, timeout=0.2)]
+        results = {r['key']: r for r in run_source_adapters(adapters, {}, executor=executor)}
+        assert results['primera']['status'] == 'ok'
+        assert results['segunda']['status'] == 'ok'
+        assert results['segunda']['elapsed'] < 0.2
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from core.parallel import rule_keys, rule_profile, score_columns, score_rows, shutdown_pool
+from core.scoring import normalize_profile, score_employee
+from core.synthetic import generate_organization
+
+
+@pytest.fixture(scope="module")
+def org():
+    return generate_organization(2000, seed=11)
+
+
+def test_vectorized_scores_match_score_employee(org):
+    columns, departments = org.scoring_columns()
+    risk, _ = score_columns(columns, departments, backend='serial', shard_rows=300)
+    keys = rule_keys(columns)
+    for i, row in enumerate(org.rows()):
+        profile = normalize_profile(row)
+        expected = score_employee(profile)
+        assert risk[i] == expected['risk_score']
+        rules = score_employee({**rule_profile(keys[i]), 'interests': profile['interests']})
+        for name in ('vulnerabilities', 'attack_vectors', 'recommendations'):
+            assert rules[name] == expected[name]
+
+
+def test_process_backend_matches_serial(org):
+    columns, departments = org.scoring_columns()
+    serial_risk, serial_summary = score_columns(columns, departments, backend='serial', shard_rows=500)
+    try:
+        risk, summary = score_columns(columns, departments, workers=2, backend='process', shard_rows=500)
+    finally:
+        shutdown_pool()
+    np.testing.assert_array_equal(risk, serial_risk)
+    for name in ('empleados', 'niveles', 'histograma', 'vulnerabilidades', 'vectores_ataque',
+                 'recomendaciones', 'departamentos'):
+        assert summary[name] == serial_summary[name]
+    for name in ('riesgo_medio', 'riesgo_desviacion', 'riesgo_min', 'riesgo_max'):
+        assert summary[name] == pytest.approx(serial_summary[name])
+
+
+def test_score_rows_from_dicts_matches_score_employee(org):
+    rows = list(org.rows(0, 200))
+    risk, _ = score_rows(rows, backend='serial')
+    expected = [score_employee(normalize_profile(row))['risk_score'] for row in rows]
+    np.testing.assert_array_equal(risk, expected)
@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+
+from core.ratelimit import RateLimited, RateLimiter
+
+
+def _stored_levels(limiter):
+    conn = limiter._connection()
+    return dict(conn.execute("SELECT name, level FROM buckets").fetchall())
+
+
+def _tickets(limiter):
+    return limiter._connection().execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+
+
+def test_concurrent_acquires_consume_one_request_each(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "rl.db"), rpm=30, tpm=3000, max_wait=30)
+    started = time.monotonic()
+    errors = []
+
+    def call():
+        try:
+            limiter.acquire(100)
+        except Exception as exc:  # pragma: no cover - el fallo se comprueba abajo
+            errors.append(exc)
+
+    threads = [threading.Thread(target=call) for _ in range(30)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    assert not errors
+    assert limiter.granted == 30
+    assert _tickets(limiter) == 0
+    levels = _stored_levels(limiter)
+    # Cada concesión consume una petición y 100 tokens; solo queda lo rellenado
+    # (menos de una llamada más, con margen por el reloj de pared)
+    assert levels['requests'] < 30 / 60 * elapsed + 1
+    assert levels['tokens'] < 3000 / 60 * elapsed + 100
+
+
+def test_waits_behind_earlier_ticket_even_with_quota(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "rl.db"), rpm=60, tpm=6000, max_wait=0.5)
+    now = time.time()
+    limiter._connection().execute("INSERT INTO tickets (cost, created, seen) VALUES (?, ?, ?)", (10, now, now))
+
+    with pytest.raises(RateLimited):
+        limiter.acquire(1000)
+
+    assert limiter.granted == 0
+    assert _stored_levels(limiter) == {}
+    assert _tickets(limiter) == 1
+
+
+def test_refund_returns_unused_tokens(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "rl.db"), rpm=0, tpm=6000, max_wait=1)
+    permit = limiter.acquire(4000)
+    permit.settle(1000)
+    assert _stored_levels(limiter)['tokens'] == pytest.approx(5000, abs=5)
@@ -0,0 +1,56 @@
+import gc
+import os
+
+from streamlit.testing.v1 import AppTest
+
+from components.reports import ReportFile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def high_risk_table(root):
+    import sys
+    sys.path.insert(0, root)
+    from components.dashboard import create_high_risk_employees_table
+    create_high_risk_employees_table()
+
+
+def run_table():
+    at = AppTest.from_function(high_risk_table, args=(ROOT,), default_timeout=30)
+    return at.run()
+
+
+def test_report_button_offers_download():
+    at = run_table()
+    assert not at.exception
+    assert not at.get('download_button')
+
+    at.button(key="risk_report").click().run()
+    assert not at.exception
+    assert len(at.get('download_button')) == 1
+
+    report = at.session_state['risk_report_file']
+    assert report.exists() and report.file_name.endswith('.pdf')
+    report.discard()
+
+
+def test_regenerating_report_removes_previous_file():
+    at = run_table()
+    at.button(key="risk_report").click().run()
+    first = at.session_state['risk_report_file'].path
+
+    at.button(key="risk_report").click().run()
+    assert not at.exception
+    assert not os.path.exists(first)
+    assert at.session_state['risk_report_file'].exists()
+    at.session_state['risk_report_file'].discard()
+
+
+def test_report_file_is_removed_when_released():
+    report = ReportFile('html', 'reporte.html', 'text/html')
+    path = report.path
+    assert os.path.exists(path)
+
+    del report
+    gc.collect()
+    assert not os.path.exists(path)
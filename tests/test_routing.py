@@ -0,0 +1,89 @@
+import pytest
+
+from core.agent import SecurityAgent, StandInTransport
+from core import routing
+from core.routing import ROUTES, Router, model_not_found
+
+
+class NotFound(Exception):
+    """Como `anthropic.NotFoundError`: error de estado HTTP 404"""
+
+    status_code = 404
+
+
+def _router():
+    return Router(models={}, routes={name: dict(route) for name, route in ROUTES.items()})
+
+
+def test_invoke_falls_back_when_model_not_found():
+    router = _router()
+    sent, announced = [], []
+
+    def send(decision):
+        sent.append(decision.model)
+        if decision.model == 'claude-3-5-haiku-20241022':
+            raise NotFound("modelo no encontrado")
+        return "ok"
+
+    text, decision = router.invoke("run_osint_analysis", "prompt", send, on_fallback=announced.append)
+
+    assert text == "ok"
+    assert sent == ['claude-3-5-haiku-20241022', 'claude-3-haiku-20240307']
+    assert decision.model == 'claude-3-haiku-20240307'
+    assert decision.reason == "respaldo de claude-3-5-haiku-20241022"
+    assert [d.model for d in announced] == ['claude-3-haiku-20240307']
+    assert router.unavailable() == {'claude-3-5-haiku-20241022'}
+
+
+def test_invoke_reraises_other_errors_and_fixed_models():
+    router = _router()
+
+    def timeout(decision):
+        raise TimeoutError("lento")
+
+    with pytest.raises(TimeoutError):
+        router.invoke("run_osint_analysis", "prompt", timeout)
+
+    def not_found(decision):
+        raise NotFound("modelo no encontrado")
+
+    with pytest.raises(NotFound):
+        router.invoke("run_osint_analysis", "prompt", not_found, models=['claude-3-5-haiku-20241022'])
+    assert not router.unavailable()
+
+
+def test_model_not_found_checks_status_not_text():
+    assert model_not_found(NotFound("modelo"))
+    assert not model_not_found(RuntimeError("HTTP 404 en el proxy"))
+    assert not model_not_found(RuntimeError("not_found_error"))
+
+
+def test_unavailable_model_is_scoped_to_credential_and_expires(monkeypatch):
+    router = _router()
+    clock = [1000.0]
+    monkeypatch.setattr(routing.time, 'monotonic', lambda: clock[0])
+
+    def send(decision):
+        if decision.scope == "clave-a" and decision.model == 'claude-3-5-haiku-20241022':
+            raise NotFound("modelo")
+        return decision.model
+
+    text, _ = router.invoke("run_osint_analysis", "prompt", send, scope="clave-a")
+    assert text == 'claude-3-haiku-20240307'
+
+    # Otra credencial sigue usando el modelo preferido
+    assert router.primary_model("run_osint_analysis", "clave-b") == 'claude-3-5-haiku-20241022'
+    assert router.primary_model("run_osint_analysis", "clave-a") == 'claude-3-haiku-20240307'
+
+    clock[0] += routing.UNAVAILABLE_TTL_S
+    assert router.unavailable("clave-a") == set()
+    assert router.primary_model("run_osint_analysis", "clave-a") == 'claude-3-5-haiku-20241022'
+
+
+def test_agent_reports_fixed_or_offline_model():
+    assert SecurityAgent().model == 'offline'
+    agent = SecurityAgent(StandInTransport(latency=0, model="stand-in"))
+    assert agent.model == "stand-in"
+    assert not agent.routed
+    result = agent.analyze_company_osint({'name': "ACME"})
+    assert result['ai_model'] == "stand-in"
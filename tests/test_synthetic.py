@@ -0,0 +1,34 @@
+import numpy as np
+
+from core.synthetic import generate_organization, load_organization, write_organization
+
+
+def test_same_seed_reproduces_organization():
+    first = generate_organization(3000, seed=42, block_rows=1000)
+    second = generate_organization(3000, seed=42, block_rows=1000)
+    assert first.columns.keys() == second.columns.keys()
+    for name in first.columns:
+        np.testing.assert_array_equal(first.columns[name], second.columns[name])
+    assert list(first.rows(0, 50)) == list(second.rows(0, 50))
+
+
+def test_different_seed_changes_organization():
+    first = generate_organization(1000, seed=1)
+    second = generate_organization(1000, seed=2)
+    assert not np.array_equal(first.columns['social_activity'], second.columns['social_activity'])
+
+
+def test_generated_values_stay_in_range():
+    org = generate_organization(5000, seed=3)
+    for name in ('social_activity', 'info_sharing', 'security_awareness'):
+        assert org.columns[name].min() >= 1 and org.columns[name].max() <= 10
+    assert list(org.columns['employee_id'][:3]) == [1, 2, 3]
+
+
+def test_npz_round_trip(tmp_path):
+    org = generate_organization(500, seed=9)
+    path = tmp_path / "org.npz"
+    write_organization(org, str(path))
+    loaded = load_organization(str(path))
+    assert loaded.seed == org.seed
+    assert list(loaded.rows()) == list(org.rows())
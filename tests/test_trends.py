@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from components import dashboard
+from components.trends import TrendEngine
+
+
+@pytest.fixture(autouse=True)
+def session_state(monkeypatch):
+    state = {}
+    monkeypatch.setattr(dashboard, 'st', SimpleNamespace(session_state=state))
+    return state
+
+
+def expected(values):
+    return TrendEngine.from_matrix(["v"], np.atleast_2d(values), window=dashboard.TREND_WINDOW)
+
+
+def get(values, dates):
+    return dashboard.get_trend_engine("v", ["v"], values, index=dates)
+
+
+def test_growing_history_reuses_engine():
+    dates = pd.date_range('2024-01-01', periods=30, freq='D')
+    values = np.arange(30, dtype=float)
+
+    first = get(values[:20], dates[:20])
+    second = get(values, dates)
+    assert second is first
+    assert second.count == 30
+    np.testing.assert_allclose(second.ewma, expected(values).ewma)
+
+
+def test_replaced_history_with_same_length_rebuilds_engine():
+    dates = pd.date_range('2024-01-01', periods=20, freq='D')
+    first = get(np.arange(20, dtype=float), dates)
+
+    replaced = np.arange(20, dtype=float)[::-1].copy()
+    second = get(replaced, dates + pd.Timedelta(days=100))
+    assert second is not first
+    np.testing.assert_allclose(second.ewma, expected(replaced).ewma)
+
+
+def test_filtered_history_rebuilds_engine():
+    dates = pd.date_range('2024-01-01', periods=20, freq='D')
+    values = np.arange(20, dtype=float)
+    get(values, dates)
+
+    # Mismo tramo final más corto: la huella del principio ya no coincide
+    engine = get(values[5:], dates[5:])
+    assert engine.count == 15
+    np.testing.assert_allclose(engine.ewma, expected(values[5:]).ewma)
+
+
+def test_edited_values_at_same_timestamps_rebuild_engine():
+    dates = pd.date_range('2024-01-01', periods=20, freq='D')
+    values = np.arange(20, dtype=float)
+    get(values[:10], dates[:10])
+
+    edited = values.copy()
+    edited[9] = 99
+    engine = get(edited, dates)
+    np.testing.assert_allclose(engine.ewma, expected(edited).ewma)
+
+
+def test_edited_value_in_middle_of_consumed_prefix_rebuilds_engine():
+    dates = pd.date_range('2024-01-01', periods=20, freq='D')
+    values = np.arange(20, dtype=float)
+    get(values[:10], dates[:10])
+
+    edited = values.copy()
+    edited[4] = 500
+    engine = get(edited, dates)
+    np.testing.assert_allclose(engine.ewma, expected(edited).ewma)